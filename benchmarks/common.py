@@ -0,0 +1,104 @@
+"""
+基准测试公共部分：计时、结果文件（JSON）和与基线的对比
+
+结果文件格式：
+    {"meta": {"python": ..., "platform": ..., "commit": ..., "time": ...},
+     "results": {用例名: {指标: 数值, ...}, ...}}
+对比只看 METRICS 中登记了方向的指标：lower 越小越好（耗时），higher 越大越好（吞吐）。
+"""
+
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+
+LOWER = 'lower'
+HIGHER = 'higher'
+
+# 指标 -> 方向
+METRICS = {
+    'median_ns': LOWER,
+    'min_ns': LOWER,
+}
+
+
+def measure(fn, repeat=5, min_time=0.2):
+    """重复计时 fn()，每轮至少 min_time 秒，返回单次调用的耗时统计"""
+    timer = timeit.Timer(fn)
+    # 循环次数翻倍直到一轮不短于 min_time
+    loops = 1
+    while True:
+        elapsed = timer.timeit(loops)
+        if elapsed >= min_time:
+            break
+        loops = max(loops * 2, int(loops * min_time / max(elapsed, 1e-9) * 1.1))
+    times = [t / loops * 1e9 for t in timer.repeat(repeat, loops)]
+    median = statistics.median(times)
+    return {
+        'median_ns': round(median, 1),
+        'min_ns': round(min(times), 1),
+        'ops_per_s': round(1e9 / median, 1) if median else None,
+        'loops': loops,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip()
+    except Exception:
+        return ''
+
+
+def environment():
+    return {
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'commit': git_commit(),
+        'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+
+def write_results(path, results, meta=None):
+    data = {'meta': meta or environment(), 'results': results}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def load_results(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)['results']
+
+
+def compare(current, baseline, tolerance=0.10, metrics=None):
+    """
+    逐用例逐指标对比，返回 [(用例, 指标, 基线值, 当前值, 变化比例, 是否退化)]。
+    变化比例为正表示变好；退化：朝坏的方向变化超过 tolerance（可为 {指标: 容差}）。
+    """
+    metrics = metrics or METRICS
+    rows = []
+    for name, values in current.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for metric, direction in metrics.items():
+            old, new = base.get(metric), values.get(metric)
+            if not old or new is None:
+                continue
+            change = (old - new) / old if direction == LOWER else (new - old) / old
+            limit = tolerance.get(metric, 0.10) if isinstance(tolerance, dict) else tolerance
+            rows.append((name, metric, old, new, change, change < -limit))
+    return rows
+
+
+def format_comparison(rows):
+    lines = [f"{'用例':<48} {'指标':<22} {'基线':>14} {'当前':>14} {'变化':>8}"]
+    for name, metric, old, new, change, regressed in rows:
+        flag = '  退化' if regressed else ''
+        lines.append(f"{name:<48} {metric:<22} {old:>14.1f} {new:>14.1f} {change:>+7.1%}{flag}")
+    return '\n'.join(lines)
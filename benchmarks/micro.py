@@ -0,0 +1,214 @@
+"""
+协议与解码热点的微基准
+
+    python -m benchmarks.micro                                 # 全部用例，结果写入 benchmarks/results_micro.json
+    python -m benchmarks.micro --quick --filter crc            # 只跑名称含 crc 的用例，缩短计时
+    python -m benchmarks.micro --baseline benchmarks/baseline_micro.json
+    python -m benchmarks.micro --save-baseline                 # 把本次结果存为基线
+
+覆盖 Protocol.calc_crc / calc_lrc / build_rtu_request / parse_rtu_response / parse_ascii_response、
+decode_modbus_value 和 DataProcessor.update_param_value。帧大小 1~125 个寄存器，参数表 100~50000 行。
+update_param_value 需要 PyQt5（使用 offscreen 平台，无需显示器），未安装时跳过。
+"""
+
+import argparse
+import os
+import random
+import struct
+import sys
+
+from benchmarks.common import LOWER, compare, format_comparison, load_results, measure, write_results
+from core.protocol import Protocol
+
+FRAME_QTYS = (1, 10, 60, 125)
+MAP_SIZES = (100, 1000, 10000, 50000)
+QUICK_MAP_SIZES = (100, 1000)
+GROUP_COUNT = 4
+
+DEFAULT_OUTPUT = os.path.join('benchmarks', 'results_micro.json')
+DEFAULT_BASELINE = os.path.join('benchmarks', 'baseline_micro.json')
+
+
+def response_frame(qty, slave=1, seed=0):
+    """带CRC的FC3响应帧"""
+    rng = random.Random(seed)
+    body = bytes([slave, 3, 2 * qty]) + bytes(rng.randrange(256) for _ in range(2 * qty))
+    return body + Protocol.calc_crc(body)
+
+
+def ascii_frame(qty, slave=1, seed=0):
+    body = response_frame(qty, slave, seed)[:-2]
+    return b':' + body.hex().upper().encode() + Protocol.calc_lrc(body).hex().upper().encode() + b'\r\n'
+
+
+def protocol_cases():
+    """[(名称, 可调用对象)]"""
+    cases = []
+    for qty in FRAME_QTYS:
+        frame = response_frame(qty)
+        body = frame[:-2]
+        text = ascii_frame(qty)
+        data = bytes([2 * qty]) + struct.pack(f'>{qty}H', *range(qty))
+        cases += [
+            (f'protocol/calc_crc/qty={qty}', lambda body=body: Protocol.calc_crc(body)),
+            (f'protocol/calc_lrc/qty={qty}', lambda body=body: Protocol.calc_lrc(body)),
+            (f'protocol/build_rtu_request/fc3/qty={qty}', lambda qty=qty: Protocol.build_rtu_request(1, 3, 100, qty)),
+            (f'protocol/build_rtu_request/fc16/qty={qty}',
+             lambda qty=qty, data=data: Protocol.build_rtu_request(1, 16, 100, qty, data)),
+            (f'protocol/parse_rtu_response/qty={qty}', lambda frame=frame: Protocol.parse_rtu_response(frame)),
+            (f'protocol/parse_ascii_response/qty={qty}', lambda text=text: Protocol.parse_ascii_response(text)),
+        ]
+    return cases
+
+
+def param_map(rows, seed=0):
+    """生成参数表：与导入后的分组表相同的列（addr 为整数字符串）"""
+    import pandas as pd
+    rng = random.Random(seed)
+    types = ['UNSIGNED', 'SIGNED', 'HEX', None]
+    return pd.DataFrame({
+        'name': [f'P{i}' for i in range(rows)],
+        'addr': [str(40000 + i) for i in range(rows)],
+        'dataType': [rng.choice(types) for _ in range(rows)],
+        'slave': [1] * rows,
+        'port': [''] * rows,
+    })
+
+
+def decode_cases(map_sizes):
+    from core.data_processor import decode_modbus_value
+    cases = []
+    frame = response_frame(125)
+    payload = frame[:-2]
+    for rows in map_sizes:
+        df = param_map(rows)
+        last = rows - 1
+        reg_bytes = payload[3:5]
+        cases += [
+            (f'decode/decode_modbus_value/typed/rows={rows}',
+             lambda df=df, last=last: decode_modbus_value(reg_bytes, 'UNSIGNED', payload, 0, 125, last, df)),
+            # 未指定类型时按行查找数据类型列
+            (f'decode/decode_modbus_value/untyped/rows={rows}',
+             lambda df=df, last=last: decode_modbus_value(reg_bytes, None, payload, 0, 125, last, df)),
+        ]
+    cases += bit_cases(map_sizes)
+    return cases
+
+
+def bit_cases(map_sizes):
+    """一个 2000 位的线圈响应按参数表解码（numpy 解包）"""
+    from core.register_map import RegisterMap
+    rng = random.Random(0)
+    data = bytes(rng.randrange(256) for _ in range(250))
+    cases = []
+    for rows in map_sizes:
+        register_map = RegisterMap.from_dataframe(param_map(rows))
+        cases.append((f'decode/decode_bits/qty=2000/rows={rows}',
+                      lambda register_map=register_map: register_map.decode_bits(40000, data, 2000)))
+    return cases
+
+
+_app = None
+
+
+def _qt_app():
+    """表格控件需要 QApplication，保存在模块中直到进程结束"""
+    global _app
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5 import QtWidgets
+    _app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv[:1])
+    return _app
+
+
+def group_table(df, group_count=GROUP_COUNT):
+    """与主窗口分组页相同布局的表格：每组 Data/Address/Value 三列"""
+    from PyQt5 import QtWidgets
+    n = len(df)
+    row_count = (n + group_count - 1) // group_count
+    table = QtWidgets.QTableWidget(row_count, group_count * 3)
+    table.setHorizontalHeaderLabels(['Data', 'Address', 'Value'] * group_count)
+    for i, (name, addr) in enumerate(zip(df['name'], df['addr'])):
+        r, base = i % row_count, (i // row_count) * 3
+        table.setItem(r, base, QtWidgets.QTableWidgetItem(name))
+        table.setItem(r, base + 1, QtWidgets.QTableWidgetItem(addr))
+        table.setItem(r, base + 2, QtWidgets.QTableWidgetItem(''))
+    return table
+
+
+def all_parameters_table(df):
+    """All Parameters 页：Address / Current Value 列"""
+    from PyQt5 import QtWidgets
+    headers = ['Name', 'Address', 'Current Value', 'slave', 'port']
+    table = QtWidgets.QTableWidget(len(df), len(headers))
+    table.setHorizontalHeaderLabels(headers)
+    for r, (name, addr) in enumerate(zip(df['name'], df['addr'])):
+        for c, text in enumerate((name, addr, '', '1', '')):
+            table.setItem(r, c, QtWidgets.QTableWidgetItem(text))
+    return table
+
+
+def update_cases(map_sizes):
+    try:
+        _qt_app()
+        from core.data_processor import DataProcessor
+    except ImportError as e:
+        print(f'跳过 update_param_value: {e}', file=sys.stderr)
+        return []
+    cases = []
+    for rows in map_sizes:
+        df = param_map(rows)
+        tables = {'group': group_table(df), 'All Parameters': all_parameters_table(df)}
+        first, middle, last = int(df['addr'].iloc[0]), int(df['addr'].iloc[rows // 2]), int(df['addr'].iloc[-1])
+        counter = iter(range(1 << 62))
+        for position, addr in (('first', first), ('middle', middle), ('last', last)):
+            cases.append((f'ui/update_param_value/group/{position}/rows={rows}',
+                          lambda addr=addr, tables=tables: DataProcessor.update_param_value(
+                              addr, str(next(counter)), tables, 'group')))
+        cases.append((f'ui/update_param_value/all/last/rows={rows}',
+                      lambda addr=last, tables=tables: DataProcessor.update_param_value(
+                          addr, str(next(counter)), tables, 'All Parameters', slave=1, port='')))
+    return cases
+
+
+def run(name_filter=None, quick=False, repeat=5, min_time=0.2):
+    map_sizes = QUICK_MAP_SIZES if quick else MAP_SIZES
+    if quick:
+        repeat, min_time = 3, 0.05
+    cases = protocol_cases() + decode_cases(map_sizes) + update_cases(map_sizes)
+    results = {}
+    for name, fn in cases:
+        if name_filter and name_filter not in name:
+            continue
+        results[name] = measure(fn, repeat, min_time)
+        print(f"{name:<56} {results[name]['median_ns']:>14.1f} ns", flush=True)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='协议与解码微基准')
+    parser.add_argument('--filter', help='只运行名称包含该字符串的用例')
+    parser.add_argument('--quick', action='store_true', help='缩短计时、只用小参数表')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.2, help='每轮计时的最短秒数')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='结果文件（默认 %(default)s）')
+    parser.add_argument('--baseline', help='与该结果文件对比（默认存在 %s 时使用）' % DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='把本次结果保存为基线')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='变慢超过该比例时标记为退化')
+    args = parser.parse_args(argv)
+
+    results = run(args.filter, args.quick, args.repeat, args.min_time)
+    write_results(args.output, results)
+    print(f'结果已写入 {args.output}')
+    if args.save_baseline:
+        write_results(DEFAULT_BASELINE, results)
+        print(f'基线已保存: {DEFAULT_BASELINE}')
+        return 0
+    baseline = args.baseline or (DEFAULT_BASELINE if os.path.exists(DEFAULT_BASELINE) else None)
+    if baseline:
+        print(format_comparison(compare(results, load_results(baseline), args.tolerance,
+                                        {'median_ns': LOWER})))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
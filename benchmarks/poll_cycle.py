@@ -0,0 +1,362 @@
+"""
+端到端轮询周期基准（带退化门限）
+
+每个场景（波特率 × 参数表行数）：
+    1. 在临时目录生成 config_and_params.xlsx
+    2. 子进程启动模拟从站（python -m core.simulator --baudrate ...，伪终端，按波特率模拟传输时间）
+    3. 另一个子进程用 Qt offscreen 平台创建真实的 MainWindow，打开伪终端、开始轮询（界面刷新开销计入），
+       预热后测量一段时间，输出一行JSON
+场景放在独立进程中运行，峰值内存互不影响，模拟从站也不与界面争用GIL。
+
+指标：
+    cycle_ms               轮询完整个参数表一次的时间
+    registers_per_s        每秒读取的寄存器数
+    ui_latency_ms_p50/p95  值写入数值表到表格刷新完成的延迟
+    request_to_ui_ms_p50   请求发出到表格显示（平均响应时间 + ui_latency_ms_p50）
+    cpu_percent            进程CPU占用（100 = 一个核），cpu_threads 为各线程占用（Linux）
+    peak_rss_mb            峰值常驻内存
+
+    python -m benchmarks.poll_cycle                              # 默认场景，结果写入 benchmarks/results_poll_cycle.json
+    python -m benchmarks.poll_cycle --bauds 115200 --rows 100,1000 --duration 5
+    python -m benchmarks.poll_cycle --save-baseline
+    python -m benchmarks.poll_cycle --tolerance cycle_ms=0.05,peak_rss_mb=0.2   # 与基线对比，退化时退出码为1
+需要 Linux（伪终端）和 PyQt5。
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.common import HIGHER, LOWER, compare, format_comparison, load_results, write_results
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_NAME = 'config_and_params.xlsx'
+GROUP_ROWS = 250
+
+DEFAULT_BAUDS = (9600, 115200)
+DEFAULT_ROWS = (100, 1000, 5000)
+DEFAULT_OUTPUT = os.path.join('benchmarks', 'results_poll_cycle.json')
+DEFAULT_BASELINE = os.path.join('benchmarks', 'baseline_poll_cycle.json')
+
+METRICS = {
+    'cycle_ms': LOWER,
+    'registers_per_s': HIGHER,
+    'ui_latency_ms_p95': LOWER,
+    'request_to_ui_ms_p50': LOWER,
+    'cpu_percent': LOWER,
+    'peak_rss_mb': LOWER,
+}
+# 界面延迟受刷新定时器相位影响，CPU/内存受机器负载影响，容差放宽
+DEFAULT_TOLERANCES = {
+    'cycle_ms': 0.10,
+    'registers_per_s': 0.10,
+    'ui_latency_ms_p95': 0.30,
+    'request_to_ui_ms_p50': 0.30,
+    'cpu_percent': 0.30,
+    'peak_rss_mb': 0.15,
+}
+
+
+def write_workbook(path, rows, port='', baudrate=9600):
+    """参数表每 GROUP_ROWS 行一个分组，地址从 0 开始连续"""
+    import pandas as pd
+    sheet = [['benchmark', '', ''], ['name', 'addr', 'dataType']]
+    for i in range(rows):
+        if i % GROUP_ROWS == 0:
+            sheet.append([f'Group {i // GROUP_ROWS + 1}', '', ''])
+        sheet.append([f'P{i}', i, 'SIGNED' if i % 4 == 1 else 'UNSIGNED'])
+    settings = [{'port': port, 'baudrate': baudrate, 'bytesize': 8, 'parity': 'N', 'stopbits': 1, 'mode': 'RTU',
+                 'slave': 1}]
+    with pd.ExcelWriter(path, engine='openpyxl') as writer:
+        pd.DataFrame(settings).to_excel(writer, sheet_name='LocalSettings', index=False)
+        pd.DataFrame(sheet).to_excel(writer, sheet_name='Params', index=False, header=False)
+
+
+# ---------- 子进程：运行一个场景 ----------
+
+def thread_cpu_times():
+    """{线程名: CPU秒}，只在 Linux 上可用（/proc/self/task）"""
+    try:
+        tids = os.listdir('/proc/self/task')
+    except OSError:
+        return {}
+    names = {t.native_id: t.name for t in threading.enumerate()}
+    tick = os.sysconf('SC_CLK_TCK')
+    times = {}
+    for tid in tids:
+        try:
+            with open(f'/proc/self/task/{tid}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            with open(f'/proc/self/task/{tid}/comm') as f:
+                comm = f.read().strip()
+        except OSError:
+            continue
+        name = names.get(int(tid), comm)
+        # utime, stime 是 ')' 之后的第 12、13 个字段
+        times[f'{name}:{tid}'] = (int(fields[11]) + int(fields[12])) / tick
+    return times
+
+
+def peak_rss_mb():
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 为 KB，macOS 为字节
+    return round(rss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class ScenarioProbe:
+    """挂在 MainWindow 上记录界面延迟，并在测量窗口前后取计数"""
+
+    def __init__(self, window, max_samples_per_refresh=200):
+        self.window = window
+        self.max_samples = max_samples_per_refresh
+        self.latencies = []
+        self.recording = False
+        self._last_changes = []
+        store = window.value_store
+        original_changed_since = store.changed_since
+        original_refresh = window.refresh_values
+
+        def changed_since(version):
+            result = original_changed_since(version)
+            self._last_changes = result[1]
+            return result
+
+        def refresh_values():
+            self._last_changes = []
+            original_refresh()
+            if self.recording and self._last_changes:
+                now = time.time()
+                step = max(1, len(self._last_changes) // self.max_samples)
+                self.latencies.extend((now - stored.ts) * 1000 for _, stored in self._last_changes[::step])
+
+        store.changed_since = changed_since
+        window.refresh_values = refresh_values
+        # 定时器已连接到原方法，重新连接
+        window.store_timer.timeout.disconnect()
+        window.store_timer.timeout.connect(refresh_values)
+
+    def counters(self):
+        ok = fail = 0
+        response_ms = []
+        for port in self.window.engine.ports.values():
+            for health in port.scheduler.health.values():
+                ok += health.ok_count
+                fail += health.fail_count
+                if health.avg_response_ms is not None:
+                    response_ms.append(health.avg_response_ms)
+        return ok, fail, response_ms
+
+    def plan_size(self):
+        requests = registers = 0
+        for port in self.window.engine.ports.values():
+            for ranges in port.scheduler.plan.values():
+                requests += len(ranges)
+                registers += sum(r.qty for r in ranges)
+        return requests, registers
+
+
+def run_scenario(config, port, baudrate, duration, warmup, interval):
+    """在当前进程中运行一个场景，返回指标dict"""
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    workdir = os.path.dirname(os.path.abspath(config))
+    sys.path.insert(0, REPO_ROOT)
+    from utils.log_manager import setup_logging
+    # 在导入主窗口之前配置日志，不写仓库里的 modbus.log
+    setup_logging(os.path.join(workdir, 'modbus.log'))
+    from PyQt5 import QtWidgets
+    from PyQt5.QtCore import QTimer
+    errors = []
+
+    def message_box(*args, **kwargs):
+        errors.append(str(args[2]) if len(args) > 2 else '')
+        return QtWidgets.QMessageBox.No
+
+    # 弹窗在无界面环境下会阻塞
+    for name in ('critical', 'warning', 'information', 'question'):
+        setattr(QtWidgets.QMessageBox, name, staticmethod(message_box))
+
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv[:1])
+    os.chdir(workdir)
+    from ui.main_window import MainWindow
+    window = MainWindow()
+    window.show()
+    config_widget = window.serial_config
+    config_widget.port_cb.addItem(port)
+    config_widget.port_cb.setCurrentText(port)
+    config_widget.baud_cb.setCurrentText(str(baudrate))
+    window.toggle_port()
+    window.toggle_polling()
+    if not window.polling:
+        raise RuntimeError(f"开始轮询失败: {errors}")
+    for port_engine in window.engine.ports.values():
+        port_engine.interval = interval
+    probe = ScenarioProbe(window)
+    state = {}
+
+    def start_window():
+        state['ok'], state['fail'], _ = probe.counters()
+        state['cpu'] = thread_cpu_times()
+        state['process_cpu'] = time.process_time()
+        state['t0'] = time.monotonic()
+        probe.recording = True
+        # 界面线程繁忙时两个定时器可能连续触发，结束定时器从开始时刻计
+        QTimer.singleShot(int(duration * 1000), end_window)
+
+    def end_window():
+        elapsed = time.monotonic() - state['t0']
+        probe.recording = False
+        ok, fail, response_ms = probe.counters()
+        cpu = thread_cpu_times()
+        process_cpu = time.process_time() - state['process_cpu']
+        requests_per_cycle, registers_per_cycle = probe.plan_size()
+        cycles = (ok - state['ok']) / requests_per_cycle if requests_per_cycle else 0
+        ui_p50 = percentile(probe.latencies, 0.5)
+        ui_p95 = percentile(probe.latencies, 0.95)
+        mean_response = statistics.mean(response_ms) if response_ms else None
+        state['result'] = {
+            'duration_s': round(elapsed, 2),
+            'requests_ok': ok - state['ok'],
+            'requests_failed': fail - state['fail'],
+            'cycle_ms': round(elapsed * 1000 / cycles, 2) if cycles else None,
+            'registers_per_s': round(registers_per_cycle * cycles / elapsed, 1),
+            'ui_latency_ms_p50': None if ui_p50 is None else round(ui_p50, 2),
+            'ui_latency_ms_p95': None if ui_p95 is None else round(ui_p95, 2),
+            'request_to_ui_ms_p50': round(ui_p50 + mean_response, 2) if ui_p50 is not None and mean_response else None,
+            'response_ms_mean': mean_response and round(mean_response, 2),
+            'cpu_percent': round(process_cpu / elapsed * 100, 1),
+            'cpu_threads': {name: round((cpu[name] - state['cpu'].get(name, 0.0)) / elapsed * 100, 1)
+                            for name in cpu if cpu[name] - state['cpu'].get(name, 0.0) > 0},
+            'peak_rss_mb': peak_rss_mb(),
+            'errors': errors[:5],
+        }
+        window.toggle_polling()
+        window.toggle_port()
+        app.quit()
+
+    QTimer.singleShot(int(warmup * 1000), start_window)
+    app.exec_()
+    window.close()
+    return state['result']
+
+
+# ---------- 主进程：按场景启动子进程并汇总 ----------
+
+def start_simulator(config, baudrate):
+    """启动模拟从站子进程，返回 (进程, 伪终端路径)"""
+    process = subprocess.Popen([sys.executable, '-m', 'core.simulator', '--config', config, '--baudrate',
+                                str(baudrate), '--seed', '1'], cwd=REPO_ROOT, stdout=subprocess.PIPE,
+                               stderr=subprocess.DEVNULL, text=True)
+    port = process.stdout.readline().strip()
+    if not port:
+        process.kill()
+        raise RuntimeError("模拟从站启动失败")
+    return process, port
+
+
+def measure_scenario(baudrate, rows, duration, warmup, interval):
+    with tempfile.TemporaryDirectory(prefix='modbus_bench_') as workdir:
+        config = os.path.join(workdir, CONFIG_NAME)
+        write_workbook(config, rows, baudrate=baudrate)
+        simulator, port = start_simulator(config, baudrate)
+        try:
+            child = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.poll_cycle', '--run-scenario', '--config', config, '--port', port,
+                 '--bauds', str(baudrate), '--duration', str(duration), '--warmup', str(warmup),
+                 '--interval', str(interval)],
+                cwd=REPO_ROOT, capture_output=True, text=True, timeout=warmup + duration + 120)
+        finally:
+            simulator.terminate()
+            simulator.wait(5)
+    lines = [line for line in child.stdout.splitlines() if line.startswith('{')]
+    if child.returncode != 0 or not lines:
+        raise RuntimeError(f"场景 baud={baudrate} rows={rows} 失败:\n{child.stderr[-2000:]}")
+    return json.loads(lines[-1])
+
+
+def parse_tolerance(text):
+    """'0.1' 统一容差，或 'cycle_ms=0.05,peak_rss_mb=0.2' 覆盖部分默认值"""
+    tolerances = dict(DEFAULT_TOLERANCES)
+    if not text:
+        return tolerances
+    if '=' not in text:
+        return {metric: float(text) for metric in METRICS}
+    for item in text.split(','):
+        metric, _, value = item.partition('=')
+        metric = metric.strip()
+        if metric not in METRICS:
+            raise ValueError(f"未知指标: {metric}")
+        tolerances[metric] = float(value)
+    return tolerances
+
+
+def parse_ints(text):
+    return [int(x) for x in str(text).split(',') if x.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='端到端轮询周期基准')
+    parser.add_argument('--bauds', default=','.join(map(str, DEFAULT_BAUDS)), help='波特率，逗号分隔')
+    parser.add_argument('--rows', default=','.join(map(str, DEFAULT_ROWS)), help='参数表行数，逗号分隔')
+    parser.add_argument('--duration', type=float, default=10.0, help='每个场景的测量秒数')
+    parser.add_argument('--warmup', type=float, default=2.0, help='开始测量前的预热秒数')
+    parser.add_argument('--interval', type=float, default=0.0, help='轮询请求间隔秒数')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='结果文件（默认 %(default)s）')
+    parser.add_argument('--baseline', help='与该结果文件对比（默认存在 %s 时使用）' % DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='把本次结果保存为基线')
+    parser.add_argument('--tolerance', help='退化容差：统一比例或 指标=比例,...')
+    # 内部使用：在子进程中运行单个场景
+    parser.add_argument('--run-scenario', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--config', help=argparse.SUPPRESS)
+    parser.add_argument('--port', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_scenario:
+        result = run_scenario(args.config, args.port, parse_ints(args.bauds)[0], args.duration, args.warmup,
+                              args.interval)
+        print(json.dumps(result, ensure_ascii=False), flush=True)
+        return 0
+
+    tolerances = parse_tolerance(args.tolerance)
+    results = {}
+    for baudrate in parse_ints(args.bauds):
+        for rows in parse_ints(args.rows):
+            name = f'baud={baudrate}/rows={rows}'
+            print(f'{name} ...', end=' ', flush=True)
+            results[name] = metrics = measure_scenario(baudrate, rows, args.duration, args.warmup, args.interval)
+            print(f"周期 {metrics['cycle_ms']} ms, {metrics['registers_per_s']} 寄存器/秒, "
+                  f"界面延迟p95 {metrics['ui_latency_ms_p95']} ms, CPU {metrics['cpu_percent']}%, "
+                  f"内存 {metrics['peak_rss_mb']} MB", flush=True)
+    write_results(args.output, results)
+    print(f'结果已写入 {args.output}')
+    if args.save_baseline:
+        write_results(DEFAULT_BASELINE, results)
+        print(f'基线已保存: {DEFAULT_BASELINE}')
+        return 0
+    baseline = args.baseline or (DEFAULT_BASELINE if os.path.exists(DEFAULT_BASELINE) else None)
+    if not baseline:
+        return 0
+    rows = compare(results, load_results(baseline), tolerances, METRICS)
+    print(format_comparison(rows))
+    regressed = [row for row in rows if row[5]]
+    if regressed:
+        print(f'{len(regressed)} 项指标退化超过容差')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,398 @@
+"""
+总线时序分析：按 端口/从站/功能码 增量统计响应时间、帧间隔、t3.5违规、帧时长与总线占用率。
+每个端口是一条独立的总线，请求配对、帧间隔和占用率按端口分别计算。
+
+时间戳约定与 SerialManager 帧监听器一致：tx 帧为发送开始时间，rx 帧为接收完成时间；
+未知的另一端按当前波特率的理论帧时长推算。只听模式下 BusSniffer 直接给出实测的帧起止时间。
+主站模式的 rx 时间包含驱动/USB转串口的读延迟，响应时间会偏大，帧间隔仅供参考。
+"""
+
+import bisect
+import csv
+import json
+import math
+import threading
+import time
+from collections import deque
+
+from core.sniffer import char_time_ns, t35_ns
+
+# 直方图分桶（毫秒）：0.1ms ~ 10s 对数分布，每十倍10个桶
+HIST_MIN_MS = 0.1
+HIST_DECADES = 5
+HIST_BINS_PER_DECADE = 10
+HIST_EDGES_MS = [HIST_MIN_MS * 10 ** (i / HIST_BINS_PER_DECADE)
+                 for i in range(HIST_DECADES * HIST_BINS_PER_DECADE + 1)]
+
+METRICS = ['turnaround', 'gap', 'duration_ratio']
+METRIC_LABELS = {
+    'turnaround': '响应时间 (ms)',
+    'gap': '帧间隔 (ms)',
+    'duration_ratio': '帧时长/理论时长',
+}
+# 帧时长比值的分桶：1.0 表示字符连续发送，越大说明帧内停顿越多
+RATIO_EDGES = [1.0 + 0.05 * i for i in range(41)]
+
+UTILIZATION_WINDOW_S = 10
+
+
+class TimingStats:
+    """单个指标的增量统计：计数/均值/方差(Welford)/最值，以及固定分桶直方图"""
+
+    __slots__ = ('edges', 'counts', 'count', 'mean', 'm2', 'min', 'max')
+
+    def __init__(self, edges=HIST_EDGES_MS):
+        self.edges = edges
+        # counts[0]为下溢桶，counts[-1]为上溢桶
+        self.counts = [0] * (len(edges) + 1)
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        self.counts[bisect.bisect_right(self.edges, value)] += 1
+
+    @property
+    def std(self):
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def percentile(self, q):
+        """由直方图估算百分位数（取所在桶的上沿）"""
+        if not self.count:
+            return None
+        target = self.count * q / 100.0
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= target:
+                if i == 0:
+                    return self.min
+                if i >= len(self.edges):
+                    return self.max
+                return min(self.edges[i], self.max)
+        return self.max
+
+    def copy(self):
+        other = TimingStats(self.edges)
+        other.counts = list(self.counts)
+        other.count, other.mean, other.m2 = self.count, self.mean, self.m2
+        other.min, other.max = self.min, self.max
+        return other
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'mean': self.mean if self.count else None,
+            'std': self.std,
+            'min': self.min,
+            'max': self.max,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+        }
+
+
+class SlaveTiming:
+    """某个 (端口, 从站, 功能码) 的时序统计"""
+
+    def __init__(self, slave, func, port=''):
+        self.port = port
+        self.slave = slave
+        self.func = func
+        self.turnaround = TimingStats()
+        self.gap = TimingStats()
+        self.duration_ratio = TimingStats(RATIO_EDGES)
+        self.requests = 0
+        self.responses = 0
+        self.exceptions = 0
+        self.no_response = 0
+        self.t35_violations = 0
+        self.bus_time_ns = 0  # 请求+响应时间+响应帧占用的总线时间
+
+    def copy(self):
+        other = SlaveTiming(self.slave, self.func, self.port)
+        other.__dict__.update(self.__dict__)
+        other.turnaround = self.turnaround.copy()
+        other.gap = self.gap.copy()
+        other.duration_ratio = self.duration_ratio.copy()
+        return other
+
+    def to_dict(self):
+        return {
+            'port': self.port,
+            'slave': self.slave,
+            'func': self.func,
+            'requests': self.requests,
+            'responses': self.responses,
+            'exceptions': self.exceptions,
+            'no_response': self.no_response,
+            't35_violations': self.t35_violations,
+            'bus_time_ms': self.bus_time_ns / 1e6,
+            'turnaround_ms': self.turnaround.to_dict(),
+            'gap_ms': self.gap.to_dict(),
+            'duration_ratio': self.duration_ratio.to_dict(),
+        }
+
+
+class BusState:
+    """单个端口（一条总线）的帧数、占用率和等待响应的请求"""
+
+    def __init__(self):
+        self.frames = 0
+        self.first_ns = None
+        self.last_end_ns = None
+        self.busy_ns = 0
+        self.pending = None  # (从站, 功能码, 请求结束时间, 请求时长)
+        self.recent = deque()  # [(帧结束时间, 帧时长)]，用于滑动窗口占用率
+        self.recent_busy_ns = 0
+
+    def add_busy(self, end_ns, duration):
+        self.busy_ns += duration
+        recent = self.recent
+        recent.append((end_ns, duration))
+        self.recent_busy_ns += duration
+        horizon = end_ns - UTILIZATION_WINDOW_S * 1_000_000_000
+        while recent and recent[0][0] < horizon:
+            self.recent_busy_ns -= recent.popleft()[1]
+
+    def utilization(self, now_ns=None):
+        """返回 (总体占用率%, 最近窗口占用率%)"""
+        if self.first_ns is None:
+            return 0.0, 0.0
+        end = self.last_end_ns if now_ns is None else max(now_ns, self.last_end_ns)
+        elapsed = end - self.first_ns
+        overall = 100.0 * self.busy_ns / elapsed if elapsed > 0 else 0.0
+        window = min(UTILIZATION_WINDOW_S * 1_000_000_000, elapsed)
+        recent = 100.0 * self.recent_busy_ns / window if window > 0 else 0.0
+        return min(overall, 100.0), min(recent, 100.0)
+
+
+class BusTimingAnalyzer:
+    """
+    总线时序分析器，可直接作为 SerialManager 的帧监听器，也可离线分析捕获文件。
+    所有更新在锁内完成，界面通过 snapshot() 取一致的副本。
+    """
+
+    def __init__(self, baudrate=9600, bytesize=8, parity='N', stopbits=1, response_timeout_ms=1000):
+        self.baudrate = baudrate
+        self.char_ns = char_time_ns(baudrate, bytesize, parity, stopbits)
+        self.gap_ns = t35_ns(baudrate, bytesize, parity, stopbits)
+        self.response_timeout_ns = int(response_timeout_ms * 1e6)
+        self._lock = threading.Lock()
+        self.reset()
+
+    @classmethod
+    def for_serial_manager(cls, serial_manager, **kwargs):
+        return cls(serial_manager.baudrate, serial_manager.bytesize,
+                   serial_manager.parity, serial_manager.stopbits, **kwargs)
+
+    def reset(self):
+        with self._lock:
+            self.stats = {}  # {(端口, 从站, 功能码): SlaveTiming}
+            self.buses = {}  # {端口: BusState}
+            self.frames = 0
+
+    def frame_duration_ns(self, length):
+        return length * self.char_ns
+
+    def __call__(self, direction, data, port, timestamp_ns):
+        """SerialManager 帧监听器接口"""
+        if direction == 'tx':
+            self.add_frame(direction, data, start_ns=timestamp_ns, port=port)
+        else:
+            self.add_frame(direction, data, end_ns=timestamp_ns, port=port)
+
+    def add_frame(self, direction, data, start_ns=None, end_ns=None, port=''):
+        """加入端口 port 上的一帧，start_ns/end_ns 至少给出一个，缺少的一端按理论时长推算"""
+        if not data or len(data) < 2:
+            return
+        theoretical = self.frame_duration_ns(len(data))
+        measured = start_ns is not None and end_ns is not None
+        if start_ns is None:
+            start_ns = end_ns - theoretical
+        if end_ns is None:
+            end_ns = start_ns + theoretical
+        slave, func = data[0], data[1] & 0x7F
+        with self._lock:
+            self.frames += 1
+            bus = self.buses.get(port)
+            if bus is None:
+                bus = self.buses[port] = BusState()
+            bus.frames += 1
+            if bus.first_ns is None:
+                bus.first_ns = start_ns
+            entry = self._stats_for(port, slave, func)
+
+            if bus.last_end_ns is not None:
+                gap = start_ns - bus.last_end_ns
+                entry.gap.add(max(gap, 0) / 1e6)
+                if gap < self.gap_ns:
+                    entry.t35_violations += 1
+            if measured and theoretical:
+                entry.duration_ratio.add((end_ns - start_ns) / theoretical)
+
+            bus.add_busy(end_ns, theoretical)
+            if bus.last_end_ns is None or end_ns > bus.last_end_ns:
+                bus.last_end_ns = end_ns
+
+            pending = bus.pending
+            if direction == 'tx':
+                if pending is not None:
+                    self._stats_for(port, pending[0], pending[1]).no_response += 1
+                entry.requests += 1
+                bus.pending = (slave, func, end_ns, theoretical)
+                return
+            if pending is None or pending[0] != slave or pending[1] != func:
+                return
+            bus.pending = None
+            if start_ns - pending[2] > self.response_timeout_ns:
+                entry.no_response += 1
+                return
+            entry.responses += 1
+            if data[1] & 0x80:
+                entry.exceptions += 1
+            turnaround = max(start_ns - pending[2], 0)
+            entry.turnaround.add(turnaround / 1e6)
+            entry.bus_time_ns += pending[3] + turnaround + theoretical
+
+    def _stats_for(self, port, slave, func):
+        entry = self.stats.get((port, slave, func))
+        if entry is None:
+            entry = self.stats[(port, slave, func)] = SlaveTiming(slave, func, port)
+        return entry
+
+    def utilization(self, now_ns=None, port=None):
+        """返回端口的 (总体占用率%, 最近窗口占用率%)；不指定端口时返回最忙的端口"""
+        with self._lock:
+            return self._utilization(now_ns, port)
+
+    def _utilization(self, now_ns=None, port=None):
+        if port is not None:
+            bus = self.buses.get(port)
+            return bus.utilization(now_ns) if bus is not None else (0.0, 0.0)
+        return max((bus.utilization(now_ns) for bus in self.buses.values()), default=(0.0, 0.0))
+
+    def snapshot(self, now_ns=None):
+        """返回统计副本 {(端口, 从站, 功能码): SlaveTiming}、各端口的帧数和占用率，以及最忙端口的占用率"""
+        with self._lock:
+            return {
+                'stats': {key: entry.copy() for key, entry in self.stats.items()},
+                'ports': {port: {'frames': bus.frames, 'utilization': bus.utilization(now_ns)}
+                          for port, bus in self.buses.items()},
+                'frames': self.frames,
+                'utilization': self._utilization(now_ns),
+                'baudrate': self.baudrate,
+                't35_ms': self.gap_ns / 1e6,
+            }
+
+    def slave_ranking(self):
+        """按占用总线时间从多到少排列从站，找出限制各端口轮询周期的从站 [(端口, 从站, 总线时间ms, 平均响应ms)]"""
+        with self._lock:
+            totals = {}
+            for entry in self.stats.values():
+                total = totals.setdefault((entry.port, entry.slave), [0, 0.0, 0])
+                total[0] += entry.bus_time_ns
+                total[1] += entry.turnaround.mean * entry.turnaround.count
+                total[2] += entry.turnaround.count
+        ranking = [(port, slave, bus / 1e6, (weighted / count) if count else None)
+                   for (port, slave), (bus, weighted, count) in totals.items()]
+        ranking.sort(key=lambda item: item[2], reverse=True)
+        return ranking
+
+    def to_dict(self):
+        snap = self.snapshot()
+        overall, recent = snap['utilization']
+        return {
+            'generated': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'baudrate': self.baudrate,
+            't35_ms': snap['t35_ms'],
+            'frames': snap['frames'],
+            'utilization_pct': overall,
+            'recent_utilization_pct': recent,
+            'ports': [{'port': port, 'frames': info['frames'], 'utilization_pct': info['utilization'][0],
+                       'recent_utilization_pct': info['utilization'][1]}
+                      for port, info in sorted(snap['ports'].items())],
+            'histogram_edges_ms': HIST_EDGES_MS,
+            'ratio_edges': RATIO_EDGES,
+            'slaves': [dict(entry.to_dict(),
+                            histograms={m: getattr(entry, m).counts for m in METRICS})
+                       for _, entry in sorted(snap['stats'].items())],
+        }
+
+    def export_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+    def export_csv(self, path):
+        """每个 端口/从站/功能码/指标 一行统计"""
+        snap = self.snapshot()
+        with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.writer(f)
+            writer.writerow(['port', 'slave', 'func', 'metric', 'count', 'mean', 'std', 'min', 'max', 'p50', 'p95', 'p99',
+                             'requests', 'responses', 'exceptions', 'no_response', 't35_violations', 'bus_time_ms'])
+            for (port, slave, func), entry in sorted(snap['stats'].items()):
+                for metric in METRICS:
+                    stats = getattr(entry, metric).to_dict()
+                    writer.writerow([port, slave, func, metric] +
+                                    [stats[k] for k in ('count', 'mean', 'std', 'min', 'max', 'p50', 'p95', 'p99')] +
+                                    [entry.requests, entry.responses, entry.exceptions, entry.no_response,
+                                     entry.t35_violations, entry.bus_time_ns / 1e6])
+
+    def export(self, path):
+        if path.lower().endswith('.json'):
+            self.export_json(path)
+        else:
+            self.export_csv(path)
+
+    def load_capture(self, reader, progress=None, should_stop=None):
+        """离线分析 FrameCaptureReader 中的帧（按帧记录的端口分别配对），返回处理的帧数"""
+        count = 0
+        for frame in reader:
+            self(frame.direction, frame.data, frame.port, frame.timestamp_ns)
+            count += 1
+            if count % 10000 == 0:
+                if progress:
+                    progress(count)
+                if should_stop and should_stop():
+                    break
+        return count
+
+
+def merge_stats(stats, slave=None, func=None, port=None):
+    """把快照中的统计按端口/从站/功能码筛选后合并，用于界面显示所有从站的汇总直方图"""
+    merged = SlaveTiming(slave, func, port)
+    for (p, s, f), entry in stats.items():
+        if port is not None and p != port:
+            continue
+        if slave is not None and s != slave:
+            continue
+        if func is not None and f != func:
+            continue
+        for metric in METRICS:
+            _merge_into(getattr(merged, metric), getattr(entry, metric))
+        for attr in ('requests', 'responses', 'exceptions', 'no_response', 't35_violations', 'bus_time_ns'):
+            setattr(merged, attr, getattr(merged, attr) + getattr(entry, attr))
+    return merged
+
+
+def _merge_into(target, source):
+    if not source.count:
+        return
+    total = target.count + source.count
+    delta = source.mean - target.mean
+    target.m2 += source.m2 + delta * delta * target.count * source.count / total
+    target.mean += delta * source.count / total
+    target.count = total
+    target.min = source.min if target.min is None else min(target.min, source.min)
+    target.max = source.max if target.max is None else max(target.max, source.max)
+    target.counts = [a + b for a, b in zip(target.counts, source.counts)]
@@ -0,0 +1,206 @@
+"""
+轮询引擎的命令队列（asyncio，不依赖Qt）：写操作（功能码 5/6/15/16）和即时读取
+
+命令按优先级（数值小的先执行）和到达顺序排队，由每个端口的命令任务执行；队列非空时轮询循环
+不再发出新的轮询请求，命令在当前事务结束（下一个帧边界）后立即发送，不必等到轮询停止或一轮结束。
+队首的写命令与紧随其后、同一从站、同一优先级且地址相邻的写命令合并为一个 FC16（线圈为 FC15），
+每个命令的 future 都得到这次事务的 ModbusResponse。
+
+    future = engine.write_registers(port, slave, 100, [1, 2, 3])     # 其他线程，concurrent.futures.Future
+超过一帧上限（123个寄存器/1968个线圈）的写操作拆成多个命令，依次排队。
+    response = await port_engine.execute(read_command(slave, 100))   # 事件循环中
+"""
+
+import asyncio
+import heapq
+import itertools
+import struct
+
+PRIORITY_WRITE = 0
+PRIORITY_READ = 1
+
+MAX_WRITE_REGISTERS = 123
+MAX_WRITE_COILS = 1968
+
+KIND_REGISTER = 'register'
+KIND_COIL = 'coil'
+WRITE_KINDS = {5: KIND_COIL, 15: KIND_COIL, 6: KIND_REGISTER, 16: KIND_REGISTER}
+
+
+class Command:
+    """一个命令：读 (func 1~4, qty) 或写 (func 5/6/15/16, values)"""
+
+    __slots__ = ('slave', 'func', 'start', 'qty', 'values', 'priority', 'future', 'queued_at')
+
+    def __init__(self, slave, func, start, qty=1, values=None, priority=PRIORITY_READ):
+        self.slave = slave
+        self.func = func
+        self.start = start
+        self.values = list(values) if values is not None else None
+        self.qty = len(self.values) if self.values is not None else qty
+        self.priority = priority
+        self.future = None
+        self.queued_at = None
+
+    @property
+    def kind(self):
+        return WRITE_KINDS.get(self.func)
+
+    @property
+    def end(self):
+        return self.start + self.qty
+
+    def encode(self):
+        """请求帧中 起始地址 之后的 (数量/值字段, 数据)，与 Protocol.build_rtu_request 的参数对应"""
+        func = self.func
+        if func == 6:
+            return self.values[0] & 0xFFFF, b''
+        if func == 5:
+            return (0xFF00 if self.values[0] else 0x0000), b''
+        if func == 16:
+            return self.qty, bytes([2 * self.qty]) + struct.pack(f'>{self.qty}H', *(v & 0xFFFF for v in self.values))
+        if func == 15:
+            return self.qty, bytes([(self.qty + 7) // 8]) + pack_bits(self.values)
+        return self.qty, b''
+
+    def __repr__(self):
+        if self.values is not None:
+            return f'Command(slave={self.slave}, func={self.func}, start={self.start}, values={self.values})'
+        return f'Command(slave={self.slave}, func={self.func}, start={self.start}, qty={self.qty})'
+
+
+def pack_bits(bits):
+    """线圈值打包：第一个线圈在第一个字节的最低位"""
+    packed = bytearray((len(bits) + 7) // 8)
+    for i, bit in enumerate(bits):
+        if bit:
+            packed[i >> 3] |= 1 << (i & 7)
+    return bytes(packed)
+
+
+def read_command(slave, start, qty=1, func=3, priority=PRIORITY_READ):
+    return Command(slave, func, start, qty, priority=priority)
+
+
+def write_registers_command(slave, start, values, priority=PRIORITY_WRITE):
+    """返回 [Command]：一个寄存器用 FC6，多个用 FC16，超过123个时按上限拆成多个 FC16；值取低16位（-1 写为 0xFFFF）"""
+    values = [v & 0xFFFF for v in values]
+    return [Command(slave, 6 if len(chunk) == 1 else 16, start + i, values=chunk, priority=priority)
+            for i, chunk in _chunks(values, MAX_WRITE_REGISTERS)]
+
+
+def write_coils_command(slave, start, bits, priority=PRIORITY_WRITE):
+    """返回 [Command]：一个线圈用 FC5，多个用 FC15，超过1968个时按上限拆成多个 FC15"""
+    bits = [1 if b else 0 for b in bits]
+    return [Command(slave, 5 if len(chunk) == 1 else 15, start + i, values=chunk, priority=priority)
+            for i, chunk in _chunks(bits, MAX_WRITE_COILS)]
+
+
+def _chunks(values, size):
+    return [(i, values[i:i + size]) for i in range(0, len(values), size)]
+
+
+def coalesce(commands):
+    """把地址连续的同类写命令合并为一个命令（FC16/FC15）；只有一个时原样返回"""
+    if len(commands) == 1:
+        return commands[0]
+    commands = sorted(commands, key=lambda c: c.start)
+    values = [v for c in commands for v in c.values]
+    first = commands[0]
+    func = 16 if first.kind == KIND_REGISTER else 15
+    return Command(first.slave, func, first.start, values=values, priority=first.priority)
+
+
+class CommandQueue:
+    """优先级队列；busy 在有命令排队或正在执行时为True，轮询循环据此让路"""
+
+    def __init__(self):
+        self._heap = []
+        self._seq = itertools.count()
+        self._active = 0
+        self._ready = None
+        self._idle = None
+
+    def __len__(self):
+        return len(self._heap)
+
+    @property
+    def busy(self):
+        return bool(self._heap) or self._active > 0
+
+    def _events(self):
+        if self._ready is None:
+            self._ready = asyncio.Event()
+            self._idle = asyncio.Event()
+            self._idle.set()
+        return self._ready, self._idle
+
+    def put(self, command):
+        """在事件循环中调用，返回命令的 future"""
+        ready, idle = self._events()
+        loop = asyncio.get_running_loop()
+        command.future = loop.create_future()
+        command.queued_at = loop.time()
+        heapq.heappush(self._heap, (command.priority, next(self._seq), command))
+        idle.clear()
+        ready.set()
+        return command.future
+
+    async def get(self):
+        """取出下一批命令：[原始命令]，可合并的相邻写命令在同一批中；调用方执行后必须调用 done()"""
+        ready, idle = self._events()
+        while True:
+            while not self._heap:
+                ready.clear()
+                await ready.wait()
+            _, _, head = heapq.heappop(self._heap)
+            if head.future.done():
+                # 调用方已取消
+                self._check_idle()
+                continue
+            break
+        self._active += 1
+        batch = [head]
+        kind = head.kind
+        if kind is not None:
+            limit = MAX_WRITE_REGISTERS if kind == KIND_REGISTER else MAX_WRITE_COILS
+            low, high = head.start, head.end
+            while self._heap:
+                _, _, nxt = self._heap[0]
+                if nxt.future.done():
+                    heapq.heappop(self._heap)
+                    continue
+                if (nxt.kind != kind or nxt.slave != head.slave or nxt.priority != head.priority
+                        or max(high, nxt.end) - min(low, nxt.start) > limit):
+                    break
+                if nxt.start == high:
+                    high = nxt.end
+                elif nxt.end == low:
+                    low = nxt.start
+                else:
+                    # 不相邻或重叠：保持原顺序
+                    break
+                heapq.heappop(self._heap)
+                batch.append(nxt)
+        return batch
+
+    def done(self):
+        self._active -= 1
+        self._check_idle()
+
+    def _check_idle(self):
+        if not self._heap and self._active <= 0:
+            self._idle.set()
+
+    async def wait_idle(self):
+        _, idle = self._events()
+        await idle.wait()
+
+    def cancel_all(self):
+        """引擎停止时取消所有排队的命令，等待中的调用方得到 CancelledError"""
+        while self._heap:
+            _, _, command = heapq.heappop(self._heap)
+            if command.future is not None:
+                command.future.cancel()
+        if self._idle is not None:
+            self._check_idle()
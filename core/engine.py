@@ -0,0 +1,632 @@
+"""
+异步轮询引擎（asyncio，不依赖Qt）
+
+一个事件循环线程驱动任意多个串口/TCP连接：每个端口一个 PortEngine，
+请求在端口内串行（同一总线同一时刻只能有一个事务），端口之间并发；
+Modbus TCP 端口（core.modbus_tcp）按事务号匹配响应，同一端口可同时有多个请求。
+
+无界面脚本：
+    engine = ModbusEngine(store)
+    engine.add_port(SerialTransport(serial_manager), params_df)
+    engine.on_values = lambda port, slave, values, space: print(port, slave, space, values)
+    asyncio.run(engine.run())
+
+Qt 界面通过 core.modbus_worker.EngineBridge 在 QThread 中运行引擎，回调转为信号。
+其他线程可用 engine.submit(coro) 提交单次请求，返回 concurrent.futures.Future；
+写操作和即时读取用 engine.write_registers()/write_coils()/read() 进入端口的命令队列（core.commands），
+在下一个帧边界插入轮询，相邻的寄存器写合并为一个 FC16。
+各阶段耗时和请求/错误计数记入 engine.metrics（core.metrics.MetricsRegistry）。
+轮询区间被从站以异常码 02 拒绝时按地址对半拆分，直到隔离出无效地址；给定 learned
+（core.learned_ranges.LearnedRanges）时学到的区间按设备保存，下次直接使用。
+"""
+
+import asyncio
+import logging
+import struct
+import time
+
+from core.commands import (CommandQueue, coalesce, pack_bits, read_command, write_coils_command,
+                           write_registers_command, PRIORITY_READ, PRIORITY_WRITE)
+from core.metrics import MetricsRegistry
+from core.poll_plan import (BIT_SPACES, FUNC_SPACES, READ_FUNCS, PollScheduler, build_poll_plan, find_slave_column,
+                            format_address, parse_slave, row_spaces, split_range, STATE_DEAD)
+from core.protocol import Protocol, crc16
+from core.register_map import RegisterMap
+from core.transport import TransportError
+from core.value_store import QUALITY_BAD, QUALITY_STALE, SPACE_COIL, SPACE_HOLDING
+from utils.log_manager import get_category_logger
+
+MODE_RTU = 'RTU'
+MODE_ASCII = 'ASCII'
+MODE_TCP = 'TCP'
+
+EXC_ILLEGAL_ADDRESS = 0x02
+
+
+def expected_response_length(func, qty):
+    """正常响应的RTU帧长（含CRC），无法预知时返回None"""
+    if func in (3, 4):
+        return 5 + 2 * qty
+    if func in (1, 2):
+        return 5 + (qty + 7) // 8
+    if func in (5, 6, 15, 16):
+        return 8
+    return None
+
+
+class ModbusResponse:
+    """一次请求的结果；error为空且exception_code为None时成功"""
+
+    __slots__ = ('request', 'response', 'payload', 'exception_code', 'error', 'elapsed')
+
+    def __init__(self, request, response=b'', payload=b'', exception_code=None, error='', elapsed=0.0):
+        self.request = request
+        self.response = response
+        self.payload = payload
+        self.exception_code = exception_code
+        self.error = error
+        self.elapsed = elapsed
+
+    @property
+    def ok(self):
+        return not self.error and self.exception_code is None
+
+    @property
+    def answered(self):
+        """从站有应答（包括异常响应）"""
+        return not self.error
+
+    @property
+    def data(self):
+        """读响应的数据字节（不含地址/功能码/字节数）"""
+        if not self.ok or len(self.payload) < 3:
+            return b''
+        return self.payload[3:3 + self.payload[2]]
+
+
+class PortEngine:
+    """单个端口（一条总线或一个连接）上的请求与轮询"""
+
+    def __init__(self, engine, transport, mode=MODE_RTU, timeout=1.0, interval=1.0, concurrency=None):
+        self.engine = engine
+        self.transport = transport
+        self.name = transport.name
+        self.pipelined = getattr(transport, 'pipelined', False)
+        self.mode = MODE_TCP if self.pipelined else mode
+        self.timeout = timeout
+        self.interval = interval
+        # 同时进行的轮询请求数，只对支持事务号的传输有意义
+        if concurrency is None:
+            concurrency = transport.max_outstanding if self.pipelined else 1
+        self.concurrency = max(1, concurrency) if self.pipelined else 1
+        self.scheduler = None
+        self._sent = 0
+        self.register_maps = {}
+        # (从站, 寄存器区) -> 从站拒绝的地址
+        self.invalid = {}
+        self.proto_log = get_category_logger('protocol')
+        self._lock = None
+        # 写操作和即时读取，优先于轮询执行
+        self.commands = CommandQueue()
+
+    def set_params(self, params_df, default_slave=1):
+        """按参数表生成轮询计划和每个 (从站, 寄存器区) 的地址查找表"""
+        self.register_maps = {}
+        self.invalid = {}
+        if params_df is None or params_df.empty:
+            self.scheduler = None
+            return
+        slave_col = find_slave_column(params_df.columns)
+        if slave_col is None:
+            slaves = [default_slave] * len(params_df)
+        else:
+            slaves = [parse_slave(x) or default_slave for x in params_df[slave_col].tolist()]
+        keys = list(zip(slaves, row_spaces(params_df)))
+        for key in dict.fromkeys(keys):
+            self.register_maps[key] = RegisterMap.from_dataframe(params_df[[k == key for k in keys]])
+        learned = self.engine.learned.for_port(self.name) if self.engine.learned is not None else {}
+        self.invalid = {key: set(invalid) for key, (_, invalid) in learned.items()}
+        self.scheduler = PollScheduler(build_poll_plan(params_df, default_slave, learned=learned))
+        for (slave, space), invalid in self.invalid.items():
+            register_map = self.register_maps.get((slave, space))
+            if register_map is not None:
+                self._mark_invalid(slave, space, sorted(invalid.intersection(register_map.addresses())))
+
+    async def request(self, slave, func, start, qty, data=b'', timeout=None):
+        """发送一个请求并等待响应；同一端口上的请求依次执行（Modbus TCP除外）"""
+        self.engine.metrics.incr('requests')
+        if self.pipelined:
+            return await self._transact_tcp(slave, func, start, qty, data, timeout or self.timeout)
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            return await self._transact(slave, func, start, qty, data, timeout or self.timeout)
+
+    async def execute(self, command):
+        """命令排队，在下一个帧边界执行，返回 ModbusResponse"""
+        return await self.commands.put(command)
+
+    async def execute_all(self, commands):
+        """依次排队多个命令（拆分后的写操作），返回第一个失败的响应，都成功时返回最后一个"""
+        results = await asyncio.gather(*[self.commands.put(command) for command in commands])
+        return next((result for result in results if not result.ok), results[-1])
+
+    async def _command_loop(self):
+        commands = self.commands
+        metrics = self.engine.metrics
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await commands.get()
+            try:
+                command = coalesce(batch)
+                qty, data = command.encode()
+                try:
+                    result = await self.request(command.slave, command.func, command.start, qty, data)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.engine.logger.error(f"{self.name} 命令执行失败: {e}", exc_info=True)
+                    result = ModbusResponse(b'', error=str(e))
+                if result.ok:
+                    # 写成功后直接更新数值表，不必等到下一轮轮询
+                    if command.func in (6, 16):
+                        self._publish(command.slave, SPACE_HOLDING, command.start,
+                                      struct.pack(f'>{command.qty}H', *(v & 0xFFFF for v in command.values)),
+                                      command.qty, partial=False)
+                    elif command.func in (5, 15):
+                        self._publish(command.slave, SPACE_COIL, command.start, pack_bits(command.values),
+                                      command.qty)
+                    elif command.func in FUNC_SPACES:
+                        self._publish(command.slave, FUNC_SPACES[command.func], command.start, result.data,
+                                      command.qty, partial=False)
+                elif result.error:
+                    self.engine._emit_message(f'{self.name} 从站 {command.slave} 地址 {command.start} 命令失败: '
+                                              f'{result.error}')
+                now = loop.time()
+                metrics.observe_many([('command_ms', (now - c.queued_at) * 1000) for c in batch],
+                                     {'commands': len(batch), 'coalesced_writes': len(batch) - 1})
+                for c in batch:
+                    if not c.future.done():
+                        c.future.set_result(result)
+            finally:
+                for c in batch:
+                    if not c.future.done():
+                        c.future.cancel()
+                commands.done()
+
+    def _publish(self, slave, space, start, data, qty, partial=True):
+        """解码连续寄存器（线圈/离散输入为打包的位）并写入数值表、发出回调，返回 [(地址, 值)]；
+        partial=False 时跳过跨出数据块的多寄存器参数（只写了其中一部分，保留轮询得到的值）"""
+        register_map = self.register_maps.get((slave, space))
+        if register_map is None:
+            return []
+        engine = self.engine
+        loop = asyncio.get_running_loop()
+        received = loop.time()
+        if space in BIT_SPACES:
+            values = register_map.decode_bits(start, data, qty)
+        else:
+            values = register_map.decode_block(start, data, qty)
+            if not partial:
+                values = [(addr, value) for addr, value in values if value != '数据不足']
+        decoded = loop.time()
+        if engine.store is not None and space not in BIT_SPACES:
+            # 寄存器映像保存读到的每个字（FLOAT32的第二个字、参数表未声明的地址），供网关按原样应答
+            words = min(qty, len(data) // 2)
+            engine.store.update_words(self.name, slave, start, struct.unpack(f'>{words}H', data[:2 * words]),
+                                      space)
+        if engine.store is not None:
+            # 同时保存原始寄存器值，供网关按原样应答
+            if space in BIT_SPACES:
+                items = [(addr, value, int(value)) for addr, value in values]
+            else:
+                items = [(addr, value, int.from_bytes(data[2 * (addr - start):2 * (addr - start) + 2], 'big'))
+                         for addr, value in values]
+            engine.store.update_many(self.name, slave, items, space)
+        engine._emit_values(self.name, slave, values, space)
+        engine.metrics.observe_many([('decode_ms', (decoded - received) * 1000),
+                                     ('emit_ms', (loop.time() - decoded) * 1000)],
+                                    {'values': len(values)})
+        return values
+
+    def _isolate(self, poll_range):
+        """
+        区间被拒绝（异常码02）：按参数表中的地址对半拆分；只剩一个地址时把它记为无效地址，不再轮询。
+        返回False表示无法处理（不是轮询计划中的区间）
+        """
+        slave, func, start, qty = poll_range
+        space = FUNC_SPACES.get(func)
+        register_map = self.register_maps.get((slave, space))
+        if register_map is None:
+            return False
+        addrs = [addr for addr in register_map.addresses() if start <= addr < start + qty]
+        engine = self.engine
+        if len(addrs) > 1:
+            parts = split_range(poll_range, addrs, register_map.widths() if space not in BIT_SPACES else None)
+            if not self.scheduler.replace(poll_range, parts):
+                # 同一区间已被另一个轮询循环拆分
+                return True
+            engine.metrics.incr('range_splits')
+            self.proto_log.info("%s 从站 %s 区间 %s+%d 被拒绝（异常码02），拆分为 %s", self.name, slave,
+                                format_address(space, start), qty,
+                                ', '.join(f'{r.start}+{r.qty}' for r in parts))
+        else:
+            if not self.scheduler.replace(poll_range, []):
+                return True
+            self.invalid.setdefault((slave, space), set()).update(addrs)
+            engine.metrics.incr('invalid_addresses', len(addrs))
+            engine._emit_message(f'{self.name} 从站 {slave} 地址 {format_address(space, start)} 不存在（异常码02），'
+                                 f'不再轮询')
+            self._mark_invalid(slave, space, addrs)
+        self._remember(slave, space)
+        return True
+
+    def _mark_invalid(self, slave, space, addrs):
+        if addrs and self.engine.store is not None:
+            self.engine.store.update_many(self.name, slave, [(addr, '非法地址') for addr in addrs], space,
+                                          QUALITY_BAD)
+
+    def _remember(self, slave, space):
+        learned = self.engine.learned
+        if learned is None:
+            return
+        func = READ_FUNCS[space]
+        ranges = [(r.start, r.qty) for r in self.scheduler.plan.get(slave, []) if r.func == func]
+        learned.update(self.name, slave, space, ranges, self.invalid.get((slave, space), ()))
+
+    async def _transact(self, slave, func, start, qty, data, timeout):
+        loop = asyncio.get_running_loop()
+        transport = self.transport
+        if self.mode == MODE_RTU:
+            req = Protocol.build_rtu_request(slave, func, start, qty, data)
+        else:
+            req = Protocol.build_ascii_request(slave, func, start, qty, data)
+        t0 = loop.time()
+        deadline = t0 + timeout
+        transport.reset_input()
+        self.proto_log.info("发送请求: %s", req.hex(' '))
+        self.engine._emit_comm(self.name, 'send', req)
+        tx_ns = time.time_ns()
+        try:
+            await transport.write(req)
+        except TransportError as e:
+            return ModbusResponse(req, error=str(e), elapsed=loop.time() - t0)
+        transport.notify_frame('tx', req, tx_ns)
+        sent = loop.time()
+
+        if self.mode == MODE_RTU:
+            resp = await transport.read_exactly(2, deadline)
+            if len(resp) == 2:
+                if resp[1] & 0x80:
+                    remaining = 3
+                else:
+                    expected = expected_response_length(func, qty)
+                    if expected is None:
+                        # 未知长度：字节数字段决定帧长
+                        resp += await transport.read_exactly(1, deadline)
+                        expected = 5 + resp[2] if len(resp) == 3 else 3
+                    remaining = expected - len(resp)
+                resp += await transport.read_exactly(remaining, deadline)
+        else:
+            resp = await transport.read_until(b'\r\n', deadline)
+        complete = loop.time()
+        elapsed = complete - t0
+        metrics = self.engine.metrics
+        if not resp:
+            metrics.incr('timeouts')
+            self.proto_log.warning("从站 %s 地址 %s 无响应", slave, start)
+            return ModbusResponse(req, error='无响应', elapsed=elapsed)
+        # 首字节时间与 loop.time() 同为单调时钟
+        first = transport.first_rx
+        first = min(max(first, sent), complete) if first is not None else None
+        metrics.observe_many([
+            ('send_ms', (sent - t0) * 1000),
+            ('first_byte_ms', None if first is None else (first - sent) * 1000),
+            ('receive_ms', None if first is None else (complete - first) * 1000),
+            ('request_ms', elapsed * 1000),
+        ])
+        transport.notify_frame('rx', resp)
+        self.proto_log.info("接收响应: %s (len=%d)", resp.hex(' '), len(resp))
+        self.engine._emit_comm(self.name, 'recv', resp)
+
+        try:
+            if self.mode == MODE_RTU:
+                if len(resp) < 5:
+                    raise Exception(f"响应长度不足: {len(resp)}")
+                if crc16(resp) != 0:
+                    raise Exception(f"CRC校验错误: {resp[-2:].hex()}")
+                payload = resp[:-2]
+            else:
+                payload = Protocol.parse_ascii_response(resp)
+        except Exception as e:
+            metrics.incr('crc_errors' if 'CRC' in str(e) or 'LRC' in str(e) else 'frame_errors')
+            self.proto_log.error("校验失败: %s", e)
+            return ModbusResponse(req, resp, error=str(e), elapsed=elapsed)
+        return self._check_payload(req, resp, payload, slave, func, start, qty, elapsed)
+
+    async def _transact_tcp(self, slave, func, start, qty, data, timeout):
+        loop = asyncio.get_running_loop()
+        transport = self.transport
+        tid, req = transport.build_request(slave, func, start, qty, data)
+        t0 = loop.time()
+        self.proto_log.info("发送请求: %s", req.hex(' '))
+        self.engine._emit_comm(self.name, 'send', req)
+        try:
+            resp = await transport.transact(tid, req, timeout)
+        except TransportError as e:
+            return ModbusResponse(req, error=str(e), elapsed=loop.time() - t0)
+        elapsed = loop.time() - t0
+        if not resp:
+            self.engine.metrics.incr('timeouts')
+            self.proto_log.warning("从站 %s 地址 %s 无响应", slave, start)
+            return ModbusResponse(req, error='无响应', elapsed=elapsed)
+        self.engine.metrics.observe('request_ms', elapsed * 1000)
+        self.proto_log.info("接收响应: %s (len=%d)", resp.hex(' '), len(resp))
+        self.engine._emit_comm(self.name, 'recv', resp)
+        # 去掉MBAP头的事务号/协议号/长度，剩下 单元号+PDU，与RTU去掉CRC后的格式相同
+        payload = resp[6:]
+        if len(payload) < 3:
+            self.engine.metrics.incr('frame_errors')
+            return ModbusResponse(req, resp, error=f"响应长度不足: {len(resp)}", elapsed=elapsed)
+        return self._check_payload(req, resp, payload, slave, func, start, qty, elapsed)
+
+    def _check_payload(self, req, resp, payload, slave, func, start, qty, elapsed):
+        metrics = self.engine.metrics
+        if payload[0] != slave or (payload[1] & 0x7F) != func:
+            metrics.incr('frame_errors')
+            return ModbusResponse(req, resp, payload, error=f'响应不匹配: 从站{payload[0]} 功能码{payload[1]}',
+                                  elapsed=elapsed)
+        if payload[1] & 0x80:
+            metrics.incr('exceptions')
+            self.proto_log.warning("从站 %s 地址 %s 异常响应: %s", slave, start, payload[2])
+            return ModbusResponse(req, resp, payload, exception_code=payload[2], elapsed=elapsed)
+        if func in (3, 4) and len(payload) < 3 + 2 * qty:
+            metrics.incr('frame_errors')
+            return ModbusResponse(req, resp, payload, error=f'响应长度不足: {len(resp)}/{5 + 2 * qty}',
+                                  elapsed=elapsed)
+        if func in (1, 2) and len(payload) < 3 + (qty + 7) // 8:
+            metrics.incr('frame_errors')
+            return ModbusResponse(req, resp, payload, error=f'响应长度不足: {len(resp)}/{5 + (qty + 7) // 8}',
+                                  elapsed=elapsed)
+        metrics.incr('responses')
+        return ModbusResponse(req, resp, payload, elapsed=elapsed)
+
+    async def run(self):
+        """按轮询计划循环读取，直到任务被取消"""
+        scheduler = self.scheduler
+        engine = self.engine
+        if scheduler is None or not len(scheduler):
+            engine._emit_message(f'{self.name} 参数表无有效地址，无法轮询')
+            # 仍然执行写操作和即时读取
+            await self._command_loop()
+            return
+        engine.logger.info("端口 %s 轮询从站: %s, 共 %d 个区间", self.name, scheduler.slaves, len(scheduler))
+        engine._emit_health(self.name, scheduler.health_snapshot())
+        self._sent = 0
+        # 支持事务号的端口同时运行多个轮询循环，共用一个调度器
+        loops = min(self.concurrency, len(scheduler))
+        await asyncio.gather(self._command_loop(), *[self._poll_loop() for _ in range(loops)])
+
+    async def _poll_loop(self):
+        scheduler = self.scheduler
+        engine = self.engine
+        metrics = engine.metrics
+        commands = self.commands
+        while True:
+            if commands.busy:
+                # 命令优先：队列清空之前不发新的轮询请求
+                await commands.wait_idle()
+            poll_range = scheduler.next_request()
+            if poll_range is None:
+                if not scheduler.slaves:
+                    # 所有地址都被从站拒绝，计划已空：只等命令
+                    await asyncio.sleep(self.interval or 1.0)
+                    continue
+                # 所有从站都离线，等到最近的探测时间
+                await asyncio.sleep(min(scheduler.next_probe_delay(), self.interval) or 0.01)
+                continue
+            slave, func, start, qty = poll_range
+            health = scheduler.health.get(slave)
+            if health is not None and health.consecutive_failures:
+                metrics.incr('retries')
+            try:
+                result = await self.request(slave, func, start, qty)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                engine.logger.error(f"{self.name} 通信错误: {e}", exc_info=True)
+                result = ModbusResponse(b'', error=str(e))
+            if result.error:
+                engine._emit_message(f'{self.name} 从站 {slave} 地址 {start} {result.error}')
+            elif result.exception_code is not None:
+                if result.exception_code != EXC_ILLEGAL_ADDRESS or not self._isolate(poll_range):
+                    engine._emit_message(f'{self.name} 从站 {slave} 地址 {start} 异常响应: {result.exception_code}')
+            else:
+                self._publish(slave, FUNC_SPACES[func], start, result.data, qty)
+
+            if scheduler.report(poll_range, result.answered, result.elapsed, result.error):
+                health = scheduler.health[slave]
+                self.proto_log.warning("%s 从站 %s 状态变为 %s (连续失败 %d 次)",
+                                       self.name, slave, health.state, health.consecutive_failures)
+                if health.state == STATE_DEAD:
+                    engine._emit_message(f'{self.name} 从站 {slave} 无响应，转为退避探测')
+                    if engine.store is not None:
+                        engine.store.mark_quality(self.name, slave, QUALITY_STALE)
+                engine._emit_health(self.name, scheduler.health_snapshot())
+            self._sent += 1
+            if len(scheduler) and self._sent % len(scheduler) == 0:
+                engine._emit_health(self.name, scheduler.health_snapshot())
+            await asyncio.sleep(self.interval)
+
+
+class ModbusEngine:
+    """
+    管理多个 PortEngine 的事件循环。回调在事件循环线程中调用：
+        on_values(port, slave, [(地址, 值)], 寄存器区)
+        on_health(port, [从站健康状态dict])
+        on_comm(port, 'send'/'recv', 帧字节)
+        on_message(文本)
+    add_service() 注册与轮询一同运行的协程（例如 core.gateway 的 Modbus TCP 网关）。
+    metrics 为 None 时使用引擎自己的 MetricsRegistry；learned 为 None 时不记忆拆分后的区间。
+    """
+
+    def __init__(self, store=None, metrics=None, learned=None):
+        self.store = store
+        self.metrics = metrics if metrics is not None else MetricsRegistry()
+        self.learned = learned
+        self.ports = {}
+        self.loop = None
+        self.logger = logging.getLogger(__name__)
+        self.on_values = None
+        self.on_health = None
+        self.on_comm = None
+        self.on_message = None
+        self.services = []
+        self._service_tasks = {}
+        self._port_tasks = {}
+        self._stop_event = None
+        self._stop_requested = False
+
+    def add_port(self, transport, params_df=None, default_slave=1, mode=MODE_RTU, timeout=1.0, interval=1.0,
+                 concurrency=None):
+        port = PortEngine(self, transport, mode, timeout, interval, concurrency)
+        if params_df is not None:
+            port.set_params(params_df, default_slave)
+        self.ports[port.name] = port
+        return port
+
+    async def run(self, poll=True):
+        """打开所有端口并运行轮询，直到 stop()"""
+        self.loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+        if self._stop_requested:
+            self._stop_event.set()
+        opened = []
+        for port in self.ports.values():
+            try:
+                await port.transport.open()
+                opened.append(port)
+            except TransportError as e:
+                self._emit_message(str(e))
+                if port.transport.reconnect:
+                    opened.append(port)
+        if poll:
+            for port in opened:
+                self._port_tasks[port.name] = self.loop.create_task(port.run())
+        for service in list(self.services):
+            self._start_service(service)
+        try:
+            await self._stop_event.wait()
+        finally:
+            tasks = list(self._port_tasks.values()) + list(self._service_tasks.values())
+            self._port_tasks = {}
+            self._service_tasks = {}
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for port in self.ports.values():
+                port.commands.cancel_all()
+            for port in opened:
+                await port.transport.close()
+            self.loop = None
+
+    def stop(self):
+        """可在任意线程调用"""
+        self._stop_requested = True
+        loop = self.loop
+        if loop is not None and self._stop_event is not None:
+            loop.call_soon_threadsafe(self._stop_event.set)
+
+    async def reconfigure_port(self, name, params_df, default_slave=1):
+        """在事件循环中替换某端口的参数表并重新开始轮询"""
+        port = self.ports[name]
+        task = self._port_tasks.pop(name, None)
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        port.set_params(params_df, default_slave)
+        self._port_tasks[name] = self.loop.create_task(port.run())
+
+    def add_service(self, service):
+        """注册协程函数 service()，随引擎启动/停止；引擎运行中调用时立即启动（可在任意线程调用）"""
+        if service not in self.services:
+            self.services.append(service)
+        loop = self.loop
+        if loop is not None:
+            loop.call_soon_threadsafe(self._start_service, service)
+
+    def remove_service(self, service):
+        if service in self.services:
+            self.services.remove(service)
+        loop = self.loop
+        if loop is not None:
+            loop.call_soon_threadsafe(self._cancel_service, service)
+
+    def _start_service(self, service):
+        if service in self._service_tasks or service not in self.services:
+            return
+        task = self.loop.create_task(service())
+        task.add_done_callback(lambda t: self._service_done(service, t))
+        self._service_tasks[service] = task
+
+    def _cancel_service(self, service):
+        task = self._service_tasks.pop(service, None)
+        if task is not None:
+            task.cancel()
+
+    def _service_done(self, service, task):
+        if self._service_tasks.get(service) is task:
+            del self._service_tasks[service]
+        if not task.cancelled() and task.exception() is not None:
+            self._emit_message(f'服务异常退出: {task.exception()}')
+
+    def submit(self, coro):
+        """从其他线程提交协程到引擎的事件循环"""
+        if self.loop is None:
+            raise RuntimeError("引擎未运行")
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def request(self, port, slave, func, start, qty, data=b'', timeout=None):
+        """从其他线程发送单次请求，返回 concurrent.futures.Future[ModbusResponse]"""
+        return self.submit(self.ports[port].request(slave, func, start, qty, data, timeout))
+
+    def command(self, port, command):
+        """从其他线程把命令放入端口的命令队列，返回 concurrent.futures.Future[ModbusResponse]"""
+        if port not in self.ports:
+            raise KeyError(f"未知端口: {port}")
+        return self.submit(self.ports[port].execute(command))
+
+    def command_all(self, port, commands):
+        """从其他线程把多个命令依次放入端口的命令队列，返回 concurrent.futures.Future[ModbusResponse]"""
+        if port not in self.ports:
+            raise KeyError(f"未知端口: {port}")
+        return self.submit(self.ports[port].execute_all(commands))
+
+    def write_registers(self, port, slave, start, values, priority=PRIORITY_WRITE):
+        return self.command_all(port, write_registers_command(slave, start, values, priority))
+
+    def write_coils(self, port, slave, start, bits, priority=PRIORITY_WRITE):
+        return self.command_all(port, write_coils_command(slave, start, bits, priority))
+
+    def read(self, port, slave, start, qty=1, func=3, priority=PRIORITY_READ):
+        """即时读取，成功时同样写入数值表"""
+        return self.command(port, read_command(slave, start, qty, func, priority))
+
+    def _emit_values(self, port, slave, values, space=SPACE_HOLDING):
+        if self.on_values is not None and values:
+            self.on_values(port, slave, values, space)
+
+    def _emit_health(self, port, health):
+        if self.on_health is not None:
+            for h in health:
+                h['port'] = port
+            self.on_health(port, health)
+
+    def _emit_comm(self, port, direction, frame):
+        if self.on_comm is not None:
+            self.on_comm(port, direction, frame)
+
+    def _emit_message(self, text):
+        self.logger.warning(text)
+        if self.on_message is not None:
+            self.on_message(text)
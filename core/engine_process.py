@@ -0,0 +1,239 @@
+"""
+在子进程中运行轮询引擎（不依赖Qt）
+
+界面进程的 pandas 表格重建、pyqtgraph 绘图等会占用GIL，拖慢同进程内的总线请求；
+子进程独占串口运行 ModbusEngine，结果经共享内存环形缓冲区批量送回，命令经管道下发：
+
+    界面进程 EngineProcess                       子进程 run_child
+      drain()  <-- ShmRing --  ('values', ...)  ('frame', ...)  ('health', ...)  ('msg', ...)
+      command()/reconfigure()/stop()  -- Pipe -->  命令；读写命令进入子进程端口的命令队列，结果经 Pipe 返回
+
+端口描述 spec（可pickle的dict）：
+    {'port': 'COM3', 'params': DataFrame, 'mode': 'RTU', 'default_slave': 1, 'interval': 1.0,
+     'serial': {'baudrate': 9600, 'bytesize': 8, 'parity': 'N', 'stopbits': 1, 'timeout': 1}}
+    网络端点不写 'serial'，可写 'endpoint': {'connections': 2, 'inflight': 4}
+learned_path 为已学习轮询区间的文件（core.learned_ranges），由子进程读写。
+"""
+
+import asyncio
+import concurrent.futures
+import itertools
+import logging
+import multiprocessing
+import pickle
+
+from core.shm_ring import ShmRing
+
+PUBLISH_INTERVAL = 0.02
+
+
+def transport_from_spec(spec):
+    from core.modbus_tcp import create_transport, parse_endpoint
+    from core.serial_manager import SerialManager
+    from core.transport import SerialTransport
+    if parse_endpoint(spec['port']) is not None:
+        endpoint = spec.get('endpoint', {})
+        return create_transport(spec['port'], endpoint.get('connections', 2), endpoint.get('inflight', 4))
+    serial = spec.get('serial', {})
+    return SerialTransport(SerialManager(port=spec['port'], **serial))
+
+
+def run_child(conn, ring_name, specs, learned_path=None, log_queue=None, log_levels=None):
+    """子进程入口；日志经 log_queue 送回界面进程，由界面进程的日志配置统一输出"""
+    if log_queue is not None:
+        from utils.log_manager import setup_child_logging
+        setup_child_logging(log_queue, log_levels)
+    ring = ShmRing(ring_name)
+    try:
+        asyncio.run(_child_main(conn, ring, specs, learned_path))
+    finally:
+        ring.close()
+        conn.close()
+
+
+async def _child_main(conn, ring, specs, learned_path=None):
+    from core.engine import ModbusEngine
+    from core.learned_ranges import LearnedRanges
+    from core.value_store import ValueStore
+
+    store = ValueStore()
+    engine = ModbusEngine(store, learned=LearnedRanges(learned_path) if learned_path else None)
+
+    def push(message):
+        return ring.put(pickle.dumps(message, pickle.HIGHEST_PROTOCOL))
+
+    def on_frame(direction, data, port, ts):
+        push(('frame', port, direction, data, ts))
+
+    for spec in specs:
+        transport = transport_from_spec(spec)
+        transport.name = spec['port']
+        transport.add_frame_listener(on_frame)
+        engine.add_port(transport, spec['params'], spec.get('default_slave', 1), spec.get('mode', 'RTU'),
+                        timeout=spec.get('serial', {}).get('timeout') or 1.0, interval=spec.get('interval', 1.0))
+    engine.on_health = lambda port, health: push(('health', port, health))
+    engine.on_message = lambda text: push(('msg', text))
+
+    async def publish():
+        """批量送出变化的值；环形缓冲区满时保留版本号，下次连同新值一起重发"""
+        version = 0
+        while True:
+            await asyncio.sleep(PUBLISH_INTERVAL)
+            current, changes = store.changed_since(version)
+            if not changes:
+                continue
+            rows = [(key, tuple(stored[:4])) for key, stored in changes]
+            if push(('values', rows)):
+                version = current
+
+    async def commands():
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                cmd = await loop.run_in_executor(None, conn.recv)
+            except (EOFError, OSError):
+                engine.stop()
+                return
+            kind = cmd[0]
+            if kind == 'stop':
+                engine.stop()
+                return
+            if kind == 'command':
+                loop.create_task(_forward_command(engine, conn, *cmd[1:]))
+            elif kind == 'reconfigure':
+                _, port, params, default_slave = cmd
+                if port in engine.ports:
+                    await engine.reconfigure_port(port, params, default_slave)
+
+    engine.add_service(publish)
+    engine.add_service(commands)
+    await engine.run()
+
+
+async def _forward_command(engine, conn, request_id, port, command):
+    """与线程内轮询相同，命令进入端口的命令队列（优先级、相邻写合并）"""
+    from core.engine import ModbusResponse
+    try:
+        result = await engine.ports[port].execute(command)
+    except Exception as e:
+        result = ModbusResponse(b'', error=str(e) or type(e).__name__)
+    conn.send(('result', request_id, result))
+
+
+class EngineProcess:
+    """界面进程一侧：启动子进程、取回结果、下发命令"""
+
+    def __init__(self, specs, store=None, ring_size=4 * 1024 * 1024, learned_path=None):
+        self.specs = specs
+        self.store = store
+        self.learned_path = learned_path
+        self.ring_size = ring_size
+        self.process = None
+        self.ring = None
+        self.conn = None
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._log_forwarder = None
+        self.logger = logging.getLogger(__name__)
+
+    def start(self):
+        self.ring = ShmRing(capacity=self.ring_size, create=True)
+        # spawn：子进程不继承界面进程的Qt状态和已打开的串口句柄
+        ctx = multiprocessing.get_context('spawn')
+        self.conn, child_conn = ctx.Pipe()
+        from utils.log_manager import ChildLogForwarder
+        self._log_forwarder = ChildLogForwarder(ctx)
+        process = ctx.Process(target=run_child,
+                              args=(child_conn, self.ring.name, self.specs, self.learned_path,
+                                    self._log_forwarder.queue, self._log_forwarder.levels()),
+                              name='modbus-engine', daemon=True)
+        try:
+            process.start()
+        except Exception:
+            self.stop()
+            raise
+        finally:
+            child_conn.close()
+        self.process = process
+        self.logger.info(f"轮询子进程已启动: pid={self.process.pid}")
+
+    def is_alive(self):
+        return self.process is not None and self.process.is_alive()
+
+    def drain(self):
+        """取出子进程送来的全部消息；数值写入 store，返回其余事件 [(类型, ...)]"""
+        events = []
+        if self.ring is None:
+            return events
+        for raw in self.ring.get_all():
+            message = pickle.loads(raw)
+            if message[0] == 'values':
+                self._apply_values(message[1])
+            events.append(message)
+        self._receive_results()
+        return events
+
+    def _apply_values(self, rows):
+        if self.store is None:
+            return
+        for (port, slave, space, addr), (value, raw, ts, quality) in rows:
+            self.store.update(port, slave, addr, value, raw, space, quality, ts)
+
+    def _receive_results(self):
+        try:
+            while self.conn is not None and self.conn.poll():
+                _, request_id, result = self.conn.recv()
+                future = self._pending.pop(request_id, None)
+                if future is not None:
+                    future.set_result(result)
+        except (EOFError, OSError):
+            pass
+
+    def _send(self, command):
+        if not self.is_alive():
+            raise RuntimeError("轮询子进程未运行")
+        self.conn.send(command)
+
+    def command(self, port, command):
+        """把 core.commands.Command 放入子进程端口的命令队列，返回 Future[ModbusResponse]，结果在 drain() 时交付"""
+        request_id = next(self._ids)
+        future = concurrent.futures.Future()
+        self._pending[request_id] = future
+        try:
+            self._send(('command', request_id, port, command))
+        except Exception:
+            del self._pending[request_id]
+            raise
+        return future
+
+    def reconfigure(self, port, params_df, default_slave=1):
+        self._send(('reconfigure', port, params_df, default_slave))
+
+    def stop(self, timeout=3.0):
+        if self.process is not None:
+            try:
+                self._send(('stop',))
+            except (RuntimeError, OSError):
+                pass
+            self.process.join(timeout)
+            if self.process.is_alive():
+                self.logger.warning("轮询子进程未按时退出，强制结束")
+                self.process.terminate()
+                self.process.join(1.0)
+            self.process = None
+        # 取走剩余结果后再释放共享内存
+        self.drain()
+        if self._pending:
+            from core.engine import ModbusResponse
+            for future in self._pending.values():
+                future.set_result(ModbusResponse(b'', error='轮询子进程已停止'))
+        self._pending = {}
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+        if self._log_forwarder is not None:
+            self._log_forwarder.stop()
+            self._log_forwarder = None
@@ -0,0 +1,216 @@
+"""
+故障注入传输（asyncio，不依赖Qt）
+
+包装任意 AsyncTransport（通常是 SerialTransport(SerialManager)），在接收方向注入可复现的故障，
+与模拟从站（core.simulator）配合，测量总线噪声下轮询周期和吞吐的变化：
+
+    faults = FaultConfig.parse('latency=0.005,jitter=0.002,drop=0.001,corrupt=0.02,split=0.1,seed=7')
+    transport = FaultyTransport(SerialTransport(serial_manager), faults)
+    engine.add_port(transport, params_df)
+
+故障（比例为 0~1 的概率，按每个请求或每个接收字节抽取）：
+    latency / jitter   响应的附加延时 latency + [0, jitter) 秒
+    drop               每个接收字节被丢弃的概率
+    corrupt            响应中翻转一个字节（CRC/LRC 校验失败）的概率
+    split              响应被拆成 2~split_parts 段、段间隔 split_gap 秒到达的概率
+    garbage            响应结束 garbage_gap 秒后追加 1~garbage_max 个随机字节的概率
+    silent             从站不应答的概率；silent_slaves 中的从站始终不应答（请求不发出）
+随机数只用 seed 初始化的独立 Random，同样的请求序列得到同样的故障序列。
+"""
+
+import asyncio
+import random
+
+from core.transport import AsyncTransport
+
+FAULT_FIELDS = {
+    'latency': float, 'jitter': float, 'drop': float, 'corrupt': float, 'split': float, 'split_parts': int,
+    'split_gap': float, 'garbage': float, 'garbage_max': int, 'garbage_gap': float, 'silent': float, 'seed': int,
+}
+
+
+class FaultConfig:
+    def __init__(self, latency=0.0, jitter=0.0, drop=0.0, corrupt=0.0, split=0.0, split_parts=3, split_gap=0.002,
+                 garbage=0.0, garbage_max=4, garbage_gap=0.001, silent=0.0, silent_slaves=(), seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.drop = drop
+        self.corrupt = corrupt
+        self.split = split
+        self.split_parts = max(2, split_parts)
+        self.split_gap = split_gap
+        self.garbage = garbage
+        self.garbage_max = max(1, garbage_max)
+        self.garbage_gap = garbage_gap
+        self.silent = silent
+        self.silent_slaves = frozenset(silent_slaves)
+        self.seed = seed
+
+    @classmethod
+    def parse(cls, text):
+        """解析 'drop=0.001,corrupt=0.01,silent_slaves=3/5,seed=1'（从站列表用 / 分隔）"""
+        kwargs = {}
+        for item in str(text or '').split(','):
+            item = item.strip()
+            if not item:
+                continue
+            key, sep, value = item.partition('=')
+            key = key.strip().lower()
+            if not sep:
+                raise ValueError(f"故障设置应为 名称=值: {item}")
+            if key == 'silent_slaves':
+                kwargs[key] = [int(s) for s in value.split('/') if s.strip()]
+            elif key in FAULT_FIELDS:
+                try:
+                    kwargs[key] = FAULT_FIELDS[key](value)
+                except ValueError:
+                    raise ValueError(f"故障设置值无效: {item}")
+            else:
+                raise ValueError(f"未知的故障类型: {key}")
+        return cls(**kwargs)
+
+    def __bool__(self):
+        return any((self.latency, self.jitter, self.drop, self.corrupt, self.split, self.garbage, self.silent,
+                    self.silent_slaves))
+
+    def __repr__(self):
+        fields = ', '.join(f'{key}={getattr(self, key)}' for key in FAULT_FIELDS if getattr(self, key))
+        if self.silent_slaves:
+            fields += f', silent_slaves={sorted(self.silent_slaves)}'
+        return f'FaultConfig({fields})'
+
+
+def request_slave(data):
+    """从请求帧取从站地址：RTU 首字节，ASCII ':' 后两位十六进制"""
+    if not data:
+        return None
+    if data[:1] == b':' and len(data) >= 3:
+        try:
+            return int(data[1:3], 16)
+        except ValueError:
+            return None
+    return data[0]
+
+
+class FaultyTransport(AsyncTransport):
+    """故障注入包装：发送原样转发，接收的数据经故障处理后按计划时间放入本层缓冲区"""
+
+    def __init__(self, inner, faults=None):
+        self.inner = inner
+        super().__init__(inner.name)
+        self.faults = faults or FaultConfig()
+        self.rng = random.Random(self.faults.seed)
+        self.reconnect = inner.reconnect
+        self.frame_listeners = inner.frame_listeners
+        # 接管内层的接收数据
+        inner._feed = self._on_inner_data
+        self._silenced = False
+        self._corrupt_armed = False
+        self._split_armed = False
+        self._garbage_armed = False
+        self._delay = 0.0
+        self._next_delivery = 0.0
+        self._garbage_handle = None
+        self.stats = {'requests': 0, 'silenced': 0, 'dropped_bytes': 0, 'corrupted': 0, 'split': 0, 'garbage': 0}
+
+    # 关闭状态跟随内层传输（例如串口读取失败）
+    @property
+    def _closed(self):
+        return self.inner._closed
+
+    @_closed.setter
+    def _closed(self, value):
+        pass
+
+    @property
+    def baudrate(self):
+        return getattr(self.inner, 'baudrate', None)
+
+    async def open(self):
+        await self.inner.open()
+        self._polling = self.inner._polling
+
+    async def close(self):
+        if self._garbage_handle is not None:
+            self._garbage_handle.cancel()
+            self._garbage_handle = None
+        await self.inner.close()
+        self._wake()
+
+    def notify_frame(self, direction, data, timestamp_ns=None):
+        self.inner.notify_frame(direction, data, timestamp_ns)
+
+    def reset_input(self):
+        super().reset_input()
+        self.inner.reset_input()
+
+    async def _fill(self):
+        return await self.inner._fill()
+
+    async def write(self, data):
+        faults = self.faults
+        rng = self.rng
+        self.stats['requests'] += 1
+        # 每个请求的故障在发送时一次抽定，保证同一请求序列可复现
+        self._silenced = request_slave(data) in faults.silent_slaves or (faults.silent and rng.random() < faults.silent)
+        self._corrupt_armed = bool(faults.corrupt) and rng.random() < faults.corrupt
+        self._split_armed = bool(faults.split) and rng.random() < faults.split
+        self._garbage_armed = bool(faults.garbage) and rng.random() < faults.garbage
+        self._delay = faults.latency + (rng.uniform(0, faults.jitter) if faults.jitter else 0.0)
+        if self._silenced:
+            self.stats['silenced'] += 1
+            return
+        await self.inner.write(data)
+
+    def _on_inner_data(self, data):
+        if not data or self._silenced:
+            return
+        faults = self.faults
+        rng = self.rng
+        if faults.drop:
+            kept = bytes(b for b in data if rng.random() >= faults.drop)
+            self.stats['dropped_bytes'] += len(data) - len(kept)
+            data = kept
+            if not data:
+                return
+        if self._corrupt_armed:
+            self._corrupt_armed = False
+            self.stats['corrupted'] += 1
+            data = bytearray(data)
+            data[rng.randrange(len(data))] ^= 1 << rng.randrange(8)
+            data = bytes(data)
+        pieces = [data]
+        if self._split_armed and len(data) > 1:
+            self._split_armed = False
+            self.stats['split'] += 1
+            parts = min(len(data), rng.randint(2, faults.split_parts))
+            cuts = sorted(rng.sample(range(1, len(data)), parts - 1))
+            pieces = [data[i:j] for i, j in zip([0] + cuts, cuts + [len(data)])]
+        loop = asyncio.get_running_loop()
+        # 按顺序交付：不早于上一段
+        when = max(loop.time() + self._delay, self._next_delivery)
+        for i, piece in enumerate(pieces):
+            if i:
+                when += faults.split_gap
+            self._deliver_at(loop, when, piece)
+        self._next_delivery = when
+        if self._garbage_armed:
+            # 数据停止到达 garbage_gap 秒后再追加，新数据到达时推迟
+            if self._garbage_handle is not None:
+                self._garbage_handle.cancel()
+            self._garbage_handle = loop.call_at(when + faults.garbage_gap, self._append_garbage)
+
+    def _deliver_at(self, loop, when, piece):
+        if when <= loop.time():
+            self._feed(piece)
+        else:
+            loop.call_at(when, self._feed, piece)
+
+    def _append_garbage(self):
+        self._garbage_handle = None
+        if not self._garbage_armed:
+            return
+        self._garbage_armed = False
+        self.stats['garbage'] += 1
+        rng = self.rng
+        self._feed(bytes(rng.randrange(256) for _ in range(rng.randint(1, self.faults.garbage_max))))
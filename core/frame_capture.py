@@ -0,0 +1,332 @@
+"""
+二进制帧捕获文件
+
+数据文件(.mbcap)：
+    文件头  FILE_HEADER: magic(8s) version(H) reserved(H) 创建时间ns(q)
+    记录    RECORD:      帧长度(H) 时间戳ns(q) 方向(B) 从站(B) 端口号(H) + 帧字节
+方向为 DIR_PORT 的记录是端口声明，帧字节为端口名(UTF-8)，端口号为新分配的编号。
+
+索引文件(.mbcap.idx)：
+    文件头  INDEX_HEADER: magic(8s) 索引间隔(I) reserved(I)
+    条目    INDEX_ENTRY:  类型(B) 时间戳ns(q) 帧序号/端口号(Q) 记录偏移(Q)
+每 INDEX_INTERVAL 帧写一个索引点；端口声明也写入索引，打开文件时无需扫描数据文件。
+"""
+import bisect
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import namedtuple
+
+FILE_MAGIC = b'MBCAP001'
+INDEX_MAGIC = b'MBIDX001'
+FILE_VERSION = 1
+
+FILE_HEADER = struct.Struct('<8sHHq')
+RECORD = struct.Struct('<HqBBH')
+INDEX_HEADER = struct.Struct('<8sII')
+INDEX_ENTRY = struct.Struct('<B7xqQQ')
+
+DIR_TX = 0
+DIR_RX = 1
+DIR_PORT = 0xFF
+DIRECTIONS = {'tx': DIR_TX, 'rx': DIR_RX}
+DIRECTION_NAMES = {DIR_TX: 'tx', DIR_RX: 'rx'}
+
+INDEX_POINT = 0
+INDEX_PORT = 1
+INDEX_INTERVAL = 256
+
+CapturedFrame = namedtuple('CapturedFrame', ['index', 'timestamp_ns', 'direction', 'slave', 'port', 'data'])
+
+
+def frame_slave(data):
+    """从RTU/ASCII帧中取从站地址"""
+    if not data:
+        return 0
+    if data[0] == 0x3A and len(data) >= 3:  # ASCII ':'
+        try:
+            return int(data[1:3], 16)
+        except ValueError:
+            return 0
+    return data[0]
+
+
+def index_path_for(path):
+    return path + '.idx'
+
+
+class FrameCaptureWriter:
+    """追加写入捕获文件，可直接作为 SerialManager 的帧监听器"""
+
+    def __init__(self, path, flush_interval=1.0, buffer_size=1 << 20):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._ports = {}
+        self._frame_count = 0
+        self._last_flush = time.monotonic()
+
+        exists = os.path.exists(path) and os.path.getsize(path) >= FILE_HEADER.size
+        port_offsets = {}
+        index_points = []
+        if exists:
+            # 追加到已有捕获：先读出端口表、帧数和索引（含读取端补扫出的尾部）
+            reader = FrameCaptureReader(path)
+            try:
+                self._ports = {name: pid for pid, name in reader.ports.items()}
+                port_offsets = dict(reader.port_offsets)
+                index_points = reader.index_points()
+                self._frame_count = len(reader)
+                end_offset = reader.end_offset
+            finally:
+                reader.close()
+            with open(path, 'r+b') as f:
+                f.truncate(end_offset)  # 丢弃崩溃时残留的半条记录
+            self._file = open(path, 'ab', buffering=buffer_size)
+            self._offset = end_offset
+        else:
+            self._file = open(path, 'wb', buffering=buffer_size)
+            self._file.write(FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, 0, time.time_ns()))
+            self._offset = FILE_HEADER.size
+
+        # 索引文件总是重写：追加时以读取端得到的完整索引为准
+        self._index = open(index_path_for(path), 'wb')
+        self._index.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_INTERVAL, 0))
+        for pid, offset in port_offsets.items():
+            self._index.write(INDEX_ENTRY.pack(INDEX_PORT, 0, pid, offset))
+        for frame_no, ts, offset in index_points:
+            self._index.write(INDEX_ENTRY.pack(INDEX_POINT, ts, frame_no, offset))
+        self.logger.info(f"帧捕获已开始: {path}")
+
+    @property
+    def frame_count(self):
+        return self._frame_count
+
+    def _port_id(self, port, ts):
+        pid = self._ports.get(port)
+        if pid is None:
+            pid = len(self._ports)
+            self._ports[port] = pid
+            name = str(port).encode('utf-8')
+            self._index.write(INDEX_ENTRY.pack(INDEX_PORT, ts, pid, self._offset))
+            self._file.write(RECORD.pack(len(name), ts, DIR_PORT, 0, pid))
+            self._file.write(name)
+            self._offset += RECORD.size + len(name)
+        return pid
+
+    def write_frame(self, direction, data, port='', timestamp_ns=None, slave=None):
+        if not data:
+            return
+        ts = timestamp_ns if timestamp_ns is not None else time.time_ns()
+        dir_code = DIRECTIONS.get(direction, direction)
+        if slave is None:
+            slave = frame_slave(data)
+        data = bytes(data[:0xFFFF])
+        with self._lock:
+            if self._file is None:
+                return
+            pid = self._port_id(port, ts)
+            if self._frame_count % INDEX_INTERVAL == 0:
+                self._index.write(INDEX_ENTRY.pack(INDEX_POINT, ts, self._frame_count, self._offset))
+            self._file.write(RECORD.pack(len(data), ts, dir_code, slave & 0xFF, pid))
+            self._file.write(data)
+            self._offset += RECORD.size + len(data)
+            self._frame_count += 1
+            now = time.monotonic()
+            if now - self._last_flush >= self.flush_interval:
+                self._flush_locked()
+                self._last_flush = now
+
+    def __call__(self, direction, data, port, timestamp_ns):
+        """SerialManager 帧监听器接口"""
+        self.write_frame(direction, data, port, timestamp_ns)
+
+    def _flush_locked(self):
+        # 先写数据再写索引，保证索引指向的记录都已落盘
+        self._file.flush()
+        self._index.flush()
+
+    def flush(self):
+        with self._lock:
+            if self._file is not None:
+                self._flush_locked()
+
+    def close(self):
+        with self._lock:
+            if self._file is None:
+                return
+            self._flush_locked()
+            self._file.close()
+            self._index.close()
+            self._file = None
+            self._index = None
+        self.logger.info(f"帧捕获已停止: {self.path}, 共 {self._frame_count} 帧")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class FrameCaptureReader:
+    """内存映射读取捕获文件，支持按帧序号和时间随机定位"""
+
+    def __init__(self, path):
+        self.path = path
+        self.ports = {}
+        self.port_offsets = {}
+        self._index_ts = []
+        self._index_offsets = []
+        self._index_interval = INDEX_INTERVAL
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        if size < FILE_HEADER.size:
+            self._file.close()
+            raise Exception(f"捕获文件过短: {path}")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, self.created_ns = FILE_HEADER.unpack_from(self._mm, 0)
+        if magic != FILE_MAGIC:
+            self.close()
+            raise Exception(f"不是有效的捕获文件: {path}")
+        self.version = version
+        self._load_index()
+        self._scan_tail()
+
+    def _load_index(self):
+        index_path = index_path_for(self.path)
+        if not os.path.exists(index_path):
+            return
+        with open(index_path, 'rb') as f:
+            raw = f.read()
+        if len(raw) < INDEX_HEADER.size:
+            return
+        magic, interval, _ = INDEX_HEADER.unpack_from(raw, 0)
+        if magic != INDEX_MAGIC:
+            return
+        self._index_interval = interval
+        size = len(self._mm)
+        usable = (len(raw) - INDEX_HEADER.size) // INDEX_ENTRY.size
+        for kind, ts, value, offset in INDEX_ENTRY.iter_unpack(
+                raw[INDEX_HEADER.size:INDEX_HEADER.size + usable * INDEX_ENTRY.size]):
+            if kind == INDEX_PORT:
+                if offset and offset + RECORD.size <= size:
+                    self.port_offsets[value] = offset
+                    length = RECORD.unpack_from(self._mm, offset)[0]
+                    self.ports[value] = bytes(self._mm[offset + RECORD.size:offset + RECORD.size + length]).decode('utf-8', 'replace')
+                else:
+                    self.ports.setdefault(value, str(value))
+            elif kind == INDEX_POINT and offset + RECORD.size <= size and value == len(self._index_offsets) * interval:
+                self._index_ts.append(ts)
+                self._index_offsets.append(offset)
+
+    def _scan_tail(self):
+        """补扫索引未覆盖的尾部（未刷新索引或意外中断的捕获）"""
+        if self._index_offsets:
+            frame_no = (len(self._index_offsets) - 1) * self._index_interval
+            offset = self._index_offsets[-1]
+        else:
+            frame_no = 0
+            offset = FILE_HEADER.size
+        mm = self._mm
+        size = len(mm)
+        while offset + RECORD.size <= size:
+            length, ts, direction, _, pid = RECORD.unpack_from(mm, offset)
+            end = offset + RECORD.size + length
+            if end > size:
+                break
+            if direction == DIR_PORT:
+                self.port_offsets[pid] = offset
+                self.ports[pid] = bytes(mm[offset + RECORD.size:end]).decode('utf-8', 'replace')
+            else:
+                if frame_no % self._index_interval == 0 and frame_no // self._index_interval == len(self._index_offsets):
+                    self._index_ts.append(ts)
+                    self._index_offsets.append(offset)
+                frame_no += 1
+            offset = end
+        self._count = frame_no
+        self.end_offset = offset
+
+    def __len__(self):
+        return self._count
+
+    def index_points(self):
+        """返回 [(帧序号, 时间戳ns, 记录偏移)]"""
+        interval = self._index_interval
+        return [(i * interval, ts, offset)
+                for i, (ts, offset) in enumerate(zip(self._index_ts, self._index_offsets))]
+
+    def _read_record(self, offset):
+        length, ts, direction, slave, pid = RECORD.unpack_from(self._mm, offset)
+        start = offset + RECORD.size
+        return length, ts, direction, slave, pid, start, start + length
+
+    def _iter_from_offset(self, frame_no, offset):
+        mm = self._mm
+        end_offset = self.end_offset
+        ports = self.ports
+        while offset < end_offset and frame_no < self._count:
+            length, ts, direction, slave, pid, start, end = self._read_record(offset)
+            offset = end
+            if direction == DIR_PORT:
+                continue
+            yield CapturedFrame(frame_no, ts, DIRECTION_NAMES.get(direction, direction), slave,
+                                ports.get(pid, str(pid)), bytes(mm[start:end]))
+            frame_no += 1
+
+    def iter_from(self, frame_no=0):
+        """从指定帧序号开始顺序读取"""
+        if frame_no < 0:
+            frame_no += self._count
+        if frame_no < 0 or frame_no >= self._count:
+            return
+        block = frame_no // self._index_interval
+        it = self._iter_from_offset(block * self._index_interval, self._index_offsets[block])
+        for frame in it:
+            if frame.index >= frame_no:
+                yield frame
+
+    def __iter__(self):
+        return self.iter_from(0)
+
+    def __getitem__(self, frame_no):
+        if frame_no < 0:
+            frame_no += self._count
+        if frame_no < 0 or frame_no >= self._count:
+            raise IndexError(frame_no)
+        return next(self.iter_from(frame_no))
+
+    def seek_time(self, timestamp_ns):
+        """返回时间戳 >= timestamp_ns 的第一帧序号，超出末尾时返回帧数"""
+        block = bisect.bisect_right(self._index_ts, timestamp_ns) - 1
+        if block < 0:
+            return 0
+        for frame in self._iter_from_offset(block * self._index_interval, self._index_offsets[block]):
+            if frame.timestamp_ns >= timestamp_ns:
+                return frame.index
+        return self._count
+
+    def iter_time_range(self, start_ns, end_ns=None):
+        """读取 [start_ns, end_ns) 时间段内的帧"""
+        for frame in self.iter_from(self.seek_time(start_ns)):
+            if end_ns is not None and frame.timestamp_ns >= end_ns:
+                break
+            yield frame
+
+    def close(self):
+        if getattr(self, '_mm', None) is not None:
+            self._mm.close()
+            self._mm = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,222 @@
+"""
+Modbus TCP 从站网关（缓存，asyncio，不依赖Qt）
+
+把轮询得到的寄存器映像作为 Modbus TCP 从站提供给其他上位机：读请求直接由 ValueStore 的寄存器映像应答
+（轮询读到的每个字，包括 FLOAT32 的第二个字），
+不产生额外总线流量；写请求进入对应端口的命令队列（core.commands），在下一个帧边界插入轮询发送，
+相邻地址的写请求可能合并为一个 FC16，按从站的应答结果给每个客户端各自的响应。
+
+    单元号 -> (端口, 从站)：routes 显式指定，未指定时按从站地址查找（优先主串口）
+    时效：值的年龄超过 max_age（可按寄存器单独设置）或从站离线时，返回异常码 0x0B
+    年龄寄存器：设置 age_offset 后，读 age_offset+地址 返回该寄存器的年龄（0.1秒，未知为0xFFFF），
+              age_offset 之上不能有轮询的寄存器（validate_age_offset）
+"""
+
+import asyncio
+import logging
+import struct
+import time
+
+from core.commands import Command, PRIORITY_WRITE
+from core.poll_plan import find_slave_column, parse_slave, slave_addresses, split_by_port
+from core.value_store import QUALITY_GOOD, SPACE_HOLDING
+
+MBAP_HEADER = struct.Struct('>HHHB')
+MAX_READ_QTY = 125
+MAX_WRITE_QTY = 123
+
+EXC_ILLEGAL_FUNCTION = 0x01
+EXC_ILLEGAL_ADDRESS = 0x02
+EXC_ILLEGAL_VALUE = 0x03
+EXC_PATH_UNAVAILABLE = 0x0A
+EXC_TARGET_NO_RESPONSE = 0x0B
+
+MAX_AGE_COLUMNS = ['max_age', 'maxage', '最大时效']
+ADDRESS_SPACE = 0x10000
+
+
+def exception_pdu(func, code):
+    return bytes([func | 0x80, code])
+
+
+def register_limits_from_dataframe(df, port, default_slave=1):
+    """参数表可选的 max_age 列（秒）-> {(端口, 从站, 地址): 秒}"""
+    limits = {}
+    if df is None or df.empty or 'addr' not in df.columns:
+        return limits
+    age_col = next((c for c in df.columns if str(c).strip().lower() in MAX_AGE_COLUMNS), None)
+    if age_col is None:
+        return limits
+    slave_col = find_slave_column(df.columns)
+    slaves = df[slave_col].tolist() if slave_col is not None else [None] * len(df)
+    for addr, slave, max_age in zip(df['addr'].tolist(), slaves, df[age_col].tolist()):
+        try:
+            addr = int(float(addr))
+            max_age = float(max_age)
+        except (TypeError, ValueError):
+            continue
+        if max_age == max_age and max_age > 0:  # 排除NaN
+            limits[(port, parse_slave(slave) or default_slave, addr)] = max_age
+    return limits
+
+
+def validate_age_offset(age_offset, params_df, default_slave=1):
+    """年龄寄存器区 [age_offset, 65535] 与轮询的保持寄存器重叠时抛出 ValueError"""
+    if age_offset is None:
+        return
+    if not 0 < age_offset < ADDRESS_SPACE:
+        raise ValueError(f"年龄寄存器偏移应在 1~65535: {age_offset}")
+    if params_df is None or params_df.empty:
+        return
+    for port_params in split_by_port(params_df).values():
+        for (slave, space), widths in slave_addresses(port_params, default_slave).items():
+            if space != SPACE_HOLDING:
+                continue
+            overlap = [addr for addr, width in widths.items() if addr + width > age_offset]
+            if overlap:
+                raise ValueError(f"年龄寄存器偏移 {age_offset} 与从站 {slave} 的寄存器 {min(overlap)} 重叠")
+
+
+class ModbusGateway:
+    """缓存网关，serve() 在引擎的事件循环中运行（ModbusEngine.add_service）"""
+
+    def __init__(self, store, engine=None, host='0.0.0.0', port=502, routes=None, primary_port=None,
+                 max_age=None, register_max_age=None, age_offset=None, write_timeout=3.0):
+        self.store = store
+        self.engine = engine
+        self.host = host
+        self.port = port
+        self.routes = dict(routes or {})
+        self.primary_port = primary_port
+        self.max_age = max_age
+        self.register_max_age = dict(register_max_age or {})
+        self.age_offset = age_offset
+        self.write_timeout = write_timeout
+        self.logger = logging.getLogger(__name__)
+        self.clients = set()
+        self.stats = {'requests': 0, 'reads': 0, 'stale': 0, 'writes': 0, 'errors': 0}
+        self._resolved = {}
+
+    async def serve(self):
+        """监听端口直到任务被取消"""
+        server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        self.logger.info(f"Modbus TCP 网关已启动: {self.host}:{self.port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for writer in list(self.clients):
+                writer.close()
+            self.logger.info("Modbus TCP 网关已停止")
+
+    async def _handle_client(self, reader, writer):
+        peer = writer.get_extra_info('peername')
+        self.clients.add(writer)
+        self.logger.info(f"网关客户端连接: {peer}")
+        try:
+            while True:
+                header = await reader.readexactly(MBAP_HEADER.size)
+                tid, protocol, length, unit = MBAP_HEADER.unpack(header)
+                if protocol != 0 or not 2 <= length <= 254:
+                    break
+                pdu = await reader.readexactly(length - 1)
+                # 同一连接内依次应答；读请求不等待总线，写请求等到从站应答
+                resp = await self.handle_pdu(unit, pdu)
+                writer.write(MBAP_HEADER.pack(tid, 0, len(resp) + 1, unit) + resp)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.clients.discard(writer)
+            writer.close()
+            self.logger.info(f"网关客户端断开: {peer}")
+
+    async def handle_pdu(self, unit, pdu):
+        """处理一个请求PDU，返回响应PDU"""
+        self.stats['requests'] += 1
+        func = pdu[0]
+        try:
+            if func == 3:
+                start, qty = struct.unpack('>HH', pdu[1:5])
+                return self.read_registers(unit, start, qty)
+            if func in (6, 16):
+                return await self.forward_write(unit, pdu)
+            return exception_pdu(func, EXC_ILLEGAL_FUNCTION)
+        except struct.error:
+            self.stats['errors'] += 1
+            return exception_pdu(func, EXC_ILLEGAL_VALUE)
+
+    def resolve(self, unit):
+        """单元号 -> (端口, 从站)，找不到时返回None"""
+        if unit in self.routes:
+            return self.routes[unit]
+        target = self._resolved.get(unit)
+        if target is None:
+            ports = sorted(self.store.ports_for_slave(unit))
+            if not ports:
+                return None
+            port = self.primary_port if self.primary_port in ports else ports[0]
+            target = self._resolved[unit] = (port, unit)
+        return target
+
+    def _limit(self, port, slave, addr):
+        return self.register_max_age.get((port, slave, addr), self.max_age)
+
+    def read_registers(self, unit, start, qty):
+        if not 1 <= qty <= MAX_READ_QTY:
+            return exception_pdu(3, EXC_ILLEGAL_VALUE)
+        target = self.resolve(unit)
+        if target is None:
+            return exception_pdu(3, EXC_PATH_UNAVAILABLE)
+        port, slave = target
+        age_offset = self.age_offset
+        age_block = age_offset is not None and age_offset <= start and start + qty <= age_offset + ADDRESS_SPACE
+        if age_offset is not None and not age_block and start + qty > age_offset:
+            # 跨过年龄寄存器区的起点
+            return exception_pdu(3, EXC_ILLEGAL_ADDRESS)
+        base = start - age_offset if age_block else start
+        now = time.time()
+        words = []
+        for addr in range(base, base + qty):
+            stored = self.store.get_word(port, slave, addr, SPACE_HOLDING)
+            if age_block:
+                age = 0xFFFF if stored is None else min(int((now - stored.ts) * 10), 0xFFFF)
+                words.append(age)
+                continue
+            if stored is None:
+                return exception_pdu(3, EXC_ILLEGAL_ADDRESS)
+            limit = self._limit(port, slave, addr)
+            if stored.quality != QUALITY_GOOD or (limit is not None and now - stored.ts > limit):
+                self.stats['stale'] += 1
+                return exception_pdu(3, EXC_TARGET_NO_RESPONSE)
+            words.append(stored.raw)
+        self.stats['reads'] += 1
+        return bytes([3, 2 * qty]) + struct.pack(f'>{qty}H', *words)
+
+    async def forward_write(self, unit, pdu):
+        func = pdu[0]
+        target = self.resolve(unit)
+        if target is None or self.engine is None or target[0] not in self.engine.ports:
+            return exception_pdu(func, EXC_PATH_UNAVAILABLE)
+        start, value = struct.unpack('>HH', pdu[1:5])
+        values = [value]
+        if func == 16:
+            if not 1 <= value <= MAX_WRITE_QTY or len(pdu) < 6 or pdu[5] != 2 * value or len(pdu) < 6 + 2 * value:
+                return exception_pdu(func, EXC_ILLEGAL_VALUE)
+            values = list(struct.unpack(f'>{value}H', pdu[6:6 + 2 * value]))
+        port, slave = target
+        command = Command(slave, func, start, values=values, priority=PRIORITY_WRITE)
+        try:
+            result = await asyncio.wait_for(self.engine.ports[port].execute(command), self.write_timeout)
+        except asyncio.TimeoutError:
+            return exception_pdu(func, EXC_TARGET_NO_RESPONSE)
+        except Exception as e:
+            self.logger.error(f"网关转发写请求失败: {e}")
+            return exception_pdu(func, EXC_TARGET_NO_RESPONSE)
+        self.stats['writes'] += 1
+        if not result.answered:
+            return exception_pdu(func, EXC_TARGET_NO_RESPONSE)
+        if result.exception_code is not None:
+            return exception_pdu(func, result.exception_code)
+        # 可能与其他写请求合并发送，按客户端自己的请求生成正常响应（FC6 回显，FC16 起始地址+数量）
+        return pdu[:5]
@@ -0,0 +1,317 @@
+"""
+无界面轮询（不导入 PyQt5 / pyqtgraph）
+
+在没有显示器的工控机上按同一个配置文件轮询，解码后的值输出到标准输出、CSV 或二进制帧记录：
+
+    python modbus_analyzer.py --headless
+    python modbus_analyzer.py --headless --config site.xlsx --port /dev/ttyUSB0 --output csv --file values.csv
+    python modbus_analyzer.py --headless --output record --file bus.mbcap --stats 30
+
+串口参数、默认从站取自 LocalSettings 页，附加串口和 Modbus TCP 端点取自参数表的 port 列和 Ports 页，
+与界面的“开始轮询”相同。record 输出为 core.frame_capture 的 .mbcap 文件（原始收发帧，可回放解码）。
+SIGINT/SIGTERM 停止轮询并关闭端口和输出文件；吞吐统计定期写入日志（标准错误）。
+"""
+
+import argparse
+import asyncio
+import csv
+import logging
+import os
+import signal
+import sys
+import time
+
+import pandas as pd
+
+from core.engine import ModbusEngine, MODE_RTU
+from core.fault_injection import FaultConfig, FaultyTransport
+from core.learned_ranges import LearnedRanges, learned_path_for
+from core.modbus_tcp import create_transport, parse_endpoint
+from core.poll_plan import format_address, parse_slave, row_spaces, split_by_port
+from core.serial_manager import SerialManager
+from core.transport import SerialTransport
+from core.value_store import ValueStore
+from utils.excel_manager import ExcelManager
+
+DEFAULT_CONFIG = 'config_and_params.xlsx'
+OUTPUTS = ('stdout', 'csv', 'record')
+CSV_COLUMNS = ['ts', 'port', 'slave', 'addr', 'name', 'value', 'raw', 'quality']
+
+logger = logging.getLogger(__name__)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='modbus_analyzer.py --headless', description='无界面轮询')
+    parser.add_argument('--headless', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--config', default=DEFAULT_CONFIG, help='配置文件（默认 %(default)s）')
+    parser.add_argument('--port', help='主串口，覆盖 LocalSettings 中的设置')
+    parser.add_argument('--baudrate', type=int, help='主串口波特率')
+    parser.add_argument('--mode', choices=['RTU', 'ASCII'], help='主串口协议')
+    parser.add_argument('--slave', type=int, help='参数表未指定从站时使用的从站地址')
+    parser.add_argument('--interval', type=float, default=1.0, help='每个请求之后的间隔秒数（默认 %(default)s）')
+    parser.add_argument('--timeout', type=float, default=1.0, help='响应超时秒数（默认 %(default)s）')
+    parser.add_argument('--output', choices=OUTPUTS, default='stdout', help='输出方式（默认 %(default)s）')
+    parser.add_argument('--file', help='csv / record 输出文件')
+    parser.add_argument('--flush', type=float, default=0.5, help='输出变化值的周期秒数（默认 %(default)s）')
+    parser.add_argument('--stats', type=float, default=10.0, help='吞吐统计周期秒数，0 为不统计（默认 %(default)s）')
+    parser.add_argument('--faults', help="注入故障（测试用），如 'drop=0.001,corrupt=0.01,seed=1'，见 core.fault_injection")
+    parser.add_argument('--learned', help='已学习轮询区间的文件（默认为配置文件所在目录的 learned_ranges.json）')
+    parser.add_argument('--log', default='modbus.log', help='日志文件（默认 %(default)s）')
+    return parser
+
+
+def load_serial_settings(path):
+    """读取 LocalSettings 页第一行的串口设置（与界面相同的格式）"""
+    settings = {'port': '', 'baudrate': 9600, 'bytesize': 8, 'parity': 'N', 'stopbits': 1, 'mode': MODE_RTU, 'slave': 1}
+    try:
+        df = pd.read_excel(path, sheet_name='LocalSettings')
+    except Exception as e:
+        logger.warning(f"读取串口设置失败: {e}")
+        return settings
+    if df.empty:
+        return settings
+    row = df.iloc[0]
+    for key in ('baudrate', 'bytesize', 'stopbits'):
+        try:
+            settings[key] = int(float(row.get(key)))
+        except (TypeError, ValueError):
+            pass
+    for key in ('port', 'parity', 'mode'):
+        val = str(row.get(key, '')).strip()
+        if val and val.lower() != 'nan':
+            settings[key] = val
+    settings['slave'] = parse_slave(row.get('slave')) or 1
+    return settings
+
+
+def load_all_params(excel, default_slave):
+    """合并所有分组的参数表，只保留有效地址（与界面开始轮询时相同）"""
+    groups = excel.load_param_groups(default_slave)
+    if not groups:
+        return pd.DataFrame()
+    all_params = pd.concat([group_df for _, _, group_df in groups], ignore_index=True)
+    all_params = all_params[all_params['addr'].apply(lambda x: str(x).replace('.0', '').isdigit())].copy()
+    all_params['addr'] = all_params['addr'].apply(lambda x: int(float(x)))
+    all_params.sort_values('addr', inplace=True)
+    return all_params
+
+
+def build_engine(args, settings, all_params, port_configs, store):
+    """按参数表的 port 列建立端口，返回 (engine, [SerialManager])；''为主串口"""
+    learned_path = args.learned or learned_path_for(args.config)
+    engine = ModbusEngine(store, learned=LearnedRanges(learned_path))
+    serial_managers = []
+    main_port = settings['port']
+    faults = FaultConfig.parse(args.faults) if args.faults else None
+    for port, port_params in split_by_port(all_params).items():
+        config = dict(settings)
+        if port in ('', main_port):
+            port = main_port
+        else:
+            config.update(port_configs.get(port, {}))
+        if not port:
+            logger.error("未配置主串口（LocalSettings 或 --port），跳过未指定端口的参数")
+            continue
+        if parse_endpoint(port) is not None:
+            transport = create_transport(port, config.get('connections', 2), config.get('inflight', 4))
+            engine.add_port(transport, port_params, settings['slave'], MODE_RTU, timeout=args.timeout,
+                            interval=args.interval)
+            continue
+        serial_manager = SerialManager(
+            port=port,
+            baudrate=config['baudrate'],
+            bytesize=config['bytesize'],
+            parity=config['parity'],
+            stopbits=config['stopbits'],
+            timeout=args.timeout
+        )
+        serial_managers.append(serial_manager)
+        transport = SerialTransport(serial_manager)
+        if faults:
+            transport = FaultyTransport(transport, faults)
+        engine.add_port(transport, port_params, settings['slave'], config['mode'],
+                        timeout=args.timeout, interval=args.interval)
+    return engine, serial_managers
+
+
+def name_index(all_params, main_port, default_slave):
+    """(端口, 从站, 寄存器区, 地址) -> 参数名"""
+    index = {}
+    if all_params.empty:
+        return index
+    ports = all_params['port'] if 'port' in all_params.columns else [''] * len(all_params)
+    slaves = all_params['slave'] if 'slave' in all_params.columns else [default_slave] * len(all_params)
+    names = all_params['name'] if 'name' in all_params.columns else [''] * len(all_params)
+    for port, slave, space, addr, name in zip(ports, slaves, row_spaces(all_params), all_params['addr'], names):
+        index[(port or main_port, int(slave), space, int(addr))] = '' if name != name else str(name)
+    return index
+
+
+class StdoutOutput:
+    """每个变化值一行：时间 端口 从站 地址 名称 = 值"""
+
+    def __init__(self, names, stream=None):
+        self.names = names
+        self.stream = stream or sys.stdout
+
+    def write(self, changes):
+        lines = []
+        for key, stored in changes:
+            port, slave, space, addr = key
+            stamp = time.strftime('%H:%M:%S', time.localtime(stored.ts)) + f'.{int(stored.ts * 1000) % 1000:03d}'
+            name = self.names.get(key, '')
+            flag = '' if stored.quality == 'good' else f' [{stored.quality}]'
+            lines.append(f'{stamp} {port} {slave} {format_address(space, addr)} {name} = {stored.value}{flag}\n')
+        self.stream.write(''.join(lines))
+        self.stream.flush()
+
+    def close(self):
+        pass
+
+
+class CsvOutput:
+    def __init__(self, path, names):
+        self.names = names
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(CSV_COLUMNS)
+
+    def write(self, changes):
+        self.writer.writerows(
+            (f'{stored.ts:.3f}', key[0], key[1], format_address(key[2], key[3]), self.names.get(key, ''),
+             stored.value, stored.raw, stored.quality)
+            for key, stored in changes)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class HeadlessRunner:
+    """运行引擎，并作为引擎服务周期性输出变化值和吞吐统计"""
+
+    def __init__(self, engine, store, output=None, flush_interval=0.5, stats_interval=10.0):
+        self.engine = engine
+        self.store = store
+        self.output = output
+        self.flush_interval = flush_interval
+        self.stats_interval = stats_interval
+        self.started = None
+
+    async def _output_service(self):
+        version = 0
+        try:
+            while True:
+                await asyncio.sleep(self.flush_interval)
+                version, changes = self.store.changed_since(version)
+                if changes:
+                    self.output.write(changes)
+        finally:
+            # 停止时输出最后一批
+            _, changes = self.store.changed_since(version)
+            if changes:
+                self.output.write(changes)
+
+    def _counters(self):
+        counters = {}
+        for name, port in self.engine.ports.items():
+            ok = fail = 0
+            if port.scheduler is not None:
+                for health in port.scheduler.health.values():
+                    ok += health.ok_count
+                    fail += health.fail_count
+            counters[name] = (ok, fail)
+        return counters
+
+    def stats_line(self, previous, current, elapsed, values):
+        parts = []
+        for name, (ok, fail) in current.items():
+            last_ok, last_fail = previous.get(name, (0, 0))
+            parts.append(f'{name}: {(ok - last_ok) / elapsed:.1f} 请求/秒, 失败 {fail - last_fail}')
+        return f"吞吐: {values / elapsed:.1f} 值/秒; " + '; '.join(parts)
+
+    async def _stats_service(self):
+        previous = self._counters()
+        version = self.store.version
+        last = time.monotonic()
+        while True:
+            await asyncio.sleep(self.stats_interval)
+            now = time.monotonic()
+            current = self._counters()
+            logger.info(self.stats_line(previous, current, now - last, self.store.version - version))
+            previous, version, last = current, self.store.version, now
+
+    def _install_signal_handlers(self, loop):
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, self.engine.stop)
+            except (NotImplementedError, RuntimeError):
+                # Windows 事件循环不支持，改用 signal.signal（engine.stop 可在任意线程调用）
+                signal.signal(signum, lambda *_: self.engine.stop())
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        self._install_signal_handlers(loop)
+        if self.output is not None:
+            self.engine.add_service(self._output_service)
+        if self.stats_interval > 0:
+            self.engine.add_service(self._stats_service)
+        self.started = time.monotonic()
+        counters = self._counters()
+        await self.engine.run()
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        logger.info("轮询结束，共运行 %.1f 秒; %s", elapsed,
+                    self.stats_line(counters, self._counters(), elapsed, self.store.version))
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    from utils.log_manager import setup_logging
+    setup_logging(args.log, console=True)
+
+    excel = ExcelManager(args.config)
+    settings = load_serial_settings(args.config)
+    for key in ('port', 'baudrate', 'mode', 'slave'):
+        if getattr(args, key) is not None:
+            settings[key] = getattr(args, key)
+    all_params = load_all_params(excel, settings['slave'])
+    if all_params.empty:
+        logger.error(f"{args.config} 中没有可轮询的参数")
+        return 1
+    if args.output != 'stdout' and not args.file:
+        logger.error(f"--output {args.output} 需要 --file")
+        return 2
+
+    store = ValueStore()
+    engine, serial_managers = build_engine(args, settings, all_params, excel.load_ports(), store)
+    if not engine.ports:
+        logger.error("没有可轮询的端口")
+        return 1
+
+    names = name_index(all_params, settings['port'], settings['slave'])
+    capture = None
+    output = None
+    if args.output == 'stdout':
+        output = StdoutOutput(names)
+    elif args.output == 'csv':
+        output = CsvOutput(args.file, names)
+    else:
+        from core.frame_capture import FrameCaptureWriter
+        capture = FrameCaptureWriter(args.file)
+        for port in engine.ports.values():
+            port.transport.add_frame_listener(capture)
+
+    logger.info("无界面轮询: %s, 输出 %s", ', '.join(engine.ports), args.file or args.output)
+    if args.faults:
+        logger.warning("已启用故障注入: %s", FaultConfig.parse(args.faults))
+    runner = HeadlessRunner(engine, store, output, args.flush, args.stats)
+    try:
+        asyncio.run(runner.run())
+    finally:
+        if output is not None:
+            output.close()
+        if capture is not None:
+            capture.close()
+        for serial_manager in serial_managers:
+            serial_manager.close()
+    return 0
@@ -0,0 +1,81 @@
+"""
+按设备记忆的轮询区间（不依赖Qt）
+
+从站对合并区间中的某个地址返回异常码 02（非法数据地址）时，整个区间每轮都读不到。
+轮询引擎把这样的区间按参数表中的地址对半拆分，直到隔离出能读的子区间和被拒绝的单个地址；
+学到的区间和无效地址按 (端口, 从站, 寄存器区) 写入 JSON 文件，下次启动时直接按它生成轮询计划，
+不必再经过一轮拆分。参数表改动后新增的地址照常合并，删除该文件即可重新学习。
+
+    learned = LearnedRanges('learned_ranges.json')
+    engine = ModbusEngine(store, learned=learned)
+"""
+
+import json
+import logging
+import os
+import time
+
+DEFAULT_LEARNED_FILE = 'learned_ranges.json'
+
+
+def learned_path_for(config_path):
+    """界面和 --headless 共用的位置：参数表所在目录下的 learned_ranges.json"""
+    return os.path.join(os.path.dirname(os.path.abspath(config_path)), DEFAULT_LEARNED_FILE)
+
+
+class LearnedRanges:
+    """{(端口, 从站, 寄存器区): ([(起始, 数量)], {无效地址})}，path 为 None 时只保存在内存中"""
+
+    def __init__(self, path=DEFAULT_LEARNED_FILE):
+        self.path = path
+        self.devices = {}
+        self.logger = logging.getLogger(__name__)
+        if path and os.path.exists(path):
+            self.load()
+
+    def __len__(self):
+        return len(self.devices)
+
+    def get(self, port, slave, space):
+        """返回 ([(起始, 数量)], {无效地址})，没有记录时返回None"""
+        return self.devices.get((port, slave, space))
+
+    def for_port(self, port):
+        """{(从站, 寄存器区): ([(起始, 数量)], {无效地址})}"""
+        return {(slave, space): entry for (name, slave, space), entry in self.devices.items() if name == port}
+
+    def update(self, port, slave, space, ranges, invalid):
+        self.devices[(port, slave, space)] = ([tuple(r) for r in ranges], set(invalid))
+        self.save()
+
+    def forget(self, port=None):
+        """删除某端口（None 为全部）的记录"""
+        self.devices = {key: entry for key, entry in self.devices.items() if port is not None and key[0] != port}
+        self.save()
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for item in data.get('devices', []):
+                self.devices[(item['port'], int(item['slave']), item['space'])] = (
+                    [(int(start), int(qty)) for start, qty in item.get('ranges', [])],
+                    {int(addr) for addr in item.get('invalid', [])})
+        except Exception as e:
+            self.logger.error(f"读取已学习的轮询区间失败: {self.path}: {e}")
+            self.devices = {}
+
+    def save(self):
+        if not self.path:
+            return
+        devices = [{'port': port, 'slave': slave, 'space': space, 'ranges': [list(r) for r in ranges],
+                    'invalid': sorted(invalid)}
+                   for (port, slave, space), (ranges, invalid) in sorted(self.devices.items())]
+        tmp = self.path + '.tmp'
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({'updated': time.strftime('%Y-%m-%d %H:%M:%S'), 'devices': devices}, f,
+                          ensure_ascii=False, indent=2)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            self.logger.error(f"保存已学习的轮询区间失败: {self.path}: {e}")
@@ -0,0 +1,169 @@
+"""
+运行指标登记表（不依赖Qt）：计数器、瞬时值和各阶段延迟直方图
+
+轮询一个区间经过的阶段（时间都取单调时钟）：
+    请求生成 built -> 发送完成 sent -> 收到首字节 first_byte -> 收完整帧 complete
+    -> 解码 decoded -> 写入数值表/回调 emitted -> 界面表格刷新 rendered
+相邻阶段之间的耗时记入 STAGE_LATENCIES 中的直方图，据此判断慢在总线、解码还是界面。
+
+    metrics = MetricsRegistry()
+    engine = ModbusEngine(store, metrics=metrics)
+    metrics.snapshot()          # 界面定时读取
+    metrics.export('metrics.json')
+
+引擎线程和界面线程都会更新，所有操作在锁内完成。直方图复用 core.bus_timing.TimingStats（毫秒）。
+"""
+
+import csv
+import json
+import threading
+import time
+
+from core.bus_timing import HIST_EDGES_MS, TimingStats
+
+# 延迟指标 -> 说明
+STAGE_LATENCIES = {
+    'send_ms': '生成请求 -> 发送完成',
+    'first_byte_ms': '发送完成 -> 收到首字节',
+    'receive_ms': '首字节 -> 收完整帧',
+    'request_ms': '生成请求 -> 收完整帧',
+    'decode_ms': '收完整帧 -> 解码',
+    'emit_ms': '解码 -> 写入数值表/回调',
+    'render_ms': '写入数值表 -> 表格刷新',
+    'refresh_ms': '界面一次刷新的耗时',
+    'command_ms': '命令排队 -> 完成（写操作/即时读取）',
+    'gui_stall_ms': '界面事件循环卡顿时长（core.watchdog）',
+}
+
+# 计数器 -> 说明
+COUNTERS = {
+    'requests': '请求',
+    'responses': '正常响应',
+    'timeouts': '无响应',
+    'crc_errors': 'CRC/LRC错误',
+    'frame_errors': '帧错误（长度/不匹配）',
+    'exceptions': '异常响应',
+    'retries': '失败后的重试',
+    'range_splits': '被拒绝（异常码02）后拆分的区间',
+    'invalid_addresses': '从站不存在的地址（不再轮询）',
+    'values': '解码的值',
+    'commands': '执行的命令（写操作/即时读取）',
+    'coalesced_writes': '合并到前一个写命令中的写命令',
+    'frames_rendered': '界面刷新次数',
+    'values_rendered': '界面刷新的值',
+    'ui_signals_queued': '发往界面的信号',
+    'ui_signals_handled': '界面处理的信号',
+    'gui_stalls': '界面卡顿次数',
+}
+
+# 瞬时值 -> 说明
+GAUGES = {
+    'ui_queue_depth': '界面待处理的信号数',
+    'ui_pending_values': '最近一次刷新取出的值数',
+}
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self.counters = dict.fromkeys(COUNTERS, 0)
+            self.gauges = dict.fromkeys(GAUGES, 0)
+            self.gauge_max = dict.fromkeys(GAUGES, 0)
+            self.latencies = {name: TimingStats() for name in STAGE_LATENCIES}
+
+    def incr(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def set_gauge(self, name, value):
+        with self._lock:
+            self.gauges[name] = value
+            if value > self.gauge_max.get(name, 0):
+                self.gauge_max[name] = value
+
+    def observe(self, name, ms):
+        with self._lock:
+            self._stats(name).add(ms)
+
+    def observe_many(self, items, counters=None):
+        """一次加锁记录多个延迟 [(指标, 毫秒)]（毫秒为None时跳过），可同时累加计数器 {名称: 增量}"""
+        with self._lock:
+            for name, ms in items:
+                if ms is not None:
+                    self._stats(name).add(ms)
+            for name, n in (counters or {}).items():
+                self.counters[name] = self.counters.get(name, 0) + n
+
+    def counter(self, name):
+        return self.counters.get(name, 0)
+
+    def _stats(self, name):
+        stats = self.latencies.get(name)
+        if stats is None:
+            stats = self.latencies[name] = TimingStats()
+        return stats
+
+    def snapshot(self):
+        """一致的副本：{'time', 'uptime_s', 'counters', 'gauges', 'gauge_max', 'latencies': {名称: TimingStats}}"""
+        with self._lock:
+            now = time.time()
+            return {
+                'time': now,
+                'uptime_s': now - self.started,
+                'counters': dict(self.counters),
+                'gauges': dict(self.gauges),
+                'gauge_max': dict(self.gauge_max),
+                'latencies': {name: stats.copy() for name, stats in self.latencies.items()},
+            }
+
+    def to_dict(self):
+        snap = self.snapshot()
+        return {
+            'generated': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(snap['time'])),
+            'uptime_s': snap['uptime_s'],
+            'counters': snap['counters'],
+            'gauges': snap['gauges'],
+            'gauge_max': snap['gauge_max'],
+            'histogram_edges_ms': HIST_EDGES_MS,
+            'latencies_ms': {name: dict(stats.to_dict(), histogram=stats.counts)
+                             for name, stats in snap['latencies'].items()},
+        }
+
+    def export_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+    def export_csv(self, path):
+        """每个计数器/瞬时值/延迟指标一行"""
+        snap = self.snapshot()
+        fields = ('count', 'mean', 'std', 'min', 'max', 'p50', 'p95', 'p99')
+        with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.writer(f)
+            writer.writerow(['kind', 'name', 'value', 'max'] + list(fields))
+            for name, value in snap['counters'].items():
+                writer.writerow(['counter', name, value, ''])
+            for name, value in snap['gauges'].items():
+                writer.writerow(['gauge', name, value, snap['gauge_max'].get(name, '')])
+            for name, stats in snap['latencies'].items():
+                stats = stats.to_dict()
+                writer.writerow(['latency_ms', name, '', ''] + [stats[k] for k in fields])
+
+    def export(self, path):
+        if path.lower().endswith('.json'):
+            self.export_json(path)
+        else:
+            self.export_csv(path)
+
+
+def counter_rates(previous, current):
+    """两次快照之间每秒的计数增量 {名称: 每秒}"""
+    elapsed = current['time'] - previous['time']
+    if elapsed <= 0:
+        return dict.fromkeys(current['counters'], 0.0)
+    return {name: (value - previous['counters'].get(name, 0)) / elapsed
+            for name, value in current['counters'].items()}
@@ -0,0 +1,233 @@
+"""
+Modbus TCP 客户端传输（MBAP帧，asyncio，不依赖Qt）
+
+每个端点一个连接池：池内可有多条连接，每条连接允许多个未完成事务，响应按事务号匹配，
+TCP设备不必一问一答地串行轮询。RTU over TCP（串口服务器透传）没有事务号，
+使用 core.transport.StreamTransport 按RTU帧一问一答。
+
+参数表/Ports页的 port 列写法：
+    tcp://192.168.1.10:502       Modbus TCP（端口缺省502）
+    rtu+tcp://192.168.1.20:4001  RTU over TCP
+"""
+
+import asyncio
+import re
+import struct
+
+from core.transport import AsyncTransport, StreamTransport, TransportError
+
+MBAP_HEADER = struct.Struct('>HHHB')  # 事务号, 协议号(0), 后续长度, 单元号
+DEFAULT_TCP_PORT = 502
+
+SCHEME_TCP = 'tcp'
+SCHEME_RTU_OVER_TCP = 'rtu+tcp'
+
+_ENDPOINT_RE = re.compile(r'^(tcp|rtu\+tcp)://([^:/\s]+)(?::(\d+))?/?$', re.IGNORECASE)
+
+
+def parse_endpoint(text):
+    """解析 'tcp://host:port' / 'rtu+tcp://host:port'，返回 (协议, 主机, 端口)，不是网络端点时返回None"""
+    match = _ENDPOINT_RE.match(str(text).strip())
+    if match is None:
+        return None
+    scheme = match.group(1).lower()
+    port = int(match.group(3)) if match.group(3) else DEFAULT_TCP_PORT
+    return scheme, match.group(2), port
+
+
+def create_transport(endpoint, size=2, max_inflight=4, connect_timeout=3.0):
+    """按端点写法创建传输对象，name 沿用原始写法以便与参数表的 port 列对应"""
+    parsed = parse_endpoint(endpoint)
+    if parsed is None:
+        raise ValueError(f"无效的网络端点: {endpoint}")
+    scheme, host, port = parsed
+    if scheme == SCHEME_TCP:
+        transport = TcpConnectionPool(host, port, size, max_inflight, connect_timeout)
+    else:
+        transport = StreamTransport(host, port, connect_timeout)
+    transport.name = str(endpoint).strip()
+    return transport
+
+
+def _expire(future):
+    if not future.done():
+        future.set_result(b'')
+
+
+def build_mbap_request(tid, unit, func, start, qty, data=b''):
+    pdu = bytes([func]) + start.to_bytes(2, 'big') + qty.to_bytes(2, 'big') + data
+    return MBAP_HEADER.pack(tid, 0, len(pdu) + 1, unit) + pdu
+
+
+class TcpConnection:
+    """一条TCP连接，读任务按事务号把响应交给等待中的请求"""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.pending = {}
+        self._reader = None
+        self._writer = None
+        self._read_task = None
+        self.closed = True
+
+    async def connect(self):
+        pool = self.pool
+        try:
+            self._reader, self._writer = await asyncio.wait_for(
+                asyncio.open_connection(pool.host, pool.port), pool.connect_timeout)
+        except (OSError, asyncio.TimeoutError) as e:
+            raise TransportError(f"连接 {pool.name} 失败: {e}")
+        self.closed = False
+        self._read_task = asyncio.get_running_loop().create_task(self._read_loop())
+
+    async def _read_loop(self):
+        reader = self._reader
+        try:
+            while True:
+                header = await reader.readexactly(MBAP_HEADER.size)
+                tid, protocol, length, _ = MBAP_HEADER.unpack(header)
+                if protocol != 0 or not 2 <= length <= 254:
+                    self.pool.logger.error(f"{self.pool.name} MBAP头错误: {header.hex(' ')}")
+                    break
+                body = await reader.readexactly(length - 1)
+                future = self.pending.pop(tid, None)
+                if future is not None and not future.done():
+                    future.set_result(header + body)
+                else:
+                    # 已超时的请求迟到的响应
+                    self.pool.logger.debug(f"{self.pool.name} 丢弃事务号 {tid} 的响应")
+        except (OSError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            self.closed = True
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(TransportError(f"连接 {self.pool.name} 已断开"))
+            self.pending.clear()
+
+    async def transact(self, tid, adu, timeout):
+        """发送一帧并等待相同事务号的响应，超时返回b''"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending[tid] = future
+        try:
+            self._writer.write(adu)
+            await self._writer.drain()
+        except OSError as e:
+            self.pending.pop(tid, None)
+            self.closed = True
+            raise TransportError(f"发送失败 {self.pool.name}: {e}")
+        # 超时以空响应结束等待（不用 wait_for，原因见 core.transport）
+        timer = loop.call_later(timeout, _expire, future)
+        try:
+            return await future
+        finally:
+            timer.cancel()
+            self.pending.pop(tid, None)
+
+    async def close(self):
+        self.closed = True
+        if self._read_task is not None:
+            self._read_task.cancel()
+            self._read_task = None
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except Exception:
+                pass
+            self._writer = None
+
+
+class TcpConnectionPool(AsyncTransport):
+    """
+    单个Modbus TCP端点的连接池。与串口传输的区别是收发合并为 transact()：
+        tid, adu = pool.build_request(unit, func, start, qty)
+        resp = await pool.transact(tid, adu, timeout)
+    连接按需建立（最多size条），每条连接最多max_inflight个未完成事务，断开的连接下次使用时重建。
+    """
+
+    # 引擎据此允许同一端口上并发多个请求
+    pipelined = True
+    reconnect = True
+
+    def __init__(self, host, port=DEFAULT_TCP_PORT, size=2, max_inflight=4, connect_timeout=3.0):
+        super().__init__(f'{host}:{port}')
+        self.host = host
+        self.port = port
+        self.size = max(1, size)
+        self.max_inflight = max(1, max_inflight)
+        self.connect_timeout = connect_timeout
+        self.connections = []
+        self._slots = None
+        self._connect_lock = None
+        self._tid = 0
+
+    @property
+    def max_outstanding(self):
+        return self.size * self.max_inflight
+
+    async def open(self):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_outstanding)
+            self._connect_lock = asyncio.Lock()
+        connection = TcpConnection(self)
+        await connection.connect()
+        self.connections = [connection]
+        self._closed = False
+        self.logger.info(f"已连接 {self.name}")
+
+    async def close(self):
+        for connection in self.connections:
+            await connection.close()
+        self.connections = []
+        self._slots = None
+        self._closed = True
+
+    def reset_input(self):
+        pass
+
+    async def write(self, data):
+        raise TransportError("Modbus TCP 请使用 transact()")
+
+    def build_request(self, unit, func, start, qty, data=b''):
+        """分配事务号（跳过仍在等待中的）并生成请求帧"""
+        busy = set()
+        for connection in self.connections:
+            busy.update(connection.pending)
+        for _ in range(0x10000):
+            self._tid = (self._tid + 1) & 0xFFFF
+            if self._tid not in busy:
+                break
+        return self._tid, build_mbap_request(self._tid, unit, func, start, qty, data)
+
+    async def _connection(self):
+        """选未完成事务最少的连接；都在忙且未满size条时新建一条"""
+        async with self._connect_lock:
+            self.connections = [c for c in self.connections if not c.closed]
+            idle = [c for c in self.connections if len(c.pending) < self.max_inflight]
+            best = min(idle, key=lambda c: len(c.pending)) if idle else None
+            if (best is None or best.pending) and len(self.connections) < self.size:
+                connection = TcpConnection(self)
+                try:
+                    await connection.connect()
+                except TransportError:
+                    if best is None:
+                        raise
+                else:
+                    self.connections.append(connection)
+                    best = connection
+            if best is None:
+                raise TransportError(f"{self.name} 没有可用连接")
+            return best
+
+    async def transact(self, tid, adu, timeout):
+        if self._slots is None:
+            raise TransportError(f"{self.name} 未连接")
+        async with self._slots:
+            connection = await self._connection()
+            self.notify_frame('tx', adu)
+            resp = await connection.transact(tid, adu, timeout)
+            if resp:
+                self.notify_frame('rx', resp)
+            return resp
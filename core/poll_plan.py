@@ -0,0 +1,351 @@
+"""
+多从站轮询计划与调度
+
+参数表按从站和寄存器区拆分为读区间（连续地址合并，单次最多125个寄存器）；
+线圈和离散输入按位打包，单次最多2000位，相距不远的地址也合并到同一请求（多读的位不解码），
+调度器在同一总线上轮流给各从站发请求；连续失败的从站判为离线，
+之后只按指数退避间隔用一个区间探测，其余从站保持正常轮询速率。
+"""
+
+import bisect
+import time
+from collections import namedtuple
+
+from core.register_map import find_data_type_column, point_data_type, register_count
+from core.value_store import SPACE_COIL, SPACE_DISCRETE, SPACE_HOLDING, SPACE_INPUT
+
+MAX_READ_QTY = 125
+MAX_READ_BITS = 2000
+# 位区间内允许跳过的未使用地址数（多读几个字节比多一次请求便宜）
+MAX_BIT_GAP = 64
+
+READ_FUNCS = {SPACE_COIL: 1, SPACE_DISCRETE: 2, SPACE_HOLDING: 3, SPACE_INPUT: 4}
+FUNC_SPACES = {func: space for space, func in READ_FUNCS.items()}
+BIT_SPACES = frozenset((SPACE_COIL, SPACE_DISCRETE))
+
+PollRange = namedtuple('PollRange', ['slave', 'func', 'start', 'qty'])
+
+STATE_OK = 'ok'
+STATE_SUSPECT = 'suspect'
+STATE_DEAD = 'dead'
+
+SLAVE_COLUMNS = ['slave', 'slave_id', 'slaveid', 'unit', 'unit_id', '从站', '从站地址', '站号']
+PORT_COLUMNS = ['port', 'com', '串口', '端口']
+SPACE_COLUMNS = ['space', 'area', 'register_type', '寄存器区', '寄存器类型']
+
+# space 列可写的名称（不区分大小写）
+SPACE_NAMES = {
+    SPACE_HOLDING: ['holding', 'hr', '4x', 'fc3', '保持寄存器'],
+    SPACE_INPUT: ['input', 'ir', '3x', 'fc4', '输入寄存器'],
+    SPACE_COIL: ['coil', 'coils', '0x', 'fc1', '线圈'],
+    SPACE_DISCRETE: ['discrete', 'di', '1x', 'fc2', '离散输入'],
+}
+SPACE_ALIASES = {name: space for space, names in SPACE_NAMES.items() for name in names}
+
+
+def find_slave_column(columns):
+    for col in columns:
+        if str(col).strip().lower() in SLAVE_COLUMNS:
+            return col
+    return None
+
+
+def find_port_column(columns):
+    for col in columns:
+        if str(col).strip().lower() in PORT_COLUMNS:
+            return col
+    return None
+
+
+def find_space_column(columns):
+    for col in columns:
+        if str(col).strip().lower() in SPACE_COLUMNS:
+            return col
+    return None
+
+
+def parse_space(value):
+    """寄存器区单元格内容，空值或无法识别时返回None"""
+    if value is None or value != value:  # NaN
+        return None
+    return SPACE_ALIASES.get(str(value).strip().lower())
+
+
+def format_address(space, addr):
+    """显示用地址：保持寄存器只有地址，其他寄存器区加前缀，例如 'coil:5'"""
+    return str(addr) if space in (None, SPACE_HOLDING) else f'{space}:{addr}'
+
+
+def parse_port(value):
+    """端口单元格内容，空值返回''（表示主串口）"""
+    if value is None or value != value:  # NaN
+        return ''
+    text = str(value).strip()
+    return '' if text.lower() == 'nan' else text
+
+
+def split_by_port(params_df):
+    """按端口列拆分参数表 {端口: DataFrame}，''为主串口"""
+    if params_df is None or params_df.empty:
+        return {}
+    port_col = find_port_column(params_df.columns)
+    if port_col is None:
+        return {'': params_df}
+    ports = params_df[port_col].apply(parse_port)
+    return {port: params_df[ports == port].copy() for port in ports.unique()}
+
+
+def parse_slave(value):
+    """把单元格内容解析为从站地址(1~247)，无效时返回None"""
+    if value is None or value != value:  # NaN
+        return None
+    text = str(value).strip()
+    if text.endswith('.0'):
+        text = text[:-2]
+    try:
+        slave = int(text, 0)
+    except ValueError:
+        return None
+    return slave if 0 < slave <= 247 else None
+
+
+def merge_ranges(addrs, max_qty=MAX_READ_QTY, max_gap=0, widths=None):
+    """
+    把地址合并为区间 [(起始, 数量)]；max_gap>0 时中间最多跳过这么多个未使用的地址。
+    widths 为 {地址: 寄存器数}（FLOAT32 占2个），区间覆盖整个值，一个值不会被拆到两个请求中
+    """
+    widths = widths or {}
+    ranges = []
+    for addr in sorted(set(addrs)):
+        end = addr + widths.get(addr, 1)
+        if ranges and addr - (ranges[-1][0] + ranges[-1][1]) <= max_gap and end - ranges[-1][0] <= max_qty:
+            ranges[-1][1] = max(ranges[-1][1], end - ranges[-1][0])
+        else:
+            ranges.append([addr, end - addr])
+    return [(start, qty) for start, qty in ranges]
+
+
+def row_spaces(params_df):
+    """参数表每行的寄存器区，没有 space 列或单元格为空时为保持寄存器"""
+    space_col = find_space_column(params_df.columns)
+    if space_col is None:
+        return [SPACE_HOLDING] * len(params_df)
+    return [parse_space(value) or SPACE_HOLDING for value in params_df[space_col].tolist()]
+
+
+def slave_addresses(params_df, default_slave=1):
+    """
+    从参数表取 {(从站, 寄存器区): {地址: 占用的寄存器数}}，没有从站列或单元格为空时使用default_slave；
+    FLOAT32 占2个寄存器，线圈/离散输入每个地址1位
+    """
+    result = {}
+    if params_df is None or params_df.empty or 'addr' not in params_df.columns:
+        return result
+    slave_col = find_slave_column(params_df.columns)
+    slaves = params_df[slave_col].tolist() if slave_col is not None else [None] * len(params_df)
+    type_col = find_data_type_column(params_df.columns)
+    types = params_df[type_col].tolist() if type_col is not None else [None] * len(params_df)
+    for addr, slave, space, data_type in zip(params_df['addr'].tolist(), slaves, row_spaces(params_df), types):
+        text = str(addr).strip()
+        if text.endswith('.0'):
+            text = text[:-2]
+        if not text.isdigit():
+            continue
+        addr = int(text)
+        slave = parse_slave(slave) or default_slave
+        width = 1 if space in BIT_SPACES else register_count(point_data_type(addr, data_type))
+        widths = result.setdefault((slave, space), {})
+        widths[addr] = max(width, widths.get(addr, 1))
+    return result
+
+
+def plan_ranges(addrs, space=SPACE_HOLDING, max_qty=MAX_READ_QTY, learned=None, widths=None):
+    """
+    一个从站一个寄存器区的地址 -> [(起始, 数量)]，widths 为 {地址: 寄存器数}（缺省每个地址1个）。
+    learned=([(起始, 数量)], {无效地址}) 为之前学到的区间（core.learned_ranges）：无效地址不再轮询，
+    落在学到的区间内的地址按该区间读取，其余地址照常合并，但不跨过无效地址和学到的区间
+    """
+    if space in BIT_SPACES:
+        max_qty, max_gap = MAX_READ_BITS, MAX_BIT_GAP
+    else:
+        max_gap = 0
+    widths = widths or {}
+    if not learned:
+        return merge_ranges(addrs, max_qty, max_gap, widths)
+    known, invalid = learned
+    known = sorted(known)
+    starts = [start for start, _ in known]
+    barriers = sorted(set(invalid) | set(starts))
+    groups = {}
+    segments = [[]]
+    previous = None
+    for addr in sorted(set(addrs) - set(invalid)):
+        i = bisect.bisect_right(starts, addr) - 1
+        if i >= 0 and addr < known[i][0] + known[i][1]:
+            groups.setdefault(i, []).append(addr)
+            continue
+        if previous is not None and bisect.bisect_right(barriers, addr) != bisect.bisect_right(barriers, previous):
+            segments.append([])
+        segments[-1].append(addr)
+        previous = addr
+    ranges = [(group[0], max(addr + widths.get(addr, 1) for addr in group) - group[0])
+              for group in groups.values()]
+    for segment in segments:
+        ranges += merge_ranges(segment, max_qty, max_gap, widths)
+    return sorted(ranges)
+
+
+def split_range(poll_range, addrs, widths=None):
+    """把区间内参数表的地址（升序）对半分成两个区间，每个区间只覆盖自己的地址（FLOAT32 按 widths 覆盖2个寄存器）"""
+    widths = widths or {}
+    half = len(addrs) // 2
+    slave, func = poll_range.slave, poll_range.func
+    return [PollRange(slave, func, part[0], max(addr + widths.get(addr, 1) for addr in part) - part[0])
+            for part in (addrs[:half], addrs[half:])]
+
+
+def build_poll_plan(params_df, default_slave=1, max_qty=MAX_READ_QTY, learned=None):
+    """由参数表生成 {从站: [PollRange]}，功能码由寄存器区决定；learned 为 {(从站, 寄存器区): 学到的区间}"""
+    plan = {}
+    learned = learned or {}
+    for (slave, space), addrs in sorted(slave_addresses(params_df, default_slave).items()):
+        ranges = plan_ranges(addrs, space, max_qty, learned.get((slave, space)), addrs)
+        func = READ_FUNCS[space]
+        plan.setdefault(slave, []).extend(PollRange(slave, func, start, qty) for start, qty in ranges)
+    return plan
+
+
+class SlaveHealth:
+    """单个从站的通讯健康状态"""
+
+    def __init__(self, slave):
+        self.slave = slave
+        self.state = STATE_OK
+        self.consecutive_failures = 0
+        self.ok_count = 0
+        self.fail_count = 0
+        self.skipped = 0  # 离线期间跳过的请求数
+        self.backoff = 0.0
+        self.next_probe = 0.0
+        self.last_ok = None
+        self.last_error = ''
+        self.avg_response_ms = None
+
+    def to_dict(self):
+        return {
+            'slave': self.slave,
+            'state': self.state,
+            'ok': self.ok_count,
+            'fail': self.fail_count,
+            'consecutive_failures': self.consecutive_failures,
+            'skipped': self.skipped,
+            'backoff': self.backoff,
+            'last_ok': self.last_ok,
+            'last_error': self.last_error,
+            'avg_response_ms': self.avg_response_ms,
+        }
+
+
+class PollScheduler:
+    """
+    同一总线上的多从站调度器（不依赖Qt，调用方负责收发）：
+        rng = scheduler.next_request()
+        ... 发送请求 ...
+        scheduler.report(rng, ok, elapsed, error)
+    """
+
+    def __init__(self, plan, fail_threshold=3, backoff_initial=2.0, backoff_max=60.0, clock=time.monotonic):
+        self.plan = {slave: list(ranges) for slave, ranges in plan.items() if ranges}
+        self.fail_threshold = fail_threshold
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.clock = clock
+        self.slaves = sorted(self.plan)
+        self.health = {slave: SlaveHealth(slave) for slave in self.slaves}
+        self._cursor = {slave: 0 for slave in self.slaves}
+        self._slave_index = 0
+
+    def __len__(self):
+        return sum(len(ranges) for ranges in self.plan.values())
+
+    def next_request(self):
+        """返回下一个要发送的 PollRange；所有从站都离线且未到探测时间时返回None"""
+        now = self.clock()
+        for _ in range(len(self.slaves)):
+            slave = self.slaves[self._slave_index]
+            self._slave_index = (self._slave_index + 1) % len(self.slaves)
+            health = self.health[slave]
+            if health.state == STATE_DEAD:
+                if now < health.next_probe:
+                    health.skipped += 1
+                    continue
+                # 探测：只发该从站的第一个区间
+                return self.plan[slave][0]
+            ranges = self.plan[slave]
+            index = self._cursor[slave]
+            self._cursor[slave] = (index + 1) % len(ranges)
+            return ranges[index]
+        return None
+
+    def replace(self, poll_range, new_ranges):
+        """把计划中的一个区间替换为若干区间（空列表为删除），区间已不在计划中时返回False"""
+        slave = poll_range.slave
+        ranges = self.plan.get(slave)
+        if ranges is None or poll_range not in ranges:
+            return False
+        index = ranges.index(poll_range)
+        ranges[index:index + 1] = new_ranges
+        if not ranges:
+            # 该从站已没有可读的地址
+            del self.plan[slave]
+            del self._cursor[slave]
+            del self.health[slave]
+            self.slaves.remove(slave)
+            self._slave_index = self._slave_index % len(self.slaves) if self.slaves else 0
+            return True
+        cursor = self._cursor[slave]
+        if cursor > index:
+            cursor += len(new_ranges) - 1
+        self._cursor[slave] = cursor % len(ranges)
+        return True
+
+    def next_probe_delay(self):
+        """计划中的从站都离线时，距离最近一次探测的秒数"""
+        probes = [self.health[slave].next_probe for slave in self.slaves if self.health[slave].state == STATE_DEAD]
+        if len(probes) < len(self.slaves) or not probes:
+            return 0.0
+        return max(0.0, min(probes) - self.clock())
+
+    def report(self, poll_range, ok, elapsed=None, error=''):
+        """记录一次请求结果，返回该从站状态是否发生变化"""
+        health = self.health.get(poll_range.slave)
+        if health is None:
+            return False
+        previous = health.state
+        if ok:
+            health.ok_count += 1
+            health.consecutive_failures = 0
+            health.last_ok = time.time()
+            health.state = STATE_OK
+            health.backoff = 0.0
+            if elapsed is not None:
+                ms = elapsed * 1000
+                health.avg_response_ms = ms if health.avg_response_ms is None else \
+                    health.avg_response_ms * 0.8 + ms * 0.2
+        else:
+            health.fail_count += 1
+            health.consecutive_failures += 1
+            health.last_error = error
+            if health.state == STATE_DEAD:
+                health.backoff = min(health.backoff * 2, self.backoff_max)
+                health.next_probe = self.clock() + health.backoff
+            elif health.consecutive_failures >= self.fail_threshold:
+                health.state = STATE_DEAD
+                health.backoff = self.backoff_initial
+                health.next_probe = self.clock() + health.backoff
+            else:
+                health.state = STATE_SUSPECT
+        return health.state != previous
+
+    def health_snapshot(self):
+        return [self.health[slave].to_dict() for slave in self.slaves]
@@ -0,0 +1,271 @@
+"""
+运行时性能分析（不依赖Qt）：cProfile、采样分析器和 tracemalloc 内存快照
+
+现场排查时在界面 Tools > Profile 中启停，结果写入日志目录下的 profiles/：
+    FunctionProfiler   cProfile，只统计调用 start() 的线程；轮询线程的分析器要在事件循环中启停
+                       （call_in_loop）。保存 .pstats（可用 snakeviz 等工具打开）和按累计/自身耗时排序的文本报告
+    SamplingProfiler   从独立线程定时读取目标线程的调用栈（sys._current_frames），不改变被测代码的执行，
+                       开销只与采样间隔有关。保存按函数的自身/累计样本数和折叠栈 .folded（flamegraph.pl、speedscope）
+    MemoryTracer       tracemalloc 快照，按模块和代码行列出分配最多的位置，与上一次快照对比增长
+"""
+
+import collections
+import concurrent.futures
+import cProfile
+import io
+import linecache
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+
+
+def profile_path(directory, prefix, ext):
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"{prefix}_{time.strftime('%Y%m%d_%H%M%S')}{ext}")
+
+
+def call_in_loop(loop, fn, timeout=5.0):
+    """在事件循环线程中执行 fn() 并等待结果（从其他线程调用）"""
+    future = concurrent.futures.Future()
+
+    def run():
+        try:
+            future.set_result(fn())
+        except Exception as e:
+            future.set_exception(e)
+
+    loop.call_soon_threadsafe(run)
+    return future.result(timeout)
+
+
+class FunctionProfiler:
+    """cProfile 包装：start()/stop() 必须在被分析的线程中调用"""
+
+    def __init__(self, name):
+        self.name = name
+        self.profile = None
+        self.started = None
+        self.elapsed = 0.0
+
+    @property
+    def running(self):
+        return self.started is not None
+
+    def start(self):
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+        self.started = time.monotonic()
+
+    def stop(self):
+        if self.started is None:
+            return
+        self.profile.disable()
+        self.elapsed = time.monotonic() - self.started
+        self.started = None
+
+    def report(self, top=60):
+        stream = io.StringIO()
+        stream.write(f"cProfile {self.name}: {self.elapsed:.1f} 秒\n\n")
+        stats = pstats.Stats(self.profile, stream=stream)
+        stats.strip_dirs()
+        for key in ('cumulative', 'tottime'):
+            stream.write(f"==== 按 {key} 排序 ====\n")
+            stats.sort_stats(key).print_stats(top)
+        return stream.getvalue()
+
+    def save(self, directory):
+        """保存 .pstats 和文本报告，返回文件路径列表"""
+        path = profile_path(directory, f'cprofile_{self.name}', '.pstats')
+        self.profile.dump_stats(path)
+        text_path = path[:-len('.pstats')] + '.txt'
+        with open(text_path, 'w', encoding='utf-8') as f:
+            f.write(self.report())
+        return [path, text_path]
+
+
+def frame_key(code):
+    return code.co_filename, code.co_firstlineno, code.co_name
+
+
+def frame_label(key):
+    filename, lineno, name = key
+    return f'{module_name(filename)}:{name}:{lineno}'
+
+
+class SamplingProfiler:
+    """定时采样目标线程的调用栈，统计每个函数的自身样本（栈顶）和累计样本（出现在栈中）"""
+
+    def __init__(self, name, thread_id, interval=0.005, max_depth=128):
+        self.name = name
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self.missed = 0
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+        self._started = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self):
+        self._stop.clear()
+        self._started = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name=f'sampler-{self.name}', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(2)
+        self._thread = None
+        self.elapsed = time.monotonic() - self._started
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                # 目标线程已结束
+                self.missed += 1
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                stack.append(frame_key(frame.f_code))
+                frame = frame.f_back
+            del frame
+            self.stacks[tuple(reversed(stack))] += 1
+            self.samples += 1
+
+    def function_counts(self):
+        """返回 (自身样本 Counter, 累计样本 Counter)，键为 frame_key"""
+        own = collections.Counter()
+        total = collections.Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for key in set(stack):
+                total[key] += count
+        return own, total
+
+    def report(self, top=50):
+        own, total = self.function_counts()
+        samples = self.samples or 1
+        lines = [f"采样分析 {self.name}: {self.elapsed:.1f} 秒, 间隔 {self.interval * 1000:.1f} ms, "
+                 f"样本 {self.samples}, 未取到 {self.missed}", '']
+        for title, counter in (('自身样本（函数本身在执行）', own), ('累计样本（函数在调用栈中）', total)):
+            lines.append(f'==== {title} ====')
+            lines.append(f"{'样本':>8} {'比例':>7}  函数")
+            for key, count in counter.most_common(top):
+                lines.append(f'{count:>8} {count / samples:>7.1%}  {frame_label(key)}')
+            lines.append('')
+        return '\n'.join(lines)
+
+    def folded(self):
+        """折叠栈格式：每行 '根;...;栈顶 样本数'"""
+        return '\n'.join(f"{';'.join(frame_label(key) for key in stack)} {count}"
+                         for stack, count in self.stacks.most_common())
+
+    def save(self, directory):
+        path = profile_path(directory, f'sampling_{self.name}', '.txt')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.report())
+        folded_path = path[:-len('.txt')] + '.folded'
+        with open(folded_path, 'w', encoding='utf-8') as f:
+            f.write(self.folded())
+        return [path, folded_path]
+
+
+_module_files = {}
+
+
+def module_name(filename):
+    """由源文件路径找模块名，找不到时返回文件名"""
+    name = _module_files.get(filename)
+    if name is None:
+        for mod_name, module in list(sys.modules.items()):
+            path = getattr(module, '__file__', None)
+            if path:
+                _module_files.setdefault(path, mod_name)
+        name = _module_files.setdefault(filename, os.path.basename(filename))
+    return name
+
+
+class MemoryTracer:
+    """tracemalloc 快照与报告"""
+
+    # 不统计 tracemalloc、报告生成（linecache、本模块）和导入机制的分配
+    FILTERS = (
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, linecache.__file__),
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+        tracemalloc.Filter(False, '<unknown>'),
+    )
+
+    def __init__(self, nframes=1):
+        self.nframes = nframes
+        self.previous = None
+
+    @property
+    def running(self):
+        return tracemalloc.is_tracing()
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.nframes)
+        self.previous = None
+
+    def stop(self):
+        tracemalloc.stop()
+        self.previous = None
+
+    def take_snapshot(self):
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("内存跟踪未开启")
+        return tracemalloc.take_snapshot().filter_traces(self.FILTERS)
+
+    def report(self, snapshot, previous=None, top=30):
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"tracemalloc: 当前 {current / 1024 / 1024:.1f} MB, 峰值 {peak / 1024 / 1024:.1f} MB", '']
+        by_module = collections.defaultdict(lambda: [0, 0])
+        for stat in snapshot.statistics('filename'):
+            entry = by_module[module_name(stat.traceback[0].filename)]
+            entry[0] += stat.size
+            entry[1] += stat.count
+        lines.append('==== 按模块 ====')
+        lines.append(f"{'KB':>12} {'块数':>10}  模块")
+        for name, (size, count) in sorted(by_module.items(), key=lambda item: item[1][0], reverse=True)[:top]:
+            lines.append(f'{size / 1024:>12.1f} {count:>10}  {name}')
+        lines.append('')
+        lines.append('==== 按代码行 ====')
+        for stat in snapshot.statistics('lineno')[:top]:
+            frame = stat.traceback[0]
+            lines.append(f'{stat.size / 1024:>12.1f} {stat.count:>10}  {module_name(frame.filename)}:{frame.lineno}  '
+                         f'{linecache.getline(frame.filename, frame.lineno).strip()}')
+        if previous is not None:
+            lines.append('')
+            lines.append('==== 与上一次快照相比增长最多 ====')
+            for stat in snapshot.compare_to(previous, 'lineno')[:top]:
+                frame = stat.traceback[0]
+                lines.append(f'{stat.size_diff / 1024:>+12.1f} {stat.count_diff:>+10}  '
+                             f'{module_name(frame.filename)}:{frame.lineno}')
+        return '\n'.join(lines) + '\n'
+
+    def save_snapshot(self, directory):
+        """取快照并保存 .tracemalloc 和文本报告，返回文件路径列表"""
+        snapshot = self.take_snapshot()
+        path = profile_path(directory, 'memory', '.tracemalloc')
+        snapshot.dump(path)
+        text_path = path[:-len('.tracemalloc')] + '.txt'
+        with open(text_path, 'w', encoding='utf-8') as f:
+            f.write(self.report(snapshot, self.previous))
+        self.previous = snapshot
+        return [path, text_path]
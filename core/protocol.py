@@ -1,19 +1,37 @@
 import struct
 
+
+def _build_crc_table():
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            if (crc & 0x0001):
+                crc >>= 1
+                crc ^= 0xA001
+            else:
+                crc >>= 1
+        table.append(crc)
+    return table
+
+
+# CRC16/MODBUS 查表，每字节一次查表代替8次移位
+CRC_TABLE = _build_crc_table()
+
+
+def crc16(data, crc=0xFFFF):
+    """返回整数CRC，可传入上次结果分段累加"""
+    table = CRC_TABLE
+    for a in data:
+        crc = (crc >> 8) ^ table[(crc ^ a) & 0xFF]
+    return crc
+
+
 class Protocol:
     """Modbus协议实现类"""
     @staticmethod
     def calc_crc(data: bytes) -> bytes:
-        crc = 0xFFFF
-        for a in data:
-            crc ^= a
-            for _ in range(8):
-                if (crc & 0x0001):
-                    crc >>= 1
-                    crc ^= 0xA001
-                else:
-                    crc >>= 1
-        return struct.pack('<H', crc)
+        return struct.pack('<H', crc16(data))
 
     @staticmethod
     def build_rtu_request(slave_addr, func_code, start_addr, qty, data=b''):
@@ -29,11 +47,7 @@ class Protocol:
         crc = Protocol.calc_crc(resp[:-2])
         # 比较接收的CRC（小端）
         if resp[-2] != crc[0] or resp[-1] != crc[1]:
-            # 打印字节调试信息
-            print(f"DEBUG: CRC检验失败 - 接收CRC={resp[-2:].hex()}, 计算CRC={crc.hex()}")
             raise Exception(f"CRC校验错误: 接收={resp[-2:].hex()}, 计算={crc.hex()}")
-        # 打印解析调试信息
-        print(f"DEBUG: RTU解析成功 - 载荷={resp[:-2].hex()}")
         return resp[:-2]
 
     @staticmethod
@@ -61,15 +75,11 @@ class Protocol:
             # 计算LRC
             payload_hex = hex_str[:-2]
             recv_lrc = int(hex_str[-2:], 16)
-            calc_lrc = Protocol.calc_lrc(bytes.fromhex(payload_hex))
+            calc_lrc = Protocol.calc_lrc(bytes.fromhex(payload_hex))[0]
             if recv_lrc != calc_lrc:
-                # 打印字节调试信息
-                print(f"DEBUG: LRC检验失败 - 接收LRC={hex_str[-2:]}, 计算LRC={calc_lrc:02x}")
                 raise Exception(f"LRC校验错误: 接收={hex_str[-2:]}, 计算={calc_lrc:02x}")
             # 转换为二进制
             result = bytes.fromhex(payload_hex)
-            # 打印解析调试信息
-            print(f"DEBUG: ASCII解析成功 - 载荷={result.hex()}")
             return result
         except Exception as e:
             raise Exception(f"ASCII响应解析错误: {e}")
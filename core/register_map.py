@@ -0,0 +1,160 @@
+import logging
+import struct
+
+import numpy as np
+
+# 显示策略常量（与 core.data_processor 保持一致）
+DISPLAY_SIGNED = 'SIGNED'
+DISPLAY_HEX = 'HEX'
+DISPLAY_UNSIGNED = 'UNSIGNED'
+DISPLAY_FLOAT32 = 'FLOAT32'
+
+DATA_TYPE_COLUMNS = ['datatype', 'data_type', '数据类型', 'type', '类型']
+
+# 已知需要SIGNED类型的地址列表（临时调试措施，与轮询线程保持一致）
+KNOWN_SIGNED_ADDRS = frozenset(range(10000, 10013))
+
+decode_log = logging.getLogger('modbus.decode')
+
+
+def find_data_type_column(columns):
+    for col in columns:
+        if str(col).strip().lower() in DATA_TYPE_COLUMNS:
+            return col
+    return None
+
+
+def normalize_data_type(value):
+    text = '' if value is None else str(value).strip().upper()
+    if not text or text == 'NAN':
+        return DISPLAY_UNSIGNED
+    return text
+
+
+def point_data_type(addr, value):
+    """参数行的数据类型（已知需要SIGNED的地址优先）"""
+    if addr in KNOWN_SIGNED_ADDRS:
+        return DISPLAY_SIGNED
+    return normalize_data_type(value)
+
+
+def register_count(data_type):
+    """一个值占用的寄存器数：FLOAT32 为2个，其余1个"""
+    return 2 if data_type == DISPLAY_FLOAT32 else 1
+
+
+def decode_register(data_bytes, i, data_type):
+    """解码第i个寄存器，data_bytes为响应中的数据字节（不含地址/功能码/字节数）"""
+    reg_bytes = data_bytes[2 * i:2 * i + 2]
+    if len(reg_bytes) < 2:
+        return '数据不足'
+    if data_type == DISPLAY_UNSIGNED:
+        return str((reg_bytes[0] << 8) | reg_bytes[1])
+    if data_type == DISPLAY_SIGNED:
+        return str(int.from_bytes(reg_bytes, 'big', signed=True))
+    if data_type == DISPLAY_FLOAT32:
+        reg_bytes2 = data_bytes[2 * i:2 * i + 4]
+        if len(reg_bytes2) == 4:
+            return str(struct.unpack('>f', reg_bytes2)[0])
+        return '数据不足'
+    if data_type == DISPLAY_HEX:
+        return f"0x{reg_bytes.hex()}H"
+    if 'SIGNED' in data_type:
+        return str(int.from_bytes(reg_bytes, 'big', signed=True))
+    return str((reg_bytes[0] << 8) | reg_bytes[1])
+
+
+class RegisterPoint:
+    __slots__ = ('addr', 'name', 'data_type')
+
+    def __init__(self, addr, name='', data_type=DISPLAY_UNSIGNED):
+        self.addr = addr
+        self.name = name
+        self.data_type = data_type
+
+    def __repr__(self):
+        return f"RegisterPoint({self.addr}, {self.name!r}, {self.data_type})"
+
+
+class RegisterMap:
+    """
+    参数表的地址查找表 {地址: RegisterPoint}，不依赖Qt，
+    供轮询、监听和离线分析按地址直接解码寄存器块
+    """
+
+    def __init__(self, points=None):
+        self.points = {}
+        for point in points or []:
+            self.points[point.addr] = point
+        self._bit_addrs = None
+
+    @classmethod
+    def from_dataframe(cls, df):
+        """由参数表DataFrame构建，需要 addr 列，可选 name 和数据类型列"""
+        points = []
+        if df is None or 'addr' not in df.columns:
+            return cls(points)
+        type_col = find_data_type_column(df.columns)
+        names = df['name'].tolist() if 'name' in df.columns else [''] * len(df)
+        types = df[type_col].tolist() if type_col is not None else [None] * len(df)
+        for addr, name, data_type in zip(df['addr'].tolist(), names, types):
+            text = str(addr).strip()
+            if text.endswith('.0'):
+                text = text[:-2]
+            if not text.isdigit():
+                continue
+            addr = int(text)
+            data_type = point_data_type(addr, data_type)
+            if name is None or name != name:  # NaN
+                name = ''
+            points.append(RegisterPoint(addr, str(name), data_type))
+        return cls(points)
+
+    def __len__(self):
+        return len(self.points)
+
+    def __contains__(self, addr):
+        return addr in self.points
+
+    def get(self, addr):
+        return self.points.get(addr)
+
+    def addresses(self):
+        return sorted(self.points)
+
+    def widths(self):
+        """{地址: 占用的寄存器数}"""
+        return {addr: register_count(point.data_type) for addr, point in self.points.items()}
+
+    def decode_block(self, start_addr, data_bytes, qty=None):
+        """解码从start_addr开始的连续寄存器，只返回参数表中存在的地址 [(地址, 值)]"""
+        if qty is None:
+            qty = len(data_bytes) // 2
+        points = self.points
+        values = []
+        for i in range(qty):
+            point = points.get(start_addr + i)
+            if point is None:
+                continue
+            values.append((point.addr, decode_register(data_bytes, i, point.data_type)))
+        if decode_log.isEnabledFor(logging.DEBUG):
+            decode_log.debug("解码寄存器块 %s+%s: %s", start_addr, qty, values)
+        return values
+
+    def decode_bits(self, start_addr, data_bytes, qty):
+        """解码线圈/离散输入响应（第一个位在第一个字节的最低位），只返回参数表中存在的地址 [(地址, '0'/'1')]"""
+        addrs = self._bit_addrs
+        if addrs is None:
+            addrs = self._bit_addrs = np.array(sorted(self.points), dtype=np.int64)
+        lo, hi = np.searchsorted(addrs, [start_addr, start_addr + qty])
+        if lo == hi:
+            return []
+        bits = np.unpackbits(np.frombuffer(data_bytes, dtype=np.uint8), bitorder='little')
+        wanted = addrs[lo:hi]
+        offsets = wanted - start_addr
+        # 响应字节不足时缺少的位不解码
+        present = offsets < len(bits)
+        values = list(zip(wanted[present].tolist(), np.where(bits[offsets[present]], '1', '0').tolist()))
+        if decode_log.isEnabledFor(logging.DEBUG):
+            decode_log.debug("解码位块 %s+%s: %s", start_addr, qty, values)
+        return values
@@ -0,0 +1,372 @@
+"""
+寄存器区扫描（不依赖Qt）：找出没有文档的设备上哪些地址有应答，结果写成参数表
+
+逐个地址读 0~65535 在串口上要几个小时（每个不存在的地址都可能等满超时）。这里先按整块读
+（寄存器一次125个，线圈/离散输入一次2000位），整块成功就一次得到整块地址；只有被拒绝
+（异常响应）或无应答的块才对半拆分，拆到 SMALL_BLOCK 个地址以下时逐个地址读。
+超时按每个从站实测的应答时间自适应（AdaptiveTimeout），存在的从站应答很快，不必等满默认超时。
+请求数主要花在被拒绝的地址上（每个约1.2个请求）：resolution > 1 时拆到不超过该数量的被拒绝块直接跳过，
+空白区域的请求数降到约 1/resolution，代价是与无效地址相邻的少量地址可能漏掉。
+Modbus TCP 端点（按事务号并发）上各从站、各子块同时扫描，串口总线上依次进行。
+
+    python modbus_analyzer.py --scan --port /dev/ttyUSB0 --slaves 1-4 --output scan.xlsx
+    python modbus_analyzer.py --scan --port tcp://192.168.1.10:502 --slaves 1-32 --spaces holding,input
+
+输出为参数表格式（第1行标题，第2行列名 name/addr/dataType/space/slave，连续地址一组），
+写入已有的配置文件时替换同名sheet，载入后即可按它轮询。
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import struct
+import time
+
+import pandas as pd
+
+from core.engine import ModbusEngine, MODE_ASCII, MODE_RTU, expected_response_length
+from core.poll_plan import BIT_SPACES, MAX_READ_BITS, MAX_READ_QTY, READ_FUNCS, parse_space
+from core.value_store import SPACE_HOLDING, SPACE_INPUT
+
+# 按块读取时拆到这个数量以下改为逐个地址读（对半拆到底的请求数约为逐个读的两倍）
+SMALL_BLOCK = 8
+MAX_ADDRESS = 0xFFFF
+
+# 不支持该功能码：整个寄存器区跳过；其余异常响应（非法地址/数值等）拆分后再试
+EXC_ILLEGAL_FUNCTION = 0x01
+# 从站忙（确认/忙）：稍后重试
+BUSY_CODES = (0x05, 0x06)
+# 网关找不到从站：按无应答处理
+GATEWAY_CODES = (0x0A, 0x0B)
+BUSY_RETRIES = 3
+
+SPACE_PREFIXES = {SPACE_HOLDING: 'HR', SPACE_INPUT: 'IR', 'coil': 'CO', 'discrete': 'DI'}
+SHEET_COLUMNS = ['name', 'addr', 'dataType', 'space', 'slave', 'scan_value']
+DEFAULT_SHEET = 'Scan'
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveTimeout:
+    """
+    按实测应答时间调整的超时（同TCP的重传超时算法）：rto = srtt + 4 * rttvar，限制在 [minimum, maximum]，
+    超时一次加倍。串口上另加响应帧的传输时间（byte_time 为每字节秒数），大块读取不会被误判为超时
+    """
+
+    def __init__(self, initial=0.5, minimum=0.02, maximum=2.0, byte_time=0.0):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.byte_time = byte_time
+        self.rto = min(max(initial, minimum), maximum)
+        self.srtt = None
+        self.rttvar = 0.0
+
+    def timeout(self, resp_bytes=0):
+        return self.rto + self.byte_time * resp_bytes
+
+    def observe(self, elapsed, resp_bytes=0):
+        sample = max(0.0, elapsed - self.byte_time * resp_bytes)
+        if self.srtt is None:
+            self.srtt = sample
+            self.rttvar = sample / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - sample)
+            self.srtt = 0.875 * self.srtt + 0.125 * sample
+        self.rto = min(max(self.srtt + 4 * self.rttvar, self.minimum), self.maximum)
+
+    def backoff(self):
+        self.rto = min(self.rto * 2, self.maximum)
+
+
+class RegisterScanner:
+    """
+    在 ModbusEngine 的一个端口上扫描：
+        scanner = RegisterScanner(engine.add_port(transport), [1, 2], [SPACE_HOLDING, SPACE_INPUT])
+        await scanner.run()           # 需在引擎事件循环中（engine.run(poll=False) 的服务）
+        scanner.found                 # {(从站, 寄存器区): {地址: 值}}
+    """
+
+    def __init__(self, port_engine, slaves, spaces=(SPACE_HOLDING, SPACE_INPUT), start=0, end=MAX_ADDRESS,
+                 timeout=0.5, min_timeout=0.02, block=None, resolution=1):
+        self.port = port_engine
+        self.slaves = list(slaves)
+        self.spaces = list(spaces)
+        self.start = start
+        self.end = end
+        self.initial_timeout = timeout
+        self.min_timeout = min_timeout
+        self.block = block
+        self.resolution = max(1, resolution)
+        # 支持事务号的端口上并发扫描，串口总线上依次进行
+        self.parallel = port_engine.pipelined
+        baudrate = getattr(port_engine.transport, 'baudrate', None)
+        # 每字符 11 位（起始位 + 8 数据位 + 校验/停止位）
+        self.byte_time = 11.0 / baudrate if baudrate and not self.parallel else 0.0
+        if port_engine.mode == MODE_ASCII:
+            self.byte_time *= 2
+        self.timeouts = {}
+        self.found = {}
+        self.absent = []
+        self.unsupported = []
+        self.requests = 0
+        self.covered = 0
+        self.total = len(self.slaves) * len(self.spaces) * (end - start + 1)
+        self._unsupported = set()
+        self._slots = asyncio.Semaphore(max(1, port_engine.concurrency)) if self.parallel else None
+
+    async def run(self):
+        """扫描所有从站，返回 found"""
+        await self._gather(self._scan_slave(slave) for slave in self.slaves)
+        return self.found
+
+    async def _gather(self, coros):
+        if self.parallel:
+            await asyncio.gather(*coros)
+        else:
+            for coro in coros:
+                await coro
+
+    async def _read(self, slave, func, start, qty):
+        """一次读请求，返回 ModbusResponse；超时按从站自适应"""
+        timing = self.timeouts[slave]
+        resp_bytes = expected_response_length(func, qty) or 0
+        if self._slots is None:
+            result = await self.port.request(slave, func, start, qty, timeout=timing.timeout(resp_bytes))
+        else:
+            async with self._slots:
+                result = await self.port.request(slave, func, start, qty, timeout=timing.timeout(resp_bytes))
+        self.requests += 1
+        if result.answered:
+            timing.observe(result.elapsed, resp_bytes if result.ok else 0)
+        else:
+            timing.backoff()
+        return result
+
+    async def _scan_slave(self, slave):
+        self.timeouts[slave] = AdaptiveTimeout(self.initial_timeout, self.min_timeout, max(self.initial_timeout, 2.0),
+                                               self.byte_time)
+        size = self.end - self.start + 1
+        if not await self._probe(slave):
+            logger.info("从站 %s 无应答，跳过", slave)
+            self.absent.append(slave)
+            self.covered += size * len(self.spaces)
+            return
+        for space in self.spaces:
+            self.found.setdefault((slave, space), {})
+            block = self.block or (MAX_READ_BITS if space in BIT_SPACES else MAX_READ_QTY)
+            blocks = [(addr, min(block, self.end + 1 - addr)) for addr in range(self.start, self.end + 1, block)]
+            await self._gather(self._scan_range(slave, space, start, qty) for start, qty in blocks)
+            if (slave, space) in self._unsupported:
+                self.unsupported.append((slave, space))
+                logger.info("从站 %s 不支持 %s（异常码01）", slave, space)
+            else:
+                logger.info("从站 %s %s: %d 个地址有应答", slave, space, len(self.found[(slave, space)]))
+
+    async def _probe(self, slave):
+        """从站是否存在：任何应答（包括异常响应）都算存在，无应答时再试一次"""
+        func = READ_FUNCS[self.spaces[0]]
+        for _ in range(2):
+            result = await self._read(slave, func, self.start, 1)
+            if result.answered and result.exception_code not in GATEWAY_CODES:
+                return True
+        return False
+
+    async def _scan_range(self, slave, space, start, qty):
+        key = (slave, space)
+        if key in self._unsupported:
+            self.covered += qty
+            return
+        func = READ_FUNCS[space]
+        result = None
+        for attempt in range(BUSY_RETRIES + 1):
+            result = await self._read(slave, func, start, qty)
+            if result.exception_code not in BUSY_CODES:
+                break
+            await asyncio.sleep(0.05 * (attempt + 1))
+        if result.ok:
+            self.found[key].update(self._decode(space, start, qty, result.data))
+            self.covered += qty
+            return
+        if result.exception_code == EXC_ILLEGAL_FUNCTION:
+            self._unsupported.add(key)
+            self.covered += qty
+            return
+        if 1 < qty <= self.resolution:
+            self.covered += qty
+            return
+        if qty == 1:
+            if not result.answered:
+                # 单个地址无应答：再等一次加倍后的超时
+                result = await self._read(slave, func, start, 1)
+                if result.ok:
+                    self.found[key].update(self._decode(space, start, 1, result.data))
+            self.covered += 1
+            return
+        if qty <= SMALL_BLOCK:
+            parts = [(addr, 1) for addr in range(start, start + qty)]
+        else:
+            half = qty // 2
+            parts = [(start, half), (start + half, qty - half)]
+        await self._gather(self._scan_range(slave, space, addr, n) for addr, n in parts)
+
+    @staticmethod
+    def _decode(space, start, qty, data):
+        if space in BIT_SPACES:
+            return {start + i: (data[i >> 3] >> (i & 7)) & 1 for i in range(qty)}
+        return dict(zip(range(start, start + qty), struct.unpack(f'>{qty}H', data[:2 * qty])))
+
+    def progress(self):
+        return self.covered / self.total if self.total else 1.0
+
+    def runs(self, slave, space, max_qty=None):
+        """有应答的地址按连续段分组 [(起始, 数量)]，每段不超过 max_qty（缺省为一次读取的最大数量）"""
+        if max_qty is None:
+            max_qty = MAX_READ_BITS if space in BIT_SPACES else MAX_READ_QTY
+        runs = []
+        for addr in sorted(self.found.get((slave, space), {})):
+            if runs and runs[-1][0] + runs[-1][1] == addr and runs[-1][1] < max_qty:
+                runs[-1][1] += 1
+            else:
+                runs.append([addr, 1])
+        return [tuple(run) for run in runs]
+
+    def to_dataframe(self):
+        """参数表：每个连续段一个分组行（name 为分组名，slave/space 写在分组行上），其后每个地址一行"""
+        rows = []
+        for slave, space in sorted(self.found):
+            values = self.found[(slave, space)]
+            prefix = SPACE_PREFIXES.get(space, space)
+            for start, qty in self.runs(slave, space):
+                rows.append({'name': f'从站{slave} {prefix} {start}-{start + qty - 1}', 'space': space,
+                             'slave': slave})
+                for addr in range(start, start + qty):
+                    rows.append({'name': f'{prefix}{addr}', 'addr': addr,
+                                 'dataType': '' if space in BIT_SPACES else 'UNSIGNED',
+                                 'scan_value': values[addr]})
+        # object 列：整数不转成浮点，空单元格保持为空
+        return pd.DataFrame(rows, columns=SHEET_COLUMNS, dtype=object)
+
+
+def write_sheet(df, path, sheet_name=DEFAULT_SHEET, title=''):
+    """按参数表格式写入（第1行标题、第2行列名）；文件已存在时只替换该sheet"""
+    if os.path.exists(path):
+        writer = pd.ExcelWriter(path, engine='openpyxl', mode='a', if_sheet_exists='replace')
+    else:
+        writer = pd.ExcelWriter(path, engine='openpyxl')
+    with writer:
+        df.to_excel(writer, sheet_name=sheet_name, index=False, startrow=1)
+        writer.sheets[sheet_name].cell(row=1, column=1, value=title)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='modbus_analyzer.py --scan', description='扫描从站有应答的寄存器地址')
+    parser.add_argument('--scan', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--config', default='config_and_params.xlsx',
+                        help='读取 LocalSettings 串口设置的配置文件（默认 %(default)s）')
+    parser.add_argument('--port', help='串口或网络端点（tcp://主机:502），覆盖 LocalSettings 中的设置')
+    parser.add_argument('--baudrate', type=int, help='串口波特率')
+    parser.add_argument('--mode', choices=[MODE_RTU, MODE_ASCII], help='串口协议')
+    parser.add_argument('--slaves', default='1', help='从站地址，如 1-8,10（默认 %(default)s）')
+    parser.add_argument('--spaces', default='holding,input',
+                        help='寄存器区 holding/input/coil/discrete，逗号分隔（默认 %(default)s）')
+    parser.add_argument('--start', type=int, default=0, help='起始地址（默认 %(default)s）')
+    parser.add_argument('--end', type=int, default=MAX_ADDRESS, help='结束地址（含，默认 %(default)s）')
+    parser.add_argument('--block', type=int, help='首轮每块的地址数（默认寄存器125、位2000）')
+    parser.add_argument('--resolution', type=int, default=1,
+                        help='被拒绝的块拆到不超过该数量时跳过，不再逐个地址读（默认 %(default)s，即逐个地址）')
+    parser.add_argument('--timeout', type=float, default=0.5, help='初始超时秒数，之后按实测应答时间调整（默认 %(default)s）')
+    parser.add_argument('--min-timeout', type=float, default=0.02, help='自适应超时下限秒数（默认 %(default)s）')
+    parser.add_argument('--connections', type=int, default=2, help='Modbus TCP 连接数（默认 %(default)s）')
+    parser.add_argument('--inflight', type=int, default=8, help='每条 Modbus TCP 连接的并发请求数（默认 %(default)s）')
+    parser.add_argument('--output', default='scan.xlsx', help='结果文件，已存在时替换其中的sheet（默认 %(default)s）')
+    parser.add_argument('--sheet', default=DEFAULT_SHEET, help='结果sheet名（默认 %(default)s）')
+    parser.add_argument('--log', default='modbus.log', help='日志文件（默认 %(default)s）')
+    return parser
+
+
+async def _run(engine, scanner, report_interval=5.0):
+    async def scan():
+        try:
+            await scanner.run()
+        finally:
+            engine.stop()
+
+    async def report():
+        while True:
+            await asyncio.sleep(report_interval)
+            logger.info("扫描进度 %.1f%%，已发送 %d 个请求", scanner.progress() * 100, scanner.requests)
+
+    engine.add_service(scan)
+    engine.add_service(report)
+    await engine.run(poll=False)
+
+
+def main(argv=None):
+    from core.headless import load_serial_settings
+    from core.modbus_tcp import create_transport, parse_endpoint
+    from core.serial_manager import SerialManager
+    from core.simulator import parse_slave_ids
+    from core.transport import SerialTransport
+    from utils.log_manager import setup_logging
+
+    args = build_parser().parse_args(argv)
+    setup_logging(args.log, console=True)
+    settings = load_serial_settings(args.config) if os.path.exists(args.config) else {
+        'port': '', 'baudrate': 9600, 'bytesize': 8, 'parity': 'N', 'stopbits': 1, 'mode': MODE_RTU}
+    for key in ('port', 'baudrate', 'mode'):
+        if getattr(args, key) is not None:
+            settings[key] = getattr(args, key)
+    if not settings['port']:
+        logger.error("未指定串口（--port 或 LocalSettings）")
+        return 2
+    try:
+        slaves = parse_slave_ids(args.slaves)
+    except ValueError as e:
+        logger.error(str(e))
+        return 2
+    spaces = [parse_space(name) for name in args.spaces.split(',') if name.strip()]
+    if not spaces or None in spaces:
+        logger.error(f"无效的寄存器区: {args.spaces}")
+        return 2
+    if not 0 <= args.start <= args.end <= MAX_ADDRESS:
+        logger.error(f"地址范围应在 0~{MAX_ADDRESS}: {args.start}-{args.end}")
+        return 2
+
+    port = settings['port']
+    engine = ModbusEngine()
+    serial_manager = None
+    if parse_endpoint(port) is not None:
+        transport = create_transport(port, args.connections, args.inflight)
+        port_engine = engine.add_port(transport, timeout=args.timeout)
+    else:
+        serial_manager = SerialManager(port=port, baudrate=settings['baudrate'], bytesize=settings['bytesize'],
+                                       parity=settings['parity'], stopbits=settings['stopbits'],
+                                       timeout=args.timeout)
+        port_engine = engine.add_port(SerialTransport(serial_manager), mode=settings['mode'], timeout=args.timeout)
+    scanner = RegisterScanner(port_engine, slaves, spaces, args.start, args.end, args.timeout, args.min_timeout,
+                              args.block, args.resolution)
+
+    logger.info("扫描 %s 从站 %s，%s，地址 %d-%d", port, args.slaves, ', '.join(spaces), args.start, args.end)
+    t0 = time.monotonic()
+    try:
+        asyncio.run(_run(engine, scanner))
+    except KeyboardInterrupt:
+        logger.warning("扫描被中断，只保存已扫描的部分")
+    finally:
+        if serial_manager is not None:
+            serial_manager.close()
+    elapsed = time.monotonic() - t0
+
+    df = scanner.to_dataframe()
+    title = f'扫描结果 {port} {time.strftime("%Y-%m-%d %H:%M:%S")}'
+    write_sheet(df, args.output, args.sheet, title)
+    points = sum(len(values) for values in scanner.found.values())
+    logger.info("扫描完成: %d 个地址有应答, %d 个请求, 耗时 %.1f 秒, 无应答的从站 %s; 结果写入 %s 的 %s 页",
+                points, scanner.requests, elapsed, scanner.absent or '无', args.output, args.sheet)
+    return 0
+
+
+if __name__ == '__main__':
+    import sys
+    sys.exit(main())
@@ -1,6 +1,7 @@
 import serial
 import serial.tools.list_ports
 import logging
+import time
 from core.protocol import Protocol
 
 class SerialManager:
@@ -13,6 +14,27 @@ class SerialManager:
         self.stopbits = stopbits
         self.timeout = timeout
         self.logger = logging.getLogger(__name__)
+        # 帧监听器: listener(direction, data, port, timestamp_ns)，direction为'tx'/'rx'
+        # timestamp_ns: tx为开始发送的时间，rx为接收完成的时间
+        self.frame_listeners = []
+
+    def add_frame_listener(self, listener):
+        if listener not in self.frame_listeners:
+            self.frame_listeners.append(listener)
+
+    def remove_frame_listener(self, listener):
+        if listener in self.frame_listeners:
+            self.frame_listeners.remove(listener)
+
+    def notify_frame(self, direction, data, timestamp_ns=None):
+        if not self.frame_listeners or not data:
+            return
+        ts = timestamp_ns if timestamp_ns is not None else time.time_ns()
+        for listener in list(self.frame_listeners):
+            try:
+                listener(direction, data, self.port, ts)
+            except Exception as e:
+                self.logger.error(f"帧监听器异常: {e}")
 
     def open(self):
         try:
@@ -44,6 +66,7 @@ class SerialManager:
         if self.ser is not None and self.ser.is_open:
             try:
                 self.ser.write(data)
+                self.notify_frame('tx', data)
                 return True
             except Exception as e:
                 self.logger.error(f"写入串口失败: {e}")
@@ -53,7 +76,25 @@ class SerialManager:
     def read(self, size):
         if self.ser is not None and self.ser.is_open:
             try:
-                return self.ser.read(size)
+                data = self.ser.read(size)
+                self.notify_frame('rx', data)
+                return data
+            except Exception as e:
+                self.logger.error(f"读取串口失败: {e}")
+                return None
+        return None
+
+    def read_available(self):
+        """读取已到达的全部字节，无数据时最多阻塞timeout秒；不通知帧监听器（原始数据块不是完整帧）"""
+        if self.ser is not None and self.ser.is_open:
+            try:
+                data = self.ser.read(1)
+                if not data:
+                    return b''
+                waiting = self.ser.in_waiting
+                if waiting:
+                    data += self.ser.read(waiting)
+                return data
             except Exception as e:
                 self.logger.error(f"读取串口失败: {e}")
                 return None
@@ -0,0 +1,272 @@
+"""
+共享内存寄存器映像（multiprocessing.shared_memory + numpy，不依赖Qt）
+
+轮询进程把最新值写入一块命名共享内存，同机的分析脚本直接读取，没有IPC往返：
+
+    from core.shared_image import RegisterImageReader
+    with RegisterImageReader('modbus_image') as image:
+        snap = image.snapshot()          # 一致的快照
+        snap.get('COM3', 1, 100)         # -> (数值, 原始值, 时间戳, 质量)
+
+内存布局（小端）：
+    头部 64 字节   magic, 布局版本, seq, 容量, 已用槽数, 索引长度
+    索引区         JSON 数组 [[端口, 从站, 寄存器区, 地址], ...]，下标即槽号
+    value  float64[容量]   数值（非数字显示值为 NaN）
+    ts     float64[容量]   时间戳（秒）
+    raw    uint32[容量]    原始寄存器值
+    quality uint8[容量]    0=good 1=stale 2=bad
+
+一致性用 seqlock：写入前 seq 加1（奇数表示正在写），写完再加1；
+读者复制数据前后各读一次 seq，两次相同且为偶数时快照有效，否则重读。
+"""
+
+import asyncio
+import json
+import logging
+import struct
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+MAGIC = b'MBSI'
+LAYOUT_VERSION = 1
+HEADER = struct.Struct('<4sIQIII')  # magic, 布局版本, seq, 容量, 已用槽数, 索引长度
+HEADER_SIZE = 64
+SEQ_OFFSET = 8
+INDEX_BYTES_PER_SLOT = 64
+DEFAULT_IMAGE_NAME = 'modbus_image'
+
+logger = logging.getLogger(__name__)
+
+QUALITY_CODES = {'good': 0, 'stale': 1, 'bad': 2}
+QUALITY_NAMES = {code: name for name, code in QUALITY_CODES.items()}
+
+
+def _layout(capacity):
+    """返回各区的 (偏移, 长度)"""
+    index_offset = HEADER_SIZE
+    index_size = capacity * INDEX_BYTES_PER_SLOT
+    value_offset = index_offset + index_size
+    ts_offset = value_offset + 8 * capacity
+    raw_offset = ts_offset + 8 * capacity
+    quality_offset = raw_offset + 4 * capacity
+    total = quality_offset + capacity
+    return {
+        'index': (index_offset, index_size),
+        'value': value_offset,
+        'ts': ts_offset,
+        'raw': raw_offset,
+        'quality': quality_offset,
+        'total': total,
+    }
+
+
+def _arrays(buf, capacity):
+    layout = _layout(capacity)
+    return (
+        np.ndarray(capacity, dtype='<f8', buffer=buf, offset=layout['value']),
+        np.ndarray(capacity, dtype='<f8', buffer=buf, offset=layout['ts']),
+        np.ndarray(capacity, dtype='<u4', buffer=buf, offset=layout['raw']),
+        np.ndarray(capacity, dtype='u1', buffer=buf, offset=layout['quality']),
+    )
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float('nan')
+
+
+class RegisterImageWriter:
+    """创建共享内存并写入；同一时刻只能有一个写者"""
+
+    def __init__(self, name=DEFAULT_IMAGE_NAME, capacity=4096):
+        self.name = name
+        self.capacity = capacity
+        layout = _layout(capacity)
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=layout['total'])
+        except FileExistsError:
+            # 上次异常退出留下的同名段，重建
+            old = shared_memory.SharedMemory(name=name)
+            old.close()
+            old.unlink()
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=layout['total'])
+        self.buf = self.shm.buf
+        self.values, self.ts, self.raw, self.quality = _arrays(self.buf, capacity)
+        self.values[:] = np.nan
+        self.slots = {}
+        self.overflow = 0  # 因容量不足未写入的值个数
+        self._seq = 0
+        self._index_size = 0
+        HEADER.pack_into(self.buf, 0, MAGIC, LAYOUT_VERSION, 0, capacity, 0, 0)
+
+    def _set_seq(self, seq):
+        self._seq = seq
+        struct.pack_into('<Q', self.buf, SEQ_OFFSET, seq)
+
+    def write(self, changes):
+        """写入 [((端口, 从站, 寄存器区, 地址), StoredValue)]，返回写入个数（超出容量的丢弃）"""
+        if not changes:
+            return 0
+        slots = self.slots
+        new_keys = False
+        rows = []
+        for key, stored in changes:
+            slot = slots.get(key)
+            if slot is None:
+                if len(slots) >= self.capacity:
+                    if not self.overflow:
+                        logger.warning(f"共享内存映像 {self.name} 容量 {self.capacity} 已满，之后新增的寄存器不写入映像")
+                    self.overflow += 1
+                    continue
+                slot = slots[key] = len(slots)
+                new_keys = True
+            rows.append((slot, stored))
+        self._set_seq(self._seq + 1)  # 奇数：写入中
+        try:
+            if new_keys:
+                self._write_index()
+            for slot, stored in rows:
+                self.values[slot] = _to_float(stored.value)
+                self.ts[slot] = stored.ts
+                self.raw[slot] = stored.raw if stored.raw is not None else 0
+                self.quality[slot] = QUALITY_CODES.get(stored.quality, 2)
+        finally:
+            self._set_seq(self._seq + 1)
+        return len(rows)
+
+    def _write_index(self):
+        keys = [None] * len(self.slots)
+        for key, slot in self.slots.items():
+            keys[slot] = list(key)
+        data = json.dumps(keys, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        offset, size = _layout(self.capacity)['index']
+        if len(data) > size:
+            raise ValueError("共享内存索引区已满")
+        self.buf[offset:offset + len(data)] = data
+        self._index_size = len(data)
+        HEADER.pack_into(self.buf, 0, MAGIC, LAYOUT_VERSION, self._seq, self.capacity, len(self.slots), len(data))
+
+    async def serve_store(self, store, interval=0.01):
+        """作为引擎服务运行：按 interval 周期把 ValueStore 的变化写入共享内存"""
+        version = 0
+        try:
+            while True:
+                version, changes = store.changed_since(version)
+                self.write(changes)
+                await asyncio.sleep(interval)
+        finally:
+            self.close()
+
+    def close(self):
+        if self.shm is None:
+            return
+        self.values = self.ts = self.raw = self.quality = None
+        self.buf = None
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+        self.shm = None
+
+
+class ImageSnapshot:
+    """某一时刻的一致快照"""
+
+    def __init__(self, keys, values, ts, raw, quality, seq):
+        self.keys = keys
+        self.values = values
+        self.ts = ts
+        self.raw = raw
+        self.quality = quality
+        self.seq = seq
+        self._slots = None
+
+    def __len__(self):
+        return len(self.keys)
+
+    def slot(self, port, slave, addr, space='holding'):
+        if self._slots is None:
+            self._slots = {tuple(key): i for i, key in enumerate(self.keys)}
+        return self._slots.get((port, slave, space, addr))
+
+    def get(self, port, slave, addr, space='holding'):
+        """返回 (数值, 原始值, 时间戳, 质量) 或 None"""
+        i = self.slot(port, slave, addr, space)
+        if i is None:
+            return None
+        return float(self.values[i]), int(self.raw[i]), float(self.ts[i]), QUALITY_NAMES[int(self.quality[i])]
+
+    def to_dict(self):
+        return {tuple(key): (float(self.values[i]), int(self.raw[i]), float(self.ts[i]),
+                             QUALITY_NAMES[int(self.quality[i])]) for i, key in enumerate(self.keys)}
+
+
+class RegisterImageReader:
+    """在其他进程中只读打开共享内存映像"""
+
+    def __init__(self, name=DEFAULT_IMAGE_NAME):
+        self.shm = shared_memory.SharedMemory(name=name)
+        _untrack(self.shm)
+        self.buf = self.shm.buf
+        magic, layout_version, _, capacity, _, _ = HEADER.unpack_from(self.buf, 0)
+        if magic != MAGIC or layout_version != LAYOUT_VERSION:
+            self.close()
+            raise ValueError(f"不是寄存器映像或版本不兼容: {name}")
+        self.capacity = capacity
+        self.values, self.ts, self.raw, self.quality = _arrays(self.buf, capacity)
+        self._keys = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def seq(self):
+        return struct.unpack_from('<Q', self.buf, SEQ_OFFSET)[0]
+
+    def snapshot(self, timeout=1.0):
+        """复制一份一致的快照；写者一直在写导致超时时抛出 TimeoutError"""
+        deadline = time.monotonic() + timeout
+        buf = self.buf
+        while True:
+            seq1 = self.seq()
+            if not seq1 & 1:
+                _, _, _, _, count, index_size = HEADER.unpack_from(buf, 0)
+                if count != len(self._keys):
+                    offset = HEADER_SIZE
+                    index = bytes(buf[offset:offset + index_size])
+                else:
+                    index = None
+                values = self.values[:count].copy()
+                ts = self.ts[:count].copy()
+                raw = self.raw[:count].copy()
+                quality = self.quality[:count].copy()
+                if self.seq() == seq1:
+                    if index is not None:
+                        self._keys = json.loads(index)
+                    return ImageSnapshot(self._keys, values, ts, raw, quality, seq1)
+            if time.monotonic() > deadline:
+                raise TimeoutError("读取共享内存快照超时")
+            time.sleep(0)
+
+    def close(self):
+        self.values = self.ts = self.raw = self.quality = None
+        self.buf = None
+        if self.shm is not None:
+            self.shm.close()
+            self.shm = None
+
+
+def _untrack(shm):
+    """读者不拥有共享内存，避免本进程退出时被 resource_tracker 删除（POSIX）"""
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    except Exception:
+        pass
@@ -0,0 +1,90 @@
+"""
+共享内存环形缓冲区（单写者/单读者，不依赖Qt）
+
+用于轮询子进程向界面进程批量传送结果。头部两个只增不减的字节计数：
+head 由写者在写完数据后更新，tail 由读者在读完后更新，已用空间 = head - tail。
+每条消息为 4 字节长度 + 数据，跨越缓冲区末尾时分两段复制。
+"""
+
+import struct
+from multiprocessing import shared_memory
+
+HEADER = struct.Struct('<QQQ')  # head, tail, 容量
+HEAD_OFFSET = 0
+TAIL_OFFSET = 8
+DATA_OFFSET = 64
+LENGTH = struct.Struct('<I')
+
+
+class ShmRing:
+    def __init__(self, name=None, capacity=4 * 1024 * 1024, create=False):
+        if create:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=DATA_OFFSET + capacity)
+            HEADER.pack_into(self.shm.buf, 0, 0, 0, capacity)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.owner = create
+        self.name = self.shm.name
+        self.buf = self.shm.buf
+        self.capacity = HEADER.unpack_from(self.buf, 0)[2]
+        self.dropped = 0
+
+    def _counter(self, offset):
+        return struct.unpack_from('<Q', self.buf, offset)[0]
+
+    def _copy_in(self, pos, data):
+        pos %= self.capacity
+        first = min(len(data), self.capacity - pos)
+        start = DATA_OFFSET + pos
+        self.buf[start:start + first] = data[:first]
+        if first < len(data):
+            self.buf[DATA_OFFSET:DATA_OFFSET + len(data) - first] = data[first:]
+
+    def _copy_out(self, pos, n):
+        pos %= self.capacity
+        first = min(n, self.capacity - pos)
+        start = DATA_OFFSET + pos
+        data = bytes(self.buf[start:start + first])
+        if first < n:
+            data += bytes(self.buf[DATA_OFFSET:DATA_OFFSET + n - first])
+        return data
+
+    def free_space(self):
+        return self.capacity - (self._counter(HEAD_OFFSET) - self._counter(TAIL_OFFSET))
+
+    def put(self, data):
+        """写入一条消息，空间不足时返回False（由调用方决定丢弃或重试）"""
+        needed = LENGTH.size + len(data)
+        head = self._counter(HEAD_OFFSET)
+        if needed > self.capacity - (head - self._counter(TAIL_OFFSET)):
+            self.dropped += 1
+            return False
+        self._copy_in(head, LENGTH.pack(len(data)))
+        self._copy_in(head + LENGTH.size, data)
+        # 数据写完后再发布head
+        struct.pack_into('<Q', self.buf, HEAD_OFFSET, head + needed)
+        return True
+
+    def get_all(self):
+        """取出当前所有消息"""
+        messages = []
+        tail = self._counter(TAIL_OFFSET)
+        head = self._counter(HEAD_OFFSET)
+        while tail < head:
+            length = LENGTH.unpack(self._copy_out(tail, LENGTH.size))[0]
+            messages.append(self._copy_out(tail + LENGTH.size, length))
+            tail += LENGTH.size + length
+        struct.pack_into('<Q', self.buf, TAIL_OFFSET, tail)
+        return messages
+
+    def close(self):
+        if self.shm is None:
+            return
+        self.buf = None
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+        self.shm = None
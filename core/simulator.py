@@ -0,0 +1,483 @@
+"""
+Modbus RTU/ASCII 从站模拟器（伪终端，不依赖Qt，需要 POSIX 的 pty）
+
+创建一对伪终端，在主端应答请求；从端路径像真实串口一样交给 SerialManager / 界面 / --headless 打开：
+
+    python -m core.simulator --config config_and_params.xlsx --slaves 1-8 --latency 0.005
+    # 输出 "模拟从站已就绪: /dev/pts/5"
+
+    sim = ModbusSimulator.from_excel('config_and_params.xlsx', latency=0.002, seed=1)
+    port = sim.start()              # -> '/dev/pts/5'
+    ...
+    sim.stop()
+
+寄存器映像由参数表生成（分组、slave 列与轮询相同），--slaves 把同一映像复制到多个从站地址。
+参数表可选 sim 列描述寄存器动态，每次被读取时更新；没有 sim 列时寄存器值为地址的低16位：
+    const[:值]            固定值
+    ramp:最小:最大[:步长]  每次读取加步长，超过最大值回到最小值
+    noise:中心:幅度        中心 ± 幅度 的均匀随机数（给定 seed 可复现）
+    counter[:步长]         16位计数器，溢出回绕
+FLOAT32 参数占两个寄存器，按 IEEE754 大端写入。参数表的 space 列把参数放入输入寄存器、线圈或离散输入，
+线圈/离散输入的值取动态值的最低位（没有 sim 列时为地址的最低位）。
+支持功能码 1、2、3、4（未声明输入寄存器时与保持寄存器同一映像）、5、6、15、16，其余返回异常码 01；
+strict=True 时读写参数表以外的地址返回异常码 02。
+伪终端没有波特率，--baudrate 按该波特率把请求和响应的传输时间加到响应延时上。
+"""
+
+import argparse
+import logging
+import os
+import random
+import select
+import struct
+import threading
+import time
+
+from core.commands import pack_bits
+from core.poll_plan import BIT_SPACES, find_slave_column, parse_slave, row_spaces
+from core.protocol import Protocol, crc16
+from core.register_map import DISPLAY_FLOAT32, find_data_type_column, normalize_data_type
+from core.value_store import SPACE_COIL, SPACE_DISCRETE, SPACE_HOLDING, SPACE_INPUT
+
+MODE_RTU = 'RTU'
+MODE_ASCII = 'ASCII'
+
+SIM_COLUMNS = ['sim', 'simulate', 'dynamics', '模拟']
+
+EXC_ILLEGAL_FUNCTION = 0x01
+EXC_ILLEGAL_ADDRESS = 0x02
+EXC_ILLEGAL_VALUE = 0x03
+
+MAX_READ_QTY = 125
+MAX_WRITE_QTY = 123
+MAX_READ_BITS = 2000
+MAX_WRITE_BITS = 1968
+
+
+def find_sim_column(columns):
+    for col in columns:
+        if str(col).strip().lower() in SIM_COLUMNS:
+            return col
+    return None
+
+
+class Dynamics:
+    """寄存器动态：每次读取调用 next() 得到新值"""
+
+    def __init__(self, kind='const', args=(), rng=None):
+        self.kind = kind
+        self.args = args
+        self.rng = rng or random.Random()
+        if kind == 'const':
+            self.value = args[0] if args else 0
+        elif kind == 'ramp':
+            if len(args) < 2:
+                raise ValueError("ramp 需要 最小:最大[:步长]")
+            self.value = args[0]
+        elif kind == 'noise':
+            if len(args) < 2:
+                raise ValueError("noise 需要 中心:幅度")
+            self.value = args[0]
+        elif kind == 'counter':
+            self.value = 0
+        else:
+            raise ValueError(f"未知的寄存器动态: {kind}")
+
+    @classmethod
+    def parse(cls, text, rng=None, default=0):
+        """解析 'ramp:0:100:1' 形式的描述，空值为固定值 default"""
+        text = '' if text is None or text != text else str(text).strip()
+        if not text or text.lower() == 'nan':
+            return cls('const', (default,), rng)
+        parts = text.split(':')
+        kind = parts[0].strip().lower()
+        try:
+            args = tuple(float(p) for p in parts[1:] if p.strip())
+        except ValueError:
+            raise ValueError(f"寄存器动态参数无效: {text}")
+        return cls(kind, args, rng)
+
+    def next(self):
+        kind = self.kind
+        if kind == 'ramp':
+            low, high = self.args[0], self.args[1]
+            step = self.args[2] if len(self.args) > 2 else 1
+            value = self.value
+            self.value = value + step
+            if self.value > high:
+                self.value = low
+            return value
+        if kind == 'noise':
+            center, amplitude = self.args[0], self.args[1]
+            self.value = center + self.rng.uniform(-amplitude, amplitude)
+            return self.value
+        if kind == 'counter':
+            step = int(self.args[0]) if self.args else 1
+            value = self.value
+            self.value = (value + step) & 0xFFFF
+            return value
+        return self.value
+
+    def set(self, value):
+        """被主站写入后保持写入值"""
+        self.kind = 'const'
+        self.value = value
+
+
+class SimulatedSlave:
+    """一个从站各寄存器区的映像 {地址: 值}，带动态的寄存器在读取时更新"""
+
+    def __init__(self, slave_id, strict=False):
+        self.slave_id = slave_id
+        self.strict = strict
+        # 寄存器区 -> ({地址: 值}, {地址: (Dynamics, 数据类型)})
+        self.tables = {space: ({}, {}) for space in (SPACE_HOLDING, SPACE_INPUT, SPACE_COIL, SPACE_DISCRETE)}
+        self.registers, self.dynamics = self.tables[SPACE_HOLDING]
+        self.requests = 0
+
+    def add_point(self, addr, data_type, dynamics, space=SPACE_HOLDING):
+        registers, table_dynamics = self.tables[space]
+        table_dynamics[addr] = (dynamics, data_type)
+        registers[addr] = 0
+        if data_type == DISPLAY_FLOAT32 and space not in BIT_SPACES:
+            registers[addr + 1] = 0
+
+    def _table(self, space):
+        if space == SPACE_INPUT and not self.tables[SPACE_INPUT][0]:
+            # 没有声明输入寄存器时 FC4 读保持寄存器映像
+            space = SPACE_HOLDING
+        return self.tables[space]
+
+    def _refresh(self, space, start, qty):
+        registers, table_dynamics = self._table(space)
+        for addr in range(start, start + qty):
+            entry = table_dynamics.get(addr)
+            if entry is None:
+                continue
+            dynamics, data_type = entry
+            value = dynamics.next()
+            if space in BIT_SPACES:
+                registers[addr] = int(round(value)) & 1
+            elif data_type == DISPLAY_FLOAT32:
+                high, low = struct.unpack('>HH', struct.pack('>f', float(value)))
+                registers[addr] = high
+                registers[addr + 1] = low
+            else:
+                # 有符号值按补码写入
+                registers[addr] = int(round(value)) & 0xFFFF
+
+    def _check(self, space, start, qty):
+        if not self.strict:
+            return True
+        registers = self._table(space)[0]
+        return all(addr in registers for addr in range(start, start + qty))
+
+    def read(self, start, qty, space=SPACE_HOLDING):
+        """返回寄存器（线圈/离散输入为0/1）值列表；strict 时越界返回 None"""
+        if not self._check(space, start, qty):
+            return None
+        self._refresh(space, start, qty)
+        registers = self._table(space)[0]
+        return [registers.get(addr, 0) for addr in range(start, start + qty)]
+
+    def write(self, start, values, space=SPACE_HOLDING):
+        if not self._check(space, start, len(values)):
+            return False
+        registers, table_dynamics = self.tables[space]
+        for i, value in enumerate(values):
+            addr = start + i
+            registers[addr] = value
+            entry = table_dynamics.get(addr)
+            if entry is not None and entry[1] != DISPLAY_FLOAT32:
+                entry[0].set(value)
+        return True
+
+
+class ModbusSimulator:
+    """在伪终端主端运行的多从站模拟器"""
+
+    def __init__(self, slaves=None, mode=MODE_RTU, latency=0.0, jitter=0.0, seed=None, baudrate=None):
+        self.slaves = {slave.slave_id: slave for slave in (slaves or [])}
+        self.mode = mode
+        self.latency = latency
+        self.jitter = jitter
+        # 伪终端没有波特率：指定时按 10 位/字符 加上请求和响应的传输时间及 3.5 字符帧间隔
+        self.baudrate = baudrate
+        self.rng = random.Random(seed)
+        self.master_fd = None
+        self.slave_fd = None
+        self.port = None
+        self.requests = 0
+        self.errors = 0
+        self._thread = None
+        self._running = False
+        self.logger = logging.getLogger(__name__)
+
+    @classmethod
+    def from_excel(cls, path, slave_ids=None, default_slave=1, port=None, strict=False, **kwargs):
+        """
+        由配置文件的参数表生成寄存器映像。
+        slave_ids 指定时，参数表中所有从站的寄存器合并后复制到这些从站地址；
+        port 指定时只取 port 列为该值的参数（''为主串口）。
+        """
+        from utils.excel_manager import ExcelManager
+        from core.poll_plan import split_by_port
+        import pandas as pd
+        groups = ExcelManager(path).load_param_groups(default_slave)
+        if not groups:
+            raise ValueError(f"{path} 中没有参数")
+        params = pd.concat([df for _, _, df in groups], ignore_index=True)
+        if port is not None:
+            params = split_by_port(params).get(port)
+            if params is None:
+                raise ValueError(f"参数表中没有端口 {port or '(主串口)'} 的参数")
+        simulator = cls(**kwargs)
+        simulator.load_dataframe(params, slave_ids, default_slave, strict)
+        return simulator
+
+    def load_dataframe(self, params, slave_ids=None, default_slave=1, strict=False):
+        type_col = find_data_type_column(params.columns)
+        sim_col = find_sim_column(params.columns)
+        slave_col = find_slave_column(params.columns)
+        if slave_ids:
+            targets = [list(slave_ids)] * len(params)
+        elif slave_col is not None:
+            targets = [[parse_slave(s) or default_slave] for s in params[slave_col]]
+        else:
+            targets = [[default_slave]] * len(params)
+        types = params[type_col] if type_col is not None else [None] * len(params)
+        sims = params[sim_col] if sim_col is not None else [None] * len(params)
+        for addr, data_type, sim, slave_list, space in zip(params['addr'], types, sims, targets, row_spaces(params)):
+            text = str(addr).strip()
+            if text.endswith('.0'):
+                text = text[:-2]
+            if not text.isdigit():
+                continue
+            addr = int(text)
+            data_type = normalize_data_type(data_type)
+            default = addr & 1 if space in BIT_SPACES else addr & 0xFFFF
+            for slave_id in slave_list:
+                slave = self.slaves.get(slave_id)
+                if slave is None:
+                    slave = self.slaves[slave_id] = SimulatedSlave(slave_id, strict)
+                slave.add_point(addr, data_type, Dynamics.parse(sim, self.rng, default=default), space)
+        return self
+
+    # ---------- 应答 ----------
+
+    def handle_pdu(self, slave_id, pdu):
+        """处理一个请求PDU（功能码+数据），返回响应PDU；不应答（从站不存在/广播）时返回None"""
+        slave = self.slaves.get(slave_id)
+        if slave is None:
+            return None
+        self.requests += 1
+        slave.requests += 1
+        func = pdu[0]
+        if func in (1, 2):
+            start, qty = struct.unpack('>HH', pdu[1:5])
+            if not 1 <= qty <= MAX_READ_BITS:
+                return bytes([func | 0x80, EXC_ILLEGAL_VALUE])
+            bits = slave.read(start, qty, SPACE_COIL if func == 1 else SPACE_DISCRETE)
+            if bits is None:
+                return bytes([func | 0x80, EXC_ILLEGAL_ADDRESS])
+            data = pack_bits(bits)
+            return bytes([func, len(data)]) + data
+        if func in (3, 4):
+            start, qty = struct.unpack('>HH', pdu[1:5])
+            if not 1 <= qty <= MAX_READ_QTY:
+                return bytes([func | 0x80, EXC_ILLEGAL_VALUE])
+            values = slave.read(start, qty, SPACE_HOLDING if func == 3 else SPACE_INPUT)
+            if values is None:
+                return bytes([func | 0x80, EXC_ILLEGAL_ADDRESS])
+            return bytes([func, 2 * qty]) + struct.pack(f'>{qty}H', *values)
+        if func == 5:
+            addr, value = struct.unpack('>HH', pdu[1:5])
+            if value not in (0xFF00, 0x0000):
+                return bytes([func | 0x80, EXC_ILLEGAL_VALUE])
+            if not slave.write(addr, [1 if value else 0], SPACE_COIL):
+                return bytes([func | 0x80, EXC_ILLEGAL_ADDRESS])
+            return pdu[:5]
+        if func == 15:
+            start, qty, count = struct.unpack('>HHB', pdu[1:6])
+            if not 1 <= qty <= MAX_WRITE_BITS or count != (qty + 7) // 8 or len(pdu) < 6 + count:
+                return bytes([func | 0x80, EXC_ILLEGAL_VALUE])
+            data = pdu[6:6 + count]
+            if not slave.write(start, [(data[i >> 3] >> (i & 7)) & 1 for i in range(qty)], SPACE_COIL):
+                return bytes([func | 0x80, EXC_ILLEGAL_ADDRESS])
+            return pdu[:5]
+        if func == 6:
+            addr, value = struct.unpack('>HH', pdu[1:5])
+            if not slave.write(addr, [value]):
+                return bytes([func | 0x80, EXC_ILLEGAL_ADDRESS])
+            return pdu[:5]
+        if func == 16:
+            start, qty, count = struct.unpack('>HHB', pdu[1:6])
+            if not 1 <= qty <= MAX_WRITE_QTY or count != 2 * qty or len(pdu) < 6 + count:
+                return bytes([func | 0x80, EXC_ILLEGAL_VALUE])
+            if not slave.write(start, list(struct.unpack(f'>{qty}H', pdu[6:6 + count]))):
+                return bytes([func | 0x80, EXC_ILLEGAL_ADDRESS])
+            return pdu[:5]
+        return bytes([func | 0x80, EXC_ILLEGAL_FUNCTION])
+
+    def _respond(self, slave_id, pdu, request_size=0):
+        response = self.handle_pdu(slave_id, pdu)
+        if response is None:
+            return b''
+        body = bytes([slave_id]) + response
+        if self.mode == MODE_RTU:
+            frame = body + Protocol.calc_crc(body)
+        else:
+            frame = b':' + body.hex().upper().encode() + Protocol.calc_lrc(body).hex().upper().encode() + b'\r\n'
+        delay = self.latency + (self.rng.uniform(0, self.jitter) if self.jitter else 0.0)
+        if self.baudrate:
+            delay += (request_size + len(frame) + 3.5) * 10 / self.baudrate
+        if delay > 0:
+            time.sleep(delay)
+        return frame
+
+    def process_rtu(self, buf):
+        """从缓冲区取出完整的RTU请求帧并应答，返回 (未处理的剩余数据, 响应字节)"""
+        out = b''
+        while len(buf) >= 8:
+            func = buf[1]
+            if func in (15, 16):
+                if len(buf) < 7:
+                    break
+                length = 9 + buf[6]
+            else:
+                length = 8
+            if len(buf) < length:
+                break
+            frame = buf[:length]
+            if crc16(frame) != 0:
+                # 错位或噪声：丢一个字节重新同步
+                self.errors += 1
+                buf = buf[1:]
+                continue
+            buf = buf[length:]
+            out += self._respond(frame[0], frame[1:-2], len(frame))
+        return buf, out
+
+    def process_ascii(self, buf):
+        out = b''
+        while True:
+            end = buf.find(b'\r\n')
+            if end < 0:
+                break
+            line, buf = buf[:end + 2], buf[end + 2:]
+            start = line.find(b':')
+            if start < 0:
+                continue
+            try:
+                frame = Protocol.parse_ascii_response(line[start:])
+            except Exception:
+                self.errors += 1
+                continue
+            if len(frame) >= 2:
+                out += self._respond(frame[0], frame[1:], len(line))
+        return buf, out
+
+    # ---------- 伪终端 ----------
+
+    def open_pty(self):
+        import pty
+        import tty
+        self.master_fd, self.slave_fd = pty.openpty()
+        tty.setraw(self.master_fd)
+        tty.setraw(self.slave_fd)
+        self.port = os.ttyname(self.slave_fd)
+        return self.port
+
+    def start(self):
+        """打开伪终端并在后台线程应答，返回从端路径"""
+        if self.port is None:
+            self.open_pty()
+        self._running = True
+        self._thread = threading.Thread(target=self._serve, name='modbus-simulator', daemon=True)
+        self._thread.start()
+        self.logger.info(f"模拟从站已就绪: {self.port}, 从站 {sorted(self.slaves)}, {self.mode}")
+        return self.port
+
+    def _serve(self):
+        process = self.process_rtu if self.mode == MODE_RTU else self.process_ascii
+        buf = b''
+        while self._running:
+            try:
+                ready, _, _ = select.select([self.master_fd], [], [], 0.1)
+                if not ready:
+                    continue
+                data = os.read(self.master_fd, 4096)
+            except OSError:
+                break
+            buf, out = process(buf + data)
+            if out:
+                try:
+                    os.write(self.master_fd, out)
+                except OSError:
+                    break
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(1.0)
+            self._thread = None
+        for fd in (self.master_fd, self.slave_fd):
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        self.master_fd = self.slave_fd = None
+        self.port = None
+
+
+def parse_slave_ids(text):
+    """'1-4,7' -> [1, 2, 3, 4, 7]"""
+    ids = []
+    for part in str(text).split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            low, high = part.split('-', 1)
+            ids.extend(range(int(low), int(high) + 1))
+        else:
+            ids.append(int(part))
+    if not all(1 <= i <= 247 for i in ids):
+        raise ValueError(f"从站地址应为 1~247: {text}")
+    return ids
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Modbus RTU/ASCII 从站模拟器（伪终端）')
+    parser.add_argument('--config', default='config_and_params.xlsx', help='配置文件（默认 %(default)s）')
+    parser.add_argument('--slaves', help='从站地址，如 1-8,10；不指定时按参数表的从站')
+    parser.add_argument('--port', help="只模拟参数表中该端口的参数（''为主串口）")
+    parser.add_argument('--mode', choices=[MODE_RTU, MODE_ASCII], default=MODE_RTU)
+    parser.add_argument('--latency', type=float, default=0.0, help='响应延时秒数')
+    parser.add_argument('--baudrate', type=int, help='模拟该波特率的传输时间')
+    parser.add_argument('--jitter', type=float, default=0.0, help='附加的随机延时上限秒数')
+    parser.add_argument('--seed', type=int, help='随机数种子')
+    parser.add_argument('--strict', action='store_true', help='参数表以外的地址返回异常码 02')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    simulator = ModbusSimulator.from_excel(
+        args.config, parse_slave_ids(args.slaves) if args.slaves else None, port=args.port, strict=args.strict,
+        mode=args.mode, latency=args.latency, jitter=args.jitter, seed=args.seed,
+        baudrate=args.baudrate)
+    print(simulator.start(), flush=True)
+    try:
+        while True:
+            time.sleep(10)
+            logging.info(f"已应答 {simulator.requests} 个请求, 丢弃 {simulator.errors} 个错误帧")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        simulator.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    import sys
+    sys.exit(main())
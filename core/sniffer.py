@@ -0,0 +1,327 @@
+"""
+被动监听（只听不发）：把串口原始字节流切分为RTU帧并配对请求/响应。
+
+分帧以CRC为准：在当前帧起点根据功能码推算可能的帧长，只对这些候选长度做一次CRC校验，
+校验通过即出帧，全部失败则丢弃一个字节重新同步；已确认的字节不会再被重新解析。
+字符间隔(t3.5)用于结束功能码未知的帧以及清理残缺数据。
+"""
+
+import logging
+import time
+from collections import namedtuple
+
+from core.protocol import crc16
+
+SniffedFrame = namedtuple('SniffedFrame', ['data', 'start_ns', 'end_ns', 'kind'])
+SniffedTransaction = namedtuple('SniffedTransaction', [
+    'slave', 'func', 'start_addr', 'qty', 'request', 'response',
+    'request_ns', 'response_ns', 'exception_code', 'values'])
+
+KIND_REQUEST = 'request'
+KIND_RESPONSE = 'response'
+KIND_EXCEPTION = 'exception'
+KIND_UNKNOWN = None
+
+MIN_FRAME = 4
+MAX_FRAME = 256
+
+
+def char_time_ns(baudrate, bytesize=8, parity='N', stopbits=1):
+    """单个字符在总线上的传输时间（起始位+数据位+校验位+停止位）"""
+    bits = 1 + bytesize + (0 if str(parity).upper() == 'N' else 1) + stopbits
+    return int(bits * 1e9 / baudrate)
+
+
+def t35_ns(baudrate, bytesize=8, parity='N', stopbits=1):
+    """帧间最小静默时间：波特率高于19200时固定为1.75ms"""
+    if baudrate > 19200:
+        return 1750000
+    return int(3.5 * char_time_ns(baudrate, bytesize, parity, stopbits))
+
+
+def candidate_lengths(buf, pos, available):
+    """
+    根据帧头推算候选帧长 [(长度, 类型)]；需要的头部字节不足时返回None表示等待更多数据，
+    功能码未知时返回空列表（由帧间隔决定帧尾）
+    """
+    if available < 2:
+        return None
+    func = buf[pos + 1]
+    if func & 0x80:
+        return [(5, KIND_EXCEPTION)]
+    if func in (1, 2, 3, 4):
+        if available < 3:
+            return None
+        # 请求固定8字节；响应为 地址+功能码+字节数+数据+CRC
+        return sorted([(8, KIND_REQUEST), (5 + buf[pos + 2], KIND_RESPONSE)])
+    if func in (5, 6, 8):
+        return [(8, KIND_UNKNOWN)]
+    if func in (15, 16):
+        if available < 7:
+            return None
+        return sorted([(8, KIND_RESPONSE), (9 + buf[pos + 6], KIND_REQUEST)])
+    if func in (7, 11, 12, 17):
+        # 请求仅 地址+功能码+CRC
+        if available < 3:
+            return None
+        lengths = [(4, KIND_REQUEST)]
+        if func == 7:
+            lengths.append((5, KIND_RESPONSE))
+        elif func == 11:
+            lengths.append((8, KIND_RESPONSE))
+        else:
+            lengths.append((5 + buf[pos + 2], KIND_RESPONSE))
+        return sorted(lengths)
+    if func == 23:
+        if available < 11:
+            return None
+        return sorted([(5 + buf[pos + 2], KIND_RESPONSE), (13 + buf[pos + 10], KIND_REQUEST)])
+    return []
+
+
+def expected_response_length(func, qty):
+    if qty is None:
+        return None
+    if func in (3, 4):
+        return 5 + 2 * qty
+    if func in (1, 2):
+        return 5 + (qty + 7) // 8
+    if func in (5, 6, 15, 16):
+        return 8
+    return None
+
+
+class RtuFramer:
+    """流式RTU分帧器，feed() 可以在任意位置切分的数据块上反复调用"""
+
+    def __init__(self, baudrate=9600, bytesize=8, parity='N', stopbits=1, stale_ms=50):
+        self.char_ns = char_time_ns(baudrate, bytesize, parity, stopbits)
+        self.gap_ns = t35_ns(baudrate, bytesize, parity, stopbits)
+        # 已知帧长但迟迟收不齐的残帧，超过该静默时间后丢弃
+        self.stale_ns = max(int(stale_ms * 1e6), self.gap_ns)
+        self.buf = bytearray()
+        self.pos = 0
+        self._checked = 0  # 当前起点已校验过的最大候选长度
+        self._buf_end_ns = None  # buf最后一个字节的到达时间
+        self._chunks = []  # [(块结束位置, 到达时间)]，用于还原跨块帧的实际起止时间
+        self.frames = 0
+        self.noise_bytes = 0
+
+    def _byte_time(self, index):
+        """估算buf中第index个字节结束的时间（以所在数据块的到达时间为准）"""
+        for end, ts in self._chunks:
+            if index < end:
+                return ts - (end - 1 - index) * self.char_ns
+        return self._buf_end_ns - (len(self.buf) - 1 - index) * self.char_ns
+
+    def _compact(self):
+        if self.pos:
+            del self.buf[:self.pos]
+            self._chunks = [(end - self.pos, ts) for end, ts in self._chunks if end > self.pos]
+            self.pos = 0
+
+    def _emit(self, out, length, kind):
+        start = self.pos
+        end = start + length
+        out.append(SniffedFrame(bytes(self.buf[start:end]),
+                                self._byte_time(start) - self.char_ns,
+                                self._byte_time(end - 1), kind))
+        self.pos = end
+        self._checked = 0
+        self.frames += 1
+
+    def _drop(self, count):
+        self.pos += count
+        self._checked = 0
+        self.noise_bytes += count
+
+    def feed(self, data, timestamp_ns=None):
+        """送入新收到的数据块（timestamp_ns为该块最后一个字节的到达时间），返回切出的完整帧"""
+        if timestamp_ns is None:
+            timestamp_ns = time.monotonic_ns()
+        out = []
+        if self._buf_end_ns is not None and self.pos < len(self.buf):
+            gap = timestamp_ns - len(data) * self.char_ns - self._buf_end_ns
+            if gap > self.gap_ns:
+                self._close_on_gap(out, gap)
+        self.buf += data
+        self._buf_end_ns = timestamp_ns
+        self._chunks.append((len(self.buf), timestamp_ns))
+        self._scan(out)
+        self._compact()
+        return out
+
+    def flush(self, now_ns=None):
+        """总线空闲时调用，结束残留数据"""
+        if now_ns is None:
+            now_ns = time.monotonic_ns()
+        out = []
+        if self._buf_end_ns is not None and self.pos < len(self.buf):
+            gap = now_ns - self._buf_end_ns
+            if gap > self.gap_ns:
+                self._close_on_gap(out, gap)
+                self._compact()
+        return out
+
+    def _close_on_gap(self, out, gap):
+        """静默超过t3.5：未知功能码的帧以CRC整体校验收尾，残帧在超时后丢弃"""
+        while self.pos < len(self.buf):
+            available = len(self.buf) - self.pos
+            lengths = candidate_lengths(self.buf, self.pos, available)
+            if lengths and max(length for length, _ in lengths) > available and gap < self.stale_ns:
+                return  # 可能是被USB分包拆开的帧，继续等待
+            if available >= MIN_FRAME and crc16(self.buf[self.pos:]) == 0:
+                self._emit(out, available, KIND_UNKNOWN)
+            else:
+                self._drop(available)
+
+    def _scan(self, out):
+        buf = self.buf
+        while True:
+            available = len(buf) - self.pos
+            if available < MIN_FRAME:
+                return
+            lengths = candidate_lengths(buf, self.pos, available)
+            if lengths is None:
+                return
+            if not lengths:
+                # 未知功能码：等待帧间隔，但数据过长说明已失步
+                if available > MAX_FRAME:
+                    self._drop(1)
+                    continue
+                return
+            matched = False
+            waiting = False
+            for length, kind in lengths:
+                if length > MAX_FRAME or length < MIN_FRAME:
+                    continue
+                if length > available:
+                    waiting = True
+                    continue
+                if length <= self._checked:
+                    continue
+                # 帧连同CRC一起计算，结果为0即校验通过
+                if crc16(buf[self.pos:self.pos + length]) == 0:
+                    self._emit(out, length, kind)
+                    matched = True
+                    break
+            if matched:
+                continue
+            if waiting:
+                self._checked = max([l for l, _ in lengths if l <= available] or [0])
+                return
+            self._drop(1)
+
+
+class TransactionPairer:
+    """把帧配对为 请求→响应 事务"""
+
+    def __init__(self, response_timeout_ms=1000, register_map=None):
+        self.response_timeout_ns = int(response_timeout_ms * 1e6)
+        self.register_map = register_map
+        self.pending = None  # (frame, slave, func, start, qty)
+        self.unmatched = 0
+
+    def add(self, frame):
+        """加入一帧，返回完成的事务列表（超时未响应的请求也作为事务返回）"""
+        done = []
+        data = frame.data
+        slave, func = data[0], data[1]
+        pending = self.pending
+        if pending is not None:
+            req_frame, p_slave, p_func = pending[0], pending[1], pending[2]
+            expired = frame.start_ns - req_frame.end_ns > self.response_timeout_ns
+            same = not expired and slave == p_slave and (func & 0x7F) == p_func
+            is_response = same and (frame.kind != KIND_REQUEST
+                                    or len(data) == expected_response_length(p_func, pending[4]))
+            if is_response:
+                done.append(self._transaction(pending, frame))
+                self.pending = None
+                return done
+            done.append(self._transaction(pending, None))
+            self.pending = None
+        if frame.kind in (KIND_RESPONSE, KIND_EXCEPTION):
+            # 没有对应请求的响应（例如从中途开始监听）
+            self.unmatched += 1
+            return done
+        start, qty = None, None
+        if len(data) >= 8 and func in (1, 2, 3, 4, 5, 6, 15, 16):
+            start = int.from_bytes(data[2:4], 'big')
+            qty = int.from_bytes(data[4:6], 'big') if func in (1, 2, 3, 4, 15, 16) else 1
+        self.pending = (frame, slave, func, start, qty)
+        return done
+
+    def expire(self, now_ns):
+        """请求超时未响应时返回无响应事务"""
+        if self.pending is not None and now_ns - self.pending[0].end_ns > self.response_timeout_ns:
+            tx = self._transaction(self.pending, None)
+            self.pending = None
+            return [tx]
+        return []
+
+    def _transaction(self, pending, resp_frame):
+        req_frame, slave, func, start, qty = pending
+        exception_code = None
+        values = []
+        response = None
+        response_ns = None
+        if resp_frame is not None:
+            response = resp_frame.data
+            response_ns = resp_frame.start_ns
+            if response[1] & 0x80:
+                exception_code = response[2]
+            elif func in (3, 4) and start is not None and self.register_map is not None:
+                byte_count = response[2]
+                values = self.register_map.decode_block(start, response[3:3 + byte_count], qty)
+        return SniffedTransaction(slave, func, start, qty, req_frame.data, response,
+                                  req_frame.start_ns, response_ns, exception_code, values)
+
+
+class BusSniffer:
+    """
+    串口只听模式：从 SerialManager 读取原始字节，分帧、配对并按参数表解码。
+    帧以 tx(请求)/rx(响应) 方向通知 SerialManager 的帧监听器（如帧捕获），
+    时间戳沿用监听器约定：tx 为帧开始时间，rx 为帧结束时间。
+    timing 为 BusTimingAnalyzer 时直接送入实测的帧起止时间。
+    """
+
+    def __init__(self, serial_manager, register_map=None, response_timeout_ms=1000, timing=None):
+        self.serial_manager = serial_manager
+        self.framer = RtuFramer(serial_manager.baudrate, serial_manager.bytesize,
+                                serial_manager.parity, serial_manager.stopbits)
+        self.pairer = TransactionPairer(response_timeout_ms, register_map)
+        self.timing = timing
+        self.logger = logging.getLogger('modbus.protocol')
+        # 墙钟与单调时钟的差，用于把帧时间换算成捕获文件的时间戳
+        self._wall_offset_ns = time.time_ns() - time.monotonic_ns()
+
+    def process(self, chunk, timestamp_ns):
+        """处理一块原始数据，返回完成的事务"""
+        transactions = []
+        frames = self.framer.feed(chunk, timestamp_ns) if chunk else self.framer.flush(timestamp_ns)
+        for frame in frames:
+            self._notify(frame)
+            transactions.extend(self.pairer.add(frame))
+        transactions.extend(self.pairer.expire(timestamp_ns))
+        return transactions
+
+    def _notify(self, frame):
+        direction = 'rx' if frame.kind in (KIND_RESPONSE, KIND_EXCEPTION) or (
+            self.pairer.pending is not None and frame.kind is KIND_UNKNOWN) else 'tx'
+        start_ns = frame.start_ns + self._wall_offset_ns
+        end_ns = frame.end_ns + self._wall_offset_ns
+        self.serial_manager.notify_frame(direction, frame.data, start_ns if direction == 'tx' else end_ns)
+        if self.timing is not None:
+            self.timing.add_frame(direction, frame.data, start_ns, end_ns, self.serial_manager.port)
+
+    def run(self, on_transaction, should_stop):
+        """阻塞运行直到 should_stop() 为真"""
+        sm = self.serial_manager
+        while not should_stop():
+            chunk = sm.read_available()
+            now = time.monotonic_ns()
+            if chunk is None:
+                time.sleep(0.1)
+                continue
+            for tx in self.process(chunk, now):
+                on_transaction(tx)
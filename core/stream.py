@@ -0,0 +1,172 @@
+"""
+本地数据流（发布/订阅，asyncio，不依赖Qt）
+
+外部程序（历史库、看板）连接本机TCP端口或Unix套接字即可接收实时数值，每行一个JSON（NDJSON）：
+    {"ts": 1700000000.123, "values": [{"port": "COM3", "slave": 1, "addr": 100, "value": "12.5",
+                                       "raw": 125, "quality": "good", "ts": 1700000000.101}, ...]}
+连接后先收到一批当前值，之后每个发布周期收到一批变化的值。
+
+订阅过滤：客户端随时可发送一行JSON替换过滤条件，字段均可省略：
+    {"port": "COM3", "slave": 1, "space": "input", "addr": [100, 199], "groups": ["温度", "压力"]}
+addr 为 [起始, 结束] 两个整数（含两端），space 为 holding/input/coil/discrete；条件无效时回复 {"error": ...}，保留原过滤条件。
+慢速客户端：发送缓冲超过上限时不再写入，期间同一寄存器只保留最新值，追上后一次发出。
+"""
+
+import asyncio
+import json
+import logging
+import time
+
+from core.value_store import SPACE_COIL, SPACE_DISCRETE, SPACE_HOLDING, SPACE_INPUT
+
+DEFAULT_STREAM_PORT = 5021
+SPACES = (SPACE_HOLDING, SPACE_INPUT, SPACE_COIL, SPACE_DISCRETE)
+
+
+class Subscription:
+    """客户端的过滤条件"""
+
+    def __init__(self, port=None, slave=None, addr=None, groups=None, group_index=None, space=None):
+        if space is not None and space not in SPACES:
+            raise ValueError(f"space 必须是 {'/'.join(SPACES)} 之一")
+        if addr is not None and not (isinstance(addr, (list, tuple)) and len(addr) == 2 and
+                                     all(isinstance(a, int) and not isinstance(a, bool) for a in addr) and
+                                     addr[0] <= addr[1]):
+            raise ValueError("addr 必须是 [起始, 结束] 两个整数，且起始不大于结束")
+        if groups is not None and not (isinstance(groups, list) and all(isinstance(g, str) for g in groups)):
+            raise ValueError("groups 必须是分组名列表")
+        self.port = port
+        self.slave = slave
+        self.space = space
+        self.addr_range = tuple(addr) if addr is not None else None
+        self.keys = None
+        if groups:
+            # 分组展开为 (端口, 从站, 地址) 集合
+            self.keys = set()
+            for name in groups:
+                self.keys.update((group_index or {}).get(name, ()))
+
+    @classmethod
+    def from_json(cls, text, group_index=None):
+        spec = json.loads(text)
+        if not isinstance(spec, dict):
+            raise ValueError("订阅必须是JSON对象")
+        return cls(spec.get('port'), spec.get('slave'), spec.get('addr'), spec.get('groups'), group_index,
+                   spec.get('space'))
+
+    def matches(self, key):
+        port, slave, space, addr = key
+        if self.port is not None and port != self.port:
+            return False
+        if self.slave is not None and slave != self.slave:
+            return False
+        if self.space is not None and space != self.space:
+            return False
+        if self.addr_range is not None and not self.addr_range[0] <= addr <= self.addr_range[1]:
+            return False
+        if self.keys is not None and (port, slave, addr) not in self.keys:
+            return False
+        return True
+
+
+class StreamClient:
+    def __init__(self, writer):
+        self.writer = writer
+        self.subscription = Subscription()
+        self.pending = {}
+        self.sent = 0
+        self.dropped = 0  # 被同一寄存器更新的值覆盖、未发出的更新数
+
+    def offer(self, changes):
+        pending = self.pending
+        matches = self.subscription.matches
+        for key, stored in changes:
+            if matches(key):
+                if key in pending:
+                    self.dropped += 1
+                pending[key] = stored
+
+    def flush(self, max_buffer):
+        """发送缓冲未满时把积压的最新值作为一行发出"""
+        if not self.pending or self.writer.transport.get_write_buffer_size() > max_buffer:
+            return
+        values = []
+        for (port, slave, space, addr), stored in self.pending.items():
+            item = {'port': port, 'slave': slave, 'addr': addr, 'value': stored.value, 'raw': stored.raw,
+                    'quality': stored.quality, 'ts': round(stored.ts, 3)}
+            if space != SPACE_HOLDING:
+                item['space'] = space
+            values.append(item)
+        self.pending = {}
+        line = json.dumps({'ts': round(time.time(), 3), 'values': values}, ensure_ascii=False,
+                          separators=(',', ':'))
+        self.writer.write(line.encode('utf-8') + b'\n')
+        self.sent += len(values)
+
+
+class ValueStreamServer:
+    """serve() 作为引擎服务运行（ModbusEngine.add_service），按 interval 周期从 ValueStore 取变化值发布"""
+
+    def __init__(self, store, host='127.0.0.1', port=DEFAULT_STREAM_PORT, unix_path=None, interval=0.1,
+                 group_index=None, max_buffer=256 * 1024):
+        self.store = store
+        self.host = host
+        self.port = port
+        self.unix_path = unix_path
+        self.interval = interval
+        # {分组名: {(端口, 从站, 地址)}}
+        self.group_index = group_index or {}
+        self.max_buffer = max_buffer
+        self.clients = set()
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def address(self):
+        return self.unix_path or f'{self.host}:{self.port}'
+
+    async def serve(self):
+        if self.unix_path:
+            server = await asyncio.start_unix_server(self._handle_client, self.unix_path)
+        else:
+            server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        self.logger.info(f"数据流已启动: {self.address}")
+        version = self.store.version
+        try:
+            async with server:
+                while True:
+                    await asyncio.sleep(self.interval)
+                    version, changes = self.store.changed_since(version)
+                    for client in list(self.clients):
+                        if changes:
+                            client.offer(changes)
+                        client.flush(self.max_buffer)
+        finally:
+            for client in list(self.clients):
+                client.writer.close()
+            self.logger.info("数据流已停止")
+
+    async def _handle_client(self, reader, writer):
+        client = StreamClient(writer)
+        peer = writer.get_extra_info('peername') or self.unix_path
+        self.logger.info(f"数据流客户端连接: {peer}")
+        # 先发当前值
+        client.offer(self.store.snapshot().items())
+        self.clients.add(client)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    client.subscription = Subscription.from_json(line, self.group_index)
+                except (ValueError, TypeError) as e:
+                    writer.write(json.dumps({'error': str(e)}, ensure_ascii=False).encode('utf-8') + b'\n')
+                    continue
+                client.pending = {}
+                client.offer(self.store.snapshot().items())
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.clients.discard(client)
+            writer.close()
+            self.logger.info(f"数据流客户端断开: {peer}, 已发送 {client.sent} 个值, 合并 {client.dropped} 个")
@@ -0,0 +1,310 @@
+"""
+异步传输层（asyncio，不依赖Qt）
+
+Transport 只负责字节收发：write() 发送，read_exactly()/read_until() 在截止时间前读取，
+超时返回已收到的部分。帧格式（RTU/ASCII/TCP）由 core.engine 处理。
+
+    SerialTransport  基于已打开的 SerialManager。POSIX 上用事件循环监听串口句柄，
+                     不支持 add_reader 的平台（如 Windows Proactor）退化为短间隔查询 in_waiting，
+                     两种方式都不占用额外线程。
+    StreamTransport  TCP 套接字（例如透传 RTU 帧的串口服务器）。
+"""
+
+import asyncio
+import logging
+import time
+
+
+def _expire(waiter):
+    if not waiter.done():
+        waiter.set_result(False)
+
+
+class TransportError(Exception):
+    pass
+
+
+class AsyncTransport:
+    """带接收缓冲的传输基类，子类把收到的数据交给 _feed()"""
+
+    # 查询模式下的轮询间隔（秒）
+    poll_interval = 0.002
+    # 为True时没有数据到达通知，读取时主动查询（子类实现 _fill）
+    _polling = False
+    # 为True时打开失败也继续轮询，由后续请求重连（网络端点）
+    reconnect = False
+
+    def __init__(self, name):
+        self.name = name
+        self.logger = logging.getLogger(__name__)
+        self._buffer = bytearray()
+        self._waiter = None
+        self._closed = True
+        # 本次请求收到首字节的时间（time.monotonic()），reset_input() 时清除
+        self.first_rx = None
+        # 帧监听器: listener(direction, data, port, timestamp_ns)，与 SerialManager 相同
+        self.frame_listeners = []
+
+    @property
+    def is_open(self):
+        return not self._closed
+
+    async def open(self):
+        raise NotImplementedError
+
+    async def close(self):
+        raise NotImplementedError
+
+    async def write(self, data):
+        raise NotImplementedError
+
+    def add_frame_listener(self, listener):
+        if listener not in self.frame_listeners:
+            self.frame_listeners.append(listener)
+
+    def remove_frame_listener(self, listener):
+        if listener in self.frame_listeners:
+            self.frame_listeners.remove(listener)
+
+    def notify_frame(self, direction, data, timestamp_ns=None):
+        if not self.frame_listeners or not data:
+            return
+        ts = timestamp_ns if timestamp_ns is not None else time.time_ns()
+        for listener in list(self.frame_listeners):
+            try:
+                listener(direction, data, self.name, ts)
+            except Exception as e:
+                self.logger.error(f"帧监听器异常: {e}")
+
+    def reset_input(self):
+        """丢弃未读取的数据（发送新请求前调用）"""
+        self._buffer.clear()
+        self.first_rx = None
+
+    def _feed(self, data):
+        if data:
+            if self.first_rx is None:
+                self.first_rx = time.monotonic()
+            self._buffer += data
+            self._wake()
+
+    def _wake(self):
+        waiter = self._waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(True)
+
+    async def _fill(self):
+        """查询模式下由子类实现：读取已到达的数据并 _feed()"""
+        return False
+
+    async def _wait_data(self, deadline):
+        """等待新数据到达，超过截止时间返回False"""
+        loop = asyncio.get_running_loop()
+        remaining = deadline - loop.time()
+        if remaining <= 0 or self._closed:
+            return False
+        if self._polling:
+            await asyncio.sleep(min(self.poll_interval, remaining))
+            await self._fill()
+            return True
+        # 不用 wait_for：数据到达与任务取消同时发生时，Python 3.12 之前的 wait_for 会吞掉取消
+        self._waiter = waiter = loop.create_future()
+        timer = loop.call_at(deadline, _expire, waiter)
+        try:
+            return await waiter
+        finally:
+            timer.cancel()
+            self._waiter = None
+
+    async def read_exactly(self, n, deadline):
+        """读取n个字节；截止时间(loop.time())到达时返回已收到的部分"""
+        buf = self._buffer
+        while len(buf) < n:
+            if self._polling:
+                await self._fill()
+                if len(buf) >= n:
+                    break
+            if not await self._wait_data(deadline):
+                break
+        data = bytes(buf[:n])
+        del buf[:n]
+        return data
+
+    async def read_until(self, terminator, deadline, max_size=1024):
+        """读取到terminator为止（包含），超时或超长时返回已收到的部分"""
+        buf = self._buffer
+        while True:
+            index = buf.find(terminator)
+            if index >= 0:
+                end = index + len(terminator)
+                break
+            if len(buf) >= max_size:
+                end = len(buf)
+                break
+            if self._polling:
+                await self._fill()
+                if buf.find(terminator) >= 0:
+                    continue
+            if not await self._wait_data(deadline):
+                end = len(buf)
+                break
+        data = bytes(buf[:end])
+        del buf[:end]
+        return data
+
+
+class SerialTransport(AsyncTransport):
+    """基于已打开的 SerialManager，收发帧会通知 SerialManager 的帧监听器"""
+
+    def __init__(self, serial_manager):
+        super().__init__(serial_manager.port)
+        self.serial_manager = serial_manager
+        self._fd = None
+        self._saved_timeout = None
+
+    @property
+    def baudrate(self):
+        return self.serial_manager.baudrate
+
+    async def open(self):
+        sm = self.serial_manager
+        if not sm.is_open() and not sm.open():
+            raise TransportError(f"打开串口失败: {sm.port}")
+        ser = sm.ser
+        # 非阻塞读取，由事件循环等待数据
+        self._saved_timeout = ser.timeout
+        ser.timeout = 0
+        loop = asyncio.get_running_loop()
+        self._polling = True
+        try:
+            fd = ser.fileno()
+            loop.add_reader(fd, self._on_readable)
+            self._fd = fd
+            self._polling = False
+        except (AttributeError, NotImplementedError, OSError, ValueError):
+            self._fd = None
+        self._closed = False
+
+    def _on_readable(self):
+        try:
+            ser = self.serial_manager.ser
+            data = ser.read(ser.in_waiting or 1)
+        except Exception as e:
+            self.logger.error(f"读取串口失败: {e}")
+            self._detach()
+            self._closed = True
+            self._wake()
+            return
+        self._feed(data)
+
+    async def _fill(self):
+        try:
+            ser = self.serial_manager.ser
+            waiting = ser.in_waiting
+            if waiting:
+                self._feed(ser.read(waiting))
+                return True
+        except Exception as e:
+            self.logger.error(f"读取串口失败: {e}")
+            self._closed = True
+        return False
+
+    def _detach(self):
+        if self._fd is not None:
+            try:
+                asyncio.get_running_loop().remove_reader(self._fd)
+            except Exception:
+                pass
+            self._fd = None
+
+    async def close(self):
+        """释放串口句柄的监听并恢复读超时；串口本身由 SerialManager 管理，不在这里关闭"""
+        self._detach()
+        ser = self.serial_manager.ser
+        if ser is not None and self._saved_timeout is not None:
+            try:
+                ser.timeout = self._saved_timeout
+            except Exception:
+                pass
+        self._closed = True
+        self._wake()
+
+    def reset_input(self):
+        super().reset_input()
+        self.serial_manager.reset_input_buffer()
+
+    async def write(self, data):
+        ser = self.serial_manager.ser
+        if self._closed or ser is None:
+            raise TransportError(f"串口未打开: {self.name}")
+        try:
+            ser.write(data)
+        except Exception as e:
+            raise TransportError(f"写入串口失败: {e}")
+
+    def notify_frame(self, direction, data, timestamp_ns=None):
+        self.serial_manager.notify_frame(direction, data, timestamp_ns)
+        super().notify_frame(direction, data, timestamp_ns)
+
+
+class StreamTransport(AsyncTransport):
+    """TCP 套接字传输，断开后下次 write() 自动重连"""
+
+    reconnect = True
+
+    def __init__(self, host, port, connect_timeout=3.0):
+        super().__init__(f'{host}:{port}')
+        self.host = host
+        self.port = port
+        self.connect_timeout = connect_timeout
+        self._reader = None
+        self._writer = None
+        self._read_task = None
+
+    async def open(self):
+        try:
+            self._reader, self._writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port), self.connect_timeout)
+        except (OSError, asyncio.TimeoutError) as e:
+            raise TransportError(f"连接 {self.name} 失败: {e}")
+        self._closed = False
+        self._read_task = asyncio.get_running_loop().create_task(self._read_loop())
+        self.logger.info(f"已连接 {self.name}")
+
+    async def _read_loop(self):
+        try:
+            while True:
+                data = await self._reader.read(4096)
+                if not data:
+                    break
+                self._feed(data)
+        except (OSError, asyncio.CancelledError):
+            pass
+        finally:
+            self._closed = True
+            self._wake()
+
+    async def close(self):
+        if self._read_task is not None:
+            self._read_task.cancel()
+            self._read_task = None
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except Exception:
+                pass
+            self._writer = None
+        self._closed = True
+        self._wake()
+
+    async def write(self, data):
+        if self._closed:
+            await self.close()
+            await self.open()
+        try:
+            self._writer.write(data)
+            await self._writer.drain()
+        except OSError as e:
+            self._closed = True
+            raise TransportError(f"发送失败 {self.name}: {e}")
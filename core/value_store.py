@@ -0,0 +1,132 @@
+"""
+共享数值存储：多个轮询线程写入，界面按版本号增量读取。
+
+键为 (端口, 从站, 寄存器区, 地址)，每次写入递增全局版本号；
+界面定时调用 changed_since() 只取上次之后变化的值，避免每个寄存器一个跨线程信号。
+值表按版本号排序（写入时移到末尾），changed_since() 从末尾倒序取到旧版本为止，开销只与变化数量有关。
+另存一份寄存器映像（update_words/get_word）：读响应中的每个字，包括 FLOAT32 的第二个字和
+参数表未声明的地址，供 core.gateway 按原样应答。
+"""
+
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+# 寄存器区：保持寄存器(FC3)、输入寄存器(FC4)、线圈(FC1)、离散输入(FC2)
+SPACE_HOLDING = 'holding'
+SPACE_INPUT = 'input'
+SPACE_COIL = 'coil'
+SPACE_DISCRETE = 'discrete'
+
+QUALITY_GOOD = 'good'
+QUALITY_STALE = 'stale'
+QUALITY_BAD = 'bad'
+
+StoredValue = namedtuple('StoredValue', ['value', 'raw', 'ts', 'quality', 'version'])
+StoredWord = namedtuple('StoredWord', ['raw', 'ts', 'quality'])
+
+
+class ValueStore:
+    """线程安全的最新值表"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # 按版本号升序排列，每次写入把键移到末尾
+        self._values = OrderedDict()
+        self._words = {}
+        # 从站 -> {端口}，供网关按从站地址查找端口
+        self._slave_ports = {}
+        self._version = 0
+
+    @property
+    def version(self):
+        return self._version
+
+    def update(self, port, slave, addr, value, raw=None, space=SPACE_HOLDING, quality=QUALITY_GOOD, ts=None):
+        with self._lock:
+            self._version += 1
+            key = (port, slave, space, addr)
+            self._values[key] = StoredValue(value, raw, time.time() if ts is None else ts, quality, self._version)
+            self._values.move_to_end(key)
+            self._slave_ports.setdefault(slave, set()).add(port)
+
+    def update_many(self, port, slave, items, space=SPACE_HOLDING, quality=QUALITY_GOOD, ts=None):
+        """批量写入 [(地址, 值)] 或 [(地址, 值, 原始值)]，一次加锁"""
+        ts = time.time() if ts is None else ts
+        with self._lock:
+            values = self._values
+            for item in items:
+                self._version += 1
+                raw = item[2] if len(item) > 2 else None
+                key = (port, slave, space, item[0])
+                values[key] = StoredValue(item[1], raw, ts, quality, self._version)
+                values.move_to_end(key)
+            self._slave_ports.setdefault(slave, set()).add(port)
+
+    def update_words(self, port, slave, start, words, space=SPACE_HOLDING, ts=None):
+        """保存从 start 开始连续读到的寄存器原始值（不递增版本号，不出现在 changed_since 中）"""
+        ts = time.time() if ts is None else ts
+        with self._lock:
+            image = self._words
+            for i, word in enumerate(words):
+                image[(port, slave, space, start + i)] = StoredWord(word, ts, QUALITY_GOOD)
+            self._slave_ports.setdefault(slave, set()).add(port)
+
+    def get_word(self, port, slave, addr, space=SPACE_HOLDING):
+        """寄存器映像中的 StoredWord，没有读到过时返回None"""
+        with self._lock:
+            return self._words.get((port, slave, space, addr))
+
+    def ports_for_slave(self, slave):
+        """有该从站数据的端口"""
+        with self._lock:
+            return set(self._slave_ports.get(slave, ()))
+
+    def mark_quality(self, port, slave, quality, space=None):
+        """把某从站的所有值标记为指定质量（例如从站离线时标为stale）"""
+        with self._lock:
+            values = self._values
+            keys = [key for key, stored in values.items()
+                    if key[0] == port and key[1] == slave and (space is None or key[2] == space)
+                    and stored.quality != quality]
+            for key in keys:
+                self._version += 1
+                values[key] = values[key]._replace(quality=quality, version=self._version)
+                values.move_to_end(key)
+            for key, word in self._words.items():
+                if key[0] == port and key[1] == slave and (space is None or key[2] == space) \
+                        and word.quality != quality:
+                    self._words[key] = word._replace(quality=quality)
+
+    def get(self, port, slave, addr, space=SPACE_HOLDING):
+        with self._lock:
+            return self._values.get((port, slave, space, addr))
+
+    def changed_since(self, version):
+        """返回 (当前版本号, [(键, StoredValue)])，只包含版本号大于version的值"""
+        with self._lock:
+            current = self._version
+            if version >= current:
+                return current, []
+            changes = []
+            for key in reversed(self._values):
+                stored = self._values[key]
+                if stored.version <= version:
+                    break
+                changes.append((key, stored))
+            changes.reverse()
+            return current, changes
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+            self._words.clear()
+            self._slave_ports.clear()
+            self._version += 1
+
+    def __len__(self):
+        return len(self._values)
@@ -0,0 +1,88 @@
+"""
+事件循环卡顿检测（不依赖Qt）
+
+被监视的线程用定时器周期性调用 beat()（界面为 QTimer，asyncio 可用 loop.call_later）；
+监视线程发现超过 threshold_ms 没有心跳时，立即抓取被监视线程此刻的调用栈（卡在哪里）写入日志，
+即使线程再也没有恢复也能看到卡在哪里；心跳恢复后按两次心跳的间隔算出卡顿时长，
+记入日志和 MetricsRegistry（gui_stalls / gui_stall_ms）。
+
+    watchdog = StallWatchdog(threading.get_ident(), threshold_ms=250, metrics=metrics)
+    watchdog.start()
+    heartbeat = QTimer(); heartbeat.timeout.connect(watchdog.beat); heartbeat.start(watchdog.interval_ms)
+"""
+
+import sys
+import threading
+import time
+import traceback
+
+from utils.log_manager import get_category_logger
+
+
+class StallWatchdog:
+    def __init__(self, thread_id, threshold_ms=250, interval_ms=50, metrics=None, name='GUI',
+                 counter='gui_stalls', latency='gui_stall_ms', max_history=50):
+        self.thread_id = thread_id
+        self.threshold_ms = threshold_ms
+        self.interval_ms = interval_ms
+        self.metrics = metrics
+        self.name = name
+        self.counter = counter
+        self.latency = latency
+        self.max_history = max_history
+        # 最近的卡顿 [(开始时间 time.time(), 时长ms, 调用栈文本)]
+        self.history = []
+        self.logger = get_category_logger('ui')
+        self._last_beat = time.monotonic()
+        self._stall_stack = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f'watchdog-{self.name}', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(1)
+            self._thread = None
+
+    def beat(self):
+        """在被监视的线程中由定时器调用"""
+        now = time.monotonic()
+        gap_ms = (now - self._last_beat) * 1000
+        self._last_beat = now
+        stack = self._stall_stack
+        if stack is None and gap_ms < self.threshold_ms + self.interval_ms:
+            return
+        self._stall_stack = None
+        # 卡顿时长：心跳间隔减去一个定时周期
+        duration = max(gap_ms - self.interval_ms, 0.0)
+        if duration < self.threshold_ms:
+            return
+        if stack is None:
+            stack = '（监视线程未来得及抓取调用栈）'
+        self.history.append((time.time() - gap_ms / 1000, duration, stack))
+        del self.history[:-self.max_history]
+        if self.metrics is not None:
+            self.metrics.observe_many([(self.latency, duration)], {self.counter: 1})
+        self.logger.warning("%s 线程卡顿 %.0f ms 后恢复", self.name, duration)
+
+    def _run(self):
+        # 检查周期取阈值的1/4，抓到的调用栈离卡顿开始不超过这个时间
+        period = max(self.threshold_ms / 4, 10) / 1000
+        while not self._stop.wait(period):
+            if self._stall_stack is not None:
+                continue
+            if (time.monotonic() - self._last_beat) * 1000 < self.threshold_ms + self.interval_ms:
+                continue
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self._stall_stack = ''.join(traceback.format_stack(frame))
+            del frame
+            self.logger.warning("%s 线程已 %.0f ms 未响应，调用栈:\n%s", self.name,
+                                (time.monotonic() - self._last_beat) * 1000, self._stall_stack)
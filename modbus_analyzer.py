@@ -2,14 +2,25 @@
 # -*- coding: utf-8 -*-
 
 import sys
-from PyQt5.QtWidgets import QApplication
-from ui.main_window import MainWindow
+import multiprocessing
 
 def main():
+    from PyQt5.QtWidgets import QApplication
+    from ui.main_window import MainWindow
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
     sys.exit(app.exec_())
 
 if __name__ == '__main__':
+    # 打包后的程序启动轮询子进程需要
+    multiprocessing.freeze_support()
+    if '--headless' in sys.argv[1:]:
+        # 无界面模式不导入Qt
+        from core.headless import main as headless_main
+        sys.exit(headless_main(sys.argv[1:]))
+    if '--scan' in sys.argv[1:]:
+        # 寄存器扫描同样不导入Qt
+        from core.scanner import main as scan_main
+        sys.exit(scan_main(sys.argv[1:]))
     main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# core/utils 为命名空间包，从仓库根目录导入
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,93 @@
+"""命令队列测试：优先级、相邻写命令合并、取消"""
+
+import asyncio
+
+from core.commands import (MAX_WRITE_COILS, MAX_WRITE_REGISTERS, CommandQueue, coalesce, read_command,
+                           write_coils_command, write_registers_command)
+
+
+def registers(slave, start, values, **kwargs):
+    command, = write_registers_command(slave, start, values, **kwargs)
+    return command
+
+
+def coils(slave, start, bits):
+    command, = write_coils_command(slave, start, bits)
+    return command
+
+
+def drain(commands):
+    """依次放入命令，返回 get() 取出的每一批的起始地址"""
+    async def scenario():
+        queue = CommandQueue()
+        for command in commands:
+            queue.put(command)
+        batches = []
+        while len(queue):
+            batch = await queue.get()
+            batches.append([c.start for c in batch])
+            queue.done()
+        return batches
+    return asyncio.run(scenario())
+
+
+def test_adjacent_writes_to_same_slave_coalesce():
+    assert drain([registers(1, 100, [1]), registers(1, 101, [2, 3]),
+                  registers(1, 99, [0])]) == [[100, 101, 99]]
+
+
+def test_coalescing_stops_at_gap_other_slave_kind_or_priority():
+    assert drain([registers(1, 100, [1]), registers(1, 102, [2])]) == [[100], [102]]
+    assert drain([registers(1, 100, [1]), registers(2, 101, [2])]) == [[100], [101]]
+    assert drain([registers(1, 100, [1]), coils(1, 101, [1])]) == [[100], [101]]
+    assert drain([registers(1, 100, [1]),
+                  registers(1, 101, [2], priority=2)]) == [[100], [101]]
+
+
+def test_reads_are_never_coalesced_and_writes_go_first():
+    assert drain([read_command(1, 0), read_command(1, 1), registers(1, 50, [1])]) == [[50], [0], [1]]
+
+
+def test_coalescing_respects_fc16_limit():
+    head = registers(1, 0, [0] * (MAX_WRITE_REGISTERS - 1))
+    assert drain([head, registers(1, MAX_WRITE_REGISTERS - 1, [1]),
+                  registers(1, MAX_WRITE_REGISTERS, [2])]) == [[0, MAX_WRITE_REGISTERS - 1],
+                                                                              [MAX_WRITE_REGISTERS]]
+
+
+def test_cancelled_commands_are_skipped():
+    async def scenario():
+        queue = CommandQueue()
+        first = queue.put(registers(1, 100, [1]))
+        queue.put(registers(1, 101, [2]))
+        first.cancel()
+        batch = await queue.get()
+        queue.done()
+        return [c.start for c in batch], queue.busy
+    assert asyncio.run(scenario()) == ([101], False)
+
+
+def test_coalesce_builds_one_fc16_in_address_order():
+    merged = coalesce([registers(1, 11, [2, 3]), registers(1, 10, [1])])
+    assert (merged.func, merged.start, merged.values) == (16, 10, [1, 2, 3])
+    qty, data = merged.encode()
+    assert qty == 3 and data == bytes([6, 0, 1, 0, 2, 0, 3])
+    merged = coalesce([coils(1, 0, [1]), coils(1, 1, [0, 1])])
+    assert (merged.func, merged.encode()) == (15, (3, bytes([1, 0b101])))
+
+
+def test_register_values_are_masked_to_16_bits():
+    command = registers(1, 10, [-1, 0x12345])
+    assert command.values == [0xFFFF, 0x2345]
+    assert command.encode() == (2, bytes([4, 0xFF, 0xFF, 0x23, 0x45]))
+    assert registers(1, 10, [-2]).encode() == (0xFFFE, b'')
+
+
+def test_oversized_writes_split_at_frame_limit():
+    commands = write_registers_command(1, 1000, list(range(300)))
+    assert [(c.func, c.start, c.qty) for c in commands] == [(16, 1000, 123), (16, 1123, 123), (16, 1246, 54)]
+    assert [v for c in commands for v in c.values] == list(range(300))
+    assert [(c.func, c.qty) for c in write_registers_command(1, 0, [0] * 124)] == [(16, 123), (6, 1)]
+    assert [c.qty for c in write_coils_command(1, 0, [1] * (MAX_WRITE_COILS + 1))] == [MAX_WRITE_COILS, 1]
+    # 拆分后的命令不会被重新合并成超长的 FC16
+    assert drain(commands) == [[1000], [1123], [1246]]
@@ -0,0 +1,133 @@
+import asyncio
+import os
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from core.engine import ModbusEngine
+from core.value_store import ValueStore
+
+pytestmark = pytest.mark.skipif(os.name != 'posix', reason='模拟从站需要伪终端')
+
+
+def simulator(rows, strict=True):
+    from core.simulator import ModbusSimulator
+    sim = ModbusSimulator(seed=1)
+    sim.load_dataframe(pd.DataFrame(rows, columns=['name', 'addr', 'dataType', 'sim']), strict=strict)
+    return sim
+
+
+def poll(port_name, params, until, timeout=5.0, action=None, **engine_kwargs):
+    """在后台线程轮询，直到 until(store) 为真或超时，返回 (store, port_engine)；action(engine) 在引擎启动后调用一次"""
+    from core.serial_manager import SerialManager
+    from core.transport import SerialTransport
+    store = ValueStore()
+    engine = ModbusEngine(store, **engine_kwargs)
+    transport = SerialTransport(SerialManager(port=port_name, timeout=1))
+    port = engine.add_port(transport, params, 1, 'RTU', timeout=0.5, interval=0)
+    thread = threading.Thread(target=lambda: asyncio.run(engine.run()))
+    thread.start()
+    try:
+        deadline = time.monotonic() + timeout
+        while not until(store) and time.monotonic() < deadline:
+            if action is not None and engine.loop is not None:
+                action(engine)
+                action = None
+            time.sleep(0.02)
+    finally:
+        engine.stop()
+        thread.join(5)
+    return store, port
+
+
+def value(store, port, addr):
+    stored = store.get(port, 1, addr)
+    return None if stored is None else stored.value
+
+
+def test_float32_row_polled_end_to_end():
+    rows = [['a', 199, 'UNSIGNED', 'const:7'], ['f', 200, 'FLOAT32', 'const:12.5'], ['b', 202, None, 'const:9']]
+    sim = simulator(rows)
+    port_name = sim.start()
+    try:
+        params = pd.DataFrame([row[:3] for row in rows], columns=['name', 'addr', 'dataType'])
+        store, port = poll(port_name, params, lambda s: len(s) >= 3)
+    finally:
+        sim.stop()
+    assert [(r.start, r.qty) for r in port.scheduler.plan[1]] == [(199, 4)]
+    assert value(store, port_name, 200) == '12.5'
+    assert value(store, port_name, 199) == '7'
+    assert value(store, port_name, 202) == '9'
+
+
+def test_lone_float32_row_polled_end_to_end():
+    rows = [['f', 300, 'FLOAT32', 'const:-1.25']]
+    sim = simulator(rows)
+    port_name = sim.start()
+    try:
+        params = pd.DataFrame([row[:3] for row in rows], columns=['name', 'addr', 'dataType'])
+        store, _ = poll(port_name, params, lambda s: len(s) >= 1)
+    finally:
+        sim.stop()
+    assert value(store, port_name, 300) == '-1.25'
+
+
+def test_rejected_range_bisected_to_invalid_address_and_remembered(tmp_path):
+    from core.learned_ranges import LearnedRanges
+    declared = [[f'p{addr}', addr, None, f'const:{addr}'] for addr in range(10, 18)]
+    sim = simulator([row for row in declared if row[1] != 13])
+    port_name = sim.start()
+    params = pd.DataFrame([row[:3] for row in declared], columns=['name', 'addr', 'dataType'])
+    path = str(tmp_path / 'learned.json')
+
+    def settled(store):
+        return value(store, port_name, 13) == '非法地址' and all(
+            value(store, port_name, addr) == str(addr) for addr in range(10, 18) if addr != 13)
+
+    try:
+        store, port = poll(port_name, params, settled, learned=LearnedRanges(path))
+        assert settled(store)
+        assert store.get(port_name, 1, 13).quality == 'bad'
+        assert 13 not in {addr for r in port.scheduler.plan[1] for addr in range(r.start, r.start + r.qty)}
+        assert port.engine.metrics.counter('range_splits') >= 1
+        ranges, invalid = LearnedRanges(path).get(port_name, 1, 'holding')
+        assert invalid == {13}
+
+        # 下次启动直接按学到的区间轮询，不再拆分
+        store, port = poll(port_name, params, lambda s: all(
+            value(s, port_name, addr) == str(addr) for addr in range(10, 18) if addr != 13),
+            learned=LearnedRanges(path))
+        assert sorted((r.start, r.qty) for r in port.scheduler.plan[1]) == sorted(ranges)
+        assert port.engine.metrics.counter('range_splits') == 0
+        assert value(store, port_name, 13) == '非法地址'
+    finally:
+        sim.stop()
+
+
+def test_negative_register_write_is_masked_and_polling_continues():
+    from core.commands import Command
+    rows = [['a', 10, None, None], ['b', 11, None, None]]
+    sim = simulator(rows)
+    port_name = sim.start()
+    responses = []
+    after_writes = []
+
+    def write(engine):
+        responses.append(engine.write_registers(port_name, 1, 10, [-1]).result(2))
+        # 直接构造、未经 write_registers_command 处理的命令同样按低16位发布
+        responses.append(engine.command(port_name, Command(1, 16, 10, values=[-2, -3])).result(2))
+        after_writes.append((engine, engine.metrics.counter('requests')))
+
+    def polled_after_writes(store):
+        return bool(after_writes) and after_writes[0][0].metrics.counter('requests') > after_writes[0][1] + 5
+
+    try:
+        params = pd.DataFrame([row[:3] for row in rows], columns=['name', 'addr', 'dataType'])
+        store, port = poll(port_name, params, polled_after_writes, action=write)
+    finally:
+        sim.stop()
+    assert [r.ok for r in responses] == [True, True]
+    assert polled_after_writes(store)
+    assert (value(store, port_name, 10), value(store, port_name, 11)) == ('65534', '65533')
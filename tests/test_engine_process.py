@@ -0,0 +1,67 @@
+"""子进程轮询测试：读写命令经管道进入子进程端口的命令队列"""
+
+import os
+import time
+
+import pandas as pd
+import pytest
+
+from core.commands import read_command, write_registers_command
+from core.engine_process import EngineProcess
+from core.value_store import ValueStore
+
+pytestmark = pytest.mark.skipif(os.name != 'posix', reason='模拟从站需要伪终端')
+
+
+def wait(process, future, timeout=5.0):
+    """像界面定时器一样调用 drain() 直到结果交付"""
+    deadline = time.monotonic() + timeout
+    while not future.done() and time.monotonic() < deadline:
+        process.drain()
+        time.sleep(0.02)
+    return future.result(0)
+
+
+def test_commands_run_through_child_command_queue():
+    from core.simulator import ModbusSimulator
+    sim = ModbusSimulator(seed=1).load_dataframe(
+        pd.DataFrame({'name': ['a', 'b'], 'addr': ['10', '11'], 'sim': ['const:1', 'const:2']}), strict=True)
+    port = sim.start()
+    params = pd.DataFrame({'name': ['a', 'b'], 'addr': ['10', '11']})
+    spec = {'port': port, 'params': params, 'mode': 'RTU', 'interval': 0.05,
+            'serial': {'baudrate': 9600, 'bytesize': 8, 'parity': 'N', 'stopbits': 1, 'timeout': 0.5}}
+    store = ValueStore()
+    process = EngineProcess([spec], store)
+    process.start()
+    try:
+        write, = write_registers_command(1, 10, [-1, 300])
+        response = wait(process, process.command(port, write))
+        assert response.ok and response.payload[1] == 16
+        response = wait(process, process.command(port, read_command(1, 10, 2)))
+        assert response.data == bytes([0xFF, 0xFF, 0x01, 0x2C])
+        response = wait(process, process.command(port, read_command(1, 50)))
+        assert response.exception_code == 2
+        response = wait(process, process.command('COM99', read_command(1, 10)))
+        assert not response.ok and response.error
+    finally:
+        process.stop()
+        sim.stop()
+    assert not process.is_alive()
+
+
+def test_child_log_records_are_forwarded_to_parent(caplog):
+    from core.simulator import ModbusSimulator
+    sim = ModbusSimulator(seed=1).load_dataframe(pd.DataFrame({'name': ['a'], 'addr': ['10']}))
+    port = sim.start()
+    spec = {'port': port, 'params': pd.DataFrame({'name': ['a'], 'addr': ['10']}), 'interval': 0.05,
+            'serial': {'baudrate': 9600, 'bytesize': 8, 'parity': 'N', 'stopbits': 1, 'timeout': 0.5}}
+    caplog.set_level('INFO')
+    process = EngineProcess([spec], ValueStore())
+    process.start()
+    try:
+        wait(process, process.command(port, read_command(1, 10)))
+    finally:
+        process.stop()
+        sim.stop()
+    child = [r for r in caplog.records if r.processName == 'modbus-engine']
+    assert child, [r.getMessage() for r in caplog.records]
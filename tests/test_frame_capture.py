@@ -0,0 +1,59 @@
+"""帧捕获文件测试：重新打开追加、索引重建和残缺尾部"""
+
+import os
+
+from core.frame_capture import INDEX_INTERVAL, FrameCaptureReader, FrameCaptureWriter, index_path_for
+
+MS = 1_000_000
+
+
+def write(path, start, count, ports):
+    with FrameCaptureWriter(path) as writer:
+        for i in range(start, start + count):
+            writer.write_frame('tx' if i % 2 == 0 else 'rx', bytes([1, 3]) + i.to_bytes(4, 'big'),
+                               ports[i % len(ports)], i * MS)
+        return writer.frame_count
+
+
+def check(path, total, port_names):
+    with FrameCaptureReader(path) as reader:
+        assert len(reader) == total
+        assert sorted(reader.ports.values()) == sorted(port_names)
+        frames = list(reader)
+        assert [f.index for f in frames] == list(range(total))
+        assert [int.from_bytes(f.data[2:], 'big') for f in frames] == list(range(total))
+        for i in (0, INDEX_INTERVAL - 1, INDEX_INTERVAL, total - 1):
+            frame = reader[i]
+            assert frame.timestamp_ns == i * MS and frame.direction == ('tx' if i % 2 == 0 else 'rx')
+        assert reader.seek_time(INDEX_INTERVAL * MS + 1) == INDEX_INTERVAL + 1
+        return frames
+
+
+def test_reopen_appends_with_continuous_frame_numbers_and_ports(tmp_path):
+    path = str(tmp_path / 'bus.mbcap')
+    assert write(path, 0, 600, ['COM1', 'COM2']) == 600
+    assert write(path, 600, 300, ['COM2', 'COM3']) == 900
+    frames = check(path, 900, ['COM1', 'COM2', 'COM3'])
+    assert {f.port for f in frames[:600]} == {'COM1', 'COM2'}
+    assert {f.port for f in frames[600:]} == {'COM2', 'COM3'}
+    with FrameCaptureReader(path) as reader:
+        assert [point[0] for point in reader.index_points()] == list(range(0, 900, INDEX_INTERVAL))
+
+
+def test_append_without_index_file_rebuilds_index(tmp_path):
+    path = str(tmp_path / 'bus.mbcap')
+    write(path, 0, 300, ['COM1'])
+    os.remove(index_path_for(path))
+    write(path, 300, 300, ['COM1'])
+    check(path, 600, ['COM1'])
+
+
+def test_append_discards_truncated_tail_record(tmp_path):
+    path = str(tmp_path / 'bus.mbcap')
+    write(path, 0, 300, ['COM1'])
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - 3)  # 最后一条记录写到一半时中断
+    with FrameCaptureReader(path) as reader:
+        assert len(reader) == 299
+    write(path, 299, 301, ['COM1'])
+    check(path, 600, ['COM1'])
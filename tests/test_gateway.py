@@ -0,0 +1,84 @@
+import asyncio
+import struct
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from core.engine import ModbusEngine
+from core.gateway import (EXC_ILLEGAL_ADDRESS, EXC_PATH_UNAVAILABLE, EXC_TARGET_NO_RESPONSE, ModbusGateway,
+                          validate_age_offset)
+from core.value_store import QUALITY_STALE, ValueStore
+
+PORT = 'COM1'
+
+
+def publish(store, rows, start, words, slave=1):
+    """按参数表解码一个读响应块并写入数值表（与轮询相同的路径）"""
+    engine = ModbusEngine(store)
+    port = engine.add_port(SimpleNamespace(name=PORT), pd.DataFrame(rows, columns=['name', 'addr', 'dataType']),
+                           slave)
+    data = struct.pack(f'>{len(words)}H', *words)
+
+    async def main():
+        return port._publish(slave, 'holding', start, data, len(words))
+
+    return asyncio.run(main())
+
+
+def read(gateway, unit, start, qty):
+    pdu = gateway.read_registers(unit, start, qty)
+    if pdu[0] & 0x80:
+        return pdu[1]
+    return list(struct.unpack(f'>{qty}H', pdu[2:]))
+
+
+def test_float32_second_word_and_undeclared_gap_served():
+    store = ValueStore()
+    words = [0x4148, 0x0000, 0x1234, 7]
+    values = publish(store, [['f', 200, 'FLOAT32'], ['u', 203, 'UNSIGNED']], 200, words)
+    assert values == [(200, '12.5'), (203, '7')]
+    gateway = ModbusGateway(store, primary_port=PORT)
+    assert read(gateway, 1, 200, 4) == words
+    assert read(gateway, 1, 201, 1) == [0x0000]
+    # 没有读到过的地址
+    assert read(gateway, 1, 204, 1) == EXC_ILLEGAL_ADDRESS
+
+
+def test_stale_slave_returns_target_no_response():
+    store = ValueStore()
+    publish(store, [['f', 200, 'FLOAT32']], 200, [1, 2])
+    store.mark_quality(PORT, 1, QUALITY_STALE)
+    assert read(ModbusGateway(store), 1, 201, 1) == EXC_TARGET_NO_RESPONSE
+
+
+def test_unknown_unit_resolved_once_data_arrives():
+    store = ValueStore()
+    gateway = ModbusGateway(store)
+    assert read(gateway, 2, 0, 1) == EXC_PATH_UNAVAILABLE
+    publish(store, [['a', 0, None]], 0, [42], slave=2)
+    assert read(gateway, 2, 0, 1) == [42]
+
+
+def test_age_registers_only_inside_age_block():
+    store = ValueStore()
+    publish(store, [['a', 10, None], ['b', 11, None]], 10, [1, 2])
+    gateway = ModbusGateway(store, age_offset=1000)
+    assert read(gateway, 1, 10, 2) == [1, 2]
+    ages = read(gateway, 1, 1010, 3)
+    assert ages[:2] == [0, 0] and ages[2] == 0xFFFF
+    # 跨过年龄寄存器区起点的读请求
+    assert read(gateway, 1, 995, 10) == EXC_ILLEGAL_ADDRESS
+
+
+def test_validate_age_offset_rejects_overlap():
+    params = pd.DataFrame([['a', 10, None], ['f', 999, 'FLOAT32']], columns=['name', 'addr', 'dataType'])
+    validate_age_offset(None, params)
+    validate_age_offset(1001, params)
+    with pytest.raises(ValueError):
+        validate_age_offset(1000, params)
+    with pytest.raises(ValueError):
+        validate_age_offset(0, params)
+    # 线圈不占用保持寄存器地址
+    coils = pd.DataFrame([['c', 5000, None, 'coil']], columns=['name', 'addr', 'dataType', 'space'])
+    validate_age_offset(1001, coils)
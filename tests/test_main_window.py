@@ -0,0 +1,90 @@
+"""主窗口表格刷新测试（离屏Qt，不读取Excel）"""
+
+import os
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+QtWidgets = pytest.importorskip('PyQt5.QtWidgets')
+
+from core.value_store import ValueStore  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def app():
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+def window(group_df, main_port):
+    """只带一个分组表和 All Parameters 表的主窗口"""
+    from ui.main_window import MainWindow
+    w = MainWindow.__new__(MainWindow)
+    QtWidgets.QMainWindow.__init__(w)
+    w.default_slave = 1
+    w.serial_manager = SimpleNamespace(port=main_port)
+    all_params = group_df.rename(columns={'当前值': 'Current Value', 'name': 'Name', 'addr': 'Address'})
+    w.param_tables = {'G': QtWidgets.QTableWidget(2, 6),
+                      'All Parameters': QtWidgets.QTableWidget(len(all_params), len(all_params.columns))}
+    w.param_dfs = {'G': group_df, 'All Parameters': all_params}
+    w.value_store = ValueStore()
+    w._store_version = 0
+    w.metrics = SimpleNamespace(set_gauge=lambda *a: None, observe_many=lambda *a: None)
+    w._build_cell_index()
+    return w
+
+
+def test_refresh_routes_values_by_port_slave_and_space(app):
+    group = pd.DataFrame({'name': ['a', 'b', 'c', 'd'], 'addr': ['10', '10', '11', '12'], '当前值': [''] * 4,
+                          'slave': [1, 2, 1, 1], 'port': ['', '', 'COM9', 'COM1'], 'space': ['holding'] * 4})
+    w = window(group, 'COM1')
+    store = w.value_store
+    store.update('COM1', 2, 10, '42')
+    store.update('COM9', 1, 11, '7')
+    store.update('COM1', 1, 12, '5')   # 端口列写明主串口的行
+    store.update('COM1', 3, 10, 'x')   # 表中没有的从站
+    store.update('COM1', 1, 11, 'y')   # 地址属于 COM9
+    w.refresh_values()
+    assert group['当前值'].tolist() == ['', '42', '7', '5']
+    assert w.param_dfs['All Parameters']['Current Value'].tolist() == ['', '42', '7', '5']
+    table = w.param_tables['G']
+    # 两行三组：第 i 个参数在 (i % 2, (i // 2) * 3 + 2)
+    assert [table.item(r, c).text() for r, c in [(1, 2), (0, 5), (1, 5)]] == ['42', '7', '5']
+    assert table.item(0, 2) is None
+
+
+def test_index_follows_main_port_change(app):
+    group = pd.DataFrame({'name': ['a'], 'addr': ['10'], '当前值': [''], 'slave': [1], 'port': ['COM2'],
+                          'space': ['holding']})
+    w = window(group, 'COM1')
+    w.serial_manager = SimpleNamespace(port='COM2')
+    w.value_store.update('COM2', 1, 10, '8')
+    w.refresh_values()
+    assert group['当前值'].tolist() == ['8']
+
+
+def test_group_table_keeps_aliased_data_type_column(app, monkeypatch):
+    from core.register_map import RegisterMap
+    from ui import main_window
+    group = pd.DataFrame({'name': ['t'], 'addr': ['20'], '数据类型': ['FLOAT32'], 'slave': [1]})
+
+    class FakeExcel:
+        def __init__(self, path):
+            pass
+
+        def load_ports(self):
+            return {}
+
+        def load_param_groups(self, default_slave):
+            return [('G', None, group)]
+
+    monkeypatch.setattr(main_window, 'ExcelManager', FakeExcel)
+    w = main_window.MainWindow.__new__(main_window.MainWindow)
+    QtWidgets.QMainWindow.__init__(w)
+    w.default_slave = 1
+    w.serial_manager = SimpleNamespace(port='COM1')
+    w.tab_widget = QtWidgets.QTabWidget()
+    w._build_all_tables()
+    assert '数据类型' in w.param_dfs['G'].columns
+    assert RegisterMap.from_dataframe(w.param_dfs['G']).get(20).data_type == 'FLOAT32'
@@ -0,0 +1,194 @@
+import asyncio
+import struct
+
+import pytest
+
+from core.modbus_tcp import MBAP_HEADER, TcpConnectionPool, build_mbap_request, parse_endpoint
+from core.transport import TransportError
+
+SILENT_UNIT = 99
+
+
+class StubServer:
+    """进程内的 Modbus TCP 从站替身：FC3 应答 寄存器值=地址，可延迟/逆序应答、不应答或断开连接"""
+
+    def __init__(self, hold=0, delay=0.0, close_after=None):
+        self.hold = hold                # 攒够这么多个请求后逆序应答
+        self.delay = delay              # 每个应答的延时
+        self.close_after = close_after  # 每条连接收到这么多个请求后直接断开（不应答）
+        self.connections = 0
+        self.outstanding = 0
+        self.max_outstanding = 0
+        self.server = None
+        self.port = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, '127.0.0.1', 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    @staticmethod
+    def response(tid, unit, start, qty):
+        pdu = bytes([3, 2 * qty]) + struct.pack(f'>{qty}H', *range(start, start + qty))
+        return MBAP_HEADER.pack(tid, 0, len(pdu) + 1, unit) + pdu
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        held = []
+        received = 0
+        tasks = []
+        try:
+            while True:
+                header = await reader.readexactly(MBAP_HEADER.size)
+                tid, _, length, unit = MBAP_HEADER.unpack(header)
+                pdu = await reader.readexactly(length - 1)
+                received += 1
+                if self.close_after is not None and received > self.close_after:
+                    break
+                if unit == SILENT_UNIT:
+                    continue
+                start, qty = struct.unpack('>HH', pdu[1:5])
+                self.outstanding += 1
+                self.max_outstanding = max(self.max_outstanding, self.outstanding)
+                resp = self.response(tid, unit, start, qty)
+                if self.hold:
+                    held.append(resp)
+                    if len(held) >= self.hold:
+                        for item in reversed(held):
+                            writer.write(item)
+                            self.outstanding -= 1
+                        held = []
+                        await writer.drain()
+                else:
+                    tasks.append(asyncio.ensure_future(self._reply(writer, resp)))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    async def _reply(self, writer, resp):
+        await asyncio.sleep(self.delay)
+        self.outstanding -= 1
+        writer.write(resp)
+        await writer.drain()
+
+
+async def read(pool, start, qty=1, unit=1, timeout=1.0):
+    tid, adu = pool.build_request(unit, 3, start, qty)
+    return tid, await pool.transact(tid, adu, timeout)
+
+
+def registers(resp):
+    return list(struct.unpack(f'>{resp[8] // 2}H', resp[9:9 + resp[8]]))
+
+
+def test_parse_endpoint():
+    assert parse_endpoint('tcp://10.0.0.5') == ('tcp', '10.0.0.5', 502)
+    assert parse_endpoint('RTU+TCP://gw:4001/') == ('rtu+tcp', 'gw', 4001)
+    assert parse_endpoint('COM3') is None
+
+
+def test_build_mbap_request():
+    assert build_mbap_request(7, 1, 3, 100, 2) == bytes.fromhex('0007 0000 0006 01 03 0064 0002')
+
+
+def test_out_of_order_replies_matched_by_transaction_id():
+    async def main():
+        server = await StubServer(hold=4).start()
+        pool = TcpConnectionPool('127.0.0.1', server.port, size=1, max_inflight=4)
+        await pool.open()
+        try:
+            results = await asyncio.gather(*[read(pool, start) for start in (10, 20, 30, 40)])
+        finally:
+            await pool.close()
+            await server.stop()
+        return results
+
+    results = asyncio.run(main())
+    for start, (tid, resp) in zip((10, 20, 30, 40), results):
+        assert MBAP_HEADER.unpack(resp[:7])[0] == tid
+        assert registers(resp) == [start]
+
+
+def test_pipelining_limited_to_inflight():
+    async def main():
+        server = await StubServer(delay=0.05).start()
+        pool = TcpConnectionPool('127.0.0.1', server.port, size=1, max_inflight=3)
+        await pool.open()
+        try:
+            results = await asyncio.gather(*[read(pool, start, qty=2) for start in range(8)])
+        finally:
+            await pool.close()
+            await server.stop()
+        return server, results
+
+    server, results = asyncio.run(main())
+    assert [registers(resp) for _, resp in results] == [[start, start + 1] for start in range(8)]
+    assert server.connections == 1
+    assert server.max_outstanding == 3
+
+
+def test_pool_opens_more_connections_when_busy():
+    async def main():
+        server = await StubServer(delay=0.05).start()
+        pool = TcpConnectionPool('127.0.0.1', server.port, size=2, max_inflight=2)
+        await pool.open()
+        try:
+            await asyncio.gather(*[read(pool, start) for start in range(8)])
+        finally:
+            await pool.close()
+            await server.stop()
+        return server
+
+    server = asyncio.run(main())
+    assert server.connections == 2
+    assert server.max_outstanding == 4
+
+
+def test_timeout_returns_empty_and_cleans_pending():
+    async def main():
+        server = await StubServer().start()
+        pool = TcpConnectionPool('127.0.0.1', server.port, size=1, max_inflight=4)
+        await pool.open()
+        try:
+            _, resp = await read(pool, 5, unit=SILENT_UNIT, timeout=0.05)
+            pending = [dict(c.pending) for c in pool.connections]
+            # 超时后同一连接照常可用
+            _, after = await read(pool, 6)
+        finally:
+            await pool.close()
+            await server.stop()
+        return resp, pending, after
+
+    resp, pending, after = asyncio.run(main())
+    assert resp == b''
+    assert pending == [{}]
+    assert registers(after) == [6]
+
+
+def test_reconnect_after_peer_closes():
+    async def main():
+        server = await StubServer(close_after=1).start()
+        pool = TcpConnectionPool('127.0.0.1', server.port, size=1, max_inflight=4)
+        await pool.open()
+        try:
+            _, first = await read(pool, 1)
+            # 第二个请求时对端断开：等待中的请求得到 TransportError
+            with pytest.raises(TransportError):
+                await read(pool, 2)
+            _, third = await read(pool, 3)
+        finally:
+            await pool.close()
+            await server.stop()
+        return server, first, third
+
+    server, first, third = asyncio.run(main())
+    assert registers(first) == [1]
+    assert registers(third) == [3]
+    assert server.connections == 2
@@ -0,0 +1,82 @@
+import pandas as pd
+
+from core.poll_plan import PollRange, build_poll_plan, merge_ranges, plan_ranges, slave_addresses, split_range
+
+
+def params(rows):
+    return pd.DataFrame(rows, columns=['name', 'addr', 'dataType'])
+
+
+def test_float32_row_reads_two_registers():
+    plan = build_poll_plan(params([['f', 200, 'FLOAT32']]))
+    assert plan == {1: [PollRange(1, 3, 200, 2)]}
+
+
+def test_float32_widths_from_parameter_table():
+    widths = slave_addresses(params([['a', 100, 'UNSIGNED'], ['f', 101, 'FLOAT32'], ['b', 103, None]]))
+    assert widths == {(1, 'holding'): {100: 1, 101: 2, 103: 1}}
+    assert build_poll_plan(params([['a', 100, 'UNSIGNED'], ['f', 101, 'FLOAT32'], ['b', 103, None]])) == \
+        {1: [PollRange(1, 3, 100, 4)]}
+
+
+def test_float32_not_split_across_requests():
+    # 第二个寄存器会超出125个的限制时整个值移到下一个请求
+    assert merge_ranges(range(125), max_qty=125, widths={124: 2}) == [(0, 124), (124, 2)]
+    assert merge_ranges(range(124), max_qty=125, widths={123: 2}) == [(0, 125)]
+
+
+def test_learned_group_covers_float32():
+    ranges = plan_ranges({100: 1, 101: 2}, learned=([(100, 2)], set()), widths={100: 1, 101: 2})
+    assert ranges == [(100, 3)]
+
+
+def test_split_range_halves_by_declared_addresses():
+    rng = PollRange(1, 3, 100, 8)
+    assert split_range(rng, [100, 101, 104, 107]) == [PollRange(1, 3, 100, 2), PollRange(1, 3, 104, 4)]
+
+
+def test_split_range_keeps_float32_words_together():
+    rng = PollRange(1, 3, 100, 6)
+    parts = split_range(rng, [100, 104], widths={100: 1, 104: 2})
+    assert parts == [PollRange(1, 3, 100, 1), PollRange(1, 3, 104, 2)]
+
+
+def test_learned_invalid_addresses_split_new_merges():
+    learned = ([(10, 3), (14, 4)], {13})
+    assert plan_ranges(range(10, 18), learned=learned) == [(10, 3), (14, 4)]
+    # 参数表新增的地址照常合并，但不跨过无效地址和学到的区间
+    assert plan_ranges(list(range(10, 18)) + [18, 19, 20], learned=learned) == [(10, 3), (14, 4), (18, 3)]
+
+
+def test_learned_ranges_round_trip(tmp_path):
+    from core.learned_ranges import LearnedRanges
+    path = str(tmp_path / 'learned.json')
+    LearnedRanges(path).update('COM1', 1, 'holding', [(10, 3), (14, 4)], {13})
+    learned = LearnedRanges(path)
+    assert learned.for_port('COM1') == {(1, 'holding'): ([(10, 3), (14, 4)], {13})}
+    learned.forget('COM1')
+    assert len(LearnedRanges(path)) == 0
+
+
+def test_removing_last_range_drops_slave_health_and_probe_delay_ignores_it():
+    from core.poll_plan import STATE_DEAD, PollScheduler
+    now = [100.0]
+    scheduler = PollScheduler({1: [PollRange(1, 3, 0, 1)], 2: [PollRange(2, 3, 0, 1)]}, fail_threshold=1,
+                              clock=lambda: now[0])
+    assert scheduler.replace(PollRange(2, 3, 0, 1), [])
+    assert 2 not in scheduler.health and scheduler.slaves == [1]
+    assert scheduler.report(PollRange(1, 3, 0, 1), False, error='timeout')
+    assert scheduler.health[1].state == STATE_DEAD
+    # 唯一的从站离线：不发请求，按探测时间等待，而不是返回0让轮询循环空转
+    assert scheduler.next_request() is None
+    assert scheduler.next_probe_delay() == scheduler.health[1].next_probe - now[0] > 0
+    assert [h['slave'] for h in scheduler.health_snapshot()] == [1]
+    assert scheduler.replace(PollRange(1, 3, 0, 1), [])
+    assert scheduler.slaves == [] and scheduler.health == {} and scheduler.next_request() is None
+
+
+def test_learned_path_is_next_to_config(tmp_path, monkeypatch):
+    from core.learned_ranges import learned_path_for
+    monkeypatch.chdir(tmp_path)
+    assert learned_path_for('config_and_params.xlsx') == str(tmp_path / 'learned_ranges.json')
+    assert learned_path_for('/opt/site/config.xlsx') == '/opt/site/learned_ranges.json'
@@ -0,0 +1,27 @@
+"""共享内存寄存器映像测试"""
+
+import logging
+import os
+
+from core.shared_image import RegisterImageReader, RegisterImageWriter
+from core.value_store import ValueStore
+
+
+def test_overflow_is_counted_and_warned_once(caplog):
+    store = ValueStore()
+    store.update_many('COM1', 1, [(addr, addr) for addr in range(5)])
+    _, changes = store.changed_since(0)
+    writer = RegisterImageWriter(f'test_image_{os.getpid()}', capacity=3)
+    try:
+        with caplog.at_level(logging.WARNING, logger='core.shared_image'):
+            assert writer.write(changes) == 3
+            assert writer.write(changes) == 3
+        assert writer.overflow == 4
+        assert len([r for r in caplog.records if '容量 3 已满' in r.getMessage()]) == 1
+        with RegisterImageReader(writer.name) as reader:
+            snap = reader.snapshot()
+            assert len(snap) == 3
+            assert snap.get('COM1', 1, 2)[0] == 2.0
+            assert snap.get('COM1', 1, 3) is None
+    finally:
+        writer.close()
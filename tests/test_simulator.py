@@ -0,0 +1,28 @@
+"""模拟从站参数表加载测试（直接调用 handle_pdu，不需要伪终端）"""
+
+import struct
+
+import pandas as pd
+
+from core.simulator import ModbusSimulator
+
+
+def read_holding(sim, slave_id, addr, qty=1):
+    return sim.handle_pdu(slave_id, struct.pack('>BHH', 3, addr, qty))
+
+
+def test_slave_alias_column_and_blank_cells_use_default_slave():
+    df = pd.DataFrame({'name': ['a', 'b', 'c'], 'addr': ['10', '11', '12'],
+                       '从站地址': [2, None, '3.0'], 'sim': ['const:7'] * 3})
+    sim = ModbusSimulator(seed=1).load_dataframe(df, default_slave=5, strict=True)
+    assert sorted(sim.slaves) == [2, 3, 5]
+    assert read_holding(sim, 2, 10) == bytes([3, 2, 0, 7])
+    assert read_holding(sim, 5, 11) == bytes([3, 2, 0, 7])
+    assert read_holding(sim, 3, 12) == bytes([3, 2, 0, 7])
+    assert read_holding(sim, 2, 11) == bytes([0x83, 2])
+
+
+def test_invalid_slave_cell_falls_back_to_default_slave():
+    df = pd.DataFrame({'name': ['a'], 'addr': ['20'], 'unit': ['abc']})
+    sim = ModbusSimulator(seed=1).load_dataframe(df)
+    assert sorted(sim.slaves) == [1]
@@ -0,0 +1,87 @@
+"""被动监听分帧测试：CRC分帧、任意切分、噪声重同步、帧间隔收尾和请求/响应配对"""
+
+from core.protocol import Protocol
+from core.sniffer import (KIND_EXCEPTION, KIND_REQUEST, KIND_RESPONSE, KIND_UNKNOWN, RtuFramer,
+                          TransactionPairer, char_time_ns)
+
+MS = 1_000_000
+
+
+def frame(*body):
+    msg = bytes(body)
+    return msg + Protocol.calc_crc(msg)
+
+
+READ_REQ = frame(1, 3, 0, 100, 0, 2)
+READ_RESP = frame(1, 3, 4, 0, 1, 0, 2)
+WRITE_REQ = frame(1, 16, 0, 10, 0, 2, 4, 0, 1, 0, 2)
+WRITE_RESP = frame(1, 16, 0, 10, 0, 2)
+EXC_RESP = frame(1, 0x83, 2)
+
+
+def kinds(frames):
+    return [(f.data, f.kind) for f in frames]
+
+
+def test_back_to_back_frames_in_one_chunk():
+    framer = RtuFramer(9600)
+    stream = READ_REQ + READ_RESP + WRITE_REQ + WRITE_RESP + EXC_RESP
+    assert kinds(framer.feed(stream, 100 * MS)) == [
+        (READ_REQ, KIND_REQUEST), (READ_RESP, KIND_RESPONSE), (WRITE_REQ, KIND_REQUEST),
+        (WRITE_RESP, KIND_RESPONSE), (EXC_RESP, KIND_EXCEPTION)]
+    assert framer.noise_bytes == 0
+
+
+def test_byte_by_byte_feed_gives_same_frames():
+    framer = RtuFramer(9600)
+    char = char_time_ns(9600)
+    out = []
+    for i, byte in enumerate(READ_REQ + READ_RESP + WRITE_REQ + WRITE_RESP):
+        out += framer.feed(bytes([byte]), (i + 1) * char)
+    assert [f.data for f in out] == [READ_REQ, READ_RESP, WRITE_REQ, WRITE_RESP]
+    # 帧时间由字节到达时间还原：第一帧从0开始，持续8个字符
+    assert out[0].start_ns == 0 and out[0].end_ns == 8 * char
+
+
+def test_leading_noise_is_dropped_and_framing_resyncs():
+    framer = RtuFramer(9600)
+    frames = framer.feed(b'\x00\xff' + READ_REQ + READ_RESP, 100 * MS)
+    assert [f.data for f in frames] == [READ_REQ, READ_RESP]
+    assert framer.noise_bytes == 2
+
+
+def test_unknown_function_code_closes_on_silence():
+    framer = RtuFramer(9600)
+    custom = frame(1, 0x41, 9, 9, 9)
+    assert framer.feed(custom, 100 * MS) == []
+    assert framer.flush(100 * MS + framer.gap_ns // 2) == []
+    assert kinds(framer.flush(100 * MS + 2 * framer.gap_ns)) == [(custom, KIND_UNKNOWN)]
+
+
+def test_truncated_frame_is_discarded_after_stale_timeout():
+    framer = RtuFramer(9600, stale_ms=50)
+    assert framer.feed(READ_RESP[:5], 100 * MS) == []
+    assert framer.flush(100 * MS + 10 * MS) == []
+    assert framer.flush(100 * MS + 60 * MS) == []
+    assert framer.noise_bytes == 5
+    assert [f.data for f in framer.feed(READ_REQ, 200 * MS)] == [READ_REQ]
+
+
+def test_pairer_builds_transactions_and_reports_timeouts():
+    framer = RtuFramer(9600)
+    pairer = TransactionPairer(response_timeout_ms=100)
+    done = []
+    for f in framer.feed(READ_REQ + READ_RESP + WRITE_REQ, 10 * MS) + framer.feed(EXC_RESP, 20 * MS):
+        done += pairer.add(f)
+    read, write = done
+    assert (read.slave, read.func, read.start_addr, read.qty, read.response) == (1, 3, 100, 2, READ_RESP)
+    assert (write.func, write.start_addr, write.qty, write.exception_code) == (16, 10, 2, None)
+    # 0x83 不是 FC16 的响应：写请求记为无响应，异常帧记为未配对
+    assert write.response is None
+    assert pairer.unmatched == 1
+    done = []
+    for f in framer.feed(READ_REQ, 30 * MS):
+        done += pairer.add(f)
+    assert done == [] and pairer.expire(31 * MS) == []
+    timed_out, = pairer.expire(200 * MS)
+    assert timed_out.response is None and timed_out.start_addr == 100
@@ -0,0 +1,72 @@
+"""数据流订阅测试：过滤条件校验和错误应答"""
+
+import asyncio
+import json
+import socket
+
+import pytest
+
+from core.stream import Subscription, ValueStreamServer
+from core.value_store import SPACE_INPUT, ValueStore
+
+
+@pytest.mark.parametrize('spec', ['{"addr": [5]}', '{"addr": [1, 2, 3]}', '{"addr": 7}', '{"addr": ["a", 2]}',
+                                  '{"addr": [9, 1]}', '{"addr": [1.5, 3]}', '{"space": "bits"}',
+                                  '{"groups": "温度"}', '[1, 2]', 'not json'])
+def test_invalid_subscription_raises_value_error(spec):
+    with pytest.raises(ValueError):
+        Subscription.from_json(spec)
+
+
+def test_matches_filters_by_space_and_addr_range():
+    sub = Subscription.from_json('{"slave": 1, "space": "input", "addr": [0, 10]}')
+    assert sub.matches(('COM1', 1, 'input', 0))
+    assert sub.matches(('COM1', 1, 'input', 10))
+    assert not sub.matches(('COM1', 1, 'holding', 5))
+    assert not sub.matches(('COM1', 1, 'input', 11))
+    assert not sub.matches(('COM1', 2, 'input', 5))
+    assert Subscription.from_json('{"addr": [0, 0]}').matches(('COM1', 1, 'coil', 0))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def connect(port, timeout=2.0):
+    """等数据流服务开始监听后连接"""
+    deadline = asyncio.get_running_loop().time() + timeout
+    while True:
+        try:
+            return await asyncio.open_connection('127.0.0.1', port)
+        except OSError:
+            if asyncio.get_running_loop().time() > deadline:
+                raise
+            await asyncio.sleep(0.01)
+
+
+def test_bad_subscription_gets_error_reply_and_connection_stays_usable():
+    store = ValueStore()
+    store.update('COM1', 1, 5, 'h')
+    store.update('COM1', 1, 5, 'i', space=SPACE_INPUT)
+
+    async def scenario():
+        server = ValueStreamServer(store, port=free_port(), interval=0.01)
+        task = asyncio.create_task(server.serve())
+        reader, writer = await connect(server.port)
+        try:
+            first = json.loads(await asyncio.wait_for(reader.readline(), 2))
+            assert len(first['values']) == 2
+            for bad in (b'{"addr": [5]}\n', b'{"addr": "abc"}\n'):
+                writer.write(bad)
+                assert 'error' in json.loads(await asyncio.wait_for(reader.readline(), 2))
+            writer.write(b'{"space": "input"}\n')
+            values = json.loads(await asyncio.wait_for(reader.readline(), 2))['values']
+            assert [(v['addr'], v['value'], v.get('space')) for v in values] == [(5, 'i', 'input')]
+        finally:
+            writer.close()
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(scenario())
@@ -0,0 +1,42 @@
+"""ValueStore 增量读取测试"""
+
+from core.value_store import QUALITY_STALE, SPACE_INPUT, ValueStore
+
+
+def test_changed_since_returns_only_new_changes_in_version_order():
+    store = ValueStore()
+    store.update_many('COM1', 1, [(addr, str(addr)) for addr in range(1000)])
+    version, changes = store.changed_since(0)
+    assert len(changes) == 1000
+    store.update('COM1', 1, 5, 'a')
+    store.update('COM1', 2, 7, 'b', space=SPACE_INPUT)
+    store.update('COM1', 1, 3, 'c')
+    current, changes = store.changed_since(version)
+    assert [(key, stored.value) for key, stored in changes] == [
+        (('COM1', 1, 'holding', 5), 'a'), (('COM1', 2, 'input', 7), 'b'), (('COM1', 1, 'holding', 3), 'c')]
+    assert [stored.version for _, stored in changes] == sorted(stored.version for _, stored in changes)
+    assert store.changed_since(current) == (current, [])
+
+
+def test_changed_since_supports_independent_readers():
+    store = ValueStore()
+    store.update('COM1', 1, 1, 'x')
+    first, _ = store.changed_since(0)
+    store.update('COM1', 1, 2, 'y')
+    second, _ = store.changed_since(first)
+    store.update('COM1', 1, 1, 'z')
+    _, changes = store.changed_since(first)
+    assert [(key[3], stored.value) for key, stored in changes] == [(2, 'y'), (1, 'z')]
+    _, changes = store.changed_since(second)
+    assert [(key[3], stored.value) for key, stored in changes] == [(1, 'z')]
+
+
+def test_mark_quality_reports_marked_values_as_changes():
+    store = ValueStore()
+    store.update_many('COM1', 1, [(1, 'a'), (2, 'b')])
+    store.update('COM1', 2, 1, 'c')
+    version, _ = store.changed_since(0)
+    store.mark_quality('COM1', 1, QUALITY_STALE)
+    _, changes = store.changed_since(version)
+    assert [(key[1], key[3], stored.quality) for key, stored in changes] == [(1, 1, 'stale'), (1, 2, 'stale')]
+    assert store.get('COM1', 2, 1).quality == 'good'
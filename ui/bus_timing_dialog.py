@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import logging
+import os
+import time
+from PyQt5 import QtWidgets, QtCore
+import pyqtgraph as pg
+from core.bus_timing import (BusTimingAnalyzer, METRICS, METRIC_LABELS, HIST_EDGES_MS, RATIO_EDGES,
+                             merge_stats)
+from core.frame_capture import FrameCaptureReader
+
+REFRESH_MS = 1000
+
+
+class CaptureTimingWorker(QtCore.QThread):
+    """后台线程分析捕获文件"""
+    progress_signal = QtCore.pyqtSignal(int)
+    done_signal = QtCore.pyqtSignal(int, str)  # (帧数, 错误信息)
+
+    def __init__(self, path, analyzer, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.analyzer = analyzer
+        self._running = True
+        self.logger = logging.getLogger(__name__)
+
+    def stop(self):
+        self._running = False
+
+    def run(self):
+        try:
+            with FrameCaptureReader(self.path) as reader:
+                count = self.analyzer.load_capture(
+                    reader,
+                    progress=self.progress_signal.emit,
+                    should_stop=lambda: not self._running
+                )
+            self.done_signal.emit(count, '')
+        except Exception as e:
+            self.logger.error(f"捕获文件分析失败: {e}", exc_info=True)
+            self.done_signal.emit(0, str(e))
+
+
+class BusTimingDialog(QtWidgets.QDialog):
+    """总线时序分析：实时直方图、按端口/从站/功能码统计，支持导出和离线分析捕获文件"""
+
+    def __init__(self, live_analyzer=None, baudrate=9600, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle('Bus Timing')
+        self.resize(1100, 800)
+        self.live_analyzer = live_analyzer
+        self.analyzer = live_analyzer
+        self.baudrate = baudrate
+        self.worker = None
+        self._init_ui()
+        self.timer = QtCore.QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(REFRESH_MS)
+        self.show_live()
+
+    def _init_ui(self):
+        vbox = QtWidgets.QVBoxLayout(self)
+
+        top = QtWidgets.QHBoxLayout()
+        self.source_label = QtWidgets.QLabel('')
+        self.port_cb = QtWidgets.QComboBox()
+        self.port_cb.addItem('All Ports', None)
+        self.port_cb.currentIndexChanged.connect(self.refresh)
+        self.slave_cb = QtWidgets.QComboBox()
+        self.slave_cb.addItem('All Slaves', None)
+        self.slave_cb.currentIndexChanged.connect(self.refresh)
+        self.func_cb = QtWidgets.QComboBox()
+        self.func_cb.addItem('All Func', None)
+        self.func_cb.currentIndexChanged.connect(self.refresh)
+        self.live_btn = QtWidgets.QPushButton('Live')
+        self.live_btn.clicked.connect(self.show_live)
+        self.load_btn = QtWidgets.QPushButton('Load Capture...')
+        self.load_btn.clicked.connect(self.load_capture)
+        self.reset_btn = QtWidgets.QPushButton('Reset')
+        self.reset_btn.clicked.connect(self.reset_stats)
+        self.export_btn = QtWidgets.QPushButton('Export...')
+        self.export_btn.clicked.connect(self.export_stats)
+        top.addWidget(self.source_label, 1)
+        for widget in [self.port_cb, self.slave_cb, self.func_cb, self.live_btn, self.load_btn, self.reset_btn, self.export_btn]:
+            top.addWidget(widget)
+        vbox.addLayout(top)
+
+        self.summary_label = QtWidgets.QLabel('')
+        vbox.addWidget(self.summary_label)
+
+        plots = QtWidgets.QHBoxLayout()
+        self.curves = {}
+        for metric in METRICS:
+            plot = pg.PlotWidget(title=METRIC_LABELS[metric])
+            plot.showGrid(x=True, y=True)
+            if metric != 'duration_ratio':
+                plot.setLogMode(x=True, y=False)
+            self.curves[metric] = plot.plot([0, 1], [0], stepMode='center', fillLevel=0,
+                                            brush=(80, 160, 255, 120), pen=pg.mkPen('c'))
+            plots.addWidget(plot)
+        vbox.addLayout(plots, 2)
+
+        self.table = QtWidgets.QTableWidget()
+        self.table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        headers = ['Port', 'Slave', 'Func', 'Requests', 'Responses', 'Exceptions', 'No Resp', 'Bus Time (ms)',
+                   'Turnaround avg', 'p95', 'max', 'Gap avg', 't3.5 violations', 'Duration ratio']
+        self.table.setColumnCount(len(headers))
+        self.table.setHorizontalHeaderLabels(headers)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        vbox.addWidget(self.table, 1)
+
+    def _update_filters(self, stats):
+        for cb, values in [(self.port_cb, sorted({p for p, _, _ in stats})),
+                           (self.slave_cb, sorted({s for _, s, _ in stats})),
+                           (self.func_cb, sorted({f for _, _, f in stats}))]:
+            known = {cb.itemData(i) for i in range(cb.count())}
+            for value in values:
+                if value not in known:
+                    cb.addItem(str(value) or '(main)', value)
+
+    def refresh(self):
+        if self.analyzer is None:
+            self.source_label.setText('串口未打开，可加载捕获文件分析')
+            return
+        snap = self.analyzer.snapshot()
+        stats = snap['stats']
+        self._update_filters(stats)
+        port = self.port_cb.currentData()
+        ports = snap['ports']
+        if port is not None and port in ports:
+            frames = ports[port]['frames']
+            overall, recent = ports[port]['utilization']
+        else:
+            frames = snap['frames']
+            overall, recent = snap['utilization']
+        busiest = '' if port is not None or len(ports) < 2 else '最忙端口'
+        self.summary_label.setText(
+            f"波特率 {snap['baudrate']}, t3.5 = {snap['t35_ms']:.3f} ms, 帧数 {frames}, "
+            f"{busiest}总线占用率 {overall:.1f}% (最近 {recent:.1f}%)")
+
+        merged = merge_stats(stats, self.slave_cb.currentData(), self.func_cb.currentData(), port)
+        for metric in METRICS:
+            hist = getattr(merged, metric)
+            edges = RATIO_EDGES if metric == 'duration_ratio' else HIST_EDGES_MS
+            self.curves[metric].setData(edges, hist.counts[1:-1])
+
+        rows = sorted((e for e in stats.values() if port is None or e.port == port),
+                      key=lambda e: e.bus_time_ns, reverse=True)
+        self.table.setRowCount(len(rows))
+        for r, entry in enumerate(rows):
+            ta = entry.turnaround
+            values = [
+                entry.port, entry.slave, entry.func, entry.requests, entry.responses, entry.exceptions, entry.no_response,
+                f'{entry.bus_time_ns / 1e6:.1f}',
+                _fmt(ta.mean if ta.count else None), _fmt(ta.percentile(95)), _fmt(ta.max),
+                _fmt(entry.gap.mean if entry.gap.count else None), entry.t35_violations,
+                _fmt(entry.duration_ratio.mean if entry.duration_ratio.count else None, 2),
+            ]
+            for c, value in enumerate(values):
+                self.table.setItem(r, c, QtWidgets.QTableWidgetItem(str(value)))
+
+    def show_live(self):
+        if self.worker is not None:
+            return
+        self.analyzer = self.live_analyzer
+        if self.analyzer is not None:
+            self.source_label.setText('实时')
+        self.refresh()
+
+    def set_live_analyzer(self, analyzer):
+        """串口打开/关闭时由主窗口更新实时分析器"""
+        showing_live = self.analyzer is self.live_analyzer
+        self.live_analyzer = analyzer
+        if showing_live:
+            self.show_live()
+
+    def reset_stats(self):
+        if self.analyzer is not None and self.worker is None:
+            self.analyzer.reset()
+            self.refresh()
+
+    def load_capture(self):
+        file_name, _ = QtWidgets.QFileDialog.getOpenFileName(
+            self,
+            "Open Frame Capture",
+            "",
+            "Modbus Capture (*.mbcap);;All Files (*)"
+        )
+        if not file_name:
+            return
+        baudrate = self.live_analyzer.baudrate if self.live_analyzer is not None else self.baudrate
+        self.analyzer = BusTimingAnalyzer(baudrate)
+        self.source_label.setText(f'{os.path.basename(file_name)} (分析中...)')
+        self.load_btn.setEnabled(False)
+        self.worker = CaptureTimingWorker(file_name, self.analyzer)
+        self.worker.progress_signal.connect(lambda n: self.source_label.setText(
+            f'{os.path.basename(file_name)} (已分析 {n} 帧)'))
+        self.worker.done_signal.connect(lambda n, err: self.on_capture_done(file_name, n, err))
+        self.worker.start()
+
+    def on_capture_done(self, file_name, count, error):
+        self.worker = None
+        self.load_btn.setEnabled(True)
+        if error:
+            QtWidgets.QMessageBox.critical(self, '错误', f'捕获文件分析失败: {error}')
+            self.show_live()
+            return
+        self.source_label.setText(f'{os.path.basename(file_name)}: {count} 帧')
+        self.refresh()
+
+    def export_stats(self):
+        if self.analyzer is None:
+            return
+        default_name = time.strftime('bus_timing_%Y%m%d_%H%M%S.csv')
+        file_name, _ = QtWidgets.QFileDialog.getSaveFileName(
+            self,
+            "Export Bus Timing",
+            default_name,
+            "CSV Files (*.csv);;JSON Files (*.json)"
+        )
+        if not file_name:
+            return
+        try:
+            self.analyzer.export(file_name)
+            QtWidgets.QMessageBox.information(self, '提示', f'已导出: {file_name}')
+        except Exception as e:
+            QtWidgets.QMessageBox.critical(self, '错误', f'导出失败: {e}')
+
+    def closeEvent(self, event):
+        self.timer.stop()
+        if self.worker is not None:
+            self.worker.stop()
+            self.worker.wait(2000)
+        event.accept()
+
+
+def _fmt(value, digits=3):
+    return '' if value is None else f'{value:.{digits}f}'
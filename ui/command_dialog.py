@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import time
+from PyQt5 import QtWidgets
+from core.commands import read_command, write_coils_command, write_registers_command
+
+OPERATIONS = [
+    ('Read Coils (FC1)', 'read', 1),
+    ('Read Discrete Inputs (FC2)', 'read', 2),
+    ('Read Holding Registers (FC3)', 'read', 3),
+    ('Read Input Registers (FC4)', 'read', 4),
+    ('Write Registers (FC6/16)', 'write_registers', None),
+    ('Write Coils (FC5/15)', 'write_coils', None),
+]
+
+
+def parse_values(text):
+    """'1, 0x10, -2' -> [1, 16, 65534]（负数按16位补码）"""
+    values = []
+    for item in text.replace(';', ',').replace(' ', ',').split(','):
+        item = item.strip()
+        if not item:
+            continue
+        value = int(item, 0)
+        if not -0x8000 <= value <= 0xFFFF:
+            raise ValueError(f"超出16位范围: {item}")
+        values.append(value & 0xFFFF)
+    return values
+
+
+class CommandDialog(QtWidgets.QDialog):
+    """轮询过程中即时读写：命令进入轮询引擎的命令队列，在下一个帧边界插入轮询"""
+
+    def __init__(self, ports, default_slave, submit, parent=None):
+        """submit(port, command) 提交命令，结果由 on_result(port, command, response) 显示"""
+        super().__init__(parent)
+        self.setWindowTitle('Read / Write')
+        self.resize(600, 420)
+        self.submit = submit
+        self._sent = {}
+
+        form = QtWidgets.QFormLayout()
+        self.port_cb = QtWidgets.QComboBox()
+        self.port_cb.addItems(ports)
+        self.slave_sb = QtWidgets.QSpinBox()
+        self.slave_sb.setRange(0, 247)
+        self.slave_sb.setValue(default_slave)
+        self.op_cb = QtWidgets.QComboBox()
+        for label, _, _ in OPERATIONS:
+            self.op_cb.addItem(label)
+        self.op_cb.currentIndexChanged.connect(self._update_fields)
+        self.addr_sb = QtWidgets.QSpinBox()
+        self.addr_sb.setRange(0, 65535)
+        self.qty_sb = QtWidgets.QSpinBox()
+        self.values_edit = QtWidgets.QLineEdit()
+        self.values_edit.setPlaceholderText('逗号分隔，例如 1, 0x10, -2（线圈 1/0）')
+        form.addRow('Port', self.port_cb)
+        form.addRow('Slave', self.slave_sb)
+        form.addRow('Operation', self.op_cb)
+        form.addRow('Address', self.addr_sb)
+        form.addRow('Quantity', self.qty_sb)
+        form.addRow('Values', self.values_edit)
+
+        self.send_btn = QtWidgets.QPushButton('Send')
+        self.send_btn.clicked.connect(self.send)
+        self.result_log = QtWidgets.QPlainTextEdit()
+        self.result_log.setReadOnly(True)
+
+        vbox = QtWidgets.QVBoxLayout(self)
+        vbox.addLayout(form)
+        vbox.addWidget(self.send_btn)
+        vbox.addWidget(self.result_log, 1)
+        self.op_cb.setCurrentIndex(2)
+        self._update_fields()
+
+    def _update_fields(self):
+        _, kind, func = OPERATIONS[self.op_cb.currentIndex()]
+        self.qty_sb.setRange(1, 2000 if func in (1, 2) else 125)
+        self.qty_sb.setEnabled(kind == 'read')
+        self.values_edit.setEnabled(kind != 'read')
+
+    def build_commands(self):
+        """返回 [Command]，超过一帧上限的写操作拆成多个命令"""
+        _, kind, func = OPERATIONS[self.op_cb.currentIndex()]
+        slave, addr = self.slave_sb.value(), self.addr_sb.value()
+        if kind == 'read':
+            return [read_command(slave, addr, self.qty_sb.value(), func)]
+        values = parse_values(self.values_edit.text())
+        if not values:
+            raise ValueError("请输入要写入的值")
+        if kind == 'write_coils':
+            return write_coils_command(slave, addr, values)
+        return write_registers_command(slave, addr, values)
+
+    def send(self):
+        try:
+            commands = self.build_commands()
+            for command in commands:
+                self._sent[id(command)] = time.monotonic()
+                self.submit(self.port_cb.currentText(), command)
+                self.result_log.appendPlainText(f'-> {command}')
+        except Exception as e:
+            QtWidgets.QMessageBox.warning(self, '警告', f'发送失败: {e}')
+
+    def on_result(self, port, command, response):
+        started = self._sent.pop(id(command), None)
+        if started is None:
+            return
+        elapsed = (time.monotonic() - started) * 1000
+        if isinstance(response, Exception):
+            text = f'失败: {response}'
+        elif response.error:
+            text = f'失败: {response.error}'
+        elif response.exception_code is not None:
+            text = f'异常响应: {response.exception_code}'
+        elif command.values is None:
+            data = response.data
+            if command.func in (3, 4):
+                words = [int.from_bytes(data[i:i + 2], 'big') for i in range(0, len(data), 2)]
+                text = 'OK: ' + ', '.join(str(w) for w in words)
+            else:
+                text = 'OK: ' + ''.join(str((data[i >> 3] >> (i & 7)) & 1) for i in range(command.qty))
+        else:
+            text = 'OK'
+        self.result_log.appendPlainText(f'<- {port} 从站 {command.slave} 地址 {command.start}: {text} '
+                                        f'({elapsed:.0f} ms)')
@@ -90,4 +90,34 @@ class CommLogWidget(QtWidgets.QTextEdit):
             font-size: 13px;
         ''')
         self.setFixedHeight(6*22)  # 约6行高度（每行约22像素）
-        self.setContextMenuPolicy(QtCore.Qt.CustomContextMenu) 
\ No newline at end of file
+        self.setContextMenuPolicy(QtCore.Qt.CustomContextMenu)
+
+
+class SlaveHealthDialog(QtWidgets.QDialog):
+    """多从站轮询的通讯健康状态"""
+    HEADERS = ['Port', 'Slave', 'State', 'OK', 'Fail', 'Consecutive', 'Skipped', 'Backoff (s)', 'Avg Resp (ms)', 'Last Error']
+    STATE_COLORS = {'ok': '#c8e6c9', 'suspect': '#fff9c4', 'dead': '#ffcdd2'}
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle('Slave Health')
+        self.resize(800, 400)
+        layout = QtWidgets.QVBoxLayout(self)
+        self.table = QtWidgets.QTableWidget()
+        self.table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.table.setColumnCount(len(self.HEADERS))
+        self.table.setHorizontalHeaderLabels(self.HEADERS)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(self.table)
+
+    def update_health(self, health):
+        self.table.setRowCount(len(health))
+        for r, h in enumerate(health):
+            avg = h['avg_response_ms']
+            values = [h.get('port', ''), h['slave'], h['state'], h['ok'], h['fail'], h['consecutive_failures'], h['skipped'],
+                      f"{h['backoff']:.0f}", '' if avg is None else f'{avg:.1f}', h['last_error']]
+            color = QtGui.QColor(self.STATE_COLORS.get(h['state'], '#ffffff'))
+            for c, value in enumerate(values):
+                item = QtWidgets.QTableWidgetItem(str(value))
+                item.setBackground(color)
+                self.table.setItem(r, c, item)
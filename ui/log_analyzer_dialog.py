@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import logging
+import os
+import time
+from PyQt5 import QtWidgets, QtCore
+from utils.log_analyzer import LogIndex, STATUSES
+
+INDEX_DB = 'modbus_log_index.db'
+MAX_ROWS = 2000
+
+
+class LogImportWorker(QtCore.QThread):
+    """后台线程导入日志，避免UI卡死"""
+    progress_signal = QtCore.pyqtSignal(str, int, int)  # (文件, 已读行数, 新增事务数)
+    done_signal = QtCore.pyqtSignal(int, str)  # (新增事务总数, 错误信息)
+
+    def __init__(self, patterns, db_path=INDEX_DB, parent=None):
+        super().__init__(parent)
+        self.patterns = patterns
+        self.db_path = db_path
+        self._running = True
+        self.logger = logging.getLogger(__name__)
+
+    def stop(self):
+        self._running = False
+
+    def run(self):
+        # SQLite连接不能跨线程，导入线程使用独立连接
+        index = LogIndex(self.db_path)
+        try:
+            total = index.import_files(
+                self.patterns,
+                progress=lambda path, lines, count: self.progress_signal.emit(path, lines, count),
+                should_stop=lambda: not self._running
+            )
+            self.done_signal.emit(total, '')
+        except Exception as e:
+            self.logger.error(f"日志导入失败: {e}", exc_info=True)
+            self.done_signal.emit(0, str(e))
+        finally:
+            index.close()
+
+
+class LogAnalyzerDialog(QtWidgets.QDialog):
+    """通讯日志分析：导入modbus.log并按时间/从站/功能码/地址/错误类型查询"""
+
+    def __init__(self, log_dir='.', parent=None):
+        super().__init__(parent)
+        self.setWindowTitle('Log Analysis')
+        self.resize(1100, 700)
+        self.log_dir = log_dir
+        self.worker = None
+        self.index = LogIndex(INDEX_DB)
+        self._init_ui()
+
+    def _init_ui(self):
+        vbox = QtWidgets.QVBoxLayout(self)
+
+        import_box = QtWidgets.QHBoxLayout()
+        self.import_btn = QtWidgets.QPushButton('Import Logs...')
+        self.import_btn.clicked.connect(self.import_logs)
+        self.progress_label = QtWidgets.QLabel('')
+        import_box.addWidget(self.import_btn)
+        import_box.addWidget(self.progress_label, 1)
+        vbox.addLayout(import_box)
+
+        filter_box = QtWidgets.QHBoxLayout()
+        now = QtCore.QDateTime.currentDateTime()
+        self.start_edit = QtWidgets.QDateTimeEdit(now.addDays(-7))
+        self.start_edit.setCalendarPopup(True)
+        self.end_edit = QtWidgets.QDateTimeEdit(now.addDays(1))
+        self.end_edit.setCalendarPopup(True)
+        self.slave_edit = QtWidgets.QLineEdit()
+        self.slave_edit.setPlaceholderText('Slave')
+        self.func_edit = QtWidgets.QLineEdit()
+        self.func_edit.setPlaceholderText('Func')
+        self.addr_edit = QtWidgets.QLineEdit()
+        self.addr_edit.setPlaceholderText('Addr 或 10000-10039')
+        self.status_cb = QtWidgets.QComboBox()
+        self.status_cb.addItems(['all', 'errors'] + STATUSES)
+        self.query_btn = QtWidgets.QPushButton('Query')
+        self.query_btn.clicked.connect(self.run_query)
+        for label, widget in [('From', self.start_edit), ('To', self.end_edit), ('', self.slave_edit),
+                              ('', self.func_edit), ('', self.addr_edit), ('Status', self.status_cb)]:
+            if label:
+                filter_box.addWidget(QtWidgets.QLabel(label))
+            filter_box.addWidget(widget)
+        filter_box.addWidget(self.query_btn)
+        vbox.addLayout(filter_box)
+
+        self.result_table = QtWidgets.QTableWidget()
+        self.result_table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        headers = ['Time', 'Slave', 'Func', 'Start', 'End', 'Status', 'Exc', 'Request', 'Response', 'File:Line']
+        self.result_table.setColumnCount(len(headers))
+        self.result_table.setHorizontalHeaderLabels(headers)
+        self.result_table.horizontalHeader().setStretchLastSection(True)
+        vbox.addWidget(self.result_table, 1)
+
+        self.summary_label = QtWidgets.QLabel('')
+        vbox.addWidget(self.summary_label)
+
+    def import_logs(self):
+        files, _ = QtWidgets.QFileDialog.getOpenFileNames(
+            self,
+            "Select Log Files",
+            self.log_dir,
+            "Log Files (modbus.log*);;All Files (*)"
+        )
+        if not files:
+            return
+        self.import_btn.setEnabled(False)
+        self.worker = LogImportWorker(files)
+        self.worker.progress_signal.connect(self.on_progress)
+        self.worker.done_signal.connect(self.on_import_done)
+        self.worker.start()
+
+    def on_progress(self, path, lines, count):
+        self.progress_label.setText(f'{os.path.basename(path)}: {lines} 行, 新增 {count} 条事务')
+
+    def on_import_done(self, total, error):
+        self.import_btn.setEnabled(True)
+        self.worker = None
+        if error:
+            QtWidgets.QMessageBox.critical(self, '错误', f'日志导入失败: {error}')
+            return
+        self.progress_label.setText(f'导入完成，新增 {total} 条事务')
+        self.run_query()
+
+    def _filters(self):
+        filters = {
+            'start': self.start_edit.dateTime().toSecsSinceEpoch(),
+            'end': self.end_edit.dateTime().toSecsSinceEpoch(),
+        }
+        for key, edit in [('slave', self.slave_edit), ('func', self.func_edit)]:
+            text = edit.text().strip()
+            if text:
+                filters[key] = int(text, 0)
+        addr = self.addr_edit.text().strip()
+        if addr:
+            if '-' in addr:
+                lo, hi = addr.split('-', 1)
+                filters['addr_range'] = (int(lo), int(hi))
+            else:
+                filters['addr'] = int(addr)
+        status = self.status_cb.currentText()
+        if status == 'errors':
+            filters['status'] = [s for s in STATUSES if s != 'ok']
+        elif status != 'all':
+            filters['status'] = status
+        return filters
+
+    def run_query(self):
+        try:
+            filters = self._filters()
+        except ValueError as e:
+            QtWidgets.QMessageBox.warning(self, '提示', f'查询条件无效: {e}')
+            return
+        rows = list(self.index.query(limit=MAX_ROWS, **filters))
+        self.result_table.setRowCount(len(rows))
+        for r, row in enumerate(rows):
+            values = [
+                time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(row['ts'])) + f".{int(row['ts'] * 1000) % 1000:03d}",
+                row['slave'], row['func'], row['start_addr'], row['end_addr'], row['status'],
+                '' if row['exception_code'] is None else row['exception_code'],
+                (row['request'] or b'').hex(' '), (row['response'] or b'').hex(' '),
+                f"{os.path.basename(row['path'])}:{row['line']}",
+            ]
+            for c, value in enumerate(values):
+                self.result_table.setItem(r, c, QtWidgets.QTableWidgetItem('' if value is None else str(value)))
+        self.result_table.resizeColumnsToContents()
+        summary = self.index.summary(**filters)
+        text = ', '.join(f'{k}={v}' for k, v in sorted(summary.items()))
+        shown = f'（显示前 {MAX_ROWS} 条）' if len(rows) >= MAX_ROWS else ''
+        self.summary_label.setText(f'{sum(summary.values())} 条事务: {text} {shown}')
+
+    def closeEvent(self, event):
+        if self.worker is not None:
+            self.worker.stop()
+            self.worker.wait(2000)
+        self.index.close()
+        event.accept()
@@ -6,13 +6,33 @@ import logging
 import os
 import pandas as pd
 from core.serial_manager import SerialManager
-from core.modbus_worker import ModbusWorker
+from core.modbus_worker import EngineBridge, EngineProcessBridge, SnifferWorker
+from core.engine_process import EngineProcess
+from core.learned_ranges import LearnedRanges, learned_path_for
+from core.engine import ModbusEngine, MODE_RTU
+from core.modbus_tcp import create_transport, parse_endpoint
+from core.gateway import ModbusGateway, register_limits_from_dataframe, validate_age_offset
+from core.stream import ValueStreamServer, DEFAULT_STREAM_PORT
+from core.shared_image import RegisterImageWriter, DEFAULT_IMAGE_NAME
+from core.transport import SerialTransport
+from core.register_map import RegisterMap, find_data_type_column
+from core.poll_plan import BIT_SPACES, parse_slave, split_by_port
+from core.value_store import ValueStore, SPACE_HOLDING
 from core.data_processor import DataProcessor
 from core.protocol import Protocol
 from core.project_manager import ProjectManager
-from ui.components import SerialConfigWidget, ParamTableWidget, CommLogWidget
+from core.frame_capture import FrameCaptureWriter
+from core.bus_timing import BusTimingAnalyzer
+from core.metrics import MetricsRegistry, counter_rates
+from core.profiling import FunctionProfiler, SamplingProfiler, MemoryTracer, call_in_loop
+from core.watchdog import StallWatchdog
+from ui.components import SerialConfigWidget, ParamTableWidget, CommLogWidget, SlaveHealthDialog
+from ui.log_analyzer_dialog import LogAnalyzerDialog
+from ui.bus_timing_dialog import BusTimingDialog
+from ui.metrics_dialog import MetricsDialog, format_hud
+from ui.command_dialog import CommandDialog
 from utils.excel_manager import ExcelManager
-from utils.log_manager import LogManager
+from utils.log_manager import setup_logging, get_category_logger, LOG_CATEGORIES
 from PyQt5.QtCore import QThread, pyqtSignal, QTimer
 import re
 
@@ -20,6 +40,7 @@ import re
 import pyqtgraph as pg
 import numpy as np
 import time
+import threading
 import requests
 import webbrowser
 import tempfile
@@ -28,16 +49,10 @@ import sys
 from PyQt5.QtWidgets import QProgressDialog
 from core.plugin_manager import PluginManager
 
-# 配置日志
+# 配置日志：统一由LogManager的队列监听线程写入UTF-8轮转文件
 log_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'modbus.log')
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(log_file, encoding='gb18030'),
-        logging.StreamHandler()
-    ]
-)
+log_manager = setup_logging(log_file, console=True)
+ui_log = get_category_logger('ui')
 
 LOCAL_VERSION = "0.0.1"
 
@@ -65,17 +80,70 @@ class MainWindow(QtWidgets.QMainWindow):
         # 创建插件管理器
         self.plugin_manager = PluginManager(self)
         
-        # 初始化UI
-        self._init_menu()
-        self._init_main_layout()
-        self.statusBar().showMessage('Ready')
-
-        # 状态变量
+        # 状态变量（构建参数表之前初始化，避免覆盖已加载的表格）
         self.ser = None
+        self.serial_manager = None
+        self.capture_writer = None
+        self.sniffer_worker = None
+        self.bus_timing = None
         self.polling = False
         self.current_sheet = None
         self.param_tables = {}
         self.param_dfs = {}
+        self.cell_index = {}
+        self._cell_index_port = ''
+        # 学到的轮询区间与 --headless 相同，保存在参数表所在目录
+        self.learned_path = learned_path_for('config_and_params.xlsx')
+        self.default_slave = 1
+        self.slave_health = []
+        self.port_health = {}
+        self.port_configs = {}
+        # 多串口轮询：所有串口在同一个异步引擎线程中轮询，结果写入共享数值表，界面定时刷新
+        # 可选在子进程中轮询（Tools > Poll in Separate Process），结果经共享内存送回
+        self.poll_worker = None
+        self.engine = None
+        self.polled_ports = []
+        # 随轮询运行的服务，设置来自LocalSettings的gateway_*/stream_*/shm_name项
+        # Modbus TCP 网关：把数值表作为TCP从站提供给其他上位机
+        self.gateway = None
+        # 本地数据流：NDJSON推送实时数值给外部程序
+        self.value_stream = None
+        # 共享内存寄存器映像：同机其他进程直接读取
+        self.image_writer = None
+        self.service_settings = {}
+        self.extra_serial_managers = {}
+        self.value_store = ValueStore()
+        self._store_version = 0
+        self.store_timer = QTimer(self)
+        self.store_timer.setInterval(200)
+        self.store_timer.timeout.connect(self.refresh_values)
+        # 运行指标：引擎记录请求各阶段耗时和错误计数，界面记录刷新延迟，状态栏显示摘要
+        self.metrics = MetricsRegistry()
+        self._hud_snapshot = self.metrics.snapshot()
+        # 性能分析（Tools > Profile）：{(类型, 线程): 分析器}，结果写入日志目录下的 profiles/
+        self.profilers = {}
+        self.memory_tracer = MemoryTracer()
+        # 界面卡顿检测：心跳定时器超过阈值未执行时记录界面线程的调用栈和卡顿时长
+        self.watchdog = StallWatchdog(threading.get_ident(), threshold_ms=250, metrics=self.metrics)
+        self.heartbeat_timer = QTimer(self)
+        self.heartbeat_timer.setInterval(self.watchdog.interval_ms)
+        self.heartbeat_timer.timeout.connect(self.watchdog.beat)
+        self.heartbeat_timer.start()
+        self.watchdog.start()
+
+        # 初始化UI
+        self._init_menu()
+        self._init_main_layout()
+        self.statusBar().showMessage('Ready')
+        self.health_label = QtWidgets.QLabel('')
+        self.statusBar().addPermanentWidget(self.health_label)
+        self.hud_label = QtWidgets.QLabel('')
+        self.hud_label.setToolTip('Tools > Performance Metrics 查看详情')
+        self.statusBar().addPermanentWidget(self.hud_label)
+        self.hud_timer = QTimer(self)
+        self.hud_timer.setInterval(1000)
+        self.hud_timer.timeout.connect(self.update_hud)
+        self.hud_timer.start()
 
         # 检查Excel文件
         self._check_excel_file()
@@ -103,11 +171,86 @@ class MainWindow(QtWidgets.QMainWindow):
         chart_action = tool_menu.addAction('Chart View')
         chart_action.triggered.connect(self.show_chart_view)
         
+        # 帧捕获：把所有收发帧写入二进制捕获文件
+        self.capture_action = tool_menu.addAction('Frame Capture')
+        self.capture_action.setCheckable(True)
+        self.capture_action.triggered.connect(self.toggle_capture)
+
+        # 只听模式：监听其他主站的通讯
+        self.sniff_action = tool_menu.addAction('Listen Only (Sniffer)')
+        self.sniff_action.setCheckable(True)
+        self.sniff_action.triggered.connect(self.toggle_sniffer)
+
+        # 总线时序分析：响应时间/帧间隔/占用率
+        bus_timing_action = tool_menu.addAction('Bus Timing')
+        bus_timing_action.triggered.connect(self.show_bus_timing)
+
+        # 运行指标：各阶段延迟直方图、错误计数、界面队列，可导出快照
+        metrics_action = tool_menu.addAction('Performance Metrics')
+        metrics_action.triggered.connect(self.show_metrics)
+
+        self.gateway_action = tool_menu.addAction('Modbus TCP Gateway')
+        self.gateway_action.setCheckable(True)
+        self.gateway_action.triggered.connect(self.toggle_gateway)
+
+        self.stream_action = tool_menu.addAction('Data Stream')
+        self.stream_action.setCheckable(True)
+        self.stream_action.triggered.connect(self.toggle_stream)
+
+        self.shm_action = tool_menu.addAction('Shared Memory Image')
+        self.shm_action.setCheckable(True)
+        self.shm_action.triggered.connect(self.toggle_shared_image)
+
+        # 在子进程中轮询：总线时序不受界面负载影响（开始轮询时生效）
+        self.process_action = tool_menu.addAction('Poll in Separate Process')
+        self.process_action.setCheckable(True)
+
+        # 轮询中即时读写：命令插入轮询，不必停止轮询
+        command_action = tool_menu.addAction('Read / Write')
+        command_action.triggered.connect(self.show_command_dialog)
+
+        slave_health_action = tool_menu.addAction('Slave Health')
+        slave_health_action.triggered.connect(self.show_slave_health)
+
+        log_analysis_action = tool_menu.addAction('Log Analysis')
+        log_analysis_action.triggered.connect(self.show_log_analysis)
+
+        # 性能分析：界面线程和轮询线程分别启停，停止时保存报告
+        profile_menu = tool_menu.addMenu('Profile')
+        self.profile_actions = {}
+        for kind, kind_label in (('cprofile', 'cProfile'), ('sampling', 'Sampling')):
+            for thread, thread_label in (('gui', 'GUI Thread'), ('poll', 'Poll Thread')):
+                action = profile_menu.addAction(f'{kind_label}: {thread_label}')
+                action.setCheckable(True)
+                action.triggered.connect(lambda checked, k=kind, t=thread: self.toggle_profiler(k, t, checked))
+                self.profile_actions[(kind, thread)] = action
+        profile_menu.addSeparator()
+        self.memory_trace_action = profile_menu.addAction('Memory Tracing')
+        self.memory_trace_action.setCheckable(True)
+        self.memory_trace_action.triggered.connect(self.toggle_memory_tracing)
+        profile_menu.addAction('Memory Snapshot', self.save_memory_snapshot)
+        profile_menu.addSeparator()
+        profile_menu.addAction('Open Profile Folder', self.open_profile_folder)
+
         tool_menu.addAction('Language')
         open_cfg_action = tool_menu.addAction('Open Config File')
         open_cfg_action.triggered.connect(self.open_config_file)
         restart_action = tool_menu.addAction('Restart')
         restart_action.triggered.connect(self.restart_app)
+
+        # 日志级别：按分类运行时调整
+        log_menu = tool_menu.addMenu('Log Level')
+        levels = log_manager.get_category_levels()
+        for category in LOG_CATEGORIES:
+            category_menu = log_menu.addMenu(category)
+            group = QtWidgets.QActionGroup(category_menu)
+            for level_name in ['DEBUG', 'INFO', 'WARNING', 'ERROR']:
+                action = category_menu.addAction(level_name)
+                action.setCheckable(True)
+                action.setChecked(levels.get(category) == logging.getLevelName(level_name))
+                group.addAction(action)
+                action.triggered.connect(
+                    lambda checked, c=category, l=level_name: log_manager.set_category_level(c, l))
         help_menu = menubar.addMenu('Help')
         help_menu.addAction('Manual')
         help_menu.addAction('About')
@@ -156,109 +299,57 @@ class MainWindow(QtWidgets.QMainWindow):
 
     def _build_all_tables(self):
         self.tab_widget.clear()
-        # 调试打印
-        print("DEBUG: build_all_tables - 开始构建表格")
+        ui_log.debug("build_all_tables - 开始构建表格")
         
         self.param_tables = {}
         self.param_dfs = {}
         valid_group_count = 0
         all_valid_dfs = []
-        try:
-            xls = pd.ExcelFile('config_and_params.xlsx')
-            sheets = xls.sheet_names
-        except Exception as e:
-            logging.error(f"打开Excel文件失败: {e}")
-            sheets = []
-        finally:
-            try:
-                xls.close()
-            except Exception:
-                pass
-        for sheet in sheets:
+        excel = ExcelManager('config_and_params.xlsx')
+        self.port_configs = excel.load_ports()
+        groups = excel.load_param_groups(self.default_slave)
+        for group_name, _, group_df in groups:
             try:
-                df = pd.read_excel('config_and_params.xlsx', sheet_name=sheet, header=1)
-                if 'name' not in df.columns or 'addr' not in df.columns:
-                    continue
-                group_indices = []
-                group_names = []
-                for idx, row in df.iterrows():
-                    name_val = str(row['name']).strip() if pd.notna(row['name']) else ''
-                    addr_val = str(row['addr']).strip() if pd.notna(row['addr']) else ''
-                    is_addr_invalid = (not addr_val or addr_val.lower() in ['nan', '']) or not str(addr_val).replace('.0','').isdigit()
-                    if name_val and is_addr_invalid:
-                        group_indices.append(idx)
-                        group_names.append(name_val)
-                group_indices.append(len(df))
-                for i in range(len(group_names)):
-                    start = group_indices[i] + 1
-                    end = group_indices[i+1] if i+1 < len(group_indices) else len(df)
-                    group_df = df.iloc[start:end].copy()
-                    group_df = group_df[group_df['addr'].apply(lambda x: pd.notna(x) and str(x).replace('.0','').isdigit())]
-                    group_df['addr'] = group_df['addr'].apply(lambda x: str(int(float(x))) if pd.notna(x) and str(x).replace('.0','').isdigit() else '')
-                    group_df = group_df[group_df['addr'] != '']
-                    if group_df.empty:
-                        continue
-                    
-                    # 修复dataType列，确保正确处理数据类型
-                    if 'dataType' in group_df.columns:
-                        # 修复NaN值和空字符串
-                        group_df['dataType'] = group_df['dataType'].apply(
-                            lambda x: 'UNSIGNED' if pd.isna(x) or str(x).upper() == 'NAN' or str(x).strip() == '' else str(x)
-                        )
-                        # 特殊处理：标记所有需要SIGNED类型的地址
-                        known_signed_addrs = ['10000', '10001', '10002', '10003', '10004', '10005', '10006', '10007', '10008', '10009', '10010', '10011', '10012']
-                        for addr in known_signed_addrs:
-                            if addr in group_df['addr'].values:
-                                idx = group_df[group_df['addr'] == addr].index
-                                if len(idx) > 0:
-                                    group_df.loc[idx, 'dataType'] = 'SIGNED'
-                                    print(f"DEBUG: 表格构建时修复地址{addr}的数据类型为SIGNED")
-                        
-                        # 打印所有SIGNED类型的地址，便于调试
-                        signed_addrs = group_df[group_df['dataType'].str.upper() == 'SIGNED']['addr'].tolist()
-                        if signed_addrs:
-                            print(f"DEBUG: 检测到SIGNED类型的地址: {', '.join(signed_addrs)}")
-                        
-                        # 确保所有SIGNED的dataType大写，以便后续处理
-                        group_df.loc[group_df['dataType'].str.upper() == 'SIGNED', 'dataType'] = 'SIGNED'
-                    
-                    if '当前值' not in group_df.columns:
-                        group_df['当前值'] = ''
-                    all_valid_dfs.append(group_df)
-                    show_cols = ['name', 'addr', '当前值']
-                    valid_df = group_df[show_cols].copy()
-                    group_size = 3
-                    group_count = self._get_group_count()
-                    n = len(valid_df)
-                    row_count = (n + group_count - 1) // group_count
-                    table = ParamTableWidget()
-                    table.setRowCount(row_count)
-                    table.setColumnCount(group_count * group_size)
-                    headers = []
-                    for j in range(group_count):
-                        headers.extend(['Data', 'Address', 'Value'])
-                    table.setHorizontalHeaderLabels(headers)
-                    for idx2 in range(n):
-                        r = idx2 % row_count
-                        g = idx2 // row_count
-                        base_col = g * group_size
-                        for c, col in enumerate(show_cols):
-                            item = QtWidgets.QTableWidgetItem(str(valid_df.iloc[idx2].get(col, '')))
-                            item.setTextAlignment(QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter)
-                            table.setItem(r, base_col + c, item)
-                    table.resizeRowsToContents()
-                    table.resizeColumnsToContents()
-                    self.tab_widget.addTab(table, group_names[i])
-                    self.param_tables[group_names[i]] = table
-                    self.param_dfs[group_names[i]] = valid_df
-                    valid_group_count += 1
+                if '当前值' not in group_df.columns:
+                    group_df['当前值'] = ''
+                all_valid_dfs.append(group_df)
+                show_cols = ['name', 'addr', '当前值']
+                # 轮询需要的从站、寄存器区和数据类型列随表格数据保留，但不显示
+                type_col = find_data_type_column(group_df.columns)
+                keep_cols = show_cols + [c for c in ['slave', 'port', 'space', type_col] if c in group_df.columns]
+                valid_df = group_df[keep_cols].copy()
+                group_size = 3
+                group_count = self._get_group_count()
+                n = len(valid_df)
+                row_count = (n + group_count - 1) // group_count
+                table = ParamTableWidget()
+                table.setRowCount(row_count)
+                table.setColumnCount(group_count * group_size)
+                headers = []
+                for j in range(group_count):
+                    headers.extend(['Data', 'Address', 'Value'])
+                table.setHorizontalHeaderLabels(headers)
+                for idx2 in range(n):
+                    r = idx2 % row_count
+                    g = idx2 // row_count
+                    base_col = g * group_size
+                    for c, col in enumerate(show_cols):
+                        item = QtWidgets.QTableWidgetItem(str(valid_df.iloc[idx2].get(col, '')))
+                        item.setTextAlignment(QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter)
+                        table.setItem(r, base_col + c, item)
+                table.resizeRowsToContents()
+                table.resizeColumnsToContents()
+                self.tab_widget.addTab(table, group_name)
+                self.param_tables[group_name] = table
+                self.param_dfs[group_name] = valid_df
+                valid_group_count += 1
             except Exception as e:
-                logging.error(f"处理Sheet {sheet}失败: {e}")
+                logging.error(f"处理分组 {group_name}失败: {e}")
                 continue
         # 添加全部通讯数据Tab（显示所有字段）
         if valid_group_count > 0 and all_valid_dfs:
             all_params = pd.concat(all_valid_dfs, ignore_index=True)
-            print(f"DEBUG: 合并所有参数表前的列: {all_params.columns.tolist()}")
+            ui_log.debug("合并所有参数表前的列: %s", all_params.columns.tolist())
             
             # 重命名列
             all_cols = list(all_params.columns)
@@ -278,15 +369,15 @@ class MainWindow(QtWidgets.QMainWindow):
                 all_params = all_params.rename(columns=rename_map)
                 
             all_cols = list(all_params.columns)
-            print(f"DEBUG: 重命名后的列: {all_cols}")
+            ui_log.debug("重命名后的列: %s", all_cols)
             
             # 确保Current Value列为空，不继承attribute列的值
             if 'Current Value' in all_params.columns:
                 all_params['Current Value'] = ''
                 
-            # 打印一行数据示例，便于调试
+            # 记录一行数据示例，便于调试
             if not all_params.empty:
-                print(f"DEBUG: 第一行数据示例: {all_params.iloc[0].to_dict()}")
+                ui_log.debug("第一行数据示例: %s", all_params.iloc[0].to_dict())
             
             n = len(all_params)
             table = ParamTableWidget()
@@ -306,6 +397,7 @@ class MainWindow(QtWidgets.QMainWindow):
             self.current_sheet = self.tab_widget.tabText(0)
             # 设置"All Parameters"为当前活动标签页
             self.tab_widget.setCurrentIndex(0)
+        self._build_cell_index()
         if valid_group_count == 0:
             self.statusBar().showMessage('No valid parameter group found')
         else:
@@ -359,6 +451,7 @@ class MainWindow(QtWidgets.QMainWindow):
                 self.tab_widget.insertTab(idx, table, sheet)
                 self.param_tables[sheet] = table
                 self.param_dfs[sheet] = valid_df
+                self._build_cell_index()
             except Exception as e:
                 logging.error(f"Failed to lazy load sheet {sheet}: {e}")
         self.current_sheet = sheet
@@ -378,6 +471,12 @@ class MainWindow(QtWidgets.QMainWindow):
                 )
                 if self.serial_manager.open():
                     self.ser = self.serial_manager.ser
+                    if self.capture_writer is not None:
+                        self.serial_manager.add_frame_listener(self.capture_writer)
+                    self.bus_timing = BusTimingAnalyzer.for_serial_manager(self.serial_manager)
+                    self.serial_manager.add_frame_listener(self.bus_timing)
+                    if hasattr(self, 'bus_timing_dialog'):
+                        self.bus_timing_dialog.set_live_analyzer(self.bus_timing)
                     logging.info(f"串口打开成功: {config['port']}")
                     self.save_serial_config_to_excel(config)
                     self.open_btn.setText('Close Port')
@@ -392,6 +491,8 @@ class MainWindow(QtWidgets.QMainWindow):
         else:
             if self.polling:
                 self.toggle_polling()
+            if self.sniffer_worker is not None:
+                self.toggle_sniffer(False)
             try:
                 logging.info(f"准备关闭串口")
                 self.serial_manager.close()
@@ -418,58 +519,166 @@ class MainWindow(QtWidgets.QMainWindow):
                 all_params = all_params[all_params['addr'].apply(lambda x: str(x).replace('.0','').isdigit())].copy()
                 all_params['addr'] = all_params['addr'].apply(lambda x: int(float(x)))
                 all_params.sort_values('addr', inplace=True)
-                self.poll_worker = ModbusWorker(
-                    self.ser,
-                    all_params,
-                    1,
-                    self.serial_config.mode_cb.currentText()
-                )
-                self.poll_worker.comm_signal.connect(self.on_comm_signal)
-                self.poll_worker.msg_signal.connect(self.on_msg_signal)
-                self.poll_worker.data_signal.connect(self.on_data_signal)
-                self.poll_worker.start()
+                self.value_store.clear()
+                self.port_health = {}
+                if self.process_action.isChecked():
+                    self._start_engine_process(all_params)
+                else:
+                    self._start_engine_thread(all_params)
+                self.store_timer.start()
                 self.polling = True
                 self.poll_btn.setText('Stop Polling')
                 self.poll_btn.setEnabled(True)
                 self.open_btn.setEnabled(False)
-                self.statusBar().showMessage('开始轮询')
+                self.process_action.setEnabled(False)
+                self.statusBar().showMessage(f'开始轮询，串口: {", ".join(self.polled_ports)}')
             except Exception as e:
+                self._stop_port_workers()
                 QtWidgets.QMessageBox.critical(self, '错误', f'开始轮询失败: {e}')
         else:
-            if hasattr(self, 'poll_worker'):
-                self.poll_worker.stop()
-                self.poll_worker.wait(2000)
-                self.poll_worker = None
+            self._stop_port_workers()
             self.polling = False
             self.poll_btn.setText('Start Polling')
             # 只有串口未关闭时可重新启用轮询按钮
             self.poll_btn.setEnabled(self.ser is not None)
             self.open_btn.setEnabled(True)
+            self.process_action.setEnabled(True)
             self.statusBar().showMessage('停止轮询')
 
+    def _start_engine_thread(self, all_params):
+        # 所有串口共用一个事件循环线程，各串口的请求并发进行；''为主串口
+        self.engine = ModbusEngine(self.value_store, metrics=self.metrics, learned=LearnedRanges(self.learned_path))
+        for port, port_params in split_by_port(all_params).items():
+            if port in ('', self.serial_manager.port):
+                self._add_engine_port(self.serial_manager, port_params,
+                                      self.serial_config.mode_cb.currentText())
+            else:
+                self._start_extra_port(port, port_params)
+        if not self.engine.ports:
+            raise Exception("没有可轮询的串口")
+        if self.gateway_action.isChecked():
+            self._start_gateway(all_params)
+        if self.stream_action.isChecked():
+            self._start_stream()
+        if self.shm_action.isChecked():
+            self._start_shared_image()
+        self.poll_worker = EngineBridge(self.engine, self.serial_manager.port)
+        self.poll_worker.comm_signal.connect(self.on_comm_signal)
+        self.poll_worker.msg_signal.connect(self.on_msg_signal)
+        self.poll_worker.health_signal.connect(self.on_health_signal)
+        self.poll_worker.command_signal.connect(self.on_command_signal)
+        self.poll_worker.start()
+        self.polled_ports = list(self.engine.ports)
+
+    def _start_engine_process(self, all_params):
+        """子进程独占串口轮询：主串口在界面进程中先释放，停止轮询后重新打开"""
+        if self.gateway_action.isChecked() or self.stream_action.isChecked() or self.shm_action.isChecked():
+            self.on_msg_signal('子进程轮询时不提供 Modbus TCP 网关、数据流和共享内存映像')
+        main = self.serial_manager
+        specs = []
+        for port, port_params in split_by_port(all_params).items():
+            config = self.serial_config.get_config()
+            if port in ('', main.port):
+                port = main.port
+            else:
+                config.update(self.port_configs.get(port, {}))
+            spec = {'port': port, 'params': port_params, 'mode': config['mode'], 'default_slave': self.default_slave}
+            if parse_endpoint(port) is not None:
+                spec['endpoint'] = {'connections': config.get('connections', 2), 'inflight': config.get('inflight', 4)}
+            else:
+                spec['serial'] = {key: config[key] for key in ('baudrate', 'bytesize', 'parity', 'stopbits')}
+                spec['serial']['timeout'] = 1
+                if port != main.port:
+                    # 不打开，只用于把子进程的收发帧转给帧捕获
+                    extra = SerialManager(port=port)
+                    if self.capture_writer is not None:
+                        extra.add_frame_listener(self.capture_writer)
+                    self.extra_serial_managers[port] = extra
+            specs.append(spec)
+        serial_managers = dict(self.extra_serial_managers)
+        serial_managers[main.port] = main
+        main.close()
+        self.poll_worker = EngineProcessBridge(EngineProcess(specs, self.value_store, learned_path=self.learned_path), main.port, serial_managers)
+        self.poll_worker.comm_signal.connect(self.on_comm_signal)
+        self.poll_worker.msg_signal.connect(self.on_msg_signal)
+        self.poll_worker.health_signal.connect(self.on_health_signal)
+        self.poll_worker.command_signal.connect(self.on_command_signal)
+        self.poll_worker.start()
+        self.polled_ports = [spec['port'] for spec in specs]
+
+    def _add_engine_port(self, serial_manager, params, mode):
+        self.engine.add_port(SerialTransport(serial_manager), params, self.default_slave, mode,
+                             timeout=serial_manager.timeout or 1.0)
+
+    def _start_extra_port(self, port, params):
+        """打开附加串口：通信参数取自Ports页，未配置的项沿用主串口设置；tcp://、rtu+tcp:// 为网络端点"""
+        config = self.serial_config.get_config()
+        config.update(self.port_configs.get(port, {}))
+        if parse_endpoint(port) is not None:
+            # 网络端点由引擎在事件循环中连接
+            transport = create_transport(port, config.get('connections', 2), config.get('inflight', 4))
+            self.engine.add_port(transport, params, self.default_slave, MODE_RTU)
+            return
+        serial_manager = SerialManager(
+            port=port,
+            baudrate=config['baudrate'],
+            bytesize=config['bytesize'],
+            parity=config['parity'],
+            stopbits=config['stopbits'],
+            timeout=1
+        )
+        if not serial_manager.open():
+            self.on_msg_signal(f'打开串口 {port} 失败，跳过该串口的参数')
+            return
+        if self.capture_writer is not None:
+            serial_manager.add_frame_listener(self.capture_writer)
+        self.extra_serial_managers[port] = serial_manager
+        self._add_engine_port(serial_manager, params, config['mode'])
+
+    def _stop_port_workers(self):
+        # 轮询线程结束前停止它的分析器
+        for kind in ('cprofile', 'sampling'):
+            if (kind, 'poll') in self.profilers:
+                self.profile_actions[(kind, 'poll')].setChecked(False)
+                self.toggle_profiler(kind, 'poll', False)
+        if self.poll_worker is not None:
+            self.poll_worker.stop()
+            self.poll_worker.wait(3000)
+            if isinstance(self.poll_worker, EngineProcessBridge) and self.ser is not None:
+                # 子进程已释放主串口，重新打开
+                if self.serial_manager.open():
+                    self.ser = self.serial_manager.ser
+                else:
+                    self.on_msg_signal(f'重新打开串口 {self.serial_manager.port} 失败')
+        self.poll_worker = None
+        self.engine = None
+        self.gateway = None
+        self.value_stream = None
+        self.image_writer = None
+        for serial_manager in self.extra_serial_managers.values():
+            if self.capture_writer is not None:
+                serial_manager.remove_frame_listener(self.capture_writer)
+            serial_manager.close()
+        self.extra_serial_managers = {}
+        self.store_timer.stop()
+        self.refresh_values()
+
     def on_comm_signal(self, typ, content):
+        # 只有轮询线程的信号经过队列；子进程轮询时信号在界面线程中直接发出
+        if self.engine is not None:
+            self.metrics.incr('ui_signals_handled')
         # 移除(len=...)内容
         content = re.sub(r'\s*\(len=\d+\)', '', content)
         if typ == 'send':
             self.comm_log.append(f'<span style="color: #00ff99;">[Send] {content}</span>')
-            try:
-                print(content)
-            except Exception:
-                print('发送内容包含无法显示的字符，已跳过')
         else:
             self.comm_log.append(f'<span style="color: #ffff66;">[Receive] {content}</span>')
-            try:
-                print(content)
-            except Exception:
-                print('接收内容包含无法显示的字符，已跳过')
 
     def on_msg_signal(self, msg):
         self.comm_log.append(f'<span style="color: #ff9800;">{msg}</span>')
 
     def on_data_signal(self, addr, value):
-        print(f"on_data_signal called: addr={addr}, value={value}")
-        # 增加日志，查看接收的数据
-        print(f"DEBUG: on_data_signal - 接收到地址 {addr} 的数据，解码值为 {value}")
+        ui_log.debug("on_data_signal - 接收到地址 %s 的数据，解码值为 %s", addr, value)
         
         # 更新所有分组（所有tab）中的参数值
         for sheet, table in self.param_tables.items():
@@ -479,12 +688,426 @@ class MainWindow(QtWidgets.QMainWindow):
         if 'All Parameters' in self.param_dfs:
             df = self.param_dfs['All Parameters']
             idxs = df.index[df['Address'] == str(addr)].tolist()
-            print(f"DEBUG: on_data_signal - 找到地址 {addr} 在 All Parameters DataFrame中的行索引: {idxs}")
-            
             if 'Current Value' in df.columns:
                 for idx in idxs:
                     df.at[idx, 'Current Value'] = value
 
+    def _build_cell_index(self):
+        """建立 (端口, 从站, 寄存器区, 地址) -> [(表格, 行, 列, DataFrame, DataFrame行, DataFrame列)] 索引，
+        表格加载或重新排列后调用，refresh_values 按索引直接定位单元格。
+        端口列为空或写明主串口的行都以 '' 为键，主串口变化时 refresh_values 重建索引"""
+        main_port = self._main_port()
+        self._cell_index_port = main_port
+        index = {}
+        for sheet, df in self.param_dfs.items():
+            table = self.param_tables.get(sheet)
+            if table is None or df.empty:
+                continue
+            all_params = sheet == 'All Parameters'
+            addr_col, value_col = ('Address', 'Current Value') if all_params else ('addr', '当前值')
+            if addr_col not in df.columns or value_col not in df.columns:
+                continue
+            n = len(df)
+            # 延迟加载的工作表没有 port/slave/space 列，属于主串口默认从站的保持寄存器
+            ports = df['port'].tolist() if 'port' in df.columns else [''] * n
+            slaves = df['slave'].tolist() if 'slave' in df.columns else [self.default_slave] * n
+            spaces = df['space'].tolist() if 'space' in df.columns else [SPACE_HOLDING] * n
+            df_col = df.columns.get_loc(value_col)
+            row_count = max(1, table.rowCount())
+            for i, (port, slave, space, addr) in enumerate(zip(ports, slaves, spaces, df[addr_col].tolist())):
+                text = str(addr).strip()
+                if text.endswith('.0'):
+                    text = text[:-2]
+                if not text.isdigit():
+                    continue
+                if all_params:
+                    row, col = i, df_col
+                else:
+                    row, col = i % row_count, (i // row_count) * 3 + 2
+                port = port if isinstance(port, str) else ''
+                key = ('' if port in ('', main_port) else port, parse_slave(slave) or self.default_slave,
+                       space if isinstance(space, str) and space else SPACE_HOLDING, int(text))
+                index.setdefault(key, []).append((table, row, col, df, i, df_col))
+        self.cell_index = index
+
+    def _main_port(self):
+        return self.serial_manager.port if self.serial_manager is not None else ''
+
+    def refresh_values(self):
+        """定时从共享数值表取出变化的值，按单元格索引更新表格，每个单元格只接收它所属串口、从站和寄存器区的值"""
+        version, changes = self.value_store.changed_since(self._store_version)
+        self._store_version = version
+        metrics = self.metrics
+        metrics.set_gauge('ui_pending_values', len(changes))
+        if not changes:
+            return
+        started = time.monotonic()
+        main_port = self._main_port()
+        if main_port != self._cell_index_port:
+            self._build_cell_index()
+        index = self.cell_index
+        for (port, slave, space, addr), stored in changes:
+            cells = index.get(('' if port == main_port else port, slave, space, addr))
+            if not cells:
+                continue
+            value = str(stored.value)
+            for table, row, col, df, df_row, df_col in cells:
+                item = table.item(row, col)
+                if item is None:
+                    item = QtWidgets.QTableWidgetItem(value)
+                    item.setTextAlignment(QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter)
+                    table.setItem(row, col, item)
+                else:
+                    item.setText(value)
+                df.iat[df_row, df_col] = value
+        # 写入数值表到表格刷新完成的延迟，变化很多时抽样记录
+        now = time.time()
+        step = max(1, len(changes) // 200)
+        metrics.observe_many([('render_ms', (now - stored.ts) * 1000) for _, stored in changes[::step]] +
+                             [('refresh_ms', (time.monotonic() - started) * 1000)],
+                             {'frames_rendered': 1, 'values_rendered': len(changes)})
+
+    def update_hud(self):
+        metrics = self.metrics
+        metrics.set_gauge('ui_queue_depth', max(0, metrics.counter('ui_signals_queued') -
+                                                metrics.counter('ui_signals_handled')))
+        snap = metrics.snapshot()
+        rates = counter_rates(self._hud_snapshot, snap)
+        self._hud_snapshot = snap
+        if not snap['counters']['requests']:
+            self.hud_label.setText('')
+            return
+        self.hud_label.setText(format_hud(snap, rates))
+
+    def show_metrics(self):
+        if hasattr(self, 'metrics_dialog') and self.metrics_dialog.isVisible():
+            self.metrics_dialog.activateWindow()
+            return
+        self.metrics_dialog = MetricsDialog(self.metrics, self)
+        self.metrics_dialog.show()
+
+    def on_health_signal(self, health):
+        if health:
+            self.port_health[health[0]['port']] = health
+        health = [h for port in sorted(self.port_health) for h in self.port_health[port]]
+        self.slave_health = health
+        multi_port = len(self.port_health) > 1
+        dead = [f"{h['port']}:{h['slave']}" if multi_port else str(h['slave'])
+                for h in health if h['state'] == 'dead']
+        text = f'从站 {len(health) - len(dead)}/{len(health)} 在线'
+        if dead:
+            text += f'，离线: {", ".join(dead)}'
+        self.health_label.setText(text)
+        if hasattr(self, 'slave_health_dialog') and self.slave_health_dialog.isVisible():
+            self.slave_health_dialog.update_health(health)
+
+    def show_command_dialog(self):
+        if not self.polling or not hasattr(self.poll_worker, 'submit_command'):
+            QtWidgets.QMessageBox.warning(self, '警告', '请先开始轮询')
+            return
+        if hasattr(self, 'command_dialog') and self.command_dialog.isVisible():
+            self.command_dialog.activateWindow()
+            return
+        self.command_dialog = CommandDialog(self.polled_ports, self.default_slave, self.submit_command, self)
+        self.command_dialog.show()
+
+    def submit_command(self, port, command):
+        """命令放入轮询引擎的命令队列，结果经 on_command_signal 返回"""
+        if not self.polling or not hasattr(self.poll_worker, 'submit_command'):
+            raise Exception('轮询未运行')
+        return self.poll_worker.submit_command(port, command)
+
+    def on_command_signal(self, port, command, response):
+        if hasattr(self, 'command_dialog'):
+            self.command_dialog.on_result(port, command, response)
+
+    def show_slave_health(self):
+        if hasattr(self, 'slave_health_dialog') and self.slave_health_dialog.isVisible():
+            self.slave_health_dialog.activateWindow()
+            return
+        self.slave_health_dialog = SlaveHealthDialog(self)
+        self.slave_health_dialog.update_health(self.slave_health)
+        self.slave_health_dialog.show()
+
+    def toggle_sniffer(self, checked):
+        if checked:
+            if self.ser is None:
+                QtWidgets.QMessageBox.warning(self, '警告', '请先打开串口')
+                self.sniff_action.setChecked(False)
+                return
+            if self.polling:
+                QtWidgets.QMessageBox.warning(self, '警告', '监听模式下不能轮询，请先停止轮询')
+                self.sniff_action.setChecked(False)
+                return
+            if self.serial_config.mode_cb.currentText() != 'RTU':
+                QtWidgets.QMessageBox.warning(self, '警告', '监听模式仅支持RTU')
+                self.sniff_action.setChecked(False)
+                return
+            register_map = RegisterMap()
+            if self.param_dfs:
+                import pandas as pd
+                params = pd.concat(self.param_dfs.values(), ignore_index=True)
+                if 'space' in params.columns:
+                    # 监听只解码寄存器读响应
+                    params = params[~params['space'].isin(BIT_SPACES)]
+                register_map = RegisterMap.from_dataframe(params)
+            # 监听时缩短读超时，提高帧间隔判断的时间分辨率
+            self.serial_manager.ser.timeout = 0.05
+            # 只听模式下由分帧器直接提供实测的帧起止时间
+            self.serial_manager.remove_frame_listener(self.bus_timing)
+            self.sniffer_worker = SnifferWorker(self.serial_manager, register_map, timing=self.bus_timing)
+            self.sniffer_worker.comm_signal.connect(self.on_comm_signal)
+            self.sniffer_worker.msg_signal.connect(self.on_msg_signal)
+            self.sniffer_worker.data_signal.connect(self.on_data_signal)
+            self.sniffer_worker.start()
+            self.poll_btn.setEnabled(False)
+            self.open_btn.setEnabled(False)
+            self.statusBar().showMessage('监听中（只听不发）')
+        elif self.sniffer_worker is not None:
+            self.sniffer_worker.stop()
+            self.sniffer_worker.wait(2000)
+            self.sniffer_worker = None
+            if self.serial_manager is not None and self.serial_manager.ser is not None:
+                self.serial_manager.ser.timeout = self.serial_manager.timeout
+            if self.serial_manager is not None and self.bus_timing is not None:
+                self.serial_manager.add_frame_listener(self.bus_timing)
+            self.sniff_action.setChecked(False)
+            self.poll_btn.setEnabled(self.ser is not None)
+            self.open_btn.setEnabled(True)
+            self.statusBar().showMessage('停止监听')
+
+    def toggle_capture(self, checked):
+        if checked:
+            default_name = time.strftime('capture_%Y%m%d_%H%M%S.mbcap')
+            file_name, _ = QtWidgets.QFileDialog.getSaveFileName(
+                self,
+                "Save Frame Capture",
+                default_name,
+                "Modbus Capture (*.mbcap)"
+            )
+            if not file_name:
+                self.capture_action.setChecked(False)
+                return
+            try:
+                self.capture_writer = FrameCaptureWriter(file_name)
+            except Exception as e:
+                self.capture_action.setChecked(False)
+                QtWidgets.QMessageBox.critical(self, '错误', f'创建捕获文件失败: {e}')
+                return
+            if self.serial_manager is not None:
+                self.serial_manager.add_frame_listener(self.capture_writer)
+            self.statusBar().showMessage(f'帧捕获: {file_name}')
+        elif self.capture_writer is not None:
+            if self.serial_manager is not None:
+                self.serial_manager.remove_frame_listener(self.capture_writer)
+            self.capture_writer.close()
+            self.statusBar().showMessage(f'帧捕获已停止，共 {self.capture_writer.frame_count} 帧')
+            self.capture_writer = None
+
+    def toggle_gateway(self, checked):
+        """网关随轮询运行：轮询中勾选立即启动，否则在下次开始轮询时启动"""
+        if checked:
+            if self.polling and self.engine is not None:
+                all_params = pd.concat(self.param_dfs.values(), ignore_index=True)
+                self._start_gateway(all_params)
+            else:
+                self.statusBar().showMessage('Modbus TCP 网关将在开始轮询时启动')
+        elif self.gateway is not None:
+            if self.engine is not None:
+                self.engine.remove_service(self.gateway.serve)
+            self.gateway = None
+            self.statusBar().showMessage('Modbus TCP 网关已停止')
+
+    def _start_gateway(self, all_params):
+        settings = self.service_settings
+        try:
+            port = int(float(settings.get('gateway_port', 502)))
+            max_age = float(settings['gateway_max_age']) if 'gateway_max_age' in settings else None
+            age_offset = int(float(settings['gateway_age_offset'])) if 'gateway_age_offset' in settings else None
+            validate_age_offset(age_offset, all_params, self.default_slave)
+        except ValueError as e:
+            self.on_msg_signal(f'网关设置无效: {e}')
+            return
+        limits = {}
+        for port_key, port_params in split_by_port(all_params).items():
+            limits.update(register_limits_from_dataframe(port_params, port_key or self.serial_manager.port,
+                                                         self.default_slave))
+        self.gateway = ModbusGateway(
+            self.value_store,
+            self.engine,
+            host=settings.get('gateway_host', '0.0.0.0'),
+            port=port,
+            primary_port=self.serial_manager.port,
+            max_age=max_age,
+            register_max_age=limits,
+            age_offset=age_offset
+        )
+        self.engine.add_service(self.gateway.serve)
+        self.statusBar().showMessage(f'Modbus TCP 网关: {self.gateway.host}:{port}')
+
+    def toggle_stream(self, checked):
+        """数据流随轮询运行：轮询中勾选立即启动，否则在下次开始轮询时启动"""
+        if checked:
+            if self.polling and self.engine is not None:
+                self._start_stream()
+            else:
+                self.statusBar().showMessage('数据流将在开始轮询时启动')
+        elif self.value_stream is not None:
+            if self.engine is not None:
+                self.engine.remove_service(self.value_stream.serve)
+            self.value_stream = None
+            self.statusBar().showMessage('数据流已停止')
+
+    def _start_stream(self):
+        settings = self.service_settings
+        try:
+            port = int(float(settings.get('stream_port', DEFAULT_STREAM_PORT)))
+        except ValueError as e:
+            self.on_msg_signal(f'数据流设置无效: {e}')
+            return
+        # 分组 -> (端口, 从站, 地址)，供订阅按分组过滤
+        group_index = {}
+        for name, df in self.param_dfs.items():
+            if name == 'All Parameters' or 'addr' not in df.columns:
+                continue
+            ports = df['port'] if 'port' in df.columns else [''] * len(df)
+            slaves = df['slave'] if 'slave' in df.columns else [self.default_slave] * len(df)
+            group_index[name] = {(port or self.serial_manager.port, int(slave), int(float(addr)))
+                                 for port, slave, addr in zip(ports, slaves, df['addr'])
+                                 if str(addr).replace('.0', '').isdigit()}
+        self.value_stream = ValueStreamServer(
+            self.value_store,
+            host=settings.get('stream_host', '127.0.0.1'),
+            port=port,
+            unix_path=settings.get('stream_path'),
+            group_index=group_index
+        )
+        self.engine.add_service(self.value_stream.serve)
+        self.statusBar().showMessage(f'数据流: {self.value_stream.address}')
+
+    def toggle_shared_image(self, checked):
+        """共享内存映像随轮询运行，停止轮询时删除"""
+        if checked:
+            if self.polling and self.engine is not None:
+                self._start_shared_image()
+            else:
+                self.statusBar().showMessage('共享内存映像将在开始轮询时创建')
+        elif self.image_writer is not None:
+            if self.engine is not None:
+                self.engine.remove_service(self._image_service)
+            self.image_writer = None
+            self.statusBar().showMessage('共享内存映像已关闭')
+
+    def _start_shared_image(self):
+        name = self.service_settings.get('shm_name', DEFAULT_IMAGE_NAME)
+        try:
+            self.image_writer = RegisterImageWriter(name, capacity=self._image_capacity())
+        except Exception as e:
+            self.on_msg_signal(f'创建共享内存失败: {e}')
+            return
+        self.engine.add_service(self._image_service)
+        self.statusBar().showMessage(f'共享内存映像: {name}')
+
+    def _image_capacity(self):
+        """按参数表中的地址数确定映像容量，另留256个槽给参数表以外的地址"""
+        count = sum(len(register_map.points) for port in self.engine.ports.values()
+                    for register_map in port.register_maps.values())
+        return count + 256
+
+    async def _image_service(self):
+        await self.image_writer.serve_store(self.value_store)
+
+    def show_bus_timing(self):
+        if hasattr(self, 'bus_timing_dialog') and self.bus_timing_dialog.isVisible():
+            self.bus_timing_dialog.activateWindow()
+            return
+        baudrate = int(self.serial_config.get_config()['baudrate'])
+        self.bus_timing_dialog = BusTimingDialog(self.bus_timing, baudrate, self)
+        self.bus_timing_dialog.show()
+
+    def show_log_analysis(self):
+        if hasattr(self, 'log_dialog') and self.log_dialog.isVisible():
+            self.log_dialog.activateWindow()
+            return
+        self.log_dialog = LogAnalyzerDialog(os.path.dirname(os.path.abspath(log_file)), self)
+        self.log_dialog.show()
+
+    @property
+    def profile_dir(self):
+        return os.path.join(os.path.dirname(os.path.abspath(log_file)), 'profiles')
+
+    def toggle_profiler(self, kind, thread, checked):
+        key = (kind, thread)
+        if checked:
+            try:
+                self.profilers[key] = self._start_profiler(kind, thread)
+            except Exception as e:
+                self.profile_actions[key].setChecked(False)
+                QtWidgets.QMessageBox.warning(self, '警告', f'启动性能分析失败: {e}')
+                return
+            self.statusBar().showMessage(f'性能分析已开始: {self.profile_actions[key].text()}')
+            return
+        profiler = self.profilers.pop(key, None)
+        if profiler is None:
+            return
+        try:
+            if kind == 'cprofile' and thread == 'poll' and self.engine is not None and self.engine.loop is not None:
+                # cProfile 必须在被分析的线程中停止
+                call_in_loop(self.engine.loop, profiler.stop)
+            else:
+                profiler.stop()
+            paths = profiler.save(self.profile_dir)
+        except Exception as e:
+            ui_log.error(f"保存性能分析结果失败: {e}", exc_info=True)
+            QtWidgets.QMessageBox.critical(self, '错误', f'保存性能分析结果失败: {e}')
+            return
+        ui_log.info("性能分析结果: %s", ', '.join(paths))
+        self.statusBar().showMessage(f'性能分析已保存: {paths[0]}')
+
+    def _start_profiler(self, kind, thread):
+        loop = None
+        if thread == 'poll':
+            if self.engine is None or self.engine.loop is None:
+                raise Exception('轮询线程未运行（子进程轮询时不支持）')
+            loop = self.engine.loop
+        if kind == 'cprofile':
+            profiler = FunctionProfiler(thread)
+            if loop is None:
+                profiler.start()
+            else:
+                call_in_loop(loop, profiler.start)
+            return profiler
+        thread_id = threading.get_ident() if loop is None else call_in_loop(loop, threading.get_ident)
+        profiler = SamplingProfiler(thread, thread_id)
+        profiler.start()
+        return profiler
+
+    def toggle_memory_tracing(self, checked):
+        if checked:
+            self.memory_tracer.start()
+            self.statusBar().showMessage('内存跟踪已开启（Memory Snapshot 保存报告）')
+        else:
+            self.memory_tracer.stop()
+            self.statusBar().showMessage('内存跟踪已关闭')
+
+    def save_memory_snapshot(self):
+        if not self.memory_tracer.running:
+            # 未开启时先开启，本次快照只包含开启之后的分配
+            self.memory_trace_action.setChecked(True)
+            self.memory_tracer.start()
+        try:
+            paths = self.memory_tracer.save_snapshot(self.profile_dir)
+        except Exception as e:
+            ui_log.error(f"保存内存快照失败: {e}", exc_info=True)
+            QtWidgets.QMessageBox.critical(self, '错误', f'保存内存快照失败: {e}')
+            return
+        ui_log.info("内存快照: %s", ', '.join(paths))
+        self.statusBar().showMessage(f'内存快照已保存: {paths[1]}')
+
+    def open_profile_folder(self):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        QtGui.QDesktopServices.openUrl(QtCore.QUrl.fromLocalFile(self.profile_dir))
+
     def show_comm_log_menu(self, pos):
         menu = QtWidgets.QMenu(self)
         copy_action = menu.addAction('Copy')
@@ -517,10 +1140,18 @@ class MainWindow(QtWidgets.QMainWindow):
         """Handle window close event"""
         # 卸载插件
         self.plugin_manager.unload_plugins()
+        for kind, thread in list(self.profilers):
+            self.toggle_profiler(kind, thread, False)
+        self.heartbeat_timer.stop()
+        self.watchdog.stop()
         if self.polling:
             self.toggle_polling()
+        if self.sniffer_worker is not None:
+            self.toggle_sniffer(False)
         if self.ser is not None:
             self.ser.close()
+        if self.capture_writer is not None:
+            self.capture_writer.close()
         event.accept()
 
     def _check_excel_file(self):
@@ -578,13 +1209,14 @@ class MainWindow(QtWidgets.QMainWindow):
                     r = idx % row_count
                     g = idx // row_count
                     base_col = g * group_size
-                    for c, col in enumerate(['name', 'addr', 'Current Value']):
+                    for c, col in enumerate(['name', 'addr', '当前值']):
                         item = QtWidgets.QTableWidgetItem(str(df.iloc[idx].get(col, '')))
                         item.setTextAlignment(QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter)
                         table.setItem(r, base_col + c, item)
                 table.resizeRowsToContents()
                 table.resizeColumnsToContents()
                 table.horizontalHeader().setSectionResizeMode(QtWidgets.QHeaderView.Stretch)
+        self._build_cell_index()
         return super().resizeEvent(event)
 
     def save_serial_config_to_excel(self, config):
@@ -663,6 +1295,15 @@ class MainWindow(QtWidgets.QMainWindow):
                 if stopbits not in ['1', '2']:
                     stopbits = '1'
                 self.serial_config.stop_cb.setCurrentText(stopbits)
+                # 恢复默认从站地址（参数表未指定从站的分组使用）
+                self.default_slave = parse_slave(config.get('slave')) or 1
+                # 网关/数据流设置
+                self.service_settings = {}
+                for key in ('gateway_host', 'gateway_port', 'gateway_max_age', 'gateway_age_offset',
+                            'stream_host', 'stream_port', 'stream_path', 'shm_name'):
+                    val = config.get(key)
+                    if val is not None and str(val).strip() not in ('', 'nan'):
+                        self.service_settings[key] = str(val).strip()
                 # 恢复mode
                 mode = str(config.get('mode', ''))
                 if mode and mode not in [self.serial_config.mode_cb.itemText(i) for i in range(self.serial_config.mode_cb.count())]:
@@ -755,7 +1396,7 @@ class MainWindow(QtWidgets.QMainWindow):
                 
             # 重新连接信号
             self.poll_worker.data_signal.connect(self.chart_window.update_data)
-            print("已连接 data_signal 到 chart_window.update_data")
+            ui_log.debug("已连接 data_signal 到 chart_window.update_data")
 
     def check_update(self):
         try:
@@ -868,7 +1509,6 @@ class ChartWindow(QtWidgets.QMainWindow):
         
         # 默认设置Y轴范围，确保负值正确显示
         self.plot_widget.setYRange(-5200, -3800)
-        print("DEBUG: 初始Y轴范围设置为 [-5200, -3800]")
         
         # 不再固定X轴范围，自动扩展
         # self.plot_widget.setXRange(0, 60, padding=0)
@@ -940,7 +1580,6 @@ class ChartWindow(QtWidgets.QMainWindow):
         
         # 强制初始设置为一个默认值
         self.title_value_label.setText("最新: -9999")
-        print("DEBUG: 初始化标题值设置为 '最新: -9999'")
         
         self.right_layout.addLayout(title_layout)
         self.right_layout.addSpacing(10)
@@ -1066,10 +1705,9 @@ class ChartWindow(QtWidgets.QMainWindow):
             if times and values:
                 try:
                     self.curves[addr].setData(times, values)
-                    print(f"DEBUG: 更新曲线 addr={addr}, 时间点数={len(times)}, 值范围=[{min(values)}, {max(values)}]")
                     return True
                 except Exception as e:
-                    print(f"DEBUG: 更新曲线错误: {str(e)}")
+                    ui_log.warning("更新曲线错误: %s", e)
         return False
     
     def clear_data(self):
@@ -1161,7 +1799,6 @@ class ChartWindow(QtWidgets.QMainWindow):
         event.accept()
 
     def update_data(self, addr, value):
-        print(f"update_data called: addr={addr}, value={value}")
         try:
             addr_int = int(addr)
             if addr_int in self.data:
@@ -1196,7 +1833,7 @@ class ChartWindow(QtWidgets.QMainWindow):
                     # 实时刷新（只setData，不plot_widget.update）
                     self._update_curve(addr_int)
         except Exception as e:
-            print(f"update_data error: {e}")
+            ui_log.warning("update_data error: %s", e)
 
 if __name__ == '__main__':
     app = QtWidgets.QApplication([])
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import time
+from PyQt5 import QtWidgets, QtCore
+from core.metrics import COUNTERS, GAUGES, STAGE_LATENCIES, counter_rates
+
+REFRESH_MS = 1000
+
+
+class MetricsDialog(QtWidgets.QDialog):
+    """运行指标详情：计数/每秒速率、瞬时值和各阶段延迟分位数，支持重置和导出快照"""
+
+    def __init__(self, metrics, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle('Performance Metrics')
+        self.resize(900, 700)
+        self.metrics = metrics
+        self._previous = metrics.snapshot()
+        self._init_ui()
+        self.timer = QtCore.QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(REFRESH_MS)
+        self.refresh()
+
+    def _init_ui(self):
+        vbox = QtWidgets.QVBoxLayout(self)
+
+        top = QtWidgets.QHBoxLayout()
+        self.summary_label = QtWidgets.QLabel('')
+        self.reset_btn = QtWidgets.QPushButton('Reset')
+        self.reset_btn.clicked.connect(self.reset_metrics)
+        self.export_btn = QtWidgets.QPushButton('Export...')
+        self.export_btn.clicked.connect(self.export_metrics)
+        top.addWidget(self.summary_label, 1)
+        top.addWidget(self.reset_btn)
+        top.addWidget(self.export_btn)
+        vbox.addLayout(top)
+
+        self.counter_table = self._table(['Counter', 'Description', 'Total', 'Per Second'])
+        vbox.addWidget(self.counter_table, 2)
+        self.gauge_table = self._table(['Gauge', 'Description', 'Current', 'Max'])
+        vbox.addWidget(self.gauge_table, 1)
+        self.latency_table = self._table(['Stage', 'Description', 'Count', 'Mean (ms)', 'p50', 'p95', 'p99',
+                                          'Max'])
+        vbox.addWidget(self.latency_table, 2)
+
+    @staticmethod
+    def _table(headers):
+        table = QtWidgets.QTableWidget()
+        table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        table.setColumnCount(len(headers))
+        table.setHorizontalHeaderLabels(headers)
+        table.horizontalHeader().setStretchLastSection(True)
+        table.verticalHeader().setVisible(False)
+        return table
+
+    @staticmethod
+    def _fill(table, rows):
+        table.setRowCount(len(rows))
+        for r, values in enumerate(rows):
+            for c, value in enumerate(values):
+                table.setItem(r, c, QtWidgets.QTableWidgetItem(str(value)))
+
+    def refresh(self):
+        snap = self.metrics.snapshot()
+        rates = counter_rates(self._previous, snap)
+        self._previous = snap
+        self.summary_label.setText(f"运行 {snap['uptime_s']:.0f} 秒（{time.strftime('%H:%M:%S')}）")
+        counters = snap['counters']
+        self._fill(self.counter_table, [
+            (name, COUNTERS.get(name, ''), value, f'{rates.get(name, 0.0):.1f}') for name, value in counters.items()])
+        self._fill(self.gauge_table, [
+            (name, GAUGES.get(name, ''), value, snap['gauge_max'].get(name, ''))
+            for name, value in snap['gauges'].items()])
+        rows = []
+        for name, stats in snap['latencies'].items():
+            rows.append((name, STAGE_LATENCIES.get(name, ''), stats.count, _fmt(stats.mean if stats.count else None),
+                         _fmt(stats.percentile(50)), _fmt(stats.percentile(95)), _fmt(stats.percentile(99)),
+                         _fmt(stats.max)))
+        self._fill(self.latency_table, rows)
+
+    def reset_metrics(self):
+        self.metrics.reset()
+        self._previous = self.metrics.snapshot()
+        self.refresh()
+
+    def export_metrics(self):
+        default_name = time.strftime('metrics_%Y%m%d_%H%M%S.json')
+        file_name, _ = QtWidgets.QFileDialog.getSaveFileName(
+            self,
+            "Export Metrics Snapshot",
+            default_name,
+            "JSON Files (*.json);;CSV Files (*.csv)"
+        )
+        if not file_name:
+            return
+        try:
+            self.metrics.export(file_name)
+            QtWidgets.QMessageBox.information(self, '提示', f'已导出: {file_name}')
+        except Exception as e:
+            QtWidgets.QMessageBox.critical(self, '错误', f'导出失败: {e}')
+
+    def closeEvent(self, event):
+        self.timer.stop()
+        event.accept()
+
+
+def format_hud(snap, rates):
+    """状态栏一行摘要"""
+    counters = snap['counters']
+    latencies = snap['latencies']
+    errors = counters['timeouts'] + counters['crc_errors'] + counters['frame_errors']
+    request = latencies['request_ms'].percentile(95)
+    render = latencies['render_ms'].percentile(95)
+    return (f"请求 {rates.get('requests', 0.0):.0f}/s | 错误 {errors} | 重试 {counters['retries']} | "
+            f"响应p95 {_fmt(request, 1) or '-'} ms | 界面p95 {_fmt(render, 0) or '-'} ms | "
+            f"队列 {snap['gauges']['ui_queue_depth']} | 卡顿 {counters['gui_stalls']}")
+
+
+def _fmt(value, digits=3):
+    return '' if value is None else f'{value:.{digits}f}'
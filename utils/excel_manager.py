@@ -1,7 +1,14 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import logging
 import pandas as pd
+from core.poll_plan import (find_slave_column, parse_slave, find_port_column, parse_port, find_space_column,
+                            parse_space)
+from core.value_store import SPACE_HOLDING
+from utils.log_manager import get_category_logger
+
+decode_log = get_category_logger('decode')
 
 class ExcelManager:
     """
@@ -79,6 +86,120 @@ class ExcelManager:
                     idx = df[df['addr'].astype(str) == addr].index
                     if len(idx) > 0:
                         df.loc[idx, 'dataType'] = 'SIGNED'
-                        print(f"DEBUG: Excel加载时修复地址{addr}的数据类型为SIGNED")
+                        decode_log.debug("Excel加载时修复地址%s的数据类型为SIGNED", addr)
         
         return df
+
+    def load_param_groups(self, default_slave: int = 1) -> list:
+        """
+        按分组加载所有sheet中的参数，返回 [(分组名, 从站地址, DataFrame)]。
+        分组行：name有值而addr为空/非数字的行，其后的有效地址行属于该分组。
+        从站地址取自可选的 slave 列：分组行上的值作用于整个分组，参数行上的值优先；
+        都没有时使用 default_slave。可选的 port 列按同样规则指定串口，空表示主串口；
+        可选的 space 列按同样规则指定寄存器区（holding/input/coil/discrete），空表示保持寄存器。
+        返回的DataFrame包含 slave、port 和 space 列，addr 为整数字符串。
+        """
+        try:
+            xls = pd.ExcelFile(self.filepath)
+            sheets = xls.sheet_names
+        except Exception as e:
+            logging.error(f"打开Excel文件失败: {e}")
+            return []
+        groups = []
+        try:
+            for sheet in sheets:
+                try:
+                    df = pd.read_excel(xls, sheet_name=sheet, header=1)
+                except Exception as e:
+                    logging.error(f"读取Sheet {sheet}失败: {e}")
+                    continue
+                if 'name' not in df.columns or 'addr' not in df.columns:
+                    continue
+                groups.extend(self._split_groups(df, default_slave))
+        finally:
+            xls.close()
+        return groups
+
+    @staticmethod
+    def _split_groups(df, default_slave):
+        slave_col = find_slave_column(df.columns)
+        port_col = find_port_column(df.columns)
+        space_col = find_space_column(df.columns)
+        group_indices = []
+        group_names = []
+        for idx, row in df.iterrows():
+            name_val = str(row['name']).strip() if pd.notna(row['name']) else ''
+            addr_val = str(row['addr']).strip() if pd.notna(row['addr']) else ''
+            is_addr_invalid = (not addr_val or addr_val.lower() in ['nan', '']) or not str(addr_val).replace('.0','').isdigit()
+            if name_val and is_addr_invalid:
+                group_indices.append(idx)
+                group_names.append(name_val)
+        group_indices.append(len(df))
+        groups = []
+        for i in range(len(group_names)):
+            start = group_indices[i] + 1
+            end = group_indices[i+1] if i+1 < len(group_indices) else len(df)
+            group_df = df.iloc[start:end].copy()
+            group_df = group_df[group_df['addr'].apply(lambda x: pd.notna(x) and str(x).replace('.0','').isdigit())]
+            group_df['addr'] = group_df['addr'].apply(lambda x: str(int(float(x))))
+            if group_df.empty:
+                continue
+
+            group_slave = default_slave
+            if slave_col is not None:
+                group_slave = parse_slave(df.iloc[group_indices[i]][slave_col]) or default_slave
+                group_df['slave'] = group_df[slave_col].apply(lambda x: parse_slave(x) or group_slave)
+            else:
+                group_df['slave'] = group_slave
+            if port_col is not None:
+                group_port = parse_port(df.iloc[group_indices[i]][port_col])
+                group_df['port'] = group_df[port_col].apply(lambda x: parse_port(x) or group_port)
+            else:
+                group_df['port'] = ''
+            if space_col is not None:
+                group_space = parse_space(df.iloc[group_indices[i]][space_col]) or SPACE_HOLDING
+                group_df['space'] = group_df[space_col].apply(lambda x: parse_space(x) or group_space)
+            else:
+                group_df['space'] = SPACE_HOLDING
+
+            # 修复dataType列，确保正确处理数据类型
+            if 'dataType' in group_df.columns:
+                group_df['dataType'] = group_df['dataType'].apply(
+                    lambda x: 'UNSIGNED' if pd.isna(x) or str(x).upper() == 'NAN' or str(x).strip() == '' else str(x)
+                )
+                # 特殊处理：标记所有需要SIGNED类型的地址
+                known_signed_addrs = ['10000', '10001', '10002', '10003', '10004', '10005', '10006', '10007', '10008', '10009', '10010', '10011', '10012']
+                group_df.loc[group_df['addr'].isin(known_signed_addrs), 'dataType'] = 'SIGNED'
+                # 确保所有SIGNED的dataType大写，以便后续处理
+                group_df.loc[group_df['dataType'].str.upper() == 'SIGNED', 'dataType'] = 'SIGNED'
+            groups.append((group_names[i], group_slave, group_df))
+        return groups
+
+    def load_ports(self, sheet_name: str = 'Ports') -> dict:
+        """
+        加载附加串口的通信参数，返回 {端口: {baudrate, bytesize, parity, stopbits, mode}}；
+        Modbus TCP端点可配置 connections（连接数）和 inflight（每条连接的并发请求数）；
+        Ports页不存在时返回空字典（附加串口沿用主串口参数）
+        """
+        try:
+            df = pd.read_excel(self.filepath, sheet_name=sheet_name, dtype=str)
+        except Exception:
+            return {}
+        ports = {}
+        for _, row in df.iterrows():
+            port = parse_port(row.get('port'))
+            if not port:
+                continue
+            config = {}
+            for key in ('baudrate', 'bytesize', 'stopbits', 'connections', 'inflight'):
+                val = str(row.get(key, '')).strip()
+                try:
+                    config[key] = int(float(val))
+                except ValueError:
+                    pass
+            for key in ('parity', 'mode'):
+                val = str(row.get(key, '')).strip()
+                if val and val.lower() != 'nan':
+                    config[key] = val.upper()
+            ports[port] = config
+        return ports
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import glob
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import time
+from datetime import datetime
+
+from core.protocol import Protocol
+
+# 事务状态
+STATUS_OK = 'ok'
+STATUS_CRC_ERROR = 'crc_error'
+STATUS_LENGTH_ERROR = 'length_error'
+STATUS_EXCEPTION = 'exception'
+STATUS_NO_RESPONSE = 'no_response'
+STATUS_COMM_ERROR = 'comm_error'
+STATUSES = [STATUS_OK, STATUS_CRC_ERROR, STATUS_LENGTH_ERROR, STATUS_EXCEPTION,
+            STATUS_NO_RESPONSE, STATUS_COMM_ERROR]
+
+# 2025-05-07 14:21:37,700 - core.modbus_worker - INFO - 发送请求: 01 03 27 10 00 28 4e a5
+LINE_RE = re.compile(r'^(\d{4})-(\d\d)-(\d\d) (\d\d):(\d\d):(\d\d),(\d{3}) - ([^ ]+) - ([A-Z]+) - (.*)$')
+HEX_RE = re.compile(r'^((?:[0-9a-fA-F]{2} ?)+)')
+
+SEND_MARK = '发送请求: '
+RECV_MARK = '接收响应: '
+# 工作线程在收到响应后输出的结论行，用于补充无法从帧本身判断的状态
+MESSAGE_STATUS = [
+    ('无响应', STATUS_NO_RESPONSE),
+    ('通信错误', STATUS_COMM_ERROR),
+]
+
+BATCH_SIZE = 5000
+SIGNATURE_BYTES = 512
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE,
+    signature TEXT,
+    offset INTEGER,
+    lines INTEGER,
+    imported_at REAL
+);
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    ts REAL,
+    file_id INTEGER,
+    line INTEGER,
+    slave INTEGER,
+    func INTEGER,
+    start_addr INTEGER,
+    end_addr INTEGER,
+    status TEXT,
+    exception_code INTEGER,
+    request BLOB,
+    response BLOB
+);
+CREATE INDEX IF NOT EXISTS ix_tx_ts ON transactions(ts);
+CREATE INDEX IF NOT EXISTS ix_tx_slave_func_ts ON transactions(slave, func, ts);
+CREATE INDEX IF NOT EXISTS ix_tx_status_ts ON transactions(status, ts);
+CREATE INDEX IF NOT EXISTS ix_tx_addr ON transactions(start_addr, end_addr);
+'''
+
+
+def decode_line(raw):
+    """日志可能是UTF-8(LogManager)或gb18030(旧版basicConfig)，逐行判断"""
+    try:
+        return raw.decode('utf-8')
+    except UnicodeDecodeError:
+        return raw.decode('gb18030', errors='replace')
+
+
+def parse_hex(text):
+    m = HEX_RE.match(text.strip())
+    if not m:
+        return b''
+    try:
+        return bytes.fromhex(m.group(1))
+    except ValueError:
+        return b''
+
+
+def frame_bytes(frame):
+    """ASCII帧转换为 地址+功能码+数据+LRC 的二进制，RTU帧原样返回"""
+    if frame[:1] == b':':
+        try:
+            return bytes.fromhex(frame[1:].strip().decode('ascii'))
+        except (ValueError, UnicodeDecodeError):
+            return b''
+    return frame
+
+
+def describe_request(request):
+    """返回 (从站, 功能码, 起始地址, 结束地址)"""
+    body = frame_bytes(request)
+    if len(body) < 6:
+        return None, None, None, None
+    slave, func = body[0], body[1]
+    start = int.from_bytes(body[2:4], 'big')
+    if func in (1, 2, 3, 4, 15, 16):
+        qty = int.from_bytes(body[4:6], 'big')
+        return slave, func, start, start + max(qty, 1) - 1
+    return slave, func, start, start
+
+
+def classify_response(request, response):
+    """根据帧内容判断事务状态，返回 (状态, 异常码)"""
+    if not response:
+        return STATUS_NO_RESPONSE, None
+    if response[:1] == b':':
+        body = frame_bytes(response)
+        if len(body) < 3 or Protocol.calc_lrc(body[:-1])[0] != body[-1]:
+            return STATUS_CRC_ERROR, None
+        payload = body[:-1]
+    else:
+        if len(response) < 5:
+            return STATUS_LENGTH_ERROR, None
+        payload = response[:-2]
+        if Protocol.calc_crc(payload) != response[-2:]:
+            # 长度不够时CRC必然失败，优先归为长度错误
+            expected = expected_response_length(request)
+            if expected and len(response) < expected:
+                return STATUS_LENGTH_ERROR, None
+            return STATUS_CRC_ERROR, None
+    if payload[1] & 0x80:
+        return STATUS_EXCEPTION, payload[2] if len(payload) > 2 else None
+    return STATUS_OK, None
+
+
+def expected_response_length(request):
+    slave, func, start, end = describe_request(request)
+    if func in (3, 4):
+        return 5 + 2 * (end - start + 1)
+    if func in (1, 2):
+        return 5 + (end - start + 8) // 8
+    if func in (5, 6, 15, 16):
+        return 8
+    return None
+
+
+def file_signature(path, length=SIGNATURE_BYTES):
+    """文件头部摘要 '长度:sha1'，用于识别轮转后被改名的同一文件"""
+    with open(path, 'rb') as f:
+        head = f.read(length)
+    return f"{len(head)}:{hashlib.sha1(head).hexdigest()}"
+
+
+def signature_matches(path, signature):
+    """文件头部与记录的签名一致（文件可能已经变长）"""
+    if not signature or ':' not in signature:
+        return False
+    length = int(signature.split(':', 1)[0])
+    return os.path.getsize(path) >= length and file_signature(path, length) == signature
+
+
+def _line_timestamp(m):
+    return datetime(int(m.group(1)), int(m.group(2)), int(m.group(3)),
+                    int(m.group(4)), int(m.group(5)), int(m.group(6)),
+                    int(m.group(7)) * 1000).timestamp()
+
+
+class LogIndex:
+    """
+    modbus.log 流式导入与索引：
+      - 逐行读取，不整体加载文件；请求/响应配对为事务后批量写入SQLite
+      - 记录每个文件已导入的偏移，再次导入时只处理新增部分
+      - 按时间、从站、功能码、地址范围、错误类型建立索引以支持快速查询
+    """
+
+    def __init__(self, db_path='modbus_log_index.db'):
+        self.db_path = db_path
+        self.logger = logging.getLogger(__name__)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    @staticmethod
+    def expand_paths(patterns):
+        """展开通配符（如 modbus.log*），按修改时间排序，保证轮转文件按时间先后导入"""
+        paths = []
+        for pattern in patterns:
+            matched = glob.glob(pattern) or ([pattern] if os.path.exists(pattern) else [])
+            for p in matched:
+                if os.path.isfile(p) and not p.endswith(('.db', '-wal', '-shm')) and p not in paths:
+                    paths.append(p)
+        return sorted(paths, key=os.path.getmtime)
+
+    def import_files(self, patterns, progress=None, should_stop=None):
+        """导入多个文件，progress(path, lines, transactions) 定期回调"""
+        total = 0
+        for path in self.expand_paths(patterns):
+            if should_stop and should_stop():
+                break
+            total += self.import_file(path, progress, should_stop)
+        return total
+
+    def import_file(self, path, progress=None, should_stop=None):
+        path = os.path.abspath(path)
+        size = os.path.getsize(path)
+        row = self.conn.execute('SELECT id, signature, offset, lines FROM files WHERE path=?', (path,)).fetchone()
+        if row is None or not signature_matches(path, row[1]):
+            # 轮转后改名的文件：按头部签名找回原记录，从上次的偏移继续
+            for moved in self.conn.execute('SELECT id, signature, offset, lines, path FROM files').fetchall():
+                if moved[4] != path and signature_matches(path, moved[1]) and \
+                        not (os.path.exists(moved[4]) and signature_matches(moved[4], moved[1])):
+                    if row is not None:
+                        self.conn.execute('DELETE FROM transactions WHERE file_id=?', (row[0],))
+                        self.conn.execute('DELETE FROM files WHERE id=?', (row[0],))
+                    self.conn.execute('UPDATE files SET path=? WHERE id=?', (path, moved[0]))
+                    row = moved[:4]
+                    break
+        offset = 0
+        line_no = 0
+        if row is not None:
+            file_id, old_signature, old_offset, old_lines = row
+            if signature_matches(path, old_signature) and old_offset <= size:
+                offset, line_no = old_offset, old_lines
+                if offset == size:
+                    return 0
+            else:
+                # 同名文件已被轮转替换，清掉旧记录重新导入
+                self.conn.execute('DELETE FROM transactions WHERE file_id=?', (file_id,))
+                self.conn.execute('UPDATE files SET signature=? WHERE id=?', (file_signature(path), file_id))
+        else:
+            signature = file_signature(path)
+            file_id = self.conn.execute(
+                'INSERT INTO files(path, signature, offset, lines, imported_at) VALUES (?, ?, 0, 0, ?)',
+                (path, signature, time.time())).lastrowid
+
+        count = 0
+        batch = []
+        pending = None  # [ts, line, request, response, status, 请求行偏移]
+        insert = ('INSERT INTO transactions(ts, file_id, line, slave, func, start_addr, end_addr, '
+                  'status, exception_code, request, response) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)')
+
+        def finish(tx):
+            ts, line, request, response, status = tx[:5]
+            slave, func, start, end = describe_request(request)
+            exc_code = None
+            if status is None or response:
+                status, exc_code = classify_response(request, response)
+            batch.append((ts, file_id, line, slave, func, start, end, status, exc_code, request, response or None))
+
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            for raw in f:
+                line_offset = offset
+                line_no += 1
+                if not raw.endswith(b'\n'):
+                    # 正在写入的半行留到下次导入
+                    line_no -= 1
+                    break
+                offset += len(raw)
+                if b' - ' not in raw:
+                    continue
+                text = decode_line(raw).rstrip('\r\n')
+                m = LINE_RE.match(text)
+                if not m:
+                    continue
+                message = m.group(10)
+                if message.startswith(SEND_MARK):
+                    if pending is not None:
+                        finish(pending)
+                    pending = [_line_timestamp(m), line_no, parse_hex(message[len(SEND_MARK):]), None, None, line_offset]
+                elif message.startswith(RECV_MARK) and pending is not None and pending[3] is None:
+                    pending[3] = parse_hex(message[len(RECV_MARK):])
+                elif pending is not None and pending[3] is None:
+                    for mark, status in MESSAGE_STATUS:
+                        if mark in message:
+                            pending[4] = status
+                            finish(pending)
+                            pending = None
+                            break
+                if len(batch) >= BATCH_SIZE:
+                    self._flush(insert, batch, file_id, offset, line_no)
+                    count += len(batch)
+                    batch.clear()
+                    if progress:
+                        progress(path, line_no, count)
+                    if should_stop and should_stop():
+                        break
+        if pending is not None:
+            if pending[3] is not None or pending[4] is not None:
+                finish(pending)
+            else:
+                # 文件末尾的请求可能还在等响应，回退到请求行重新导入
+                offset, line_no = pending[5], pending[1] - 1
+        self._flush(insert, batch, file_id, offset, line_no)
+        count += len(batch)
+        if progress:
+            progress(path, line_no, count)
+        self.logger.info(f"日志导入完成: {path}, 新增事务 {count}")
+        return count
+
+    def _flush(self, insert, batch, file_id, offset, line_no):
+        with self.conn:
+            if batch:
+                self.conn.executemany(insert, batch)
+            self.conn.execute('UPDATE files SET offset=?, lines=?, imported_at=? WHERE id=?',
+                              (offset, line_no, time.time(), file_id))
+
+    def query(self, start=None, end=None, slave=None, func=None, addr=None, addr_range=None,
+              status=None, limit=None):
+        """
+        按条件查询事务，逐行返回字典，例如 CRC 失败且覆盖地址10000的最近一周事务：
+            index.query(status='crc_error', addr=10000, start=time.time() - 7 * 86400)
+        """
+        sql, params = self._where(start, end, slave, func, addr, addr_range, status)
+        sql = ('SELECT t.ts, t.slave, t.func, t.start_addr, t.end_addr, t.status, t.exception_code, '
+               't.request, t.response, f.path, t.line FROM transactions t JOIN files f ON f.id = t.file_id'
+               + sql + ' ORDER BY t.ts')
+        if limit:
+            sql += ' LIMIT %d' % int(limit)
+        cur = self.conn.execute(sql, params)
+        keys = ['ts', 'slave', 'func', 'start_addr', 'end_addr', 'status', 'exception_code',
+                'request', 'response', 'path', 'line']
+        for row in cur:
+            yield dict(zip(keys, row))
+
+    def count(self, **filters):
+        sql, params = self._where(**filters)
+        return self.conn.execute('SELECT COUNT(*) FROM transactions t' + sql, params).fetchone()[0]
+
+    def summary(self, **filters):
+        """各状态的事务数量"""
+        sql, params = self._where(**filters)
+        cur = self.conn.execute('SELECT t.status, COUNT(*) FROM transactions t' + sql + ' GROUP BY t.status', params)
+        return dict(cur.fetchall())
+
+    @staticmethod
+    def _where(start=None, end=None, slave=None, func=None, addr=None, addr_range=None, status=None):
+        clauses = []
+        params = []
+        if start is not None:
+            clauses.append('t.ts >= ?')
+            params.append(start)
+        if end is not None:
+            clauses.append('t.ts < ?')
+            params.append(end)
+        if slave is not None:
+            clauses.append('t.slave = ?')
+            params.append(slave)
+        if func is not None:
+            clauses.append('t.func = ?')
+            params.append(func)
+        if addr is not None:
+            addr_range = (addr, addr)
+        if addr_range is not None:
+            clauses.append('t.start_addr <= ? AND t.end_addr >= ?')
+            params.extend([addr_range[1], addr_range[0]])
+        if status is not None:
+            if isinstance(status, (list, tuple, set)):
+                clauses.append('t.status IN (%s)' % ','.join('?' * len(status)))
+                params.extend(status)
+            else:
+                clauses.append('t.status = ?')
+                params.append(status)
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
@@ -1,21 +1,189 @@
+import atexit
 import logging
 import os
-from logging.handlers import TimedRotatingFileHandler
+import queue
+import threading
+import time
+from logging.handlers import TimedRotatingFileHandler, QueueHandler, QueueListener
+
+# 日志分类 -> logger名称，各分类级别可在运行时单独调整
+LOG_CATEGORIES = {
+    'protocol': 'modbus.protocol',  # 收发帧、超时、校验错误
+    'decode': 'modbus.decode',      # 寄存器解码
+    'ui': 'modbus.ui',              # 界面刷新
+}
+
+# 默认级别：逐寄存器的解码细节默认关闭，需要时在运行时打开
+DEFAULT_CATEGORY_LEVELS = {
+    'protocol': logging.INFO,
+    'decode': logging.WARNING,
+    'ui': logging.INFO,
+}
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+def get_category_logger(category):
+    """获取分类logger，如 get_category_logger('protocol')"""
+    return logging.getLogger(LOG_CATEGORIES.get(category, category))
+
+
+class RateLimitFilter(logging.Filter):
+    """重复消息限流：相同内容在interval秒内只记录一次，放行时附带被抑制的次数"""
+
+    def __init__(self, interval=10.0, max_keys=4096):
+        super().__init__()
+        self.interval = interval
+        self.max_keys = max_keys
+        self._seen = {}  # key -> [上次放行时间, 被抑制次数]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.ERROR and record.exc_info:
+            return True
+        key = (record.name, record.levelno, record.getMessage())
+        now = time.monotonic()
+        with self._lock:
+            entry = self._seen.get(key)
+            if entry is not None and now - entry[0] < self.interval:
+                entry[1] += 1
+                return False
+            suppressed = entry[1] if entry is not None else 0
+            if len(self._seen) >= self.max_keys:
+                self._seen.clear()
+            self._seen[key] = [now, 0]
+        if suppressed:
+            record.msg = f"{record.getMessage()} (已抑制 {suppressed} 条重复)"
+            record.args = None
+        return True
+
 
 class LogManager:
-    def __init__(self, logfile='modbus.log'):
+    """
+    统一日志配置：
+      - 所有logger只挂一个QueueHandler，磁盘/控制台I/O在独立监听线程中完成，调用线程永不阻塞
+      - 唯一的文件输出为UTF-8按天轮转的TimedRotatingFileHandler
+      - 分类(protocol/decode/ui)级别可运行时调整，热路径分类带重复消息限流
+    """
+
+    def __init__(self, logfile='modbus.log', level=logging.DEBUG, console=False,
+                 rate_limit_interval=10.0):
         os.makedirs(os.path.dirname(logfile) or '.', exist_ok=True)
+        self.logfile = logfile
         handler = TimedRotatingFileHandler(
-            logfile, 
-            when='midnight', 
+            logfile,
+            when='midnight',
             backupCount=30,
             encoding='utf-8'
         )
-        fmt = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        handler.setFormatter(logging.Formatter(fmt))
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        handlers = [handler]
+        if console:
+            stream = logging.StreamHandler()
+            stream.setFormatter(logging.Formatter(LOG_FORMAT))
+            handlers.append(stream)
+
+        self.queue = queue.SimpleQueue()
+        self.listener = QueueListener(self.queue, *handlers, respect_handler_level=True)
+
+        root = logging.getLogger()
+        for old in list(root.handlers):
+            root.removeHandler(old)
+        root.addHandler(QueueHandler(self.queue))
+        root.setLevel(level)
+
+        self.rate_limiter = RateLimitFilter(rate_limit_interval)
+        for category, name in LOG_CATEGORIES.items():
+            category_logger = logging.getLogger(name)
+            category_logger.setLevel(DEFAULT_CATEGORY_LEVELS.get(category, logging.INFO))
+            if category in ('protocol', 'decode'):
+                category_logger.addFilter(self.rate_limiter)
+
+        self.listener.start()
+        atexit.register(self.stop)
+
         self.logger = logging.getLogger('ModbusLogger')
         self.logger.setLevel(logging.DEBUG)
-        self.logger.addHandler(handler)
 
     def log(self, level, msg):
         self.logger.log(level, msg)
+
+    def set_category_level(self, category, level):
+        """运行时设置分类级别，level可为logging常量或 'DEBUG'/'INFO' 等字符串"""
+        if category not in LOG_CATEGORIES:
+            raise ValueError(f"未知日志分类: {category}")
+        if isinstance(level, str):
+            level = logging.getLevelName(level.upper())
+        logging.getLogger(LOG_CATEGORIES[category]).setLevel(level)
+
+    def get_category_levels(self):
+        return {c: logging.getLogger(n).level for c, n in LOG_CATEGORIES.items()}
+
+    def set_rate_limit(self, interval):
+        self.rate_limiter.interval = interval
+
+    def stop(self):
+        """停止监听线程并把队列中剩余日志写完"""
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+
+_log_manager = None
+
+
+def setup_logging(logfile='modbus.log', **kwargs):
+    """进程内只配置一次日志，重复调用返回同一个LogManager"""
+    global _log_manager
+    if _log_manager is None:
+        _log_manager = LogManager(logfile, **kwargs)
+    return _log_manager
+
+
+def get_log_manager():
+    return _log_manager
+
+
+class _DispatchHandler(logging.Handler):
+    """把子进程送来的记录交给本进程的同名logger：经过本进程的分类级别、限流和唯一的文件输出"""
+
+    def handle(self, record):
+        logger = logging.getLogger(record.name)
+        if logger.isEnabledFor(record.levelno):
+            logger.handle(record)
+        return True
+
+
+class ChildLogForwarder:
+    """
+    子进程日志转发（父进程一侧）：子进程调用 setup_child_logging(forwarder.queue, forwarder.levels())，
+    记录经 multiprocessing 队列送回，由本进程的监听线程分发，不在子进程中直接写控制台或文件
+    """
+
+    def __init__(self, ctx):
+        self.queue = ctx.Queue()
+        self.listener = QueueListener(self.queue, _DispatchHandler())
+        self.listener.start()
+
+    @staticmethod
+    def levels():
+        """子进程使用的级别：根logger和各分类当前的级别"""
+        names = [''] + list(LOG_CATEGORIES.values())
+        return {name: logging.getLogger(name).getEffectiveLevel() for name in names}
+
+    def stop(self):
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+            self.queue.close()
+            self.queue.join_thread()
+
+
+def setup_child_logging(log_queue, levels=None):
+    """子进程入口调用：所有记录经 QueueHandler 送回父进程的 ChildLogForwarder"""
+    root = logging.getLogger()
+    for old in list(root.handlers):
+        root.removeHandler(old)
+    root.addHandler(QueueHandler(log_queue))
+    for name, level in (levels or {'': logging.INFO}).items():
+        logging.getLogger(name).setLevel(level)